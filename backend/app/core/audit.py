@@ -1,9 +1,304 @@
-import json, time
-from datetime import datetime
-
-def audit_log(action: str, request: dict, response: dict, user_id: str = "demo", role: str = "Analyst"):
-    # для MVP: пишем в файл; для прод: в таблицу audit_log
-    rec = {"ts": datetime.utcnow().isoformat(), "user": user_id, "role": role,
-           "action": action, "request": request, "response": response}
-    with open("/app/data/audit.log", "a") as f:
-        f.write(json.dumps(rec, ensure_ascii=False) + "\n")
+# backend/app/core/audit.py
+from __future__ import annotations
+import atexit
+import gzip
+import hashlib
+import json
+import math
+import os
+import queue
+import shutil
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from . import config
+from .tenant import get_tenant
+
+# для MVP: пишем в файл (/app/data/audit в контейнере); для прод: в таблицу audit_log
+AUDIT_DIR = Path(config.AUDIT_DIR) if config.AUDIT_DIR else Path(__file__).resolve().parents[2] / "data" / "audit"
+ACTIVE_NAME = "audit.log"
+_TS_FMT = "%Y%m%dT%H%M%S"
+# ts берётся в потоке запроса до submit(): одновременные записи попадают в файл слегка не по порядку
+ORDER_SLACK_S = 5.0
+
+
+def _shift(ts: Optional[str], seconds: float) -> Optional[str]:
+    return (datetime.fromisoformat(ts) + timedelta(seconds=seconds)).isoformat() if ts else None
+
+
+def _shrink(payload: Any) -> Any:
+    """Большие тела не пишем целиком: sha256 + размер + короткое превью."""
+    try:
+        raw = json.dumps(payload, ensure_ascii=False, default=str)
+    except Exception:
+        raw = str(payload)
+    if len(raw) <= config.AUDIT_MAX_PAYLOAD_BYTES:
+        return payload
+    return {
+        "_truncated": True,
+        "sha256": hashlib.sha256(raw.encode("utf-8")).hexdigest(),
+        "bytes": len(raw),
+        "preview": raw[:256],
+    }
+
+
+def _finite(o: Any) -> Any:
+    """NaN/inf → None: журнал должен оставаться валидным JSON (его отдаёт /api/audit)."""
+    if isinstance(o, float):
+        return o if math.isfinite(o) else None
+    if isinstance(o, dict):
+        return {k: _finite(v) for k, v in o.items()}
+    if isinstance(o, (list, tuple)):
+        return [_finite(v) for v in o]
+    return o
+
+
+def _parse_ts(line: str) -> Optional[str]:
+    # строки пишутся с ключом "ts" первым: {"ts": "2025-09-20T10:00:00.123456", ...}
+    if not line.startswith('{"ts": "'):
+        return None
+    end = line.find('"', 8)
+    return line[8:end] if end > 0 else None
+
+
+class AuditWriter:
+    """
+    Фоновый писатель аудита: запросы только кладут запись в очередь,
+    поток пачками пишет в audit.log (по размеру пачки или интервалу),
+    ротирует по размеру/смене дня и сжимает закрытые файлы в gzip.
+    Закрытые файлы называются audit-<first_ts>-<last_ts>.log.gz — поиск по времени
+    отбрасывает их по имени, не открывая.
+    """
+
+    def __init__(self, directory: Path):
+        self.dir = Path(directory)
+        self._q: "queue.Queue[Optional[Dict[str, Any]]]" = queue.Queue(maxsize=config.AUDIT_QUEUE_SIZE)
+        self._thread: Optional[threading.Thread] = None
+        self._start_lock = threading.Lock()
+        self._io_lock = threading.Lock()
+        self._first_ts: Optional[str] = None
+        self._last_ts: Optional[str] = None
+        self.dropped = 0
+        self.written = 0
+
+    # --- API ---
+
+    def submit(self, rec: Dict[str, Any]) -> None:
+        """Сериализация и усечение payload — уже в фоновом потоке, не в запросе."""
+        self._ensure_started()
+        try:
+            self._q.put_nowait(rec)
+        except queue.Full:
+            self.dropped += 1  # аудит не должен блокировать запрос
+
+    def flush(self, timeout: float = 5.0) -> None:
+        """Дождаться записи всего, что уже в очереди (для тестов/shutdown)."""
+        if self._thread is None:
+            return
+        deadline = time.monotonic() + timeout
+        while self._q.unfinished_tasks and time.monotonic() < deadline:
+            time.sleep(0.01)
+
+    def close(self) -> None:
+        if self._thread is None:
+            return
+        self._q.put(None)
+        self._thread.join(timeout=5.0)
+        self._thread = None
+
+    # --- фоновый поток ---
+
+    def _ensure_started(self) -> None:
+        if self._thread is not None:
+            return
+        with self._start_lock:
+            if self._thread is None:
+                self.dir.mkdir(parents=True, exist_ok=True)
+                self._load_active_bounds()
+                self._thread = threading.Thread(target=self._run, name="audit-writer", daemon=True)
+                self._thread.start()
+                atexit.register(self.close)  # дописать хвост очереди при выходе процесса
+
+    def _run(self) -> None:
+        batch: List[str] = []
+        deadline = time.monotonic() + config.AUDIT_FLUSH_INTERVAL_S
+        stop = False
+        while not stop:
+            try:
+                item = self._q.get(timeout=max(0.0, deadline - time.monotonic()))
+                if item is None:
+                    stop = True
+                    self._q.task_done()
+                else:
+                    try:
+                        batch.append(self._encode(item))
+                    except Exception:
+                        self._q.task_done()  # битую запись пропускаем, счётчик очереди не теряем
+            except queue.Empty:
+                pass
+            if batch and (stop or len(batch) >= config.AUDIT_BATCH_SIZE or time.monotonic() >= deadline):
+                try:
+                    self._write(batch)
+                except Exception as e:  # не роняем поток из-за диска
+                    print(f"audit write failed: {e}")
+                for _ in batch:
+                    self._q.task_done()
+                batch = []
+            if time.monotonic() >= deadline:
+                deadline = time.monotonic() + config.AUDIT_FLUSH_INTERVAL_S
+
+    @staticmethod
+    def _encode(rec: Dict[str, Any]) -> str:
+        rec = dict(rec)
+        for k in ("request", "response"):
+            v = rec.get(k)
+            if hasattr(v, "model_dump"):  # pydantic-ответы роутеров
+                v = v.model_dump(mode="json")
+            rec[k] = _shrink(_finite(v))
+        return json.dumps(rec, ensure_ascii=False, default=str)
+
+    def _write(self, lines: List[str]) -> None:
+        with self._io_lock:
+            active = self.dir / ACTIVE_NAME
+            chunk: List[str] = []
+            for line in lines:
+                ts = _parse_ts(line) or datetime.utcnow().isoformat()
+                if self._first_ts and self._needs_rotation(active, ts, chunk):
+                    self._append(active, chunk)
+                    chunk = []
+                    self._rotate(active)
+                if not self._first_ts:
+                    self._first_ts = ts
+                self._last_ts = ts
+                chunk.append(line)
+            self._append(active, chunk)
+            self.written += len(lines)
+
+    def _append(self, path: Path, chunk: List[str]) -> None:
+        if not chunk:
+            return
+        with open(path, "a", encoding="utf-8") as f:
+            f.write("\n".join(chunk) + "\n")
+            if config.AUDIT_FSYNC:
+                f.flush()
+                os.fsync(f.fileno())
+
+    def _needs_rotation(self, active: Path, ts: str, pending: List[str]) -> bool:
+        if config.AUDIT_ROTATE_DAILY and ts[:10] != self._first_ts[:10]:
+            return True
+        size = active.stat().st_size if active.exists() else 0
+        size += sum(len(x) + 1 for x in pending)
+        return size >= config.AUDIT_MAX_BYTES
+
+    def _rotate(self, active: Path) -> None:
+        if not active.exists():
+            self._first_ts = self._last_ts = None
+            return
+        first = datetime.fromisoformat(self._first_ts).strftime(_TS_FMT)
+        last = datetime.fromisoformat(self._last_ts).strftime(_TS_FMT)
+        target = self.dir / f"audit-{first}-{last}.log.gz"
+        n = 1
+        while target.exists():
+            target = self.dir / f"audit-{first}-{last}.{n}.log.gz"
+            n += 1
+        with open(active, "rb") as src, gzip.open(target, "wb", compresslevel=6) as dst:
+            shutil.copyfileobj(src, dst)
+        active.unlink()
+        self._first_ts = self._last_ts = None
+
+    def _load_active_bounds(self) -> None:
+        active = self.dir / ACTIVE_NAME
+        if not active.exists() or active.stat().st_size == 0:
+            return
+        with open(active, "r", encoding="utf-8") as f:
+            self._first_ts = _parse_ts(f.readline())
+        with open(active, "rb") as f:
+            f.seek(max(0, active.stat().st_size - 64 * 1024))
+            tail = f.read().decode("utf-8", errors="ignore").splitlines()
+        self._last_ts = next((t for t in (_parse_ts(x) for x in reversed(tail)) if t), self._first_ts)
+
+    # --- чтение ---
+
+    def _files_for_range(self, start: Optional[str], end: Optional[str]) -> List[Path]:
+        files: List[Tuple[str, Path]] = []
+        # границы файла — первая/последняя записанная, а не min/max ts: расширяем диапазон на запас
+        start, end = _shift(start, -ORDER_SLACK_S), _shift(end, ORDER_SLACK_S)
+        for p in self.dir.glob("audit-*.log.gz"):
+            parts = p.name.split(".")[0].split("-")  # audit-<first>-<last>
+            try:
+                first = datetime.strptime(parts[1], _TS_FMT).isoformat()
+                last = datetime.strptime(parts[2], _TS_FMT).isoformat()
+            except (IndexError, ValueError):
+                continue
+            # имя хранит время с точностью до секунды — сравниваем по секундам
+            if end and first[:19] > end[:19]:
+                continue
+            if start and last[:19] < start[:19]:
+                continue
+            files.append((first, p))
+        files.sort()
+        out = [p for _, p in files]
+        active = self.dir / ACTIVE_NAME
+        if active.exists():
+            out.append(active)
+        return out
+
+    def iter_records(self, start: Optional[str] = None, end: Optional[str] = None) -> Iterator[Dict[str, Any]]:
+        """Записи в диапазоне [start, end] (ISO-строки UTC), в порядке записи (≈ времени)."""
+        self.flush()
+        stop = _shift(end, ORDER_SLACK_S)
+        for path in self._files_for_range(start, end):
+            opener = gzip.open if path.suffix == ".gz" else open
+            with opener(path, "rt", encoding="utf-8") as f:
+                for line in f:
+                    ts = _parse_ts(line)
+                    if ts is None:
+                        continue
+                    if start and ts < start:
+                        continue
+                    if end and ts > end:
+                        if ts > stop:
+                            break  # дальше ORDER_SLACK_S от end — более ранних записей уже не будет
+                        continue
+                    yield json.loads(line)
+
+
+AUDIT = AuditWriter(AUDIT_DIR)
+
+
+def audit_log(action: str, request: dict, response: dict, user_id: str = "demo", role: str | None = None):
+    rec = {"ts": datetime.utcnow().isoformat(), "tenant": get_tenant(), "user": user_id,
+           "role": role or _current_role(), "action": action,
+           "request": request, "response": response}
+    AUDIT.submit(rec)
+
+
+def query_audit(start: Optional[datetime] = None, end: Optional[datetime] = None,
+                action: Optional[str] = None, limit: int = 1000) -> List[Dict[str, Any]]:
+    """Записи текущего тенанта за период (по возрастанию времени)."""
+    def iso(d: Optional[datetime]) -> Optional[str]:
+        if d is None:
+            return None
+        if d.tzinfo is not None:
+            d = d.astimezone(timezone.utc).replace(tzinfo=None)
+        return d.isoformat()
+
+    tenant = get_tenant()
+    out: List[Dict[str, Any]] = []
+    for rec in AUDIT.iter_records(iso(start), iso(end)):
+        if rec.get("tenant", config.DEFAULT_TENANT) != tenant:
+            continue
+        if action and rec.get("action") != action:
+            continue
+        out.append(rec)
+        if len(out) >= limit:
+            break
+    return out
+
+
+def _current_role() -> str:
+    from .auth import current_role  # локальный импорт: auth тянет fastapi
+    return current_role.get()
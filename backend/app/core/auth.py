@@ -1,13 +1,31 @@
 # backend/app/core/auth.py
 from fastapi import Header, HTTPException
+from contextvars import ContextVar
 from typing import Iterable, Optional
 from . import config
+from .tenant import current_tenant, validate_tenant
+
+# роль текущего запроса (для аудита)
+current_role: ContextVar[str] = ContextVar("current_role", default=config.DEFAULT_ROLE)
+
+def _bind_tenant(x_tenant: str | None):
+    try:
+        current_tenant.set(validate_tenant(x_tenant or config.DEFAULT_TENANT))
+    except ValueError as e:
+        raise HTTPException(400, str(e))
 
 def require_any(*roles):
     allowed = set(roles)
     default_role = getattr(config, "DEFAULT_ROLE", None) or "Analyst"
-    async def _inner(x_role: str | None = Header(default=None, alias="X-Role")):
+    async def _inner(x_role: str | None = Header(default=None, alias="X-Role"),
+                     x_tenant: str | None = Header(default=None, alias="X-Tenant")):
         role = x_role or default_role
         if role not in allowed:
             raise HTTPException(403, "forbidden")
+        current_role.set(role)
+        _bind_tenant(x_tenant)
     return _inner
+
+async def tenant_scope(x_tenant: str | None = Header(default=None, alias="X-Tenant")):
+    """Только привязка тенанта (для роутов без RBAC: upload, sources, dev)."""
+    _bind_tenant(x_tenant)
@@ -24,6 +24,9 @@ DATABASE_URL = os.getenv(
     "DATABASE_URL",
     "postgresql://liquidity:liquidity@db:5432/liquidity"
 )
+STORAGE_BACKEND = os.getenv("STORAGE_BACKEND", "files").lower()   # "files" (parquet/csv) | "sql" (DATABASE_URL)
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "4"))                  # соединений в пуле SqlStore
+DB_POOL_TIMEOUT_S = float(os.getenv("DB_POOL_TIMEOUT_S", "30"))     # ожидание свободного соединения
 
 # =========================
 # Forecast / KPI
@@ -32,6 +35,39 @@ DEFAULT_HORIZON_DAYS = int(os.getenv("DEFAULT_HORIZON_DAYS", "35"))  # T+35
 REPORT_TIMEOUT_S = int(os.getenv("REPORT_TIMEOUT_S", "10"))          # отчет ≤10с
 SCENARIO_TIMEOUT_S = int(os.getenv("SCENARIO_TIMEOUT_S", "5"))      # сценарий ≤5с
 ALERT_WINDOW_DAYS = int(os.getenv("ALERT_WINDOW_DAYS", "14"))       # алерты на 14д
+ALERT_RULES = os.getenv("ALERT_RULES", "")   # "окно:порог,..." (баланс < порога в окне); пусто — разрыв за ALERT_WINDOW_DAYS
+
+STARTUP_WARMUP = os.getenv("STARTUP_WARMUP", "true").lower() == "true"  # фоновый импорт ReportLab/pmdarima после старта
+MODEL_WARMUP_ON_SYNC = os.getenv("MODEL_WARMUP_ON_SYNC", "true").lower() == "true"  # перефит моделей после sync/upload
+MODEL_WARMUP_HOUR = int(os.getenv("MODEL_WARMUP_HOUR", "2"))        # ночной прогрев (час, TIMEZONE); -1 = выкл
+MODEL_KEEP_VERSIONS = int(os.getenv("MODEL_KEEP_VERSIONS", "3"))    # артефакты последних N версий данных
+HIER_MAX_WORKERS = int(os.getenv("HIER_MAX_WORKERS", str(min(8, os.cpu_count() or 4))))  # параллельные фиты листьев
+HIER_COMPONENT_MODEL = os.getenv("HIER_COMPONENT_MODEL", "auto")   # auto (arima|naive_mean) или имя модели реестра
+MODEL_SELECTION = os.getenv("MODEL_SELECTION", "true").lower() == "true"   # champion/challenger по backtest
+MODEL_SELECTION_BUCKETS = [int(x) for x in os.getenv("MODEL_SELECTION_BUCKETS", "7,14,35,60").split(",") if x.strip()]
+MODEL_SELECTION_WINDOW = int(os.getenv("MODEL_SELECTION_WINDOW", "30"))            # мин. история окна backtest
+MODEL_SELECTION_MAX_ORIGINS = int(os.getenv("MODEL_SELECTION_MAX_ORIGINS", "20"))  # последних точек отсечения
+
+FORECAST_INTERVAL_LEVEL = float(os.getenv("FORECAST_INTERVAL_LEVEL", "0.8"))  # уровень интервалов прогноза
+INTERVAL_MAX_ORIGINS = int(os.getenv("INTERVAL_MAX_ORIGINS", "40"))  # окон backtest для остатков (ARIMA/Prophet — MIN)
+INTERVAL_MIN_ORIGINS = int(os.getenv("INTERVAL_MIN_ORIGINS", "10"))  # меньше окон — нормальное приближение
+
+MULTI_ARIMA_FALLBACK = os.getenv("MULTI_ARIMA_FALLBACK", "true").lower() == "true"  # ARIMA там, где ES не хватает
+MULTI_ARIMA_WORKERS = int(os.getenv("MULTI_ARIMA_WORKERS", str(min(4, os.cpu_count() or 2))))  # процессы ARIMA в батче
+MULTI_MAX_SERIES = int(os.getenv("MULTI_MAX_SERIES", "500"))       # рядов в одном /forecast/batch
+
+BATCH_MAX_WORKERS = int(os.getenv("BATCH_MAX_WORKERS", str(min(8, os.cpu_count() or 4))))  # процессы батч-отчётов
+
+# тяжёлые эндпоинты (прогноз, сценарий, backtest, PDF) вне event loop — core/offload.py
+OFFLOAD_WORKERS = int(os.getenv("OFFLOAD_WORKERS", "0"))            # процессы пула; 0 — в потоке, как раньше
+OFFLOAD_MAX_INFLIGHT = int(os.getenv("OFFLOAD_MAX_INFLIGHT", "16"))  # в работе + в очереди; сверх — 429
+OFFLOAD_START_METHOD = os.getenv("OFFLOAD_START_METHOD", "spawn")   # spawn | forkserver | fork
+OFFLOAD_RETRY_AFTER_S = int(os.getenv("OFFLOAD_RETRY_AFTER_S", "2"))  # заголовок Retry-After у 429
+
+# сжатие и условные GET (ETag по версии данных + параметрам) — core/httpcache.py
+GZIP_MIN_BYTES = int(os.getenv("GZIP_MIN_BYTES", "1024"))           # тела меньше не сжимаются; 0 — без gzip
+GZIP_LEVEL = int(os.getenv("GZIP_LEVEL", "5"))
+HTTP_ETAGS = os.getenv("HTTP_ETAGS", "true").lower() == "true"       # ETag/If-None-Match → 304 на GET
 
 KPI_MAPE_TARGET = float(os.getenv("KPI_MAPE_TARGET", "12"))         # MAPE ≤12%
 KPI_PRECISION_GAP_TARGET = float(os.getenv("KPI_PRECISION_GAP_TARGET", "0.8"))  # Precision ≥0.8
@@ -42,6 +78,8 @@ KPI_PRECISION_GAP_TARGET = float(os.getenv("KPI_PRECISION_GAP_TARGET", "0.8"))
 FX_PAIRS = [pair.strip() for pair in os.getenv("FX_PAIRS", "").split(",") if pair.strip()]
 FX_SOURCE = os.getenv("FX_SOURCE", "csv")
 FX_FFILL = os.getenv("FX_FFILL", "true").lower() == "true"
+# годовые ставки для форвардных курсов (паритет ставок) в иерархическом прогнозе
+FX_INTEREST_RATES = os.getenv("FX_INTEREST_RATES", "KZT:0.1425,USD:0.0525,EUR:0.035")
 
 # =========================
 # Scheduler
@@ -56,11 +94,32 @@ JWT_ISSUER = os.getenv("JWT_ISSUER", "liquidity-assistant")
 JWT_AUDIENCE = os.getenv("JWT_AUDIENCE", "liquidity-users")
 DEFAULT_ROLE = os.getenv("DEFAULT_ROLE", "Analyst")
 
+# =========================
+# Multi-tenant / caches
+# =========================
+DEFAULT_TENANT = os.getenv("DEFAULT_TENANT", "default")            # без X-Tenant → data/processed
+CACHE_MAX_MB = int(os.getenv("CACHE_MAX_MB", "256"))               # общий лимит кэша датафреймов
+CACHE_TENANT_MAX_MB = int(os.getenv("CACHE_TENANT_MAX_MB", "0"))   # лимит на тенанта (0 = как общий)
+
+# =========================
+# Audit log
+# =========================
+AUDIT_DIR = os.getenv("AUDIT_DIR", "")                                       # пусто → <app>/data/audit
+AUDIT_FLUSH_INTERVAL_S = float(os.getenv("AUDIT_FLUSH_INTERVAL_S", "1.0"))   # сброс пачки не реже
+AUDIT_BATCH_SIZE = int(os.getenv("AUDIT_BATCH_SIZE", "200"))                 # ...или по размеру пачки
+AUDIT_QUEUE_SIZE = int(os.getenv("AUDIT_QUEUE_SIZE", "10000"))               # переполнение → запись теряется
+AUDIT_MAX_BYTES = int(os.getenv("AUDIT_MAX_BYTES", str(20 * 1024 * 1024)))   # ротация по размеру
+AUDIT_ROTATE_DAILY = os.getenv("AUDIT_ROTATE_DAILY", "true").lower() == "true"
+AUDIT_MAX_PAYLOAD_BYTES = int(os.getenv("AUDIT_MAX_PAYLOAD_BYTES", "4096"))  # больше → sha256 + превью
+AUDIT_FSYNC = os.getenv("AUDIT_FSYNC", "false").lower() == "true"            # fsync на пачку
+
 # =========================
 # Logging
 # =========================
 LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO")
 LOG_FORMAT = os.getenv("LOG_FORMAT", "json")
+METRICS_LOG_REQUESTS = os.getenv("METRICS_LOG_REQUESTS", "false").lower() == "true"  # JSON-лог на каждый запрос
+METRICS_LOG_SPANS = os.getenv("METRICS_LOG_SPANS", "false").lower() == "true"        # ...и на каждую стадию
 
 # =========================
 # Misc
@@ -0,0 +1,65 @@
+# backend/app/core/httpcache.py
+"""
+Условные GET для детерминированных результатов: прогноз и backtest однозначно заданы
+(набор данных, версия данных, параметры, формат), сохранённый прогон не меняется вовсе.
+ETag считается до расчёта — совпал If-None-Match → 304 без пула, модели и сериализации.
+Слабый (W/): nginx и GZip меняют байты тела, смысл ответа — нет.
+Cache-Control: private, no-cache — клиент хранит копию, но каждый раз сверяется (данные могут обновиться);
+Vary — ответ зависит от тенанта, роли и формата.
+"""
+from __future__ import annotations
+import hashlib
+import json
+from typing import Any, Dict, Optional
+
+from fastapi import Request, Response
+
+from . import config
+from .metrics import HTTP_CONDITIONAL
+
+VARY = "Accept, X-Tenant, X-Role"   # Accept-Encoding добавляет GZipMiddleware
+
+
+def etag_for(*parts: Any) -> str:
+    blob = json.dumps(parts, sort_keys=True, default=str, separators=(",", ":"))
+    return 'W/"' + hashlib.sha1(blob.encode("utf-8")).hexdigest()[:32] + '"'
+
+
+def cache_headers(etag: str) -> Dict[str, str]:
+    return {"ETag": etag, "Cache-Control": "private, no-cache", "Vary": VARY}
+
+
+def _matches(header: str, etag: str) -> bool:
+    if header.strip() == "*":
+        return True
+    opaque = etag[2:] if etag.startswith("W/") else etag
+    for tag in header.split(","):
+        tag = tag.strip()
+        if (tag[2:] if tag.startswith("W/") else tag) == opaque:   # слабое сравнение (RFC 9110 §8.8.3.2)
+            return True
+    return False
+
+
+def not_modified(request: Request, etag: Optional[str], route: str) -> Optional[Response]:
+    """304, если If-None-Match совпал с etag; иначе None (и счётчик miss)."""
+    if etag is None:
+        return None
+    header = request.headers.get("if-none-match")
+    if header and _matches(header, etag):
+        HTTP_CONDITIONAL.inc(route=route, result="not_modified")
+        return Response(status_code=304, headers=cache_headers(etag))
+    HTTP_CONDITIONAL.inc(route=route, result="miss")
+    return None
+
+
+def conditional(route: str, *parts: Any) -> Optional[str]:
+    """ETag по частям ключа (None при HTTP_ETAGS=false)."""
+    return etag_for(route, *parts) if config.HTTP_ETAGS else None
+
+
+def tag(result: Any, response: Response, etag: Optional[str]) -> Any:
+    """Заголовки кэша на ответ роута: на возвращённый Response или на response-параметр FastAPI."""
+    if etag is not None:
+        target = result if isinstance(result, Response) else response
+        target.headers.update(cache_headers(etag))
+    return result
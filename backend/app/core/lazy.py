@@ -0,0 +1,58 @@
+# backend/app/core/lazy.py
+from __future__ import annotations
+import threading
+import time
+from functools import lru_cache
+from importlib import import_module
+from importlib.util import find_spec
+from types import ModuleType
+from typing import Dict, Iterable, Optional
+
+from .logging import get_logger
+from .metrics import span
+
+log = get_logger("lazy")
+
+# время импорта модулей, прогретых warm_imports (мс) — для /api/metrics и логов старта
+IMPORT_MS: Dict[str, float] = {}
+
+
+@lru_cache(maxsize=None)
+def available(name: str) -> bool:
+    """Есть ли пакет — без импорта (find_spec читает только метаданные пути)."""
+    try:
+        return find_spec(name) is not None
+    except (ImportError, ValueError):
+        return False
+
+
+def load(name: str) -> ModuleType:
+    """Импорт при первом обращении; повторные — из sys.modules."""
+    return import_module(name)
+
+
+def warm_imports(modules: Iterable[str], background: bool = True) -> Optional[threading.Thread]:
+    """
+    Импортирует тяжёлые модули заранее (после старта API), чтобы первый запрос не платил за импорт.
+    Ошибки импорта не фатальны — модуль просто останется ленивым. Время — span("import") и IMPORT_MS.
+    """
+    modules = list(modules)
+
+    def run():
+        for name in modules:
+            t0 = time.perf_counter()
+            try:
+                with span(f"import:{name}"):
+                    load(name)
+            except Exception as e:
+                log.warning("warm import failed", extra={"lib": name, "error": str(e)})
+                continue
+            IMPORT_MS[name] = round((time.perf_counter() - t0) * 1000.0, 1)
+        log.info("warm imports done", extra={"modules": IMPORT_MS})
+
+    if not background:
+        run()
+        return None
+    t = threading.Thread(target=run, name="warm-imports", daemon=True)
+    t.start()
+    return t
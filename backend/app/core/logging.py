@@ -0,0 +1,48 @@
+# backend/app/core/logging.py
+from __future__ import annotations
+import json
+import logging
+import sys
+from datetime import datetime, timezone
+
+from . import config
+
+_RESERVED = set(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime"}
+
+
+class JsonFormatter(logging.Formatter):
+    """Одна строка JSON на запись; поля из extra={...} попадают в корень объекта."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        out = {
+            "ts": datetime.fromtimestamp(record.created, tz=timezone.utc).isoformat(),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+        }
+        for k, v in record.__dict__.items():
+            if k not in _RESERVED and not k.startswith("_"):
+                out[k] = v
+        if record.exc_info:
+            out["exc"] = self.formatException(record.exc_info)
+        return json.dumps(out, ensure_ascii=False, default=str)
+
+
+def setup_logging() -> None:
+    """Единые логи приложения по LOG_LEVEL / LOG_FORMAT (json | text)."""
+    root = logging.getLogger("app")
+    if getattr(root, "_configured", False):
+        return
+    handler = logging.StreamHandler(sys.stdout)
+    if config.LOG_FORMAT == "json":
+        handler.setFormatter(JsonFormatter())
+    else:
+        handler.setFormatter(logging.Formatter("%(asctime)s %(levelname)s %(name)s: %(message)s"))
+    root.addHandler(handler)
+    root.setLevel(config.LOG_LEVEL)
+    root.propagate = False
+    root._configured = True  # type: ignore[attr-defined]
+
+
+def get_logger(name: str) -> logging.Logger:
+    return logging.getLogger(name if name.startswith("app") else f"app.{name}")
@@ -0,0 +1,241 @@
+# backend/app/core/metrics.py
+from __future__ import annotations
+import functools
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from typing import Dict, Iterable, List, Tuple
+
+from . import config
+from .logging import get_logger
+
+log = get_logger("metrics")
+
+# секунды: от быстрых чтений parquet до фита ARIMA / генерации LLM
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+LabelKey = Tuple[Tuple[str, str], ...]
+
+
+class Histogram:
+    """Гистограмма в стиле Prometheus (кумулятивные бакеты + sum/count) с метками."""
+
+    def __init__(self, name: str, help: str, buckets: Iterable[float] = DEFAULT_BUCKETS):
+        self.name, self.help = name, help
+        self.buckets = tuple(sorted(buckets))
+        self._lock = threading.Lock()
+        self._series: Dict[LabelKey, List[float]] = {}  # [count_b0..count_bn, +Inf, sum]
+
+    def observe(self, value: float, **labels: str) -> None:
+        key = tuple(sorted(labels.items()))
+        i = bisect_left(self.buckets, value)
+        with self._lock:
+            s = self._series.get(key)
+            if s is None:
+                s = self._series[key] = [0.0] * (len(self.buckets) + 2)
+            s[i] += 1          # i == len(buckets) → корзина +Inf
+            s[-1] += value
+
+    def drain(self) -> Dict[LabelKey, List[float]]:
+        """Забрать накопленные серии и обнулить (передача замеров из процесса пула)."""
+        with self._lock:
+            series, self._series = self._series, {}
+            return series
+
+    def merge(self, series: Dict[LabelKey, List[float]]) -> None:
+        with self._lock:
+            for key, other in series.items():
+                s = self._series.get(key)
+                if s is None:
+                    self._series[key] = list(other)
+                else:
+                    for i, v in enumerate(other):
+                        s[i] += v
+
+    def snapshot(self) -> Dict[LabelKey, Dict[str, float]]:
+        with self._lock:
+            out = {}
+            for key, s in self._series.items():
+                count = sum(s[:-1])
+                out[key] = {"count": count, "sum": s[-1], "buckets": list(s[:-1])}
+            return out
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        for key, s in sorted(self.snapshot().items()):
+            cum = 0.0
+            for b, c in zip(self.buckets + (float("inf"),), s["buckets"]):
+                cum += c
+                le = "+Inf" if b == float("inf") else repr(b)
+                lines.append(f"{self.name}_bucket{_labels(key + (('le', le),))} {cum:g}")
+            lines.append(f"{self.name}_sum{_labels(key)} {s['sum']:.6f}")
+            lines.append(f"{self.name}_count{_labels(key)} {s['count']:g}")
+        return lines
+
+
+class Counter:
+    def __init__(self, name: str, help: str):
+        self.name, self.help = name, help
+        self._lock = threading.Lock()
+        self._series: Dict[LabelKey, float] = {}
+
+    def inc(self, value: float = 1.0, **labels: str) -> None:
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            self._series[key] = self._series.get(key, 0.0) + value
+
+    def drain(self) -> Dict[LabelKey, float]:
+        with self._lock:
+            series, self._series = self._series, {}
+            return series
+
+    def merge(self, series: Dict[LabelKey, float]) -> None:
+        with self._lock:
+            for key, v in series.items():
+                self._series[key] = self._series.get(key, 0.0) + v
+
+    def snapshot(self) -> Dict[LabelKey, float]:
+        with self._lock:
+            return dict(self._series)
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        for key, v in sorted(self.snapshot().items()):
+            lines.append(f"{self.name}{_labels(key)} {v:g}")
+        return lines
+
+
+def _labels(key: LabelKey) -> str:
+    if not key:
+        return ""
+    body = ",".join(f'{k}="{str(v).replace(chr(92), chr(92) * 2).replace(chr(34), chr(92) + chr(34))}"' for k, v in key)
+    return "{" + body + "}"
+
+
+REQUEST_LATENCY = Histogram("la_http_request_duration_seconds", "HTTP request latency by route")
+SPAN_LATENCY = Histogram("la_span_duration_seconds", "Latency of named pipeline stages")
+SPAN_ERRORS = Counter("la_span_errors_total", "Exceptions raised inside named stages")
+OFFLOAD_EVENTS = Counter("la_offload_tasks_total", "CPU-heavy tasks by outcome (admitted, rejected, cancelled, abandoned)")
+SINGLEFLIGHT = Counter("la_singleflight_total", "Identical computations: leader ran it, follower got the shared result")
+HTTP_CONDITIONAL = Counter("la_http_conditional_total", "Conditional GETs: not_modified (304) or miss (full body)")
+REGISTRY: List[object] = [REQUEST_LATENCY, SPAN_LATENCY, SPAN_ERRORS, OFFLOAD_EVENTS, SINGLEFLIGHT, HTTP_CONDITIONAL]
+
+
+def drain() -> Dict[str, dict]:
+    """
+    Всё накопленное процессом с прошлого drain() по имени метрики. Процесс пула (core.offload)
+    отдаёт это вместе с результатом задачи — иначе его span/timed не дошли бы до /metrics API.
+    """
+    return {m.name: m.drain() for m in REGISTRY}
+
+
+def merge(drained: Dict[str, dict]) -> None:
+    """Добавить замеры из drain() другого процесса к метрикам этого."""
+    for m in REGISTRY:
+        if drained.get(m.name):
+            m.merge(drained[m.name])
+
+
+# --- spans ---------------------------------------------------------------------
+
+@contextmanager
+def span(name: str):
+    """Замер стадии: with span("forecast_cash"): ..."""
+    t0 = time.perf_counter()
+    ok = True
+    try:
+        yield
+    except BaseException:
+        ok = False
+        SPAN_ERRORS.inc(span=name)
+        raise
+    finally:
+        dt = time.perf_counter() - t0
+        SPAN_LATENCY.observe(dt, span=name)
+        if config.METRICS_LOG_SPANS:
+            log.info("span", extra={"span": name, "duration_ms": round(dt * 1000.0, 3), "ok": ok})
+
+
+def timed(name: str):
+    """Декоратор-обёртка над span()."""
+    def deco(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with span(name):
+                return fn(*args, **kwargs)
+        return wrapper
+    return deco
+
+
+# --- ASGI middleware -------------------------------------------------------------
+
+class MetricsMiddleware:
+    """
+    Чистый ASGI-middleware (без BaseHTTPMiddleware): латентность по шаблону роута
+    (/api/runs/{run_id}, а не конкретный id), методу и статусу.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        t0 = time.perf_counter()
+        status = {"code": 500}
+
+        async def _send(message):
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, _send)
+        finally:
+            dt = time.perf_counter() - t0
+            path = _route_template(scope)
+            REQUEST_LATENCY.observe(dt, method=scope.get("method", ""), route=path, status=str(status["code"]))
+            if config.METRICS_LOG_REQUESTS:
+                log.info("request", extra={"method": scope.get("method"), "route": path,
+                                           "status": status["code"], "duration_ms": round(dt * 1000.0, 3)})
+
+
+def _route_template(scope) -> str:
+    """
+    /api/runs/3f2a… → /api/runs/{run_id}: шаблон пути сработавшего роута (scope["route"].path),
+    чтобы не плодить серию метрик на каждый id. Роут из include_router(prefix=...) знает только
+    свой путь (/runs/{run_id}) — префикс берём из начальных сегментов фактического пути.
+    Роут не найден (404) — "<unmatched>".
+    """
+    template = getattr(scope.get("route"), "path", None)
+    if not isinstance(template, str) or not template:
+        return "<unmatched>"
+    if ":path}" in template:          # параметр со слэшами — число сегментов не совпадает
+        return template
+    segments = scope.get("path", "").split("/")
+    keep = len(segments) - template.count("/")
+    return "/".join(segments[:keep]) + template if keep > 0 else template
+
+
+# --- экспорт ---------------------------------------------------------------------
+
+def render_prometheus() -> str:
+    lines: List[str] = []
+    for m in REGISTRY:
+        lines.extend(m.render())
+    return "\n".join(lines) + "\n"
+
+
+def snapshot_json() -> Dict[str, object]:
+    def rows(metric):
+        return [{**dict(k), **(v if isinstance(v, dict) else {"value": v})} for k, v in metric.snapshot().items()]
+    return {
+        "buckets": list(DEFAULT_BUCKETS),
+        "requests": rows(REQUEST_LATENCY),
+        "spans": rows(SPAN_LATENCY),
+        "span_errors": rows(SPAN_ERRORS),
+        "offload": rows(OFFLOAD_EVENTS),
+        "singleflight": rows(SINGLEFLIGHT),
+        "http_conditional": rows(HTTP_CONDITIONAL),
+    }
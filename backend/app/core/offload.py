@@ -0,0 +1,259 @@
+# backend/app/core/offload.py
+"""
+Вынос CPU-тяжёлых обработчиков (прогноз, сценарий, backtest, PDF) из event loop и пула потоков Starlette.
+
+OFFLOAD_WORKERS > 0 — задачи идут в ProcessPoolExecutor: auto_arima/Prophet/ReportLab держат GIL,
+в отдельных процессах они не тормозят /api/health и лёгкие роуты. 0 — как раньше, в потоке.
+Допуск: не больше OFFLOAD_MAX_INFLIGHT задач (выполняются + ждут) на процесс API, остальным — 429
+с Retry-After, а не бесконечная очередь. Клиент отключился — задача снимается, если ещё ждёт в очереди;
+уже запущенная досчитывается (процесс пула не прерывается), но результат отбрасывается, а слот
+освобождается только по её окончании — допуск отражает реальную загрузку CPU.
+Функции для пула — уровня модуля (pickle по имени), тенант передаётся явно.
+Одинаковые задачи (тот же key — набор данных, версия, параметры) совмещаются: пока первая считается,
+следующие ждут её результат, не занимая слот и процесс; задача снимается, только когда ушли все ждущие.
+Метрики (span/timed, singleflight) процесс пула копит у себя — они возвращаются вместе с результатом
+задачи и добавляются к метрикам API, иначе /metrics не видел бы тяжёлые стадии вовсе.
+"""
+from __future__ import annotations
+import asyncio
+import multiprocessing
+import threading
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Callable, Dict, Hashable, Optional
+
+from fastapi import HTTPException, Request
+
+from . import config
+from .logging import get_logger
+from . import metrics
+from .metrics import OFFLOAD_EVENTS, SINGLEFLIGHT
+from .tenant import get_tenant, use_tenant
+
+log = get_logger("offload")
+
+# модули, которые воркер импортирует при старте — первый запрос не платит за импорт
+_PRELOAD = ("app.services.runs", "app.services.backtest", "app.routers.backtest")
+
+
+class Saturated(Exception):
+    """Пул занят: в работе и в очереди уже OFFLOAD_MAX_INFLIGHT задач."""
+
+
+class ClientGone(Exception):
+    """Клиент закрыл соединение до готовности результата."""
+
+
+def _init_worker():
+    from importlib import import_module
+    for name in _PRELOAD:
+        try:
+            import_module(name)
+        except Exception:   # не фатально: импортируется при первой задаче
+            pass
+
+
+def _outcome(fn: Callable, args: tuple, kwargs: dict, drain_metrics: bool = False) -> tuple:
+    """(результат, исключение, метрики процесса пула) — исключение задачи не теряет метрики."""
+    try:
+        value, error = fn(*args, **kwargs), None
+    except Exception as e:
+        value, error = None, e
+    return value, error, (metrics.drain() if drain_metrics else None)
+
+
+def _call(tenant: str, fn: Callable, args: tuple, kwargs: dict) -> tuple:
+    """Выполняется в процессе пула: тот же тенант, что у запроса."""
+    with use_tenant(tenant):
+        return _outcome(fn, args, kwargs, drain_metrics=True)
+
+
+def _merge_metrics(fut: Future):
+    """Один раз на задачу (а не на каждого ждущего): замеры воркера → метрики API."""
+    if not fut.cancelled() and fut.exception() is None:
+        drained = fut.result()[2]
+        if drained:
+            metrics.merge(drained)
+
+
+def _unwrap(outcome: tuple):
+    value, error, _ = outcome
+    if error is not None:
+        raise error
+    return value
+
+
+class Offloader:
+    def __init__(self, workers: Optional[int] = None, max_inflight: Optional[int] = None):
+        self.workers = config.OFFLOAD_WORKERS if workers is None else workers
+        self.max_inflight = config.OFFLOAD_MAX_INFLIGHT if max_inflight is None else max_inflight
+        self._lock = threading.RLock()   # fut.cancel() под замком вызывает колбэки, которые его берут
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._inflight = 0
+        self._flights: Dict[Hashable, "_Flight"] = {}
+
+    # --- пул -------------------------------------------------------------------------
+    def _executor(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._pool is None:
+                ctx = multiprocessing.get_context(config.OFFLOAD_START_METHOD)
+                self._pool = ProcessPoolExecutor(max_workers=self.workers, mp_context=ctx,
+                                                 initializer=_init_worker)
+            return self._pool
+
+    def start(self):
+        """Поднять процессы заранее (после старта API), чтобы первый тяжёлый запрос не ждал spawn."""
+        if self.workers > 0:
+            pool = self._executor()
+            for _ in range(self.workers):
+                pool.submit(int)
+
+    def shutdown(self):
+        with self._lock:
+            pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.shutdown(wait=False, cancel_futures=True)
+
+    # --- допуск ----------------------------------------------------------------------
+    def _acquire(self) -> bool:
+        with self._lock:
+            if self._inflight >= self.max_inflight:
+                return False
+            self._inflight += 1
+            return True
+
+    def _release(self, *_):
+        with self._lock:
+            self._inflight -= 1
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {"mode": "process" if self.workers > 0 else "thread", "workers": self.workers,
+                    "inflight": self._inflight, "max_inflight": self.max_inflight,
+                    "coalescing": len(self._flights)}
+
+    # --- выполнение ------------------------------------------------------------------
+    def _submit(self, fn: Callable, args: tuple, kwargs: dict) -> Future:
+        if self.workers <= 0:
+            return _thread_submit(fn, args, kwargs)
+        try:
+            fut = self._executor().submit(_call, get_tenant(), fn, args, kwargs)
+        except BrokenProcessPool:          # воркер упал (OOM и т.п.) — пересоздаём пул один раз
+            log.warning("offload pool broken, restarting")
+            with self._lock:
+                self._pool = None
+            fut = self._executor().submit(_call, get_tenant(), fn, args, kwargs)
+        fut.add_done_callback(_merge_metrics)
+        return fut
+
+    async def run(self, name: str, fn: Callable, *args, request: Optional[Request] = None,
+                  key: Optional[Hashable] = None, **kwargs):
+        """
+        Выполнить fn(*args, **kwargs) вне event loop. key — ключ совмещения одинаковых задач.
+        Saturated — лимит задач исчерпан, ClientGone — request отключился раньше, чем пришёл результат.
+        """
+        flight = self._join(name, key)
+        if flight is None:
+            if not self._acquire():
+                OFFLOAD_EVENTS.inc(task=name, event="rejected")
+                raise Saturated(name)
+            try:
+                fut = self._submit(fn, args, kwargs)
+            except BaseException:
+                self._release()
+                raise
+            fut.add_done_callback(self._release)
+            OFFLOAD_EVENTS.inc(task=name, event="admitted")
+            flight = self._lead(name, key, fut)
+        try:
+            return await self._wait(name, flight, request)
+        finally:
+            with self._lock:
+                flight.waiters -= 1
+
+    def _join(self, name: str, key: Optional[Hashable]) -> Optional["_Flight"]:
+        if key is None:
+            return None
+        with self._lock:
+            flight = self._flights.get(key)
+            if flight is not None:
+                flight.waiters += 1
+        if flight is not None:
+            SINGLEFLIGHT.inc(flight=f"offload:{name}", role="follower")
+        return flight
+
+    def _lead(self, name: str, key: Optional[Hashable], fut: Future) -> "_Flight":
+        flight = _Flight(fut)
+        if key is not None:
+            SINGLEFLIGHT.inc(flight=f"offload:{name}", role="leader")
+            with self._lock:
+                self._flights[key] = flight
+
+            def forget(_):
+                with self._lock:
+                    if self._flights.get(key) is flight:
+                        del self._flights[key]
+            fut.add_done_callback(forget)
+        return flight
+
+    async def _wait(self, name: str, flight: "_Flight", request: Optional[Request]):
+        waiter = asyncio.wrap_future(flight.fut)
+        if request is None:
+            return _unwrap(await asyncio.shield(waiter))
+        watcher = asyncio.ensure_future(_wait_disconnect(request))
+        try:
+            done, _ = await asyncio.wait({waiter, watcher}, return_when=asyncio.FIRST_COMPLETED)
+        finally:
+            watcher.cancel()
+        if waiter in done:
+            return _unwrap(waiter.result())
+        with self._lock:   # снимаем, только если других ждущих нет; True — ещё не начиналась
+            cancelled = flight.waiters == 1 and flight.fut.cancel()
+        OFFLOAD_EVENTS.inc(task=name, event="cancelled" if cancelled else "abandoned")
+        log.info("client disconnected", extra={"task": name, "cancelled": cancelled})
+        raise ClientGone(name)
+
+
+class _Flight:
+    __slots__ = ("fut", "waiters")
+
+    def __init__(self, fut: Future):
+        self.fut, self.waiters = fut, 1
+
+
+def _thread_submit(fn: Callable, args: tuple, kwargs: dict) -> Future:
+    """Режим без процессов: отдельный поток с контекстом запроса (тенант, роль)."""
+    import contextvars
+    fut: Future = Future()
+    ctx = contextvars.copy_context()
+
+    def target():
+        if not fut.set_running_or_notify_cancel():
+            return
+        try:
+            fut.set_result(ctx.run(_outcome, fn, args, kwargs))
+        except BaseException as e:
+            fut.set_exception(e)
+
+    threading.Thread(target=target, name="offload", daemon=True).start()
+    return fut
+
+
+async def _wait_disconnect(request: Request, poll_s: float = 0.25):
+    while not await request.is_disconnected():
+        await asyncio.sleep(poll_s)
+
+
+OFFLOAD = Offloader()
+
+
+async def run_heavy(name: str, fn: Callable, *args, request: Optional[Request] = None,
+                    key: Optional[Hashable] = None, **kwargs):
+    """Для роутов: Saturated → 429 (Retry-After), ClientGone → 499 (ответ уже никто не читает)."""
+    try:
+        return await OFFLOAD.run(name, fn, *args, request=request, key=key, **kwargs)
+    except Saturated:
+        raise HTTPException(429, detail=f"server busy: too many {name} tasks in flight",
+                            headers={"Retry-After": str(config.OFFLOAD_RETRY_AFTER_S)})
+    except ClientGone:
+        raise HTTPException(499, detail="client closed request")
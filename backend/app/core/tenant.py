@@ -0,0 +1,29 @@
+# backend/app/core/tenant.py
+from __future__ import annotations
+import re
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from . import config
+
+_TENANT_RE = re.compile(r"^[A-Za-z0-9][A-Za-z0-9_.-]{0,63}$")
+
+# тенант текущего запроса; проставляется в core.auth (X-Tenant), читается в utils.io
+current_tenant: ContextVar[str] = ContextVar("current_tenant", default=config.DEFAULT_TENANT)
+
+def validate_tenant(tenant: str) -> str:
+    if not _TENANT_RE.match(tenant or "") or ".." in tenant:
+        raise ValueError(f"invalid tenant id: {tenant!r}")
+    return tenant
+
+def get_tenant() -> str:
+    return current_tenant.get()
+
+@contextmanager
+def use_tenant(tenant: str | None):
+    """Временно переключает тенанта (фоновые задачи, скрипты, тесты)."""
+    token = current_tenant.set(validate_tenant(tenant or config.DEFAULT_TENANT))
+    try:
+        yield
+    finally:
+        current_tenant.reset(token)
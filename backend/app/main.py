@@ -1,11 +1,20 @@
-from fastapi import FastAPI
+from fastapi import FastAPI, Depends, Query
 from fastapi.middleware.cors import CORSMiddleware
-from .routers import upload, forecast, scenario, advice, llm_test, dev_seed, sources, reports, backtest
+from fastapi.middleware.gzip import GZipMiddleware
+from fastapi.responses import PlainTextResponse
+from .core import config
+from .core.auth import require_any, tenant_scope
+from .core.logging import setup_logging
+from .core.metrics import MetricsMiddleware, render_prometheus, snapshot_json
+# роутеры лёгкие: тяжёлые библиотеки (ReportLab, pmdarima, prophet, httpx) импортируются при первом
+# использовании или фоновым прогревом после старта (STARTUP_WARMUP); замер — scripts/bench_startup.py
+from .routers import upload, forecast, scenario, advice, llm_test, dev_seed, sources, reports, backtest, audit, runs, models, alerts
 
-from apscheduler.schedulers.background import BackgroundScheduler
 from datetime import datetime
+import threading
 
 scheduler = None
+setup_logging()
 
 app = FastAPI(title="Liquidity Assistant API", version="0.1.0", description="...")
 
@@ -14,21 +23,42 @@ app.add_middleware(
     allow_origins=["*"], allow_credentials=True,
     allow_methods=["*"], allow_headers=["*"],
 )
+app.add_middleware(MetricsMiddleware)
+if config.GZIP_MIN_BYTES > 0:
+    # прогнозы/backtest/история — JSON в сотни КБ; мелкие ответы (health, 304) не трогаем
+    app.add_middleware(GZipMiddleware, minimum_size=config.GZIP_MIN_BYTES, compresslevel=config.GZIP_LEVEL)
 
-app.include_router(upload.router, prefix="/api")
+app.include_router(upload.router, prefix="/api", dependencies=[Depends(tenant_scope)])
 app.include_router(forecast.router, prefix="/api")
 app.include_router(scenario.router, prefix="/api")
 app.include_router(advice.router, prefix="/api")
 app.include_router(llm_test.router, prefix="/api")
-app.include_router(dev_seed.router, prefix="/api")
-app.include_router(sources.router, prefix="/api")
+app.include_router(dev_seed.router, prefix="/api", dependencies=[Depends(tenant_scope)])
+app.include_router(sources.router, prefix="/api", dependencies=[Depends(tenant_scope)])
 app.include_router(reports.router, prefix="/api")
 app.include_router(backtest.router, prefix="/api")
+app.include_router(audit.router, prefix="/api")
+app.include_router(runs.router, prefix="/api")
+app.include_router(models.router, prefix="/api")
+app.include_router(alerts.router, prefix="/api")
 
 @app.get("/api/health")
 def health():
     return {"status": "ok"}
 
+@app.get("/api/metrics")
+def metrics(format: str = Query("prometheus", pattern="^(prometheus|json)$")):
+    """Латентность роутов и стадий (load_df, forecast_cash, llm.chat, build_pdf...)."""
+    if format == "json":
+        from .core.offload import OFFLOAD
+        return {**snapshot_json(), "offload_pool": OFFLOAD.stats()}
+    return PlainTextResponse(render_prometheus(), media_type="text/plain; version=0.0.4")
+
+@app.get("/api/cache/stats", dependencies=[Depends(require_any("CFO", "Treasurer", "Analyst"))])
+def cache_stats():
+    from .utils.io import FRAME_CACHE
+    return FRAME_CACHE.stats()
+
 @app.get("/api/llm/test-inline")
 def llm_test_inline():
     try:
@@ -43,25 +73,62 @@ def llm_test_inline():
 def _scheduled_sync():
     from .routers.sources import sources_sync  # локальный импорт, чтобы избежать циклов
     try:
-        res = sources_sync(fx=True, bank=True, calendar=True, days=60)
+        res = sources_sync(fx=True, bank=True, calendar=True, days=60, entity=None)
         print(f"[{datetime.now().isoformat()}] scheduled sync ok -> {res['loaded']}")
     except Exception as e:
         print(f"[{datetime.now().isoformat()}] scheduled sync failed: {e}")
 
+def _scheduled_warm_up():
+    from .services.registry import warm_up_all
+    try:
+        print(f"[{datetime.now().isoformat()}] model warm-up ok -> {warm_up_all()}")
+    except Exception as e:
+        print(f"[{datetime.now().isoformat()}] model warm-up failed: {e}")
+
+def _warm_start():
+    """Фоновый прогрев после старта: импорт тяжёлых модулей и регистрация шрифтов PDF."""
+    from .core import lazy
+    modules = ["app.services.reports", "httpx"] + [m for m in ("pmdarima", "prophet") if lazy.available(m)]
+    lazy.warm_imports(modules, background=False)
+    try:
+        from .services.reports import _font_family
+        _font_family()
+    except Exception as e:
+        print(f"[{datetime.now().isoformat()}] font warm-up failed: {e}")
+
 @app.on_event("startup")
 def _startup():
     from .core import config
     global scheduler
-    if config.SYNC_EVERY_MIN and config.SYNC_EVERY_MIN > 0:
+    if config.STARTUP_WARMUP:
+        # /api/health отвечает сразу, первый отчёт/фит не платит за импорт
+        threading.Thread(target=_warm_start, name="warm-start", daemon=True).start()
+    if config.OFFLOAD_WORKERS > 0:
+        from .core.offload import OFFLOAD
+        OFFLOAD.start()   # процессы пула поднимаются сразу, а не на первом тяжёлом запросе
+    sync_on = bool(config.SYNC_EVERY_MIN and config.SYNC_EVERY_MIN > 0)
+    warm_on = 0 <= config.MODEL_WARMUP_HOUR <= 23
+    if sync_on or warm_on:
+        from apscheduler.schedulers.background import BackgroundScheduler
         scheduler = BackgroundScheduler(timezone="UTC")
-        scheduler.add_job(_scheduled_sync, "interval", minutes=config.SYNC_EVERY_MIN, id="sync_job", max_instances=1)
+        if sync_on:
+            # после каждого sync модели перефитятся в фоне (registry.schedule_warm_up)
+            scheduler.add_job(_scheduled_sync, "interval", minutes=config.SYNC_EVERY_MIN, id="sync_job", max_instances=1)
+        if warm_on:
+            scheduler.add_job(_scheduled_warm_up, "cron", hour=config.MODEL_WARMUP_HOUR, minute=0,
+                              timezone=config.TIMEZONE, id="model_warmup_job", max_instances=1)
         scheduler.start()
-        print(f"APScheduler started: every {config.SYNC_EVERY_MIN} min")
+        print(f"APScheduler started: sync every {config.SYNC_EVERY_MIN} min, "
+              f"model warm-up at {config.MODEL_WARMUP_HOUR if warm_on else 'off'}")
     else:
-        print("APScheduler disabled (SYNC_EVERY_MIN=0)")
+        print("APScheduler disabled (SYNC_EVERY_MIN=0, MODEL_WARMUP_HOUR=-1)")
 
 @app.on_event("shutdown")
 def _shutdown():
+    from .core.audit import AUDIT
     global scheduler
     if scheduler:
-        scheduler.shutdown()
\ No newline at end of file
+        scheduler.shutdown()
+    from .core.offload import OFFLOAD
+    OFFLOAD.shutdown()
+    AUDIT.close()  # дописать очередь аудита на диск
\ No newline at end of file
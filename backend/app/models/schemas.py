@@ -3,6 +3,7 @@ from datetime import date
 from typing import List, Optional, Literal, Dict, Any
 
 ScenarioName = Literal["baseline","stress","optimistic"]
+ForecastMode = Literal["total","hierarchical"]
 
 class UploadResult(BaseModel):
     loaded: Dict[str, int]
@@ -10,16 +11,41 @@ class UploadResult(BaseModel):
 class ForecastRequest(BaseModel):
     horizon_days: conint(ge=1, le=60) = 35
     scenario: ScenarioName = "baseline"
+    mode: ForecastMode = "total"   # hierarchical: банк in/out по валютам + календарь, bottom-up в KZT
 
 class ForecastPoint(BaseModel):
     date: date
     net_cash: float
     cash_balance: float
+    # интервал уровня FORECAST_INTERVAL_LEVEL и P(cash_balance < 0) — services.intervals
+    net_cash_lo: Optional[float] = None
+    net_cash_hi: Optional[float] = None
+    cash_balance_lo: Optional[float] = None
+    cash_balance_hi: Optional[float] = None
+    p_negative: Optional[float] = None
 
 class ForecastResponse(BaseModel):
     forecast: List[ForecastPoint]
-    metrics: Optional[Dict[str, float]] = None
+    metrics: Optional[Dict[str, Optional[float]]] = None
     scenario: ScenarioName = "baseline"
+    run_id: Optional[str] = None   # id в истории прогонов (/api/runs/{run_id})
+
+class BatchForecastRequest(BaseModel):
+    entities: List[str] = []   # id юрлиц; пусто → основной набор
+    horizon_days: conint(ge=1, le=60) = 35
+    scenario: ScenarioName = "baseline"
+
+class BatchForecastItem(BaseModel):
+    entity: str
+    model: str                 # ses | holt | arima | naive
+    params: Dict[str, Any] = {}
+    forecast: List[ForecastPoint]
+    metrics: Optional[Dict[str, Optional[float]]] = None
+
+class BatchForecastResponse(BaseModel):
+    items: List[BatchForecastItem]
+    failed: List[Dict[str, str]] = []
+    summary: Dict[str, Optional[float]]   # series, arima, elapsed_ms, series_per_s, load_ms
 
 class ScenarioRequest(BaseModel):
     horizon_days: conint(ge=1, le=60) = 35
@@ -28,13 +54,14 @@ class ScenarioRequest(BaseModel):
     delay_top_inflow_days: conint(ge=0, le=30) = 0
     delay_top_outflow_days: conint(ge=0, le=30) = 0
     shift_purchases_days: conint(ge=0, le=30) = 0
+    baseline_run_id: Optional[str] = None   # шоки к сохранённому прогону /forecast (без перепрогноза)
 
 class ScenarioResponse(BaseModel):
     run_id: str
     scenario: ScenarioName
     forecast_scenario: List[ForecastPoint]
     min_cash: float
-    metrics: Optional[Dict[str, float]] = None
+    metrics: Optional[Dict[str, Optional[float]]] = None
 
 class AdviceAction(BaseModel):
     title: str
@@ -42,10 +69,23 @@ class AdviceAction(BaseModel):
     rationale: Optional[str] = None
 
 class AdviceRequest(BaseModel):
-    baseline: ForecastResponse
-    scenario: ScenarioResponse
+    # прогоны целиком или их run_id из /forecast, /scenario (сервер возьмёт точки из истории прогонов);
+    # baseline_run_id можно не указывать, если сценарий выведен из baseline (/scenario с baseline_run_id)
+    baseline: Optional[ForecastResponse] = None
+    scenario: Optional[ScenarioResponse] = None
+    baseline_run_id: Optional[str] = None
+    scenario_run_id: Optional[str] = None
 
 class AdviceResponse(BaseModel):
     run_id: str
     advice_text: str
     actions: List[AdviceAction] = []
+
+class BatchReportRequest(BaseModel):
+    entities: List[str] = []   # id юрлиц (data/processed/entities/<id>); пусто → основной набор
+    horizon_days: conint(ge=1, le=60) = 35
+    scenario: ScenarioName = "baseline"
+    fx_shock: confloat(ge=-0.5, le=0.5) = 0.0
+    delay_top_inflow_days: conint(ge=0, le=30) = 0
+    delay_top_outflow_days: conint(ge=0, le=30) = 0
+    workers: Optional[conint(ge=1, le=32)] = None
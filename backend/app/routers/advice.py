@@ -1,8 +1,10 @@
 # backend/app/routers/advice.py
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, HTTPException
 from ..core.auth import require_any
+from ..core.audit import audit_log
 from ..models.schemas import AdviceRequest, AdviceResponse
 from ..services.advisor import build_advice
+from ..services.runs import resolve_pair
 
 router = APIRouter(tags=["advice"])  # без prefix="/api" — он в main.py
 
@@ -18,6 +20,16 @@ def advice_api(payload: AdviceRequest):
         "baseline": { "forecast": [...], "metrics": {...}, ... },
         "scenario": { "forecast_scenario": [...], "min_cash": ..., ... }
       }
+    или только id прогонов: {"scenario_run_id": "..."} / {"baseline_run_id": "...", "scenario_run_id": "..."} —
+    точки берутся из истории прогонов.
     Возвращает AdviceResponse с текстом брифа и actions.
     """
-    return build_advice(payload)
+    try:
+        baseline, scenario = resolve_pair(payload.model_dump())
+    except LookupError as e:
+        raise HTTPException(404, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(422, detail=str(e))
+    resp = build_advice({"baseline": baseline, "scenario": scenario})
+    audit_log("advice", payload, resp)
+    return resp
@@ -0,0 +1,35 @@
+# backend/app/routers/alerts.py
+from typing import Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+from ..core.auth import require_any
+from ..services.alerts import AlertRule, gap_detection, get_alert_store, rules_from_config
+from ..services.forecast import load_daily_cash_df
+
+router = APIRouter(tags=["alerts"])
+
+@router.get("/alerts", dependencies=[Depends(require_any("CFO", "Treasurer", "Analyst"))])
+def alerts_list(
+    status: Optional[str] = Query(None, pattern="^(open|resolved)$"),
+    limit: int = Query(100, ge=1, le=1000),
+):
+    """Алерты текущего тенанта (повторы одного разрыва — одна запись с occurrences), новые сверху."""
+    items = get_alert_store().list(status=status, limit=limit)
+    return {"count": len(items), "rules": [r.kind for r in rules_from_config()], "items": items}
+
+@router.get("/alerts/precision", dependencies=[Depends(require_any("CFO", "Treasurer", "Analyst"))])
+def alerts_precision(
+    model: str = Query("naive_mean"),
+    window_days: Optional[int] = Query(None, ge=1, le=60),
+    threshold: float = Query(0.0),
+    max_origins: Optional[int] = Query(None, ge=1),
+):
+    """Precision/recall детекции разрывов на истории витрины (rolling-backtest модели)."""
+    daily = load_daily_cash_df()
+    if daily.empty:
+        raise HTTPException(404, detail="daily_cash not found")
+    rule = AlertRule(window_days, threshold) if window_days else None
+    try:
+        return gap_detection(daily, model, rule, max_origins)
+    except KeyError:
+        raise HTTPException(400, detail=f"unknown model '{model}'")
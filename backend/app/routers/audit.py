@@ -0,0 +1,23 @@
+# backend/app/routers/audit.py
+from datetime import datetime
+from typing import Optional
+
+from fastapi import APIRouter, Depends, Query
+from ..core.auth import require_any
+from ..core.audit import query_audit
+
+router = APIRouter(tags=["audit"])
+
+@router.get("/audit", dependencies=[Depends(require_any("CFO", "Treasurer"))])
+def audit_api(
+    start: Optional[datetime] = Query(None, description="ISO, UTC (включительно)"),
+    end: Optional[datetime] = Query(None, description="ISO, UTC (включительно)"),
+    action: Optional[str] = Query(None),
+    limit: int = Query(500, ge=1, le=10000),
+):
+    """
+    Журнал действий текущего тенанта за период.
+    Ротированные gzip-файлы вне диапазона отбрасываются по имени, без чтения.
+    """
+    items = query_audit(start=start, end=end, action=action, limit=limit)
+    return {"count": len(items), "items": items}
@@ -1,9 +1,15 @@
 # backend/app/routers/backtest.py
-from fastapi import APIRouter, Depends
+import pandas as pd
+from fastapi import APIRouter, Depends, Query, Request, Response
+from fastapi.concurrency import run_in_threadpool
 from pydantic import BaseModel, Field
-from typing import List, Optional, Dict, Any
+from typing import Annotated, List, Optional, Dict, Any
 from ..core.auth import require_any
+from ..core.httpcache import conditional, not_modified, tag
+from ..core.offload import run_heavy
 from ..services.backtest import BacktestParams, rolling_backtest
+from ..services.runs import flight_key
+from ..utils.encoding import FastJSONResponse, MEDIA, binary_response, frame_columns, negotiate, table_bytes
 
 router = APIRouter(tags=["backtest"])
 
@@ -13,16 +19,76 @@ class BacktestRequest(BaseModel):
     step: int = Field(1, ge=1)
     target_col: str = "net_cash"
     models: Optional[List[str]] = None  # ["naive_last","naive_mean","arima","prophet"]
+    max_origins: Optional[int] = Field(None, ge=1)   # только последние N окон
+    gap_threshold: float = 0.0                       # порог баланса для метрик раннего предупреждения
+    detail: bool = True                              # построчные прогнозы в per_model
+
+FORMAT_QUERY = Query(None, description="json | columnar | arrow | parquet")
+
 
 @router.post("/backtest", dependencies=[Depends(require_any("Analyst","Treasurer","CFO"))])
-def run_backtest(req: BacktestRequest) -> Dict[str, Any]:
+async def run_backtest(req: BacktestRequest, request: Request,
+                       format: Optional[str] = FORMAT_QUERY) -> Dict[str, Any]:
+    fmt = negotiate(request, format)
+    return await _backtest(req, request, fmt, await _flight_key(req, fmt))
+
+
+@router.get("/backtest", dependencies=[Depends(require_any("Analyst","Treasurer","CFO"))])
+async def get_backtest(req: Annotated[BacktestRequest, Query()], request: Request,
+                       response: Response) -> Dict[str, Any]:
+    """Параметры в query (models — повтором: ?models=naive_last&models=arima); повтор с If-None-Match → 304."""
+    fmt = negotiate(request, request.query_params.get("format"))   # рядом с query-моделью — не параметр
+    key = await _flight_key(req, fmt)
+    etag = conditional("backtest", key)
+    hit = not_modified(request, etag, "backtest")
+    if hit is not None:
+        return hit
+    return tag(await _backtest(req, request, fmt, key), response, etag)
+
+
+async def _flight_key(req: BacktestRequest, fmt: str):
+    # версия данных — stat файла или запрос в БД, не в event loop
+    return await run_in_threadpool(flight_key, "backtest", {**req.model_dump(), "format": fmt})
+
+
+async def _backtest(req: BacktestRequest, request: Request, fmt: str, key) -> Response:
     params = BacktestParams(
         horizon=req.horizon, window=req.window, step=req.step,
-        target_col=req.target_col, use_models=req.models
+        target_col=req.target_col, use_models=req.models,
+        max_origins=req.max_origins, gap_threshold=req.gap_threshold, detail=req.detail,
     )
+    res = await run_heavy("backtest", backtest_json, params, fmt, request=request, key=key)
+    if isinstance(res, bytes):
+        return binary_response(res, fmt)
+    # dict уже без NaN и Timestamp — orjson вместо jsonable_encoder
+    return FastJSONResponse(res, media_type=MEDIA[fmt])
+
+
+def backtest_json(params: BacktestParams, fmt: str = "json") -> Any:
+    """
+    Backtest и сериализация — целиком в пуле OFFLOAD (обратно едет готовый dict или байты).
+    json — записи по строкам; columnar — те же таблицы по колонкам; arrow/parquet — при detail
+    длинная таблица per_model (колонка model), иначе summary; остальное — в метаданных "la".
+    """
     res = rolling_backtest(params)
-    # конвертируем DataFrame → JSON-сериализуемый формат
-    summary = res["summary"].to_dict(orient="records")
+    if fmt == "columnar":
+        return {
+            "summary": frame_columns(res["summary"]),
+            "per_model": {m: frame_columns(df) for m, df in res["per_model"].items()},
+            "params": res["params"],
+            "origins": res["origins"],
+        }
+    if fmt in ("arrow", "parquet"):
+        meta = {"params": res["params"], "origins": res["origins"]}
+        if res["per_model"]:
+            meta["summary"] = frame_columns(res["summary"])
+            body = pd.concat([df.assign(model=m) for m, df in res["per_model"].items()], ignore_index=True)
+        else:
+            body = res["summary"]
+        return table_bytes(body, fmt, meta)
+    # конвертируем DataFrame → JSON-сериализуемый формат (NaN → null: в JSON его нет)
+    summary_df = res["summary"].astype(object)
+    summary = summary_df.where(summary_df.notna(), None).to_dict(orient="records")
     per_model = {
         m: df.assign(date=df["date"].dt.strftime("%Y-%m-%d")).to_dict(orient="records")
         for m, df in res["per_model"].items()
@@ -31,4 +97,5 @@ def run_backtest(req: BacktestRequest) -> Dict[str, Any]:
         "summary": summary,
         "per_model": per_model,
         "params": res["params"],
+        "origins": res["origins"],
     }
@@ -1,18 +1,93 @@
-from fastapi import APIRouter, Depends
+from typing import Annotated, Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from fastapi.concurrency import run_in_threadpool
+from ..core import config
 from ..core.auth import require_any
-from ..models.schemas import ForecastRequest, ForecastResponse
-from ..services.forecast import get_forecast
+from ..core.audit import audit_log
+from ..core.httpcache import conditional, not_modified, tag
+from ..core.offload import run_heavy
+from ..models.schemas import ForecastRequest, ForecastResponse, BatchForecastRequest, BatchForecastResponse
+from ..services.multiseries import forecast_entities
+from ..services.runs import forecast_key, forecast_run
+from ..services.selection import selection_version
+from ..utils.encoding import negotiate, series_response
 
 router = APIRouter(tags=["forecast"])  # ← без prefix
 
+FORMAT_QUERY = Query(None, description="json | columnar | arrow | parquet")
+
+
 @router.post(
     "/forecast",
     response_model=ForecastResponse,
     dependencies=[Depends(require_any("CFO", "Treasurer", "Analyst"))],
 )
-def forecast_api(payload: ForecastRequest):
-    fcst, metrics = get_forecast(
-        horizon=payload.horizon_days,
-        scenario=payload.scenario or "baseline",
-    )
-    return ForecastResponse(forecast=fcst, metrics=metrics, scenario=payload.scenario or "baseline")
+async def forecast_api(payload: ForecastRequest, request: Request, format: Optional[str] = FORMAT_QUERY):
+    fmt = negotiate(request, format)
+    return await _forecast(payload, request, fmt, await _flight_key(payload))
+
+
+@router.get(
+    "/forecast",
+    response_model=ForecastResponse,
+    dependencies=[Depends(require_any("CFO", "Treasurer", "Analyst"))],
+)
+async def forecast_get(payload: Annotated[ForecastRequest, Query()], request: Request, response: Response):
+    """
+    То же, что POST, параметрами в query: ETag по (данные, версия, параметры с выбранной моделью,
+    версия выбора моделей, формат), повтор → 304.
+    """
+    fmt = negotiate(request, request.query_params.get("format"))   # рядом с query-моделью — не параметр
+    key, etag = await run_in_threadpool(_key_and_etag, payload, fmt)
+    hit = not_modified(request, etag, "forecast")
+    if hit is not None:
+        return hit
+    return tag(await _forecast(payload, request, fmt, key), response, etag)
+
+
+def _key_and_etag(payload: ForecastRequest, fmt: str):
+    # champion меняется фоновым select_models без смены данных — он в key, а версия выбора — в ETag
+    key = forecast_key(payload.horizon_days, payload.scenario or "baseline", payload.mode)
+    selected = selection_version() if payload.mode == "total" else None
+    return key, conditional("forecast", key, fmt, selected)
+
+
+async def _flight_key(payload: ForecastRequest):
+    # версия данных (stat/запрос в БД) и champion из selection.json — не в event loop
+    return await run_in_threadpool(forecast_key, payload.horizon_days, payload.scenario or "baseline",
+                                   payload.mode)
+
+
+async def _forecast(payload: ForecastRequest, request: Request, fmt: str, key):
+    # тот же горизонт/сценарий на той же версии данных → сохранённый прогон без пересчёта;
+    # фит/прогноз — в пуле OFFLOAD (event loop и /api/health не ждут ARIMA); одновременные
+    # одинаковые запросы ждут один расчёт
+    rec, _ = await run_heavy("forecast", forecast_run, payload.horizon_days, payload.scenario or "baseline",
+                             mode=payload.mode, request=request, key=key)
+    if fmt != "json":   # длинные горизонты: колонки/Arrow без построчной валидации pydantic
+        meta = {"run_id": rec["run_id"], "scenario": payload.scenario or "baseline", "metrics": rec["metrics"]}
+        audit_log("forecast", payload, {**meta, "format": fmt, "points": len(rec["points"])})
+        return series_response(fmt, rec["points"], "forecast", meta)
+    resp = ForecastResponse(forecast=rec["points"], metrics=rec["metrics"],
+                            scenario=payload.scenario or "baseline", run_id=rec["run_id"])
+    audit_log("forecast", payload, resp)
+    return resp
+
+
+@router.post(
+    "/forecast/batch",
+    response_model=BatchForecastResponse,
+    dependencies=[Depends(require_any("CFO", "Treasurer", "Analyst"))],
+)
+async def forecast_batch_api(payload: BatchForecastRequest, request: Request):
+    """Прогноз по многим юрлицам одним вызовом (векторное ES, ARIMA только где нужно) — в пуле OFFLOAD."""
+    if len(payload.entities) > config.MULTI_MAX_SERIES:
+        raise HTTPException(400, detail=f"too many entities (max {config.MULTI_MAX_SERIES})")
+    try:
+        res = await run_heavy("forecast_batch", forecast_entities, payload.entities, payload.horizon_days,
+                              payload.scenario, request=request)
+    except ValueError as e:
+        raise HTTPException(400, detail=str(e))
+    audit_log("forecast_batch", payload, res["summary"])
+    return res
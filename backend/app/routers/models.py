@@ -0,0 +1,40 @@
+# backend/app/routers/models.py
+from fastapi import APIRouter, Depends, HTTPException, Query
+from ..core.auth import require_any
+from ..services.registry import REGISTRY, DEFAULT_TARGET, available_models, warm_up
+from ..services.selection import load_selection, select_models
+from ..utils.io import data_version
+
+router = APIRouter(tags=["models"])
+
+@router.get("/models", dependencies=[Depends(require_any("CFO", "Treasurer", "Analyst"))])
+def models_list(target: str = Query(DEFAULT_TARGET, pattern="^[a-z_]+$")):
+    """
+    Обученные модели текущего тенанта (новые сверху): время и длительность фита,
+    порядок ARIMA, in-sample sMAPE. current=true — артефакт под текущую версию витрины.
+    """
+    version = data_version()
+    items = [{**m, "current": m["data_version"] == version} for m in REGISTRY.list(target)]
+    return {"data_version": version, "available": available_models(), "count": len(items), "items": items}
+
+@router.post("/models/warmup", dependencies=[Depends(require_any("CFO", "Treasurer"))])
+def models_warmup():
+    """Синхронный прогрев всех доступных моделей на текущей версии витрины."""
+    items = warm_up()
+    return {"data_version": data_version(), "count": len(items), "items": items}
+
+@router.get("/models/selection", dependencies=[Depends(require_any("CFO", "Treasurer", "Analyst"))])
+def models_selection(target: str = Query(DEFAULT_TARGET, pattern="^[a-z_]+$")):
+    """Champion/challenger по корзинам горизонта (последний backtest, пересчитывается после sync)."""
+    sel = load_selection(target=target)
+    if sel is None:
+        raise HTTPException(404, detail="model selection not computed yet")
+    return {**sel, "current": sel.get("data_version") == data_version()}
+
+@router.post("/models/select", dependencies=[Depends(require_any("CFO", "Treasurer"))])
+def models_select(target: str = Query(DEFAULT_TARGET, pattern="^[a-z_]+$")):
+    """Синхронный backtest и выбор моделей на текущей витрине."""
+    sel = select_models(target=target)
+    if sel is None:
+        raise HTTPException(400, detail="not enough history for backtest (MODEL_SELECTION_WINDOW)")
+    return sel
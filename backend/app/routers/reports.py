@@ -1,15 +1,17 @@
 # backend/app/routers/reports.py
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, HTTPException, Request
 from fastapi.responses import Response
 from ..core.auth import require_any
-from ..models.schemas import AdviceRequest  # используем для валидации, но тело другое
+from ..core.audit import audit_log
+from ..core.offload import run_heavy
+from ..models.schemas import AdviceRequest, BatchReportRequest  # используем для валидации, но тело другое
 from typing import Any, Dict, Optional
-from ..services.reports import build_pdf
+# ReportLab (+ шрифты) импортируется при первом отчёте, а не при старте API
 
 router = APIRouter(tags=["reports"])
 
 @router.post("/report/pdf", dependencies=[Depends(require_any("CFO", "Treasurer", "Analyst"))])
-def report_pdf(payload: Dict[str, Any]):
+async def report_pdf(payload: Dict[str, Any], request: Request):
     """
     Ожидает тело вида:
     {
@@ -18,16 +20,56 @@ def report_pdf(payload: Dict[str, Any]):
       "advice":   {...},     # ответ /advice
       "horizon_days": 14     # опционально
     }
+    Вместо baseline/scenario можно передать baseline_run_id/scenario_run_id — точки из истории прогонов.
     Возвращает application/pdf.
     """
-    pdf = build_pdf(
-        baseline=payload.get("baseline"),
-        scenario=payload.get("scenario"),
-        advice=payload.get("advice"),
-        horizon_days=payload.get("horizon_days"),
-    )
+    try:   # ReportLab — в пуле OFFLOAD, не в event loop
+        pdf = await run_heavy("report", render_pdf, payload, request=request)
+    except LookupError as e:
+        raise HTTPException(404, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(422, detail=str(e))
+    audit_log("report", payload, {"bytes": len(pdf)})
     return Response(
         content=pdf,
         media_type="application/pdf",
         headers={"Content-Disposition": 'attachment; filename="liquidity_brief.pdf"'},
     )
+
+
+def render_pdf(payload: Dict[str, Any]) -> bytes:
+    from ..services.reports import build_pdf
+    from ..services.runs import resolve_pair
+    if payload.get("baseline_run_id") or payload.get("scenario_run_id"):
+        baseline, scenario = resolve_pair(payload)
+    else:   # как раньше: что прислали, то и рисуем (пустые секции допустимы)
+        baseline, scenario = payload.get("baseline"), payload.get("scenario")
+    return build_pdf(baseline=baseline, scenario=scenario, advice=payload.get("advice"),
+                     horizon_days=payload.get("horizon_days"))
+
+
+@router.post("/report/batch", dependencies=[Depends(require_any("CFO", "Treasurer", "Analyst"))])
+async def report_batch(payload: BatchReportRequest, request: Request):
+    """
+    Батч-брифы по нескольким юрлицам: прогноз + сценарий + совет + PDF.
+    Весь батч — одна задача OFFLOAD (допуск и 429 как у одиночного отчёта).
+    Возвращает application/zip: <entity>.pdf и summary.json (тайминги по этапам).
+    """
+    from ..services.batch import run_batch_reports
+    params = payload.model_dump(exclude={"entities", "workers"})
+    try:
+        archive, summary = await run_heavy("report_batch", run_batch_reports, payload.entities, params,
+                                           workers=payload.workers, request=request)
+    except ValueError as e:
+        raise HTTPException(400, detail=str(e))
+    audit_log("report_batch", payload, {k: summary[k] for k in ("ok", "failed", "wall_ms")})
+    return Response(
+        content=archive,
+        media_type="application/zip",
+        headers={
+            "Content-Disposition": 'attachment; filename="liquidity_briefs.zip"',
+            "X-Batch-Ok": str(summary["ok"]),
+            "X-Batch-Failed": str(summary["failed"]),
+            "X-Batch-Wall-Ms": str(summary["wall_ms"]),
+        },
+    )
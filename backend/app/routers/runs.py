@@ -0,0 +1,39 @@
+# backend/app/routers/runs.py
+from typing import Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from ..core.auth import require_any
+from ..core.httpcache import conditional, not_modified, tag
+from ..services.runs import get_run_store
+from ..utils import io
+
+router = APIRouter(tags=["runs"])
+
+@router.get("/runs", dependencies=[Depends(require_any("CFO", "Treasurer", "Analyst"))])
+def runs_list(
+    request: Request,
+    response: Response,
+    kind: Optional[str] = Query(None, pattern="^(forecast|scenario)$"),
+    limit: int = Query(50, ge=1, le=1000),
+):
+    """История прогонов текущего тенанта, новые сверху (без рядов)."""
+    items = get_run_store().list(kind=kind, limit=limit)
+    # ETag по содержимому списка: дешёвый (метаданные), зато без тела, пока новых прогонов нет
+    etag = conditional("runs", io.storage_scope(None), items)
+    hit = not_modified(request, etag, "runs")
+    if hit is not None:
+        return hit
+    return tag({"count": len(items), "items": items}, response, etag)
+
+@router.get("/runs/{run_id}", dependencies=[Depends(require_any("CFO", "Treasurer", "Analyst"))])
+def runs_get(run_id: str, request: Request, response: Response):
+    """Сохранённый прогон целиком (метаданные + points) — без пересчёта."""
+    # прогон неизменяем: совпал ETag — 304 без чтения рядов из хранилища
+    etag = conditional("run", io.storage_scope(None), run_id)
+    hit = not_modified(request, etag, "run")
+    if hit is not None:
+        return hit
+    rec = get_run_store().get(run_id)
+    if rec is None:
+        raise HTTPException(404, detail=f"run {run_id} not found")
+    return tag(rec, response, etag)
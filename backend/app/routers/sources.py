@@ -4,7 +4,8 @@ import pandas as pd
 from ..sources.fx_api import fetch_fx_rates, FX_PAIRS_DEFAULT
 from ..sources.bank_mock import pull_bank_statements, pull_payment_calendar
 from ..services import etl
-from ..utils.io import save_df
+from ..utils.io import save_df, entity_dir
+from ..services.registry import schedule_warm_up
 
 router = APIRouter(tags=["sources"])
 
@@ -14,35 +15,41 @@ def sources_sync(
     bank: bool = Query(True),
     calendar: bool = Query(True),
     days: int = Query(60, ge=7, le=365),
+    entity: str | None = Query(None, description="юрлицо; по умолчанию основной набор"),
 ):
     """
     Подтягивает данные из источников (моки) за последние N дней,
     сохраняет в processed, пересобирает витрину и возвращает размеры.
     """
+    try:
+        root = entity_dir(entity)
+    except ValueError as e:
+        raise HTTPException(400, detail=str(e))
     end = date.today()
     start = end - timedelta(days=days)
     loaded = {}
 
     if fx:
         df_fx = fetch_fx_rates(start, end, pairs=FX_PAIRS_DEFAULT)
-        save_df("fx_rates.parquet", df_fx)
+        save_df("fx_rates.parquet", df_fx, root)
         loaded["fx_rates"] = int(len(df_fx))
 
     if bank:
         df_bank = pull_bank_statements(start, end)
-        save_df("bank_statements.parquet", df_bank)
+        save_df("bank_statements.parquet", df_bank, root)
         loaded["bank_statements"] = int(len(df_bank))
 
     if calendar:
-        df_cal = pull_payment_calendar(start, end)
-        save_df("payment_calendar.parquet", df_cal)
+        df_cal = etl.normalize_calendar(pull_payment_calendar(start, end))
+        save_df("payment_calendar.parquet", df_cal, root)
         loaded["payment_calendar"] = int(len(df_cal))
 
     try:
-        daily = etl.build_daily_cashframe()
-        save_df("daily_cash.parquet", daily)
+        daily = etl.build_daily_cashframe(root)
+        save_df("daily_cash.parquet", daily, root)
         loaded["daily_cash"] = int(len(daily))
     except Exception as e:
         raise HTTPException(400, detail=f"ETL failed after sync: {e}")
+    schedule_warm_up(root)  # перефит моделей под новую версию витрины — в фоне
 
     return {"ok": True, "loaded": loaded, "range": {"start": start.isoformat(), "end": end.isoformat()}}
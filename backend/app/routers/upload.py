@@ -1,11 +1,13 @@
-from fastapi import APIRouter, UploadFile, File, HTTPException
+from fastapi import APIRouter, UploadFile, File, HTTPException, Query
 from typing import List, Dict
 import pandas as pd
 from pandas.errors import ParserError
 from pathlib import Path
 
 from ..services import etl
-from ..utils.io import save_df
+from ..utils.io import save_df, entity_dir
+from ..core.audit import audit_log
+from ..services.registry import schedule_warm_up
 
 router = APIRouter(tags=["upload"])
 
@@ -21,7 +23,8 @@ def _friendly_schema_hint(name: str) -> str:
     return "Проверьте схему файла."
 
 @router.post("/upload")
-async def upload(files: List[UploadFile] = File(...)):
+async def upload(files: List[UploadFile] = File(...),
+                 entity: str | None = Query(None, description="юрлицо; по умолчанию основной набор")):
     """
     Принимает строго 3 CSV:
       - bank_statements.csv
@@ -29,7 +32,13 @@ async def upload(files: List[UploadFile] = File(...)):
       - fx_rates.csv
     Сохраняет их как parquet, затем строит витрину daily_cash.parquet.
     Возвращает размеры загруженных датасетов и витрины.
+    entity — сохранить в набор юрлица (data/processed/entities/<entity>).
     """
+    try:
+        root = entity_dir(entity)
+    except ValueError as e:
+        raise HTTPException(400, detail=str(e))
+
     # 1) Проверим состав файлов
     raw_names = [f.filename for f in files]
     # сравниваем по basename, а не по полному пути
@@ -75,19 +84,21 @@ async def upload(files: List[UploadFile] = File(...)):
 
         # Сохранение в parquet (в /data/processed)
         try:
-            save_df(f.filename.replace(".csv", ".parquet"), df)
+            save_df(f.filename.replace(".csv", ".parquet"), df, root)
             loaded[f.filename] = int(len(df))
         except Exception as e:
             raise HTTPException(400, detail=f"{f.filename}: не удалось сохранить parquet: {e}")
 
     # 3) ETL витрины
     try:
-        daily = etl.build_daily_cashframe()
-        save_df("daily_cash.parquet", daily)
+        daily = etl.build_daily_cashframe(root)
+        save_df("daily_cash.parquet", daily, root)
         loaded["daily_cash.parquet"] = int(len(daily))
     except FileNotFoundError as e:
         raise HTTPException(400, detail=f"ETL failed: отсутствуют источники — {e}")
     except Exception as e:
         raise HTTPException(400, detail=f"ETL failed: {e}")
 
+    schedule_warm_up(root)  # модели под новую версию витрины — в фоне
+    audit_log("upload", {"files": names, "entity": entity}, {"loaded": loaded})
     return {"loaded": loaded}
@@ -1,18 +1,272 @@
-from datetime import date, timedelta
-from typing import List, Dict
+# backend/app/services/alerts.py
+from __future__ import annotations
+import hashlib
+import json
+import threading
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from ..core import config
+from ..core.logging import get_logger
+from ..core.metrics import timed
+from ..utils import io, sqlstore
+from ..utils.filelock import atomic_write, file_lock
+from . import backtest as bt
+
+log = get_logger("alerts")
+
+_COLS = ("fingerprint", "kind", "scenario", "dt", "status", "run_id", "last_run_id",
+         "occurrences", "first_seen", "last_seen", "payload")
+
+
+@dataclass(frozen=True)
+class AlertRule:
+    """Баланс ниже threshold в первые window_days дней прогноза."""
+    window_days: int
+    threshold: float = 0.0
+
+    @property
+    def kind(self) -> str:
+        return f"cash_gap_{self.window_days}d" if self.threshold <= 0 else f"low_cash_{self.window_days}d"
+
+    def hits(self, offset: np.ndarray, bal: np.ndarray) -> np.ndarray:
+        """Маска пробоя: день в окне [0, window_days) от первой даты и баланс ниже порога."""
+        return (offset < self.window_days) & (bal < self.threshold)
+
+
+def _offsets(points: List[Dict]) -> tuple:
+    """(даты, дни от первой даты, баланс) — date/str даты одинаково."""
+    days = np.array([str(p["date"])[:10] for p in points], dtype="datetime64[D]")
+    bal = np.fromiter((p["cash_balance"] for p in points), dtype=float, count=len(points))
+    return days, (days - days.min()).astype(int), bal
 
-def detect_cash_gap_14d(forecast_points: List[Dict]) -> List[Dict]:
-    today = min(p["date"] for p in forecast_points)
-    horizon = today + timedelta(days=14)
-    return [p for p in forecast_points if today <= p["date"] <= horizon and p["cash_balance"] < 0]
 
-def build_alerts(run_id: str, forecast_points: List[Dict]) -> List[Dict]:
-    gaps = detect_cash_gap_14d(forecast_points)
-    if not gaps:
+def rules_from_config() -> List[AlertRule]:
+    """ALERT_RULES: "окно:порог,..." (напр. "14:0,7:5000000"); пусто — разрыв за ALERT_WINDOW_DAYS."""
+    rules = []
+    for part in (config.ALERT_RULES or "").split(","):
+        if part.strip():
+            w, _, thr = part.strip().partition(":")
+            rules.append(AlertRule(int(w), float(thr or 0)))
+    return rules or [AlertRule(int(config.ALERT_WINDOW_DAYS))]
+
+
+def evaluate(points: List[Dict], rules: Optional[List[AlertRule]] = None) -> List[Dict]:
+    """
+    Срабатывания правил по точкам прогноза: для каждого правила — одно событие с датой первого
+    пробоя, числом дней ниже порога, минимумом баланса и max p_negative (если есть интервалы).
+    """
+    if not points:
+        return []
+    rules = rules or rules_from_config()
+    days, offset, bal = _offsets(points)
+    p_neg = np.array([p.get("p_negative") for p in points], dtype=float)   # None → nan
+    out = []
+    for r in rules:
+        hit = r.hits(offset, bal)
+        if not hit.any():
+            continue
+        first = int(np.flatnonzero(hit)[0])
+        in_window = offset < r.window_days
+        payload = {
+            "window_days": r.window_days,
+            "threshold": r.threshold,
+            "count": int(hit.sum()),
+            "min_balance": float(bal[in_window].min()),
+            "days_ahead": int(offset[first]) + 1,
+        }
+        if np.isfinite(p_neg[in_window]).any():
+            payload["p_negative_max"] = float(np.nanmax(p_neg[in_window]))
+        out.append({"kind": r.kind, "dt": str(days[first]), "payload": payload})
+    return out
+
+
+def detect_cash_gap_14d(forecast_points: List[Dict]) -> List[Dict]:
+    """Точки с отрицательным балансом, на которых срабатывает AlertRule(14): то же окно, что у evaluate."""
+    if not forecast_points:
         return []
-    return [{
-        "run_id": run_id,
-        "dt": min(g["date"] for g in gaps),
-        "kind": "cash_gap_14d",
-        "payload": {"count": len(gaps)}
-    }]
+    _, offset, bal = _offsets(forecast_points)
+    hit = AlertRule(14).hits(offset, bal)
+    return [forecast_points[i] for i in np.flatnonzero(hit)]
+
+
+def build_alerts(run_id: str, forecast_points: List[Dict],
+                 rules: Optional[List[AlertRule]] = None) -> List[Dict]:
+    return [{"run_id": run_id, **a} for a in evaluate(forecast_points, rules)]
+
+
+def fingerprint(kind: str, scenario: Optional[str], dt: str) -> str:
+    """Повторяющийся алерт (тот же разрыв в следующих прогонах) — тот же отпечаток."""
+    return hashlib.sha1(f"{kind}|{scenario or 'baseline'}|{dt}".encode("utf-8")).hexdigest()[:16]
+
+
+def _now() -> str:
+    return datetime.now(timezone.utc).isoformat(timespec="milliseconds")
+
+
+class FileAlertStore:
+    """
+    Файл <data_dir>/alerts/alerts.json: {fingerprint: алерт}; перезапись целиком (алертов мало).
+    Чтение-изменение-запись — под flock alerts.lock: алерты пишут и API, и процессы пула.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _path(root: Path | None) -> Path:
+        return (io.data_dir() if root is None else Path(root)) / "alerts" / "alerts.json"
+
+    def _read(self, path: Path) -> Dict[str, Dict]:
+        return json.loads(path.read_text(encoding="utf-8")) if path.exists() else {}
+
+    def record(self, run_id: str, scenario: Optional[str], alerts: List[Dict], until: str,
+               root: Path | None = None) -> Dict[str, int]:
+        path = self._path(root)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        now = _now()
+        with self._lock, file_lock(path.with_name("alerts.lock")):
+            data = self._read(path)
+            seen = set()
+            new = 0
+            for a in alerts:
+                fp = fingerprint(a["kind"], scenario, a["dt"])
+                seen.add(fp)
+                cur = data.get(fp)
+                if cur is None:
+                    new += 1
+                    data[fp] = {"fingerprint": fp, "kind": a["kind"], "scenario": scenario, "dt": a["dt"],
+                                "status": "open", "run_id": run_id, "last_run_id": run_id, "occurrences": 1,
+                                "first_seen": now, "last_seen": now, "payload": a["payload"]}
+                else:
+                    cur.update(status="open", last_run_id=run_id, occurrences=cur["occurrences"] + 1,
+                               last_seen=now, payload=a["payload"])
+            resolved = 0
+            for fp, cur in data.items():
+                if (fp not in seen and cur["status"] == "open" and cur["scenario"] == scenario
+                        and cur["dt"] <= until):
+                    cur.update(status="resolved", last_seen=now)
+                    resolved += 1
+            blob = json.dumps(data, ensure_ascii=False).encode("utf-8")
+            atomic_write(path, lambda f: f.write(blob))
+        return {"new": new, "repeated": len(seen) - new, "resolved": resolved}
+
+    def list(self, root: Path | None = None, status: Optional[str] = None, limit: int = 100) -> List[Dict]:
+        with self._lock:
+            data = self._read(self._path(root))
+        items = [a for a in data.values() if status is None or a["status"] == status]
+        return sorted(items, key=lambda a: a["last_seen"], reverse=True)[:limit]
+
+
+class SqlAlertStore:
+    """БД: таблица alerts (migrations/001, 005), уникальность (scope, fingerprint)."""
+
+    def record(self, run_id: str, scenario: Optional[str], alerts: List[Dict], until: str,
+               root: Path | None = None) -> Dict[str, int]:
+        store = sqlstore.get_store()
+        p = store.ph
+        j = f"{p}::jsonb" if store.dialect == "postgresql" else p
+        scope, now = io.storage_scope(root), _now()
+        fps = [fingerprint(a["kind"], scenario, a["dt"]) for a in alerts]
+        with store.connection() as conn:
+            cur = conn.cursor()
+            known = set()
+            if fps:
+                cur.execute(f"select fingerprint from alerts where scope = {p} and fingerprint in "
+                            f"({', '.join([p] * len(fps))})", [scope, *fps])
+                known = {r[0] for r in cur.fetchall()}
+            for fp, a in zip(fps, alerts):
+                cur.execute(
+                    "insert into alerts (scope, fingerprint, kind, scenario, dt, status, run_id, last_run_id, "
+                    f"occurrences, first_seen, last_seen, payload) values ({', '.join([p] * 11)}, {j}) "
+                    "on conflict (scope, fingerprint) do update set status = 'open', "
+                    "last_run_id = excluded.last_run_id, occurrences = alerts.occurrences + 1, "
+                    "last_seen = excluded.last_seen, payload = excluded.payload",
+                    [scope, fp, a["kind"], scenario, a["dt"], "open", run_id, run_id, 1, now, now,
+                     json.dumps(a["payload"], ensure_ascii=False)],
+                )
+            where = (f"scope = {p} and scenario = {p} and status = 'open' and dt <= {p}"
+                     + (f" and fingerprint not in ({', '.join([p] * len(fps))})" if fps else ""))
+            cur.execute(f"update alerts set status = 'resolved', last_seen = {p} where {where}",
+                        [now, scope, scenario, until, *fps])
+            resolved = cur.rowcount
+        return {"new": len(set(fps) - known), "repeated": len(set(fps) & known), "resolved": max(resolved, 0)}
+
+    def list(self, root: Path | None = None, status: Optional[str] = None, limit: int = 100) -> List[Dict]:
+        store = sqlstore.get_store()
+        p = store.ph
+        where, params = f"scope = {p} and fingerprint is not null", [io.storage_scope(root)]
+        if status:
+            where += f" and status = {p}"
+            params.append(status)
+        with store.connection() as conn:
+            cur = conn.cursor()
+            cur.execute(f"select {', '.join(_COLS)} from alerts where {where} order by last_seen desc limit {p}",
+                        params + [int(limit)])
+            rows = cur.fetchall()
+        out = []
+        for r in rows:
+            a = dict(zip(_COLS, r))
+            a["dt"] = str(a["dt"])[:10]
+            a["run_id"], a["last_run_id"] = str(a["run_id"]), str(a["last_run_id"])
+            if isinstance(a["payload"], str):
+                a["payload"] = json.loads(a["payload"])
+            out.append(a)
+        return out
+
+
+_FILE_STORE = FileAlertStore()
+_SQL_STORE = SqlAlertStore()
+
+
+def get_alert_store():
+    return _SQL_STORE if config.STORAGE_BACKEND == "sql" else _FILE_STORE
+
+
+def on_run(run: Dict, points: List[Dict], root: Path | None = None) -> Dict[str, int]:
+    """
+    Правила по новому прогону → запись в хранилище алертов. Повтор того же разрыва — тот же алерт
+    (occurrences + 1), открытые алерты сценария, которых в прогоне больше нет, — resolved
+    (только в пределах горизонта прогона).
+    """
+    if not points:
+        return {"new": 0, "repeated": 0, "resolved": 0}
+    found = evaluate(points)
+    until = str(max(str(p["date"])[:10] for p in points))
+    res = get_alert_store().record(run["run_id"], run.get("scenario") or "baseline", found, until, root)
+    if res["new"]:
+        log.info("alerts raised", extra={"run_id": run["run_id"], **res})
+    return res
+
+
+@timed("gap_detection")
+def gap_detection(daily: pd.DataFrame, model: str = "naive_mean", rule: Optional[AlertRule] = None,
+                  max_origins: Optional[int] = None) -> Dict:
+    """
+    Качество детекции разрывов на истории: с каждой точки отсечения прогноз модели на окно правила,
+    баланс = последний факт + cumsum(прогноз). Срабатывание правила сравнивается с фактическим
+    балансом в том же окне → TP/FP/FN/TN, precision, recall и медиана запаса в днях (bt.gap_scores).
+    """
+    rule = rule or rules_from_config()[0]
+    W = int(rule.window_days)
+    df = daily.sort_values("date")
+    y = pd.to_numeric(df["net_cash"], errors="coerce").fillna(0.0).to_numpy(dtype=float)
+    b = pd.to_numeric(df["cash_balance"], errors="coerce").fillna(0.0).to_numpy(dtype=float)
+    if model in bt.HEAVY_MODELS and max_origins is None:
+        max_origins = int(config.MODEL_SELECTION_MAX_ORIGINS)
+    origins = bt.backtest_origins(len(y), int(config.MODEL_SELECTION_WINDOW), W, 1, max_origins)
+    idx = pd.DatetimeIndex(pd.to_datetime(df["date"]))
+    F = bt.forecast_matrix(bt.backtest_name(model), y, idx, origins, W)
+    scores = bt.gap_scores(F, b, origins, rule.threshold)
+    target = float(config.KPI_PRECISION_GAP_TARGET)
+    return {
+        "model": model, "kind": rule.kind, "window_days": W, "threshold": rule.threshold,
+        "origins": int(len(origins)), **scores,
+        "precision_target": target,
+        "meets_target": None if scores["precision"] is None else scores["precision"] >= target,
+    }
@@ -1,25 +1,38 @@
 # backend/app/services/backtest.py
 from __future__ import annotations
+import time
 from dataclasses import dataclass
 from typing import Dict, List, Tuple, Optional
 import numpy as np
 import pandas as pd
 
+from ..core import lazy
 from ..utils.io import load_df
+from . import npmodels as npm
 
-# опционально pmdarima
-try:
-    import pmdarima as pm
-    HAS_PMD = True
-except Exception:
-    HAS_PMD = False
+# опционально pmdarima / Prophet (pip install prophet): наличие проверяем без импорта,
+# сами библиотеки (секунды на импорт) грузятся при первом обращении к bt.pm / bt.Prophet
+HAS_PMD = lazy.available("pmdarima")
+HAS_PROPHET = lazy.available("prophet")
 
-# опционально Prophet
-try:
-    from prophet import Prophet  # pip install prophet
-    HAS_PROPHET = True
-except Exception:
-    HAS_PROPHET = False
+
+def __getattr__(name: str):
+    """PEP 562: bt.pm / bt.Prophet импортируются при первом обращении; нет пакета — AttributeError."""
+    try:
+        if name == "pm":
+            globals()["pm"] = lazy.load("pmdarima")
+            return globals()["pm"]
+        if name == "Prophet":
+            globals()["Prophet"] = lazy.load("prophet").Prophet
+            return globals()["Prophet"]
+    except ImportError as e:
+        raise AttributeError(f"{name}: {e}") from e
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def _lib(name: str):
+    """Внутри модуля глобальное имя не идёт через __getattr__ — берём явно."""
+    return globals()[name] if name in globals() else __getattr__(name)
 
 
 # ========= метрики =========
@@ -54,7 +67,7 @@ def _fc_arima(series: pd.Series, h: int) -> List[float]:
     if not HAS_PMD or len(series) < 8:
         return _fc_naive_last(series, h)
     try:
-        model = pm.auto_arima(series, seasonal=False, suppress_warnings=True, stepwise=True)
+        model = _lib("pm").auto_arima(series, seasonal=False, suppress_warnings=True, stepwise=True)
         return model.predict(n_periods=h).tolist()
     except Exception:
         return _fc_naive_last(series, h)
@@ -64,7 +77,7 @@ def _fc_prophet(series: pd.Series, index: pd.DatetimeIndex, h: int) -> List[floa
         return _fc_naive_last(series, h)
     df = pd.DataFrame({"ds": index, "y": series.astype(float).values})
     try:
-        m = Prophet(seasonality_mode="additive", weekly_seasonality=True, daily_seasonality=False)
+        m = _lib("Prophet")(seasonality_mode="additive", weekly_seasonality=True, daily_seasonality=False)
         m.fit(df)
         future = m.make_future_dataframe(periods=h, freq="D", include_history=False)
         yhat = m.predict(future)["yhat"].values.tolist()
@@ -72,12 +85,40 @@ def _fc_prophet(series: pd.Series, index: pd.DatetimeIndex, h: int) -> List[floa
     except Exception:
         return _fc_naive_last(series, h)
 
+def _np_model(name: str, with_index: bool):
+    """Обёртка модели из npmodels под сигнатуру MODEL_FUNCS."""
+    if with_index:
+        def fc(series: pd.Series, index: pd.DatetimeIndex, h: int) -> List[float]:
+            return npm.forecast(name, series.to_numpy(dtype=float), index, h).tolist()
+    else:
+        def fc(series: pd.Series, h: int) -> List[float]:
+            return npm.forecast(name, series.to_numpy(dtype=float), None, h).tolist()
+    fc.__name__ = f"_fc_{name}"
+    return fc
+
+
 MODEL_FUNCS = {
     "naive_last": _fc_naive_last,
     "naive_mean": _fc_naive_mean,
+    # чистый NumPy: миллисекунды на фит против секунд у auto_arima
+    "ses": _np_model("ses", False),
+    "holt": _np_model("holt", False),
+    "hw": _np_model("hw", False),                      # Holt-Winters, недельная сезонность
+    "dow_profile": _np_model("dow_profile", True),     # профиль по дню недели (инвойсы, зарплата)
+    "dom_profile": _np_model("dom_profile", True),     # профиль по дню месяца
     "arima": _fc_arima,
     "prophet": _fc_prophet,  # сработает только если установлен prophet
 }
+# модели, которым кроме ряда нужны даты: func(series, index, h)
+INDEX_MODELS = {"prophet", "dow_profile", "dom_profile"}
+# фит на каждом окне (секунды) — интервалы, селекция и детекция разрывов берут для них меньше окон
+HEAVY_MODELS = frozenset({"arima", "prophet"})
+_FROM_REGISTRY = {"naive": "naive_last"}     # артефакт реестра → модель backtest, остальные совпадают
+
+
+def backtest_name(model: str) -> str:
+    """Имя модели реестра (naive, arima, ses...) → имя в MODEL_FUNCS."""
+    return _FROM_REGISTRY.get(model, model)
 
 
 @dataclass
@@ -87,6 +128,9 @@ class BacktestParams:
     step: int = 1             # шаг окна (rolling origin)
     target_col: str = "net_cash"
     use_models: Optional[List[str]] = None  # если None — все доступные
+    max_origins: Optional[int] = None       # только последние N окон (для бенчмарков тяжёлых моделей)
+    gap_threshold: float = 0.0              # порог баланса для метрик раннего предупреждения о разрыве
+    detail: bool = True                     # построчные прогнозы в per_model (на больших рядах — выключать)
 
 
 def load_daily_cash() -> pd.DataFrame:
@@ -105,94 +149,149 @@ def load_daily_cash() -> pd.DataFrame:
     return df
 
 
-def rolling_backtest(params: BacktestParams) -> Dict:
-    df = load_daily_cash()
-    y = pd.to_numeric(df[params.target_col], errors="coerce").fillna(0.0)
-    idx = pd.to_datetime(df["date"])
+def backtest_origins(n: int, window: int, horizon: int, step: int = 1,
+                     max_origins: Optional[int] = None) -> np.ndarray:
+    """Точки отсечения t (train = y[:t], test = y[t:t+h]); max_origins — только последние."""
+    origins = np.arange(int(window), n - int(horizon) + 1, max(1, int(step)))
+    if max_origins and len(origins) > max_origins:
+        origins = origins[-int(max_origins):]
+    return origins
+
+
+def forecast_matrix(model: str, y: np.ndarray, index: pd.DatetimeIndex,
+                    origins: np.ndarray, horizon: int) -> np.ndarray:
+    """
+    Прогнозы модели со всех точек отсечения: матрица (len(origins), horizon).
+    Наивные модели считаются векторно (prefix-суммы), модели npmodels — одним проходом
+    со снимками состояния (npm.forecast_origins), остальные — фитом на каждом окне.
+    """
+    h = int(horizon)
+    if len(origins) == 0:
+        return np.empty((0, h))
+    if model == "naive_last":
+        return np.repeat(y[origins - 1][:, None], h, axis=1)
+    if model == "naive_mean":
+        cs = np.cumsum(y)
+        return np.repeat((cs[origins - 1] / origins)[:, None], h, axis=1)
+    if model in npm.MODELS:
+        return npm.forecast_origins(model, y, index, origins, h)
+    func = MODEL_FUNCS[model]
+    series = pd.Series(y)
+    out = np.empty((len(origins), h))
+    for i, t in enumerate(origins):
+        if model in INDEX_MODELS:
+            out[i] = func(series.iloc[:t], index[:t], h)
+        else:
+            out[i] = func(series.iloc[:t], h)
+    return out
+
+
+def truth_matrix(y: np.ndarray, origins: np.ndarray, horizon: int) -> np.ndarray:
+    """Факт для тех же окон: (len(origins), horizon) — срезы без копирования."""
+    if len(origins) == 0:
+        return np.empty((0, int(horizon)))
+    return np.lib.stride_tricks.sliding_window_view(y, int(horizon))[origins]
+
+
+def gap_scores(pred: np.ndarray, balance: np.ndarray, origins: np.ndarray,
+               threshold: float = 0.0) -> Dict[str, Optional[float]]:
+    """
+    Раннее предупреждение о разрыве по прогнозам net_cash со всех окон: прогнозный баланс =
+    факт до окна + cumsum(прогноз), сравнение с фактическим балансом в том же окне.
+    TP/FP/FN/TN, precision, recall, f1 и медиана запаса (дней между сигналом и фактическим пробоем).
+    """
+    h = pred.shape[1] if pred.ndim == 2 else 0
+    if len(origins) == 0 or h == 0:
+        return {"tp": 0, "fp": 0, "fn": 0, "tn": 0, "precision": None, "recall": None, "f1": None,
+                "median_days_early": None}
+    pred_hit = (balance[origins - 1][:, None] + np.cumsum(pred, axis=1)) < threshold
+    true_hit = truth_matrix(balance, origins, h) < threshold
+    p, a = pred_hit.any(axis=1), true_hit.any(axis=1)
+    tp, fp = int((p & a).sum()), int((p & ~a).sum())
+    fn, tn = int((~p & a).sum()), int((~p & ~a).sum())
+    precision = tp / (tp + fp) if tp + fp else None
+    recall = tp / (tp + fn) if tp + fn else None
+    both = p & a
+    lead = np.maximum(0, true_hit[both].argmax(axis=1) - pred_hit[both].argmax(axis=1))
+    return {
+        "tp": tp, "fp": fp, "fn": fn, "tn": tn, "precision": precision, "recall": recall,
+        "f1": 2 * precision * recall / (precision + recall) if precision and recall else None,
+        "median_days_early": float(np.median(lead)) if len(lead) else None,
+    }
+
+
+def rolling_backtest(params: BacktestParams, df: Optional[pd.DataFrame] = None) -> Dict:
+    """
+    Rolling-origin backtest по витрине daily_cash (или по переданному df: date + target_col).
+    По каждой модели: MAPE/sMAPE/MAE, время прогноза со всех окон и окон/с; для net_cash при наличии
+    cash_balance — precision/recall/запас раннего предупреждения о разрыве (gap_scores).
+    """
+    if df is None:
+        df = load_daily_cash()
+    else:
+        df = df.copy()
+        df["date"] = pd.to_datetime(df["date"])
+        df = df.sort_values("date")
+    y = pd.to_numeric(df[params.target_col], errors="coerce").fillna(0.0).to_numpy(dtype=float)
+    idx = pd.DatetimeIndex(pd.to_datetime(df["date"]))
 
     models = params.use_models or list(MODEL_FUNCS.keys())
     # отфильтруем модели по доступности либ
     if "prophet" in models and not HAS_PROPHET:
         models = [m for m in models if m != "prophet"]
 
-    results: Dict[str, Dict] = {}
-    per_model_rows = {m: [] for m in models}
-
-    # rolling origin
-    n = len(y)
-    start = params.window
+    # rolling origin: все модели на одних и тех же окнах
     h = int(params.horizon)
-    step = int(params.step)
+    origins = backtest_origins(len(y), params.window, h, params.step, params.max_origins)
+    truth = truth_matrix(y, origins, h)
+    date_pos = (origins[:, None] + np.arange(h)).ravel()
+    balance = None
+    if params.target_col == "net_cash" and "cash_balance" in df.columns:
+        balance = pd.to_numeric(df["cash_balance"], errors="coerce").fillna(0.0).to_numpy(dtype=float)
 
+    results: Dict[str, Dict] = {}
     for m in models:
-        fc_func = MODEL_FUNCS[m]
-        # для Prophet нужен индекс
-        for t in range(start, n - h + 1, step):
-            train_series = y.iloc[:t]
-            train_index = idx.iloc[:t]
-            # прогноз на h вперёд
-            if m == "prophet":
-                yhat = fc_func(train_series, train_index, h)
-            else:
-                yhat = fc_func(train_series, h)
-
-            # «истина»
-            y_true = y.iloc[t : t + h].values
-            dates = idx.iloc[t : t + h].values
-
-            # метрики на этом блоке
-            block_mape = mape(y_true, yhat)
-            block_smape = smape(y_true, yhat)
-
-            # копим строки
-            for d, yt, yp in zip(dates, y_true, yhat):
-                per_model_rows[m].append({
-                    "date": pd.to_datetime(d),
-                    "y_true": float(yt),
-                    "y_pred": float(yp),
-                    "model": m,
-                })
-
-        # агрегированные метрики по всем блокам
-        dfm = pd.DataFrame(per_model_rows[m])
-        dfm = dfm.sort_values("date")
-        # сравниваем по датам, где есть и факт, и прогноз
-        if not dfm.empty:
-            merged = dfm.merge(
-                df[["date", params.target_col]].rename(columns={params.target_col: "y_true_full"}),
-                on="date", how="left"
-            )
-            merged["abs_perc"] = np.where(
-                merged["y_true_full"] != 0,
-                np.abs((merged["y_true_full"] - merged["y_pred"]) / merged["y_true_full"]),
-                np.nan
-            )
+        t0 = time.perf_counter()
+        pred = forecast_matrix(m, y, idx, origins, h)
+        elapsed = time.perf_counter() - t0
+        if len(origins):
+            yt, yp = truth.ravel(), pred.ravel()
+            nz = yt != 0
             metrics = {
-                "MAPE": float(np.nanmean(merged["abs_perc"]) * 100.0),
-                "sMAPE": smape(merged["y_true_full"].values, merged["y_pred"].values),
-                "points": int(len(merged)),
+                "MAPE": float(np.mean(np.abs((yt[nz] - yp[nz]) / yt[nz])) * 100.0) if nz.any() else float("nan"),
+                "sMAPE": smape(yt, yp),
+                "MAE": float(np.mean(np.abs(yt - yp))),
+                "points": int(yt.size),
             }
         else:
-            metrics = {"MAPE": float("nan"), "sMAPE": float("nan"), "points": 0}
+            metrics = {"MAPE": float("nan"), "sMAPE": float("nan"), "MAE": float("nan"), "points": 0}
+        metrics["ms"] = round(elapsed * 1000.0, 2)
+        metrics["origins_per_s"] = round(len(origins) / elapsed, 1) if elapsed > 0 else None
+        if balance is not None:
+            gap = gap_scores(pred, balance, origins, params.gap_threshold)
+            metrics.update(gap_precision=gap["precision"], gap_recall=gap["recall"],
+                           gap_days_early=gap["median_days_early"])
 
+        detail = None
+        if params.detail:
+            detail = pd.DataFrame({
+                "date": idx[date_pos] if len(date_pos) else pd.DatetimeIndex([]),
+                "y_true": truth.ravel(),
+                "y_pred": pred.ravel(),
+                "model": m,
+            })
         results[m] = {
             "metrics": metrics,
-            "detail": pd.DataFrame(per_model_rows[m]),
+            "detail": detail,
         }
 
     # сводка
-    summary = []
-    for m, r in results.items():
-        summary.append({
-            "model": m,
-            "MAPE": r["metrics"]["MAPE"],
-            "sMAPE": r["metrics"]["sMAPE"],
-            "points": r["metrics"]["points"],
-        })
+    summary = [{"model": m, **r["metrics"]} for m, r in results.items()]
     summary_df = pd.DataFrame(summary).sort_values("sMAPE")
 
     return {
         "summary": summary_df,
-        "per_model": {m: d["detail"] for m, d in results.items()},
+        "per_model": {m: d["detail"] for m, d in results.items() if d["detail"] is not None},
         "params": vars(params),
+        "origins": int(len(origins)),
     }
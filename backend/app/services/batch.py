@@ -0,0 +1,163 @@
+# backend/app/services/batch.py
+from __future__ import annotations
+import hashlib
+import io
+import json
+import time
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Dict, List, Tuple
+
+import pandas as pd
+
+from ..core import config, metrics
+from ..core.logging import get_logger
+from ..core.tenant import get_tenant, use_tenant
+from ..utils.io import entity_dir
+from .forecast import load_daily_cash_df, _apply_scenario, forecast_cash
+from .scenarios import derive_scenario
+from .advisor import build_advice
+from .reports import build_pdf
+
+log = get_logger("batch")
+
+Result = Tuple[bytes | None, Dict[str, Any]]
+
+
+def _fit_key(daily: pd.DataFrame, horizon: int) -> str:
+    """Юрлица с идентичной витриной (тот же хэш данных) и одинаковым горизонтом делят один фит."""
+    h = hashlib.sha1(pd.util.hash_pandas_object(daily[["date", "net_cash"]], index=False).values.tobytes())
+    return f"{h.hexdigest()}:{int(horizon)}"
+
+
+def _load(entity: str) -> Tuple[pd.DataFrame, float]:
+    t0 = time.perf_counter()
+    daily = load_daily_cash_df(entity_dir(entity))
+    if daily.empty:
+        raise FileNotFoundError(f"daily_cash not found for entity '{entity}'")
+    return daily, round((time.perf_counter() - t0) * 1000.0, 1)
+
+
+def _run_entity(entity: str, daily: pd.DataFrame, fit: Tuple[List[Dict], Dict[str, float]],
+                params: Dict[str, Any], timings: Dict[str, float]) -> Result:
+    """Пайплайн одного юрлица по готовому фиту: сценарий → совет → PDF. Возвращает (pdf, тайминги)."""
+    t0 = time.perf_counter()
+
+    def lap(stage: str):
+        nonlocal t0
+        now = time.perf_counter()
+        timings[stage] = round((now - t0) * 1000.0, 1)
+        t0 = now
+
+    try:
+        fut, fit_metrics = fit
+        last_balance = float(daily["cash_balance"].iloc[-1])
+        base_pts = _apply_scenario(fut, last_balance, "baseline")
+
+        # сценарий строится из того же фита: множитель сценария + шоки
+        scen_base = _apply_scenario(fut, last_balance, params["scenario"])
+        scen = derive_scenario(
+            scen_base,
+            scenario=params["scenario"],
+            fx_shock=params["fx_shock"],
+            delay_top_inflow_days=params["delay_top_inflow_days"],
+            delay_top_outflow_days=params["delay_top_outflow_days"],
+        )
+        lap("scenario_ms")
+
+        baseline = {"forecast": base_pts, "metrics": fit_metrics, "scenario": "baseline"}
+        advice = build_advice({"baseline": baseline, "scenario": scen})
+        advice = advice.model_dump() if hasattr(advice, "model_dump") else advice
+        lap("advice_ms")
+
+        pdf = build_pdf(baseline=baseline, scenario=scen, advice=advice, horizon_days=int(params["horizon_days"]))
+        lap("pdf_ms")
+        return pdf, {"entity": entity, "ok": True, "min_cash": scen["min_cash"], **timings}
+    except Exception as e:
+        return None, {"entity": entity, "ok": False, "error": str(e), **timings}
+
+
+def _run_group(tenant: str, group: List[Tuple[str, pd.DataFrame, float]], params: Dict[str, Any],
+               drain_metrics: bool = False) -> Tuple[List[Result], dict | None]:
+    """
+    Юрлица с одной витриной: один фит, затем сценарий/совет/PDF по каждому.
+    Выполняется в процессе пула (поэтому на уровне модуля) — тенант передаётся явно,
+    метрики процесса возвращаются вместе с результатом, как в core.offload.
+    """
+    with use_tenant(tenant):
+        t0 = time.perf_counter()
+        try:
+            fit = forecast_cash(group[0][1], horizon_days=int(params["horizon_days"]))
+        except Exception as err:
+            results = [(None, {"entity": e, "ok": False, "error": str(err), "load_ms": ms}) for e, _, ms in group]
+        else:
+            fit_ms = round((time.perf_counter() - t0) * 1000.0, 1)
+            # фит один на группу — его время у первого юрлица, остальные берут готовый
+            results = [_run_entity(e, daily, fit, params, {"load_ms": ms, "forecast_ms": fit_ms if i == 0 else 0.0})
+                       for i, (e, daily, ms) in enumerate(group)]
+    return results, (metrics.drain() if drain_metrics else None)
+
+
+def _run_groups(groups: List[list], params: Dict[str, Any], workers: int) -> List[Result]:
+    """Группы — по процессам: фит и ReportLab держат GIL, потоки здесь почти не масштабируются."""
+    tenant = get_tenant()
+    if workers <= 1 or len(groups) <= 1:
+        return [r for g in groups for r in _run_group(tenant, g, params)[0]]
+    try:
+        with ProcessPoolExecutor(max_workers=min(workers, len(groups))) as ex:
+            done = list(ex.map(_run_group, [tenant] * len(groups), groups, [params] * len(groups),
+                               [True] * len(groups)))
+    except (BrokenProcessPool, OSError) as e:      # нет fork/лимиты контейнера — считаем в процессе
+        log.warning("batch pool unavailable", extra={"error": str(e)})
+        return [r for g in groups for r in _run_group(tenant, g, params)[0]]
+    for _, drained in done:
+        if drained:
+            metrics.merge(drained)
+    return [r for results, _ in done for r in results]
+
+
+def run_batch_reports(entities: List[str], params: Dict[str, Any], workers: int | None = None) -> Tuple[bytes, Dict[str, Any]]:
+    """
+    Батч-генерация брифов по списку юрлиц в пуле процессов (до BATCH_MAX_WORKERS).
+    Витрины читаются здесь же и группируются по хэшу данных: одна группа — один фит в одном процессе.
+    Возвращает (zip-архив с <entity>.pdf и summary.json, summary).
+    """
+    entities = list(dict.fromkeys(entities or ["default"]))  # без дублей, порядок сохраняем
+    for e in entities:
+        entity_dir(e)  # ValueError на невалидный id — до запуска пула
+    workers = max(1, min(int(workers or config.BATCH_MAX_WORKERS), len(entities)))
+
+    started = time.perf_counter()
+    by_entity: Dict[str, Result] = {}
+    groups: Dict[str, list] = {}
+    for e in entities:
+        try:
+            daily, load_ms = _load(e)
+        except Exception as err:
+            by_entity[e] = (None, {"entity": e, "ok": False, "error": str(err)})
+            continue
+        groups.setdefault(_fit_key(daily, int(params["horizon_days"])), []).append((e, daily, load_ms))
+    for pdf, r in _run_groups(list(groups.values()), params, workers):
+        by_entity[r["entity"]] = (pdf, r)
+    results = [by_entity[e] for e in entities]
+    wall_ms = round((time.perf_counter() - started) * 1000.0, 1)
+
+    summary = {
+        "entities": [r for _, r in results],
+        "ok": sum(1 for _, r in results if r["ok"]),
+        "failed": sum(1 for _, r in results if not r["ok"]),
+        "workers": workers,
+        "shared_fits": sum(len(g) - 1 for g in groups.values()),
+        "wall_ms": wall_ms,
+        "params": params,
+    }
+
+    buf = io.BytesIO()
+    with zipfile.ZipFile(buf, "w", compression=zipfile.ZIP_DEFLATED) as zf:
+        for pdf, r in results:
+            if pdf is not None:
+                # PDF уже сжат внутри — не тратим CPU на повторный deflate
+                zf.writestr(f"{r['entity']}.pdf", pdf, compress_type=zipfile.ZIP_STORED)
+        zf.writestr("summary.json", json.dumps(summary, ensure_ascii=False, indent=2))
+    return buf.getvalue(), summary
@@ -1,7 +1,9 @@
 import pandas as pd
 import numpy as np
 from ..utils.io import load_df, path_exists
+from ..core.metrics import timed
 from typing import Dict
+from pathlib import Path
 
 def normalize_many(files: Dict[str, pd.DataFrame]) -> Dict[str, pd.DataFrame]:
     """
@@ -18,6 +20,22 @@ def normalize_many(files: Dict[str, pd.DataFrame]) -> Dict[str, pd.DataFrame]:
     return out
 
 
+def normalize_calendar(pay: pd.DataFrame) -> pd.DataFrame:
+    """
+    Единое соглашение о знаке календаря: amount = |amount| · (+1 inflow, −1 outflow).
+    Идемпотентно — годится и для «сырых» сумм из источников, и для уже нормализованных;
+    строки с неизвестным type сохраняют свою сумму как есть.
+    """
+    pay = pay.copy()
+    pay.columns = [c.lower() for c in pay.columns]
+    amt = pd.to_numeric(pay["amount"], errors="coerce").fillna(0.0)
+    if "type" in pay.columns:
+        sign = pay["type"].astype(str).str.lower().map({"inflow": 1.0, "outflow": -1.0})
+        amt = np.where(sign.notna(), amt.abs() * sign.fillna(1.0), amt)
+    pay["amount"] = amt
+    return pay
+
+
 def normalize(name: str, df: pd.DataFrame) -> pd.DataFrame:
     """Приводим CSV к ожидаемым схемам, лёгкая очистка."""
     if name == "bank_statements.csv":
@@ -38,9 +56,7 @@ def normalize(name: str, df: pd.DataFrame) -> pd.DataFrame:
         if not need.issubset(set(df.columns)):
             raise ValueError(f"payment_calendar.csv must have: {sorted(need)}")
         df["date"] = pd.to_datetime(df["date"]).dt.date
-        sign = df["type"].str.lower().map({"inflow": 1, "outflow": -1}).fillna(0)
-        df["amount"] = pd.to_numeric(df["amount"], errors="coerce").fillna(0.0) * sign
-        return df
+        return normalize_calendar(df)
 
     if name == "fx_rates.csv":
         # ожидаем: date, USD/KZT, EUR/KZT ...
@@ -55,25 +71,27 @@ def normalize(name: str, df: pd.DataFrame) -> pd.DataFrame:
 
     raise ValueError(f"Unknown file: {name}")
 
-def build_daily_cashframe() -> pd.DataFrame:
+@timed("build_daily_cashframe")
+def build_daily_cashframe(root: Path | None = None) -> pd.DataFrame:
     """
     Собирает дневные нетто-потоки и кумулятивный баланс кэша в базовой валюте (KZT).
     Ожидаемые источники (parquet/csv):
       - bank_statements.*:  date, account, currency, amount  (inflow +, outflow -)
       - payment_calendar.*: date, type(inflow|outflow), currency, amount[, memo]
       - fx_rates.*:         date, USD/KZT, EUR/KZT, ...
+    root — корень набора данных (юрлицо), по умолчанию data/processed.
     Возвращает DataFrame: [date, net_cash, cash_balance]
     """
     # 1) Проверяем наличие исходников (parquet или csv — path_exists учитывает оба)
-    if not (path_exists("bank_statements.parquet")
-            and path_exists("payment_calendar.parquet")
-            and path_exists("fx_rates.parquet")):
+    if not (path_exists("bank_statements.parquet", root)
+            and path_exists("payment_calendar.parquet", root)
+            and path_exists("fx_rates.parquet", root)):
         raise FileNotFoundError("Missing required sources: bank_statements, payment_calendar, fx_rates")
 
     # 2) Читаем данные (load_df сам попробует parquet, затем csv)
-    bank = load_df("bank_statements.parquet").copy()
-    pay  = load_df("payment_calendar.parquet").copy()
-    fx   = load_df("fx_rates.parquet").copy()
+    bank = load_df("bank_statements.parquet", root).copy()
+    pay  = normalize_calendar(load_df("payment_calendar.parquet", root))  # и файлы, сохранённые до нормализации
+    fx   = load_df("fx_rates.parquet", root).copy()
 
     # 3) Мини-валидация и приведение типов
     for df in (bank, pay):
@@ -1,33 +1,34 @@
 # backend/app/services/forecast.py
 from __future__ import annotations
-from typing import Tuple, Dict, List
+from typing import Tuple, Dict, List, Optional, TYPE_CHECKING
 from datetime import timedelta
+from pathlib import Path
 
 import numpy as np
 import pandas as pd
 
-# пытаемся использовать pmdarima; если нет — fallback на наивный прогноз
-try:
-    import pmdarima as pm
-    HAS_PMD = True
-except Exception:
-    HAS_PMD = False
-
 # локальные импорты из проекта
-from ..utils.io import load_df
+from ..utils.io import load_df, data_version
 from ..core import config
+from ..core.metrics import timed
+# pmdarima — через backtest: наличие проверяется без импорта, сам пакет грузится при первом фите;
+# если нет — fallback на наивный прогноз
+from . import backtest as bt
+
+if TYPE_CHECKING:
+    from .registry import ModelArtifact
 
 
 # -------------------------
 # Вспомогательные функции
 # -------------------------
 
-def _load_daily_cash_df() -> pd.DataFrame:
+def load_daily_cash_df(root: Path | None = None) -> pd.DataFrame:
     """Возвращает витрину daily_cash.* как DataFrame (или пустой DF с нужными колонками)."""
     df = None
     for name in ("daily_cash", "daily_cash.parquet", "daily_cash.csv"):
         try:
-            df = load_df(name)
+            df = load_df(name, root)
             break
         except FileNotFoundError:
             continue
@@ -65,9 +66,12 @@ def _smape(y_true, y_pred) -> float:
 # Основная логика прогноза
 # -------------------------
 
-def forecast_cash(daily: pd.DataFrame, horizon_days: int) -> Tuple[List[Dict], Dict[str, float]]:
+@timed("forecast_cash")
+def forecast_cash(daily: pd.DataFrame, horizon_days: int,
+                  model: Optional["ModelArtifact"] = None) -> Tuple[List[Dict], Dict[str, float]]:
     """
     Строит прогноз ТОЛЬКО будущих точек [{date, net_cash, cash_balance}] и метрики (sMAPE).
+    model — готовый артефакт из реестра (services.registry): тогда без фита, только predict.
     Гарантированно возвращает (list, dict).
     """
     # аккуратно создаём df
@@ -89,9 +93,14 @@ def forecast_cash(daily: pd.DataFrame, horizon_days: int) -> Tuple[List[Dict], D
             df["cash_balance"] = pd.to_numeric(df["cash_balance"], errors="coerce").fillna(0.0)
         series = df["net_cash"].astype(float)
 
-        if HAS_PMD and len(series) >= 14:
+        if model is not None:
+            try:
+                yhat = model.predict(int(horizon_days)).tolist()
+            except Exception:
+                yhat = _naive_forecast(series, int(horizon_days))
+        elif bt.HAS_PMD and len(series) >= 14:
             try:
-                model = pm.auto_arima(series, seasonal=False, suppress_warnings=True, stepwise=True)
+                model = bt.pm.auto_arima(series, seasonal=False, suppress_warnings=True, stepwise=True)
                 yhat = model.predict(n_periods=int(horizon_days)).tolist()
             except Exception:
                 yhat = _naive_forecast(series, int(horizon_days))
@@ -129,13 +138,43 @@ def _apply_scenario(points: List[Dict], last_balance: float, scenario: str) -> L
         out.append({"date": p["date"], "net_cash": net, "cash_balance": bal})
     return out
 
-def get_forecast(horizon: int | None = None, scenario: str = "baseline") -> Tuple[List[Dict], Dict]:
+def get_forecast(horizon: int | None = None, scenario: str = "baseline",
+                 root: Path | None = None, model_name: str | None = None,
+                 mode: str = "total") -> Tuple[List[Dict], Dict]:
+    """
+    Прогноз на horizon дней. Модель: model_name, иначе champion для горизонта из
+    services.selection (если выбор уже посчитан), иначе ARIMA-или-naive.
+    mode="hierarchical" — по компонентам (services.hierarchy); без исходников — как total.
+    Точки дополняются интервалами и p_negative по остаткам backtest модели (services.intervals).
+    """
+    from .intervals import attach
+
     if horizon is None or horizon <= 0:
         horizon = int(getattr(config, "DEFAULT_HORIZON_DAYS", 35))
 
-    df = _load_daily_cash_df()
-    fut_points, metrics = forecast_cash(df, horizon_days=horizon)
+    version = data_version(root)  # до чтения: перезапись витрины в процессе даст новую версию, а не «чужой» артефакт
+    if mode == "hierarchical":
+        from .hierarchy import forecast_hierarchical, _component_model
+        res = forecast_hierarchical(horizon, root)
+        if res is not None:
+            points, metrics, _ = res
+            last_balance = points[0]["cash_balance"] - points[0]["net_cash"] if points else 0.0
+            points = _apply_scenario(points, last_balance, scenario)
+            df = load_daily_cash_df(root)   # ошибка суммы ≈ ошибка модели листьев на итоговом ряду
+            metrics.update(attach(points, df, version, _component_model(len(df)), root))
+            return points, metrics
+
+    df = load_daily_cash_df(root)
+    model = None
+    if not df.empty:
+        from .registry import REGISTRY
+        from .selection import choose_model
+        name = model_name or choose_model(horizon, root)
+        model = REGISTRY.get_or_fit(df, version, name=name, root=root)
+    fut_points, metrics = forecast_cash(df, horizon_days=horizon, model=model)
     last_balance = float(df["cash_balance"].iloc[-1]) if not df.empty else 0.0
     fut_points = _apply_scenario(fut_points, last_balance, scenario)
+    if model is not None:
+        metrics.update(attach(fut_points, df, version, model.name, root))
 
     return fut_points, metrics
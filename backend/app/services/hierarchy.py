@@ -0,0 +1,182 @@
+# backend/app/services/hierarchy.py
+from __future__ import annotations
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from ..core import config
+from ..core.metrics import timed
+from ..utils.io import load_df, path_exists, data_version
+from . import backtest as bt
+from .etl import normalize_calendar
+from .forecast import load_daily_cash_df, _smape, _insample_naive
+
+
+@dataclass
+class Component:
+    """Лист иерархии: поток в валюте сделки (банк in/out, календарь) → KZT по форвардному курсу."""
+    name: str                       # "bank_in_USD", "bank_out_KZT", "calendar_KZT", ...
+    currency: str
+    history: np.ndarray             # дневные суммы до last_date включительно
+    known: Optional[np.ndarray] = None   # календарь на горизонт: известные суммы, NaN — вне покрытия
+    version: str = ""
+
+
+def interest_rates() -> Dict[str, float]:
+    """FX_INTEREST_RATES="KZT:0.1425,USD:0.0525" → {"KZT": 0.1425, "USD": 0.0525} (годовые, простые)."""
+    out = {}
+    for item in config.FX_INTEREST_RATES.split(","):
+        if ":" in item:
+            ccy, rate = item.split(":", 1)
+            out[ccy.strip().upper()] = float(rate)
+    return out
+
+
+def forward_rates(spot: float, currency: str, horizon: int, rates: Dict[str, float]) -> np.ndarray:
+    """Паритет процентных ставок: F(d) = S · ((1 + r_base·d/365) / (1 + r_ccy·d/365)), d = 1..horizon."""
+    if currency == config.BASE_CURRENCY:
+        return np.ones(int(horizon))
+    d = np.arange(1, int(horizon) + 1) / 365.0
+    r_base = rates.get(config.BASE_CURRENCY, 0.0)
+    r_ccy = rates.get(currency, 0.0)
+    return float(spot) * (1.0 + r_base * d) / (1.0 + r_ccy * d)
+
+
+def _spots(fx: pd.DataFrame, last_date: pd.Timestamp) -> Dict[str, float]:
+    """Последний известный курс XXX/KZT на last_date (ffill, как в ETL)."""
+    fx = fx.copy()
+    fx["date"] = pd.to_datetime(fx["date"], errors="coerce")
+    fx = fx[fx["date"] <= last_date].sort_values("date")
+    out = {}
+    for col in fx.columns:
+        if col == "date" or "/" not in str(col):
+            continue
+        s = pd.to_numeric(fx[col], errors="coerce").dropna()
+        if len(s):
+            out[str(col).split("/")[0].upper()] = float(s.iloc[-1])
+    return out
+
+
+def _daily_by_ccy(ops: pd.DataFrame, dates: pd.DatetimeIndex) -> Dict[str, np.ndarray]:
+    """ops[date, currency, amount] → {ccy: массив по dates} одним pivot."""
+    if ops.empty:
+        return {}
+    table = ops.pivot_table(index="date", columns="currency", values="amount", aggfunc="sum")
+    table = table.reindex(dates).fillna(0.0)
+    return {str(c): table[c].to_numpy(dtype=float) for c in table.columns}
+
+
+def build_components(bank: pd.DataFrame, pay: pd.DataFrame, last_date: pd.Timestamp,
+                     horizon: int) -> Tuple[List[Component], pd.DatetimeIndex]:
+    bank = bank.copy()
+    bank.columns = [c.lower() for c in bank.columns]
+    frames = []
+    for df in (bank, normalize_calendar(pay)):
+        df["date"] = pd.to_datetime(df["date"], errors="coerce").dt.normalize()
+        df["currency"] = df["currency"].astype(str).str.upper()
+        df["amount"] = pd.to_numeric(df["amount"], errors="coerce").fillna(0.0)
+        frames.append(df[["date", "currency", "amount"]].dropna(subset=["date"]))
+    bank, pay = frames
+
+    start = min(bank["date"].min(), pay["date"].min()) if len(pay) else bank["date"].min()
+    hist_dates = pd.date_range(start, last_date, freq="D")
+    fut_dates = pd.date_range(last_date + pd.Timedelta(days=1), periods=int(horizon), freq="D")
+
+    comps: List[Component] = []
+    hist_bank = bank[bank["date"] <= last_date]
+    for kind, part in (("in", hist_bank[hist_bank["amount"] > 0]), ("out", hist_bank[hist_bank["amount"] < 0])):
+        for ccy, arr in _daily_by_ccy(part, hist_dates).items():
+            comps.append(Component(f"bank_{kind}_{ccy}", ccy, arr))
+
+    # календарь: известен до последней запланированной даты, дальше — модель по истории календаря
+    cal_hist = _daily_by_ccy(pay[pay["date"] <= last_date], hist_dates)
+    cal_fut = _daily_by_ccy(pay[pay["date"] > last_date], fut_dates)
+    cal_end = pay["date"].max() if len(pay) else last_date
+    covered = fut_dates <= cal_end
+    for ccy in sorted(set(cal_hist) | set(cal_fut)):
+        known = np.where(covered, cal_fut.get(ccy, np.zeros(len(fut_dates))), np.nan)
+        comps.append(Component(f"calendar_{ccy}", ccy, cal_hist.get(ccy, np.zeros(len(hist_dates))), known))
+    return comps, hist_dates
+
+
+def _component_model(n_obs: int) -> str:
+    """Дневные потоки разрежены: без ARIMA лучше среднее, чем «последнее значение»."""
+    if config.HIER_COMPONENT_MODEL != "auto":
+        return config.HIER_COMPONENT_MODEL
+    return "arima" if bt.HAS_PMD and n_obs >= 14 else "naive_mean"
+
+
+def _predict(comp: Component, dates: pd.DatetimeIndex, horizon: int, root: Path | None) -> np.ndarray:
+    from .registry import REGISTRY
+
+    known = comp.known
+    if known is not None and not np.isnan(known).any():
+        return known                                  # весь горизонт покрыт календарём
+    if not np.any(comp.history):
+        pred = np.zeros(int(horizon))
+    else:
+        daily = pd.DataFrame({"date": dates, comp.name: comp.history})
+        art = REGISTRY.get_or_fit(daily, comp.version, name=_component_model(len(daily)),
+                                  target=comp.name, root=root)
+        pred = art.predict(int(horizon))
+    return pred if known is None else np.where(np.isnan(known), pred, known)
+
+
+@timed("forecast_hierarchical")
+def forecast_hierarchical(horizon: int, root: Path | None = None) -> Optional[Tuple[List[Dict], Dict, Dict[str, np.ndarray]]]:
+    """
+    Иерархический прогноз от последней банковской выписки: листья (банк in/out по валютам,
+    календарь по валютам) фитятся параллельно в своей валюте, пересчитываются в KZT по форвардам
+    и складываются bottom-up (итог согласован с листьями по построению). Фиты кэшируются в реестре моделей по версии
+    источников. None — нет исходников (bank/payment/fx) → вызывающий берёт обычный режим.
+    Возвращает (points, metrics, {лист: вклад в KZT по дням}).
+    """
+    if not all(path_exists(f"{n}.parquet", root) for n in ("bank_statements", "payment_calendar", "fx_rates")):
+        return None
+    daily = load_daily_cash_df(root)
+    if daily.empty:
+        return None
+    h = int(horizon)
+    bank = load_df("bank_statements.parquet", root)
+    pay = load_df("payment_calendar.parquet", root)
+    fx = load_df("fx_rates.parquet", root)
+
+    # ETL сливает календарь в витрину как факт; здесь горизонт считается от последней выписки,
+    # а запланированное после неё — известная часть листа calendar_<ccy>
+    dts = pd.to_datetime(daily["date"]).dt.normalize()
+    bank.columns = [str(c).lower() for c in bank.columns]
+    bank_last = pd.to_datetime(bank["date"], errors="coerce").max()
+    last_date = min(bank_last.normalize(), dts.iloc[-1]) if pd.notna(bank_last) else dts.iloc[-1]
+    last_balance = float(daily["cash_balance"][dts <= last_date].iloc[-1]) if (dts <= last_date).any() else 0.0
+    comps, hist_dates = build_components(bank, pay, last_date, h)
+    versions = {"bank": data_version(root, "bank_statements"), "calendar": data_version(root, "payment_calendar")}
+    for c in comps:
+        c.version = versions["calendar" if c.name.startswith("calendar_") else "bank"]
+
+    workers = max(1, min(int(config.HIER_MAX_WORKERS), len(comps)))
+    if workers > 1:
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="hier") as ex:
+            futs = [ex.submit(contextvars.copy_context().run, _predict, c, hist_dates, h, root) for c in comps]
+            preds = [f.result() for f in futs]
+    else:
+        preds = [_predict(c, hist_dates, h, root) for c in comps]
+
+    spots, rates = _spots(fx, last_date), interest_rates()
+    contrib: Dict[str, np.ndarray] = {}
+    for c, p in zip(comps, preds):
+        fwd = forward_rates(spots.get(c.currency, 1.0), c.currency, h, rates)
+        contrib[c.name] = np.asarray(p, dtype=float) * fwd
+
+    net = np.sum(list(contrib.values()), axis=0) if contrib else np.zeros(h)
+    bal = last_balance + np.cumsum(net)
+    dates = pd.date_range(last_date + pd.Timedelta(days=1), periods=h, freq="D")
+    points = [{"date": d.date().isoformat(), "net_cash": float(n), "cash_balance": float(b)}
+              for d, n, b in zip(dates, net, bal)]
+    series = daily["net_cash"].astype(float)
+    metrics = {"smape": float(_smape(series.values, _insample_naive(series))), "components": float(len(comps))}
+    return points, metrics, contrib
@@ -0,0 +1,149 @@
+# backend/app/services/intervals.py
+from __future__ import annotations
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from statistics import NormalDist
+from typing import Dict, List
+
+import numpy as np
+import pandas as pd
+
+from ..core import config, lazy
+from ..core.logging import get_logger
+from ..core.metrics import timed
+from ..utils.filelock import atomic_write
+from . import backtest as bt
+
+log = get_logger("intervals")
+
+DEFAULT_TARGET = "net_cash"
+MAX_H = 60                                   # как ForecastRequest.horizon_days
+
+_MEM: "OrderedDict[tuple, np.ndarray]" = OrderedDict()
+_MEM_MAX = 64
+_LOCK = threading.Lock()
+
+
+def _remember(key, E: np.ndarray) -> np.ndarray:
+    with _LOCK:
+        _MEM[key] = E
+        _MEM.move_to_end(key)
+        while len(_MEM) > _MEM_MAX:
+            _MEM.popitem(last=False)
+    return E
+
+
+@timed("forecast_residuals")
+def residuals(daily: pd.DataFrame, data_version: str, model: str, root: Path | None = None,
+              target: str = DEFAULT_TARGET, compute: bool = True) -> np.ndarray:
+    """
+    Ошибки rolling-backtest модели (факт − прогноз): матрица (окна, шаги ≤ 60) на версии витрины.
+    Считается один раз на версию: файл <model>.resid.npy рядом с артефактом в реестре + LRU в памяти.
+    Истории меньше окна или compute=False без готового файла → пустая матрица (0, 0).
+    """
+    from .registry import REGISTRY
+
+    d = REGISTRY.version_dir(target, data_version, root)
+    key = (str(d), model)
+    with _LOCK:
+        if key in _MEM:
+            _MEM.move_to_end(key)
+            return _MEM[key]
+    path = d / f"{model}.resid.npy"
+    if path.exists():
+        try:
+            return _remember(key, np.load(path))
+        except Exception as e:
+            log.warning("residuals load failed", extra={"path": str(path), "error": str(e)})
+    if not compute:
+        return np.empty((0, 0))
+
+    df = daily.sort_values("date")
+    y = pd.to_numeric(df[target], errors="coerce").fillna(0.0).to_numpy(dtype=float)
+    window = int(config.MODEL_SELECTION_WINDOW)
+    h = min(MAX_H, len(y) - window)
+    if h < 1:
+        return _remember(key, np.empty((0, 0)))
+    max_origins = int(config.INTERVAL_MAX_ORIGINS)
+    if model in bt.HEAVY_MODELS:
+        max_origins = min(max_origins, int(config.INTERVAL_MIN_ORIGINS))
+    step = max(1, (len(y) - window - h + 1) // max(1, max_origins))
+    origins = bt.backtest_origins(len(y), window, h, step, max_origins)
+    idx = pd.DatetimeIndex(pd.to_datetime(df["date"]))
+    E = bt.truth_matrix(y, origins, h) - bt.forecast_matrix(bt.backtest_name(model), y, idx, origins, h)
+
+    d.mkdir(parents=True, exist_ok=True)
+    atomic_write(path, lambda f: np.save(f, E))
+    return _remember(key, E)
+
+
+_HAS_SCIPY = lazy.available("scipy")
+
+
+def _norm_cdf(x: np.ndarray) -> np.ndarray:
+    """Φ(x) массивом: scipy.special.ndtr, без scipy — erfc Абрамовица–Стиган 7.1.26 (|ошибка| < 1.5e-7)."""
+    x = np.asarray(x, dtype=float)
+    if _HAS_SCIPY:
+        return lazy.load("scipy.special").ndtr(x)
+    z = np.abs(x) / np.sqrt(2.0)
+    t = 1.0 / (1.0 + 0.3275911 * z)
+    poly = t * (0.254829592 + t * (-0.284496736 + t * (1.421413741 + t * (-1.453152027 + t * 1.061405429))))
+    tail = 0.5 * poly * np.exp(-z * z)              # 0.5·erfc(|x|/√2) = Φ(-|x|)
+    return np.where(x >= 0, 1.0 - tail, tail)
+
+
+def bands(net: np.ndarray, bal: np.ndarray, E: np.ndarray, level: float,
+          sd_fallback: float = 0.0) -> Dict[str, np.ndarray]:
+    """
+    Интервалы для net_cash (квантили ошибок шага) и cash_balance (квантили накопленных ошибок),
+    P(баланс < 0) по дням — доля окон backtest, где баланс с их ошибкой уходит в минус.
+    Окон меньше INTERVAL_MIN_ORIGINS → нормальное приближение: σ шага = sd_fallback, баланса — σ·√k.
+    """
+    h = len(net)
+    lo_q, hi_q = (1.0 - level) / 2.0, 1.0 - (1.0 - level) / 2.0
+    if E.shape[0] >= int(config.INTERVAL_MIN_ORIGINS) and E.shape[1] > 0:
+        if h > E.shape[1]:                       # горизонт длиннее оценённого — последний шаг повторяется
+            E = np.hstack([E, np.repeat(E[:, -1:], h - E.shape[1], axis=1)])
+        E = E[:, :h]
+        cum = np.cumsum(E, axis=1)
+        qn = np.quantile(E, [lo_q, hi_q], axis=0)
+        qb = np.quantile(cum, [lo_q, hi_q], axis=0)
+        p_neg = (bal[None, :] + cum < 0).mean(axis=0)
+    else:
+        z = NormalDist().inv_cdf(hi_q)
+        sd_b = sd_fallback * np.sqrt(np.arange(1, h + 1))
+        qn = np.array([-z * sd_fallback * np.ones(h), z * sd_fallback * np.ones(h)])
+        qb = np.array([-z * sd_b, z * sd_b])
+        p_neg = np.where(sd_b > 0, _norm_cdf(-bal / np.where(sd_b > 0, sd_b, 1.0)), (bal < 0).astype(float))
+    return {
+        "net_cash_lo": net + qn[0], "net_cash_hi": net + qn[1],
+        "cash_balance_lo": bal + qb[0], "cash_balance_hi": bal + qb[1],
+        "p_negative": p_neg,
+    }
+
+
+def attach(points: List[Dict], daily: pd.DataFrame, data_version: str, model: str,
+           root: Path | None = None, target: str = DEFAULT_TARGET) -> Dict[str, float]:
+    """
+    Дописывает в точки интервалы и p_negative (на месте); возвращает метрики интервалов.
+    Для ARIMA/Prophet остатки в запросе не считаются (фит на каждом окне) — берутся готовые
+    из registry.warm_up, пока их нет — нормальное приближение.
+    """
+    if not points or daily.empty:
+        return {}
+    level = float(config.FORECAST_INTERVAL_LEVEL)
+    try:
+        E = residuals(daily, data_version, model, root, target, compute=model not in bt.HEAVY_MODELS)
+    except Exception as e:   # интервалы не должны ронять прогноз
+        log.warning("residuals failed", extra={"model": model, "error": str(e)})
+        E = np.empty((0, 0))
+    net = np.fromiter((p["net_cash"] for p in points), dtype=float, count=len(points))
+    bal = np.fromiter((p["cash_balance"] for p in points), dtype=float, count=len(points))
+    sd = float(pd.to_numeric(daily[target], errors="coerce").fillna(0.0).std(ddof=0))
+    b = bands(net, bal, E, level, sd_fallback=sd)
+    cols = {k: v.tolist() for k, v in b.items()}
+    for i, p in enumerate(points):
+        for k, v in cols.items():
+            p[k] = v[i]
+    return {"interval_level": level, "interval_origins": float(E.shape[0])}
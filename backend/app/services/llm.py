@@ -1,6 +1,6 @@
-import httpx
 from typing import List, Dict, Any
 from ..core import config
+from ..core.metrics import timed
 
 def _build_messages(system: str, user: str) -> List[Dict[str, str]]:
     msgs = []
@@ -9,6 +9,7 @@ def _build_messages(system: str, user: str) -> List[Dict[str, str]]:
     msgs.append({"role": "user", "content": user})
     return msgs
 
+@timed("llm.chat")
 def chat(system_prompt: str, user_prompt: str) -> str:
     provider = config.LLM_PROVIDER
     if not provider:
@@ -30,6 +31,7 @@ def _ollama_chat(system_prompt: str, user_prompt: str) -> str:
         "stream": False,
         "options": {"temperature": 0.2}
     }
+    import httpx  # ~60 мс на импорт — только при первом вызове LLM
     with httpx.Client(timeout=config.LLM_TIMEOUT) as client:
         r = client.post(url, json=payload)
         r.raise_for_status()
@@ -46,6 +48,7 @@ def _openai_compat_chat(system_prompt: str, user_prompt: str) -> str:
         "temperature": 0.2,
         "stream": False,
     }
+    import httpx
     with httpx.Client(timeout=config.LLM_TIMEOUT, headers=headers) as client:
         r = client.post(url, json=payload)
         r.raise_for_status()
@@ -0,0 +1,164 @@
+# backend/app/services/multiseries.py
+from __future__ import annotations
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from itertools import repeat
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from ..core import config
+from ..core.logging import get_logger
+from ..core.metrics import timed
+from ..utils.io import entity_dir
+from . import backtest as bt
+from .npmodels import PHI, damped_steps, es_grid, smooth
+from .forecast import load_daily_cash_df, _apply_scenario
+
+log = get_logger("multiseries")
+
+
+def right_align(series: List[np.ndarray]) -> np.ndarray:
+    """Ряды разной длины → (N, T_max), выровнены по последнему наблюдению, слева NaN."""
+    T = max((len(s) for s in series), default=0)
+    Y = np.full((len(series), T), np.nan)
+    for i, s in enumerate(series):
+        if len(s):
+            Y[i, T - len(s):] = np.asarray(s, dtype=float)
+    return Y
+
+
+def _arima_one(y: np.ndarray, h: int) -> Optional[Tuple[np.ndarray, float, Tuple[int, ...]]]:
+    """Один ряд в ARIMA (выполняется в процессе пула, поэтому на уровне модуля)."""
+    try:
+        model = bt.pm.auto_arima(y, seasonal=False, suppress_warnings=True, stepwise=True)
+        fitted = np.asarray(model.predict_in_sample(), dtype=float)
+        return np.asarray(model.predict(n_periods=int(h)), dtype=float), bt.smape(y, fitted), tuple(model.order)
+    except Exception:
+        return None
+
+
+def _arima_many(ys: List[np.ndarray], h: int, workers: int) -> List[Optional[tuple]]:
+    if workers <= 1 or len(ys) <= 1:
+        return [_arima_one(y, h) for y in ys]
+    try:
+        with ProcessPoolExecutor(max_workers=min(workers, len(ys))) as ex:
+            return list(ex.map(_arima_one, ys, repeat(h), chunksize=max(1, len(ys) // (4 * workers))))
+    except (BrokenProcessPool, OSError) as e:      # нет fork/лимиты контейнера — считаем в процессе
+        log.warning("arima pool unavailable", extra={"error": str(e)})
+        return [_arima_one(y, h) for y in ys]
+
+
+@timed("forecast_many")
+def forecast_many(Y: np.ndarray, horizon: int, arima_fallback: Optional[bool] = None,
+                  workers: Optional[int] = None) -> Dict[str, Any]:
+    """
+    Прогноз N рядов за один вызов. Y — (N, T), история каждого ряда выровнена вправо (слева NaN).
+    Для каждого ряда по сетке выбираются SES и Holt (минимум SSE), между ними — по AIC.
+    Ряды, где у лучшей модели остаётся автокорреляция остатков (|r1| > 2/√n), при наличии
+    pmdarima уходят в auto_arima в пуле процессов. Ряды короче 3 точек — последнее значение.
+    Возвращает forecasts (N, h), models, params, smape (N,), а также время и series/s.
+    """
+    t0 = time.perf_counter()
+    Y = np.atleast_2d(np.asarray(Y, dtype=float))
+    N, h = Y.shape[0], int(horizon)
+    arima_fallback = config.MULTI_ARIMA_FALLBACK if arima_fallback is None else arima_fallback
+    workers = int(workers or config.MULTI_ARIMA_WORKERS)
+
+    alpha, beta, holt = es_grid()
+    st = smooth(Y, alpha, beta)
+    n = st["n"]
+    rows = np.arange(N)
+    best_ses = np.argmin(np.where(holt, np.inf, st["sse"]), axis=1)
+    best_holt = np.argmin(np.where(holt, st["sse"], np.inf), axis=1)
+    nn = np.maximum(n, 1)
+    aic_ses = nn * np.log(st["sse"][rows, best_ses] / nn + 1e-12) + 2 * 2
+    aic_holt = nn * np.log(st["sse"][rows, best_holt] / nn + 1e-12) + 2 * 4
+    pick = np.where(aic_holt < aic_ses, best_holt, best_ses)
+
+    steps = damped_steps(h)
+    forecasts = st["level"][rows, pick][:, None] + st["trend"][rows, pick][:, None] * steps[None, :]
+    smape = st["smape"][rows, pick].copy()
+    models = np.where(holt[pick], "holt", "ses").astype(object)
+    params: List[Dict[str, Any]] = [
+        {"alpha": float(alpha[g]), **({"beta": float(beta[g]), "phi": PHI} if holt[g] else {})} for g in pick
+    ]
+
+    short = n < 2                                     # меньше двух обновлений — сглаживать нечего
+    for i in np.flatnonzero(short):
+        valid = Y[i][~np.isnan(Y[i])]
+        forecasts[i] = valid[-1] if len(valid) else 0.0
+        models[i], params[i], smape[i] = "naive", {}, np.nan
+
+    arima_rows: List[int] = []
+    if arima_fallback and bt.HAS_PMD:
+        r1 = np.abs(st["r1"][rows, pick])
+        need = (~short) & (n >= 14) & (r1 > 2.0 / np.sqrt(nn))
+        arima_rows = np.flatnonzero(need).tolist()
+        if arima_rows:
+            ys = [Y[i][~np.isnan(Y[i])] for i in arima_rows]
+            for i, res in zip(arima_rows, _arima_many(ys, h, workers)):
+                if res is None:
+                    continue
+                forecasts[i], smape[i] = res[0], res[1]
+                models[i], params[i] = "arima", {"order": list(res[2])}
+
+    elapsed = time.perf_counter() - t0
+    return {
+        "forecasts": forecasts,
+        "models": models.tolist(),
+        "params": params,
+        "smape": smape,
+        "arima": len(arima_rows),
+        "series": N,
+        "elapsed_ms": round(elapsed * 1000.0, 1),
+        "series_per_s": round(N / elapsed, 1) if elapsed > 0 else None,
+    }
+
+
+def forecast_entities(entities: List[str], horizon: int, scenario: str = "baseline") -> Dict[str, Any]:
+    """
+    Батч-прогноз по юрлицам тенанта: витрины → матрица рядов → forecast_many → точки с балансом.
+    Юрлица без витрины попадают в failed, остальные считаются одним вызовом.
+    """
+    entities = list(dict.fromkeys(entities or ["default"]))
+    roots = {e: entity_dir(e) for e in entities}        # ValueError на невалидный id — до загрузки
+    t0 = time.perf_counter()
+    dailies, failed = {}, []
+    for e in entities:
+        daily = load_daily_cash_df(roots[e])
+        if daily.empty:
+            failed.append({"entity": e, "error": f"daily_cash not found for entity '{e}'"})
+        else:
+            dailies[e] = daily
+    load_ms = round((time.perf_counter() - t0) * 1000.0, 1)
+
+    names = list(dailies)
+    Y = right_align([dailies[e]["net_cash"].astype(float).fillna(0.0).to_numpy() for e in names])
+    res = forecast_many(Y, horizon) if names else {
+        "forecasts": np.empty((0, int(horizon))), "models": [], "params": [], "smape": np.empty(0),
+        "arima": 0, "series": 0, "elapsed_ms": 0.0, "series_per_s": None,
+    }
+
+    items = []
+    for i, e in enumerate(names):
+        daily = dailies[e]
+        last_date = pd.Timestamp(daily["date"].iloc[-1])
+        dates = pd.date_range(last_date + pd.Timedelta(days=1), periods=int(horizon), freq="D")
+        pts = [{"date": d.date().isoformat(), "net_cash": float(v), "cash_balance": 0.0}
+               for d, v in zip(dates, res["forecasts"][i])]
+        smape = float(res["smape"][i])
+        items.append({
+            "entity": e,
+            "model": res["models"][i],
+            "params": res["params"][i],
+            "forecast": _apply_scenario(pts, float(daily["cash_balance"].iloc[-1]), scenario),
+            "metrics": {"smape": smape if np.isfinite(smape) else None},
+        })
+    return {
+        "items": items,
+        "failed": failed,
+        "summary": {k: res[k] for k in ("series", "arima", "elapsed_ms", "series_per_s")} | {"load_ms": load_ms},
+    }
@@ -0,0 +1,249 @@
+# backend/app/services/npmodels.py
+# Лёгкие модели на чистом NumPy: SES, Holt с затуханием, Holt-Winters (аддитивная недельная
+# сезонность), профили по дню недели и дню месяца (циклы инвойсов/зарплат из платёжного календаря).
+# Параметры ES подбираются перебором небольшой сетки сразу для всех комбинаций (операции над (N, G)),
+# профили — в закрытой форме. Параметры — JSON-совместимые dict (их же хранит реестр моделей).
+from __future__ import annotations
+from typing import Dict, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+# сетки: SES = (alpha, beta=0), Holt = alpha × beta; Holt-Winters = alpha × beta × gamma
+ALPHAS = np.array([0.05, 0.1, 0.2, 0.3, 0.4, 0.5, 0.6, 0.7, 0.8, 0.95])
+BETAS = np.array([0.02, 0.05, 0.1, 0.2])
+HW_ALPHAS = np.array([0.05, 0.1, 0.2, 0.3, 0.5, 0.7])
+HW_BETAS = np.array([0.0, 0.05])
+HW_GAMMAS = np.array([0.05, 0.1, 0.3, 0.5])
+PHI = 0.98                       # затухание тренда: 60 дней линейной экстраполяции для кэша слишком смело
+SEASON = 7
+PROFILE_WEEKS = 8                # окно профиля по дню недели
+PROFILE_MONTHS = 6               # окно профиля по дню месяца
+
+MODELS = ("ses", "holt", "hw", "dow_profile", "dom_profile")
+MIN_OBS = {"ses": 2, "holt": 3, "hw": 2 * SEASON, "dow_profile": SEASON, "dom_profile": 28}
+
+
+def es_grid() -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """(alpha, beta, is_holt) для всех комбинаций: сначала SES, потом Holt."""
+    a_h, b_h = np.meshgrid(ALPHAS, BETAS, indexing="ij")
+    alpha = np.r_[ALPHAS, a_h.ravel()]
+    beta = np.r_[np.zeros(len(ALPHAS)), b_h.ravel()]
+    return alpha, beta, beta > 0
+
+
+def damped_steps(h: int, phi: float = PHI) -> np.ndarray:
+    """Σ φ^k, k = 1..h — множитель тренда на шагах 1..h."""
+    return np.cumsum(phi ** np.arange(1, int(h) + 1))
+
+
+def _snap_index(at: Optional[Sequence[int]], T: int) -> Dict[int, int]:
+    return {} if at is None else {int(t): i for i, t in enumerate(at) if 0 <= int(t) <= T}
+
+
+def smooth(Y: np.ndarray, alpha: np.ndarray, beta: np.ndarray,
+           at: Optional[Sequence[int]] = None) -> Dict[str, np.ndarray]:
+    """
+    Экспоненциальное сглаживание (Holt с затуханием; beta=0 — SES) сразу для N рядов × G параметров.
+    Y — (N, T), слева допускаются NaN (ряды разной длины). Цикл только по времени; ошибки одношаговые,
+    накапливаются суммы для SSE, sMAPE и автокорреляции остатков lag-1 — сами остатки не храним.
+    at — точки отсечения t: дополнительно состояние после y[:t] (level/trend/sse — (len(at), N, G)),
+    так что rolling-backtest по всем окнам — один проход.
+    """
+    N, T = Y.shape
+    G = len(alpha)
+    a, b = alpha[None, :], beta[None, :]
+    level = np.full((N, G), np.nan)
+    trend = np.zeros((N, G))
+    sse = np.zeros((N, G))
+    ape = np.zeros((N, G))
+    lag = np.zeros((N, G))
+    e_prev = np.zeros((N, G))
+    n = np.zeros(N)
+    snaps = _snap_index(at, T)
+    snap = {k: np.full((len(at) if at is not None else 0, N, G), np.nan) for k in ("level", "trend", "sse")}
+    for t in range(T + 1):
+        if t in snaps:
+            i = snaps[t]
+            snap["level"][i], snap["trend"][i], snap["sse"][i] = level, trend, sse
+        if t == T:
+            break
+        y = Y[:, t:t + 1]                                  # (N, 1)
+        obs = ~np.isnan(y)
+        started = ~np.isnan(level[:, :1])                 # старт у всех G одинаковый
+        upd = obs & started
+        f = level + PHI * trend
+        e = np.where(upd, y - f, 0.0)
+        sse = sse + e * e
+        denom = (np.abs(np.where(upd, y, 0.0)) + np.abs(f)) / 2.0
+        ape += np.where(upd, np.abs(e) / np.where(denom == 0, 1.0, denom), 0.0)
+        lag += e * e_prev
+        e_prev = e
+        n += upd[:, 0]
+        new_level = np.where(upd, f + a * e, level)
+        trend = np.where(upd, b * (new_level - level) + (1.0 - b) * PHI * trend, trend)
+        level = new_level
+        first = (obs & ~started)[:, 0]
+        level[first] = Y[first, t:t + 1]
+    return {"level": level, "trend": trend, "sse": sse, "smape": ape / np.maximum(n, 1)[:, None] * 100.0,
+            "r1": lag / np.where(sse == 0, 1.0, sse), "n": n, "at": snap}
+
+
+def hw_grid() -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    a, b, g = np.meshgrid(HW_ALPHAS, HW_BETAS, HW_GAMMAS, indexing="ij")
+    return a.ravel(), b.ravel(), g.ravel()
+
+
+def holt_winters(y: np.ndarray, alpha: np.ndarray, beta: np.ndarray, gamma: np.ndarray,
+                 m: int = SEASON, at: Optional[Sequence[int]] = None) -> Dict[str, np.ndarray]:
+    """
+    Аддитивный Holt-Winters с затухающим трендом для одного ряда по G наборам параметров
+    (форма с коррекцией ошибкой). Старт: уровень — среднее первого сезона, сезонность — отклонения.
+    Состояние после y[:t]: сезонный индекс следующего шага — t % m. at — как в smooth().
+    """
+    y = np.asarray(y, dtype=float)
+    T, G = len(y), len(alpha)
+    level = np.full(G, y[:m].mean())
+    trend = np.zeros(G)
+    season = np.repeat((y[:m] - y[:m].mean())[None, :], G, axis=0)     # (G, m)
+    sse = np.zeros(G)
+    ape = np.zeros(G)
+    snaps = _snap_index(at, T)
+    k = len(at) if at is not None else 0
+    snap = {"level": np.full((k, G), np.nan), "trend": np.full((k, G), np.nan),
+            "sse": np.full((k, G), np.nan), "season": np.full((k, G, m), np.nan)}
+    for t in range(m, T + 1):
+        if t in snaps:
+            i = snaps[t]
+            snap["level"][i], snap["trend"][i], snap["sse"][i] = level, trend, sse
+            snap["season"][i] = season
+        if t == T:
+            break
+        j = t % m
+        s = season[:, j]
+        f = level + PHI * trend + s
+        e = y[t] - f
+        sse = sse + e * e
+        denom = (abs(y[t]) + np.abs(f)) / 2.0
+        ape += np.abs(e) / np.where(denom == 0, 1.0, denom)
+        level = level + PHI * trend + alpha * e
+        trend = PHI * trend + alpha * beta * e
+        season[:, j] = s + gamma * (1.0 - alpha) * e
+    n = max(T - m, 1)
+    return {"level": level, "trend": trend, "season": season, "sse": sse,
+            "smape": ape / n * 100.0, "at": snap}
+
+
+# -------------------------
+# Один ряд: fit → params, predict(params)
+# -------------------------
+
+def _profile(values: np.ndarray, keys: np.ndarray, size: int) -> np.ndarray:
+    """Среднее по ключу (день недели/месяца); ключи без наблюдений — общее среднее окна."""
+    s = np.bincount(keys, weights=values, minlength=size)
+    c = np.bincount(keys, minlength=size)
+    mean = float(values.mean()) if len(values) else 0.0
+    return np.where(c > 0, s / np.maximum(c, 1), mean)
+
+
+def fit(name: str, y: np.ndarray, dates: Optional[pd.DatetimeIndex] = None) -> Tuple[Dict, float]:
+    """Обучает модель name на y (даты нужны профилям). Возвращает (params, in-sample sMAPE)."""
+    y = np.asarray(y, dtype=float)
+    if name in ("ses", "holt"):
+        alpha, beta, holt = es_grid()
+        sel = holt if name == "holt" else ~holt
+        st = smooth(y[None, :], alpha[sel], beta[sel])
+        g = int(np.argmin(st["sse"][0]))
+        params = {"alpha": float(alpha[sel][g]), "level": float(st["level"][0, g])}
+        if name == "holt":
+            params.update({"beta": float(beta[sel][g]), "phi": PHI, "trend": float(st["trend"][0, g])})
+        return params, float(st["smape"][0, g])
+    if name == "hw":
+        alpha, beta, gamma = hw_grid()
+        st = holt_winters(y, alpha, beta, gamma)
+        g = int(np.argmin(st["sse"]))
+        return {"alpha": float(alpha[g]), "beta": float(beta[g]), "gamma": float(gamma[g]), "phi": PHI,
+                "level": float(st["level"][g]), "trend": float(st["trend"][g]),
+                "season": st["season"][g].tolist(), "phase": int(len(y) % SEASON)}, float(st["smape"][g])
+    if name in ("dow_profile", "dom_profile"):
+        dates = pd.DatetimeIndex(dates)
+        if name == "dow_profile":
+            keep = slice(-PROFILE_WEEKS * SEASON, None)
+            keys, size = np.asarray(dates.dayofweek[keep]), 7
+        else:
+            keep = np.asarray(dates > dates[-1] - pd.DateOffset(months=PROFILE_MONTHS))
+            keys, size = np.asarray(dates.day[keep]), 32
+        prof = _profile(y[keep], keys, size)
+        err = y[keep] - prof[keys]
+        denom = (np.abs(y[keep]) + np.abs(prof[keys])) / 2.0
+        smape = float(np.mean(np.abs(err) / np.where(denom == 0, 1.0, denom)) * 100.0)
+        return {"profile": prof.tolist()}, smape
+    raise ValueError(f"unknown model: {name}")
+
+
+def predict(name: str, params: Dict, horizon: int, last_date=None) -> np.ndarray:
+    """Прогноз на шаги 1..horizon после последней точки обучения (профилям нужна её дата)."""
+    h = int(horizon)
+    if name == "ses":
+        return np.full(h, params["level"])
+    if name == "holt":
+        return params["level"] + params["trend"] * damped_steps(h, params["phi"])
+    if name == "hw":
+        season = np.asarray(params["season"])
+        idx = (params["phase"] + np.arange(h)) % len(season)
+        return params["level"] + params["trend"] * damped_steps(h, params["phi"]) + season[idx]
+    future = pd.date_range(pd.Timestamp(last_date) + pd.Timedelta(days=1), periods=h, freq="D")
+    prof = np.asarray(params["profile"])
+    if name == "dow_profile":
+        return prof[np.asarray(future.dayofweek)]
+    if name == "dom_profile":
+        return prof[np.asarray(future.day)]
+    raise ValueError(f"unknown model: {name}")
+
+
+def forecast(name: str, y: np.ndarray, dates: Optional[pd.DatetimeIndex], horizon: int) -> np.ndarray:
+    """fit + predict; история короче MIN_OBS — последнее значение (как naive_last)."""
+    y = np.asarray(y, dtype=float)
+    if len(y) < MIN_OBS[name]:
+        return np.full(int(horizon), float(y[-1]) if len(y) else 0.0)
+    params, _ = fit(name, y, dates)
+    return predict(name, params, horizon, None if dates is None else pd.DatetimeIndex(dates)[-1])
+
+
+def forecast_origins(name: str, y: np.ndarray, index: pd.DatetimeIndex,
+                     origins: np.ndarray, horizon: int) -> np.ndarray:
+    """
+    Прогнозы со всех точек отсечения (len(origins), h) — то же, что forecast(name, y[:t]) для каждого t.
+    ES-модели — один проход со снимками состояния и SSE на каждом t, профили — закрытая форма на окно.
+    """
+    h = int(horizon)
+    y = np.asarray(y, dtype=float)
+    out = np.empty((len(origins), h))
+    short = origins < MIN_OBS[name]
+    if name in ("ses", "holt"):
+        alpha, beta, holt = es_grid()
+        sel = holt if name == "holt" else ~holt
+        snap = smooth(y[None, :], alpha[sel], beta[sel], at=origins)["at"]
+        g = np.argmin(snap["sse"][:, 0, :], axis=1)
+        rows = np.arange(len(origins))
+        level, trend = snap["level"][rows, 0, g], snap["trend"][rows, 0, g]
+        out[:] = level[:, None] + (trend[:, None] * damped_steps(h)[None, :] if name == "holt" else 0.0)
+    elif name == "hw":
+        ok = ~short
+        if ok.any():
+            alpha, beta, gamma = hw_grid()
+            snap = holt_winters(y, alpha, beta, gamma, at=origins[ok])["at"]
+            g = np.argmin(snap["sse"], axis=1)
+            rows = np.arange(ok.sum())
+            idx = (origins[ok][:, None] + np.arange(h)[None, :]) % SEASON
+            season = snap["season"][rows, g]                                    # (k, m)
+            out[ok] = (snap["level"][rows, g][:, None]
+                       + snap["trend"][rows, g][:, None] * damped_steps(h)[None, :]
+                       + np.take_along_axis(season, idx, axis=1))
+    else:
+        for i, t in enumerate(origins):
+            if not short[i]:
+                out[i] = forecast(name, y[:t], index[:t], h)
+    for i in np.flatnonzero(short):
+        out[i] = y[origins[i] - 1] if origins[i] > 0 else 0.0
+    return out
@@ -0,0 +1,324 @@
+# backend/app/services/registry.py
+from __future__ import annotations
+import contextvars
+import hashlib
+import json
+import pickle
+import shutil
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import asdict, dataclass, field
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from ..core import config
+from ..core.logging import get_logger
+from ..core.metrics import timed
+from ..core.tenant import get_tenant, use_tenant
+from ..utils import io
+from ..utils.filelock import atomic_write, file_lock
+from . import backtest as bt
+from . import npmodels as npm
+
+log = get_logger("registry")
+
+DEFAULT_TARGET = "net_cash"
+
+
+@dataclass
+class ModelArtifact:
+    """Обученная модель + метаданные; сериализуется целиком (pickle) в models/<target>/<версия>/<name>.pkl."""
+    name: str                      # "arima" | "prophet" | "naive" | "naive_mean" | npmodels.MODELS
+    target: str
+    data_version: str
+    fitted_at: str
+    fit_ms: float
+    n_obs: int
+    last_date: str
+    insample_smape: Optional[float]
+    params: Dict[str, Any] = field(default_factory=dict)   # order/aic для ARIMA и т.п.
+    estimator: Any = None
+
+    def meta(self) -> Dict[str, Any]:
+        d = asdict(self)
+        d.pop("estimator")
+        return d
+
+    def predict(self, horizon: int) -> np.ndarray:
+        h = int(horizon)
+        if self.name == "arima":
+            return np.asarray(self.estimator.predict(n_periods=h), dtype=float)
+        if self.name == "prophet":
+            start = pd.Timestamp(self.last_date) + pd.Timedelta(days=1)
+            future = pd.DataFrame({"ds": pd.date_range(start, periods=h, freq="D")})
+            return np.asarray(self.estimator.predict(future)["yhat"], dtype=float)
+        if self.name == "naive_mean":
+            return np.full(h, float(self.params.get("mean", 0.0)))
+        if self.name in npm.MODELS:
+            return npm.predict(self.name, self.params, h, self.last_date)
+        return np.full(h, float(self.params.get("last", 0.0)))
+
+
+def available_models() -> List[str]:
+    return (["naive", "naive_mean", *npm.MODELS]
+            + (["arima"] if bt.HAS_PMD else []) + (["prophet"] if bt.HAS_PROPHET else []))
+
+
+def default_model(n_obs: int) -> str:
+    """Та же логика, что и раньше в forecast_cash: ARIMA от 14 точек, иначе наивная."""
+    return "arima" if bt.HAS_PMD and n_obs >= 14 else "naive"
+
+
+def _finite(x: float) -> Optional[float]:
+    return float(x) if np.isfinite(x) else None
+
+
+@timed("model_fit")
+def fit_model(name: str, daily: pd.DataFrame, data_version: str,
+              target: str = DEFAULT_TARGET) -> Optional[ModelArtifact]:
+    """Обучает модель name на daily[target]; None — модель недоступна или не сошлась."""
+    df = daily.sort_values("date")
+    y = pd.to_numeric(df[target], errors="coerce").fillna(0.0).astype(float)
+    dates = pd.to_datetime(df["date"])
+    if y.empty:
+        return None
+    t0 = time.perf_counter()
+    params: Dict[str, Any] = {}
+    estimator = None
+    try:
+        if name == "arima":
+            if not bt.HAS_PMD or len(y) < 14:
+                return None
+            estimator = bt.pm.auto_arima(y, seasonal=False, suppress_warnings=True, stepwise=True)
+            params = {"order": list(estimator.order), "aic": _finite(estimator.aic())}
+            fitted = np.asarray(estimator.predict_in_sample(), dtype=float)
+        elif name == "prophet":
+            if not bt.HAS_PROPHET or len(y) < 12:
+                return None
+            estimator = bt.Prophet(seasonality_mode="additive", weekly_seasonality=True, daily_seasonality=False)
+            hist = pd.DataFrame({"ds": dates.values, "y": y.values})
+            estimator.fit(hist)
+            params = {"seasonality_mode": "additive", "weekly_seasonality": True}
+            fitted = np.asarray(estimator.predict(hist[["ds"]])["yhat"], dtype=float)
+        elif name == "naive":
+            params = {"last": float(y.iloc[-1])}
+            fitted = np.r_[y.values[0], y.values[:-1]]
+        elif name == "naive_mean":
+            params = {"mean": float(y.mean())}
+            fitted = np.full(len(y), params["mean"])
+        elif name in npm.MODELS:
+            if len(y) < npm.MIN_OBS[name]:
+                return None
+            params, insample = npm.fit(name, y.to_numpy(), pd.DatetimeIndex(dates))
+            fitted = None
+        else:
+            raise ValueError(f"unknown model: {name}")
+    except ValueError:
+        raise
+    except Exception as e:
+        log.warning("model fit failed", extra={"model": name, "error": str(e)})
+        return None
+    return ModelArtifact(
+        name=name, target=target, data_version=data_version,
+        fitted_at=datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        fit_ms=round((time.perf_counter() - t0) * 1000.0, 1),
+        n_obs=int(len(y)), last_date=dates.iloc[-1].date().isoformat(),
+        insample_smape=_finite(bt.smape(y.values, fitted) if fitted is not None else insample),
+        params=params, estimator=estimator,
+    )
+
+
+def _version_key(data_version: str) -> str:
+    return hashlib.sha1(data_version.encode("utf-8")).hexdigest()[:16]
+
+
+class ModelRegistry:
+    """
+    Хранилище артефактов: <data_dir>/models/<target>/<sha1(версия данных)>/<name>.pkl + <name>.json.
+    Совместимый артефакт = та же версия витрины и target. Загруженные держим в памяти (LRU),
+    так что повторный прогноз — это stat файла витрины + predict.
+    """
+
+    def __init__(self, max_cached: int = 32):
+        self.max_cached = max_cached
+        self._lock = threading.Lock()
+        self._mem: "OrderedDict[Tuple[str, str, str], ModelArtifact]" = OrderedDict()
+        self._fit_locks: Dict[Tuple[str, str, str], threading.Lock] = {}
+
+    @staticmethod
+    def _dir(target: str, root: Path | None) -> Path:
+        return (io.data_dir() if root is None else Path(root)) / "models" / target
+
+    def version_dir(self, target: str, data_version: str, root: Path | None = None) -> Path:
+        """Каталог версии данных: артефакты моделей и производные от них (остатки backtest для интервалов)."""
+        return self._dir(target, root) / _version_key(data_version)
+
+    def _remember(self, key, art: ModelArtifact):
+        with self._lock:
+            self._mem[key] = art
+            self._mem.move_to_end(key)
+            while len(self._mem) > self.max_cached:
+                self._mem.popitem(last=False)
+
+    def save(self, art: ModelArtifact, root: Path | None = None) -> Path:
+        d = self.version_dir(art.target, art.data_version, root)
+        d.mkdir(parents=True, exist_ok=True)
+        atomic_write(d / f"{art.name}.pkl", lambda f: pickle.dump(art, f, protocol=pickle.HIGHEST_PROTOCOL))
+        meta = json.dumps(art.meta(), ensure_ascii=False).encode("utf-8")
+        atomic_write(d / f"{art.name}.json", lambda f: f.write(meta))
+        self._remember((str(self._dir(art.target, root)), art.data_version, art.name), art)
+        self.prune(config.MODEL_KEEP_VERSIONS, art.target, root)
+        return d / f"{art.name}.pkl"
+
+    def load(self, name: str, data_version: str, target: str = DEFAULT_TARGET,
+             root: Path | None = None) -> Optional[ModelArtifact]:
+        base = self._dir(target, root)
+        key = (str(base), data_version, name)
+        with self._lock:
+            art = self._mem.get(key)
+            if art is not None:
+                self._mem.move_to_end(key)
+                return art
+        path = base / _version_key(data_version) / f"{name}.pkl"
+        if not path.exists():
+            return None
+        try:
+            with path.open("rb") as f:
+                art = pickle.load(f)
+        except Exception as e:   # битый/несовместимый артефакт → перефит
+            log.warning("artifact load failed", extra={"path": str(path), "error": str(e)})
+            return None
+        if art.data_version != data_version:
+            return None
+        self._remember(key, art)
+        return art
+
+    def get_or_fit(self, daily: pd.DataFrame, data_version: str, name: Optional[str] = None,
+                   target: str = DEFAULT_TARGET, root: Path | None = None) -> ModelArtifact:
+        """
+        Совместимый артефакт или фит «на лету» (один на ключ — параллельные запросы ждут):
+        потоки процесса — на threading.Lock, процессы пула — на flock .<name>.lock в каталоге версии.
+        """
+        name = name or default_model(len(daily))
+        art = self.load(name, data_version, target, root)
+        if art is not None:
+            return art
+        key = (str(self._dir(target, root)), data_version, name)
+        with self._lock:
+            klock = self._fit_locks.setdefault(key, threading.Lock())
+        with klock, file_lock(self.version_dir(target, data_version, root) / f".{name}.lock"):
+            art = self.load(name, data_version, target, root)
+            if art is None:
+                art = fit_model(name, daily, data_version, target) or fit_model("naive", daily, data_version, target)
+                self.save(art, root)
+        return art
+
+    def list(self, target: str = DEFAULT_TARGET, root: Path | None = None) -> List[Dict[str, Any]]:
+        base = self._dir(target, root)
+        metas = []
+        for p in base.glob("*/*.json"):
+            try:
+                metas.append(json.loads(p.read_text(encoding="utf-8")))
+            except Exception:
+                continue
+        return sorted(metas, key=lambda m: (m.get("fitted_at", ""), m.get("name", "")), reverse=True)
+
+    def prune(self, keep: int, target: str = DEFAULT_TARGET, root: Path | None = None) -> int:
+        """Оставляет артефакты последних keep версий данных."""
+        base = self._dir(target, root)
+        if not base.exists():
+            return 0
+        dirs = sorted((d for d in base.iterdir() if d.is_dir()), key=lambda d: d.stat().st_mtime, reverse=True)
+        for d in dirs[keep:]:
+            shutil.rmtree(d, ignore_errors=True)
+        return max(0, len(dirs) - keep)
+
+
+REGISTRY = ModelRegistry()
+
+
+# -------------------------
+# Прогрев (после sync / по расписанию)
+# -------------------------
+
+def warm_up(root: Path | None = None, target: str = DEFAULT_TARGET,
+            models: Optional[List[str]] = None) -> List[Dict[str, Any]]:
+    """Обучает все доступные модели на текущей версии витрины; уже обученные не трогает."""
+    from .forecast import load_daily_cash_df
+
+    version = io.data_version(root)
+    daily = load_daily_cash_df(root)
+    if daily.empty:
+        return []
+    out = []
+    for name in models or available_models():
+        art = REGISTRY.load(name, version, target, root)
+        if art is None:
+            art = fit_model(name, daily, version, target)
+            if art is None:
+                continue
+            REGISTRY.save(art, root)
+        try:   # остатки backtest для интервалов прогноза — тоже один раз на версию
+            from .intervals import residuals
+            residuals(daily, version, name, root, target)
+        except Exception as e:
+            log.warning("residuals warm-up failed", extra={"model": name, "error": str(e)})
+        out.append(art.meta())
+    return out
+
+
+_WARMUP_POOL = ThreadPoolExecutor(max_workers=1, thread_name_prefix="model-warmup")
+_PENDING: Dict[Tuple[str, str], Future] = {}
+_PENDING_LOCK = threading.Lock()
+
+
+def schedule_warm_up(root: Path | None = None) -> Optional[Future]:
+    """
+    Фоновый прогрев после загрузки/синхронизации (контекст тенанта копируется в поток).
+    Повторный вызов, пока прогрев того же набора в очереди, ничего не добавляет.
+    """
+    if not config.MODEL_WARMUP_ON_SYNC:
+        return None
+    key = (get_tenant(), str(root))
+    with _PENDING_LOCK:
+        pending = _PENDING.get(key)
+        if pending is not None and not pending.running() and not pending.done():
+            return pending
+
+        def job():
+            with _PENDING_LOCK:
+                _PENDING.pop(key, None)
+            try:
+                metas = warm_up(root)
+                log.info("model warm-up done", extra={"tenant": key[0], "models": [m["name"] for m in metas]})
+                if config.MODEL_SELECTION:
+                    from .selection import select_models
+                    select_models(root)
+            except Exception as e:
+                log.warning("model warm-up failed", extra={"tenant": key[0], "error": str(e)})
+
+        fut = _WARMUP_POOL.submit(contextvars.copy_context().run, job)
+        _PENDING[key] = fut
+        return fut
+
+
+def warm_up_all() -> Dict[str, int]:
+    """Ночной прогрев: все наборы данных — тенанты и их юрлица (каталоги или scope в БД)."""
+    done = {}
+    for tenant, root in io.dataset_roots():
+        try:
+            with use_tenant(tenant):
+                key = io.storage_scope(root)
+                done[key] = len(warm_up(root))
+                if config.MODEL_SELECTION:
+                    from .selection import select_models
+                    select_models(root)
+        except Exception as e:
+            log.warning("model warm-up failed", extra={"tenant": tenant, "root": str(root), "error": str(e)})
+    return done
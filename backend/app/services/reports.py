@@ -1,8 +1,9 @@
 # backend/app/services/reports.py
 from __future__ import annotations
 
+from functools import lru_cache
 from io import BytesIO
-from typing import Dict, Any, List
+from typing import Dict, Any, List, Tuple
 from datetime import datetime
 from pathlib import Path
 
@@ -10,7 +11,12 @@ from reportlab.lib.pagesizes import A4
 from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
 from reportlab.lib.enums import TA_LEFT
 from reportlab.lib import colors
-from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle
+from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle, PageBreak
+from reportlab.graphics.shapes import Drawing, PolyLine, Rect, Line, String
+
+import numpy as np
+
+from ..core.metrics import timed
 
 # --- Fonts (Cyrillic support) -------------------------------------------------
 
@@ -39,9 +45,13 @@ def _register_fonts() -> str | None:
         return "DejaVuSans"
     return None
 
-FONT_FAMILY = _register_fonts()
+@lru_cache(maxsize=1)
+def _font_family() -> str | None:
+    """Регистрация TTF (чтение и разбор файлов шрифтов) — при первом PDF, а не при импорте модуля."""
+    return _register_fonts()
 
-FONT_NAME = FONT_FAMILY or "Helvetica"
+def _font_name() -> str:
+    return _font_family() or "Helvetica"
 # --- Formatting helpers -------------------------------------------------------
 
 def _fmt_pct(x) -> str:
@@ -56,8 +66,165 @@ def _fmt_num(x) -> str:
     except Exception:
         return "—"
 
+def _fmt_short(x: float) -> str:
+    """Компактная подпись оси: 12.3 млн / 450 тыс."""
+    ax = abs(x)
+    if ax >= 1e9:
+        return f"{x / 1e9:.1f} млрд"
+    if ax >= 1e6:
+        return f"{x / 1e6:.1f} млн"
+    if ax >= 1e3:
+        return f"{x / 1e3:.0f} тыс"
+    return f"{x:.0f}"
+
+# --- Chart / table helpers ----------------------------------------------------
+
+PAGE_WIDTH = A4[0] - 72          # ширина рабочей области (поля по 36pt)
+CHART_HEIGHT = 200
+CHART_MAX_BUCKETS = 260          # ~1 бакет на 2pt ширины — больше точек глаз не различит
+TABLE_ROWS_PER_PAGE = 45         # строк дневной таблицы на страницу
+
+def _series(points: List[Dict[str, Any]] | None) -> Tuple[List[str], np.ndarray, np.ndarray]:
+    """Точки прогноза → (даты ISO, net_cash, cash_balance) как numpy-массивы."""
+    points = points or []
+    dates = [str(p.get("date", ""))[:10] for p in points]
+    net = np.fromiter((float(p.get("net_cash") or 0.0) for p in points), dtype=float, count=len(points))
+    bal = np.fromiter((float(p.get("cash_balance") or 0.0) for p in points), dtype=float, count=len(points))
+    return dates, net, bal
+
+def _bucket_edges(n: int, max_buckets: int) -> np.ndarray:
+    """Границы бакетов для даунсэмплинга: не больше max_buckets, каждый ≥1 точки."""
+    buckets = max(1, min(n, max_buckets))
+    return np.unique(np.linspace(0, n, buckets + 1).astype(int))
+
+def _downsample_minmax(y: np.ndarray, max_buckets: int) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Min/max-даунсэмплинг линии: на каждый бакет — две точки (минимум и максимум),
+    так что провалы баланса не теряются при сжатии 365 дней в ширину страницы.
+    Возвращает (x в индексах исходного ряда, y).
+    """
+    n = len(y)
+    if n <= max_buckets:
+        return np.arange(n, dtype=float), y
+    edges = _bucket_edges(n, max_buckets)
+    starts = edges[:-1]
+    lo = np.minimum.reduceat(y, starts)
+    hi = np.maximum.reduceat(y, starts)
+    mid = (starts + edges[1:] - 1) / 2.0
+    xs = np.repeat(mid, 2)
+    ys = np.empty(2 * len(starts))
+    ys[0::2], ys[1::2] = lo, hi
+    return xs, ys
+
+def _downsample_sum(y: np.ndarray, max_buckets: int) -> Tuple[np.ndarray, np.ndarray, int]:
+    """Даунсэмплинг столбиков: суммируем нетто-поток по бакету (сохраняет итог за период)."""
+    n = len(y)
+    if n <= max_buckets:
+        return np.arange(n, dtype=float), y, 1
+    edges = _bucket_edges(n, max_buckets)
+    starts = edges[:-1]
+    sums = np.add.reduceat(y, starts)
+    mid = (starts + edges[1:] - 1) / 2.0
+    return mid, sums, int(np.ceil(n / len(starts)))
+
+def _build_chart(dates: List[str], net: np.ndarray, bal: np.ndarray,
+                 scen_bal: np.ndarray | None = None,
+                 width: float = PAGE_WIDTH, height: float = CHART_HEIGHT) -> Drawing:
+    """
+    Векторный график ReportLab: баланс (линия), сценарий (пунктир), нетто-поток (столбики).
+    Рисуем примитивами (PolyLine/Rect), а не через matplotlib → PNG.
+    """
+    d = Drawing(width, height)
+    n = len(dates)
+    left, right, bottom, top = 56, 8, 28, 14
+    pw, ph = width - left - right, height - bottom - top
+
+    xs_bar, bars, agg_days = _downsample_sum(net, CHART_MAX_BUCKETS)
+    xs_bal, ys_bal = _downsample_minmax(bal, CHART_MAX_BUCKETS)
+    xs_sc, ys_sc = (_downsample_minmax(scen_bal, CHART_MAX_BUCKETS)
+                    if scen_bal is not None and len(scen_bal) else (np.empty(0), np.empty(0)))
+
+    # общий масштаб по Y (баланс, сценарий и столбики на одной оси, 0 всегда в кадре)
+    ymin = float(min(0.0, ys_bal.min(initial=0.0), ys_sc.min(initial=0.0), bars.min(initial=0.0)))
+    ymax = float(max(0.0, ys_bal.max(initial=0.0), ys_sc.max(initial=0.0), bars.max(initial=0.0)))
+    if ymax == ymin:
+        ymax = ymin + 1.0
+    sy = ph / (ymax - ymin)
+    sx = pw / max(n - 1, 1)
+
+    def X(i):
+        return left + np.asarray(i, dtype=float) * sx
+
+    def Y(v):
+        return bottom + (np.asarray(v, dtype=float) - ymin) * sy
+
+    d.add(Rect(left, bottom, pw, ph, strokeColor=colors.lightgrey, strokeWidth=0.5, fillColor=None))
+    y0 = float(Y(0.0))
+    d.add(Line(left, y0, left + pw, y0, strokeColor=colors.grey, strokeWidth=0.5))
+
+    # столбики нетто-потока
+    bar_w = max(pw / max(len(bars), 1) * 0.8, 0.5)
+    for x, v in zip(X(xs_bar), Y(bars)):
+        h = float(v) - y0
+        d.add(Rect(float(x) - bar_w / 2, min(y0, float(v)), bar_w, abs(h),
+                   strokeColor=None, fillColor=colors.Color(0.55, 0.7, 0.9, alpha=0.6)))
+
+    # линии баланса
+    if len(ys_bal):
+        d.add(PolyLine(list(np.column_stack([X(xs_bal), Y(ys_bal)]).ravel()),
+                       strokeColor=colors.darkblue, strokeWidth=1.2))
+    if len(ys_sc):
+        d.add(PolyLine(list(np.column_stack([X(xs_sc), Y(ys_sc)]).ravel()),
+                       strokeColor=colors.firebrick, strokeWidth=1.0, strokeDashArray=[3, 2]))
+
+    # подписи осей
+    for v in (ymin, 0.0, ymax):
+        d.add(String(left - 4, float(Y(v)) - 3, _fmt_short(v), fontName=_font_name(), fontSize=7, textAnchor="end"))
+    if n:
+        d.add(String(left, bottom - 12, dates[0], fontName=_font_name(), fontSize=7))
+        d.add(String(left + pw, bottom - 12, dates[-1], fontName=_font_name(), fontSize=7, textAnchor="end"))
+    legend = "— баланс (baseline)   ·· баланс (сценарий)   ▮ нетто-поток"
+    if agg_days > 1:
+        legend += f" (сумма за ~{agg_days} дн.)"
+    d.add(String(left, height - 10, legend, fontName=_font_name(), fontSize=7))
+    return d
+
+def _daily_tables(baseline_pts: List[Dict[str, Any]], scenario_pts: List[Dict[str, Any]],
+                  rows_per_page: int = TABLE_ROWS_PER_PAGE) -> List[Table]:
+    """
+    Дневная таблица прогноза, заранее порезанная на страницы.
+    Фиксированные ширины/высоты строк избавляют ReportLab от замеров и split() длинной таблицы.
+    """
+    dates, net, bal = _series(baseline_pts)
+    s_dates, _, s_bal = _series(scenario_pts)
+    s_map = dict(zip(s_dates, s_bal.tolist()))
+    header = ["Дата", "Нетто-поток", "Баланс (baseline)", "Баланс (сценарий)"]
+    body = [
+        [d, _fmt_num(nc), _fmt_num(b), _fmt_num(s_map[d]) if d in s_map else "—"]
+        for d, nc, b in zip(dates, net.tolist(), bal.tolist())
+    ]
+    style = TableStyle([
+        ("FONTNAME", (0, 0), (-1, -1), _font_name()),
+        ("FONTSIZE", (0, 0), (-1, -1), 8),
+        ("BACKGROUND", (0, 0), (-1, 0), colors.whitesmoke),
+        ("BOX", (0, 0), (-1, -1), 0.5, colors.grey),
+        ("INNERGRID", (0, 0), (-1, -1), 0.25, colors.lightgrey),
+        ("ALIGN", (1, 1), (-1, -1), "RIGHT"),
+        ("TOPPADDING", (0, 0), (-1, -1), 2),
+        ("BOTTOMPADDING", (0, 0), (-1, -1), 2),
+    ])
+    col_widths = [90, 130, 130, 130]
+    tables = []
+    for i in range(0, len(body), rows_per_page):
+        chunk = [header] + body[i:i + rows_per_page]
+        t = Table(chunk, colWidths=col_widths, rowHeights=[14] * len(chunk))
+        t.setStyle(style)
+        tables.append(t)
+    return tables
+
 # --- PDF builder --------------------------------------------------------------
 
+@timed("build_pdf")
 def build_pdf(
     baseline: Dict[str, Any] | None,
     scenario: Dict[str, Any] | None,
@@ -80,7 +247,7 @@ def build_pdf(
     styles.add(ParagraphStyle(
         name="P",
         parent=styles["BodyText"],
-        fontName=(FONT_FAMILY or styles["BodyText"].fontName),
+        fontName=(_font_family() or styles["BodyText"].fontName),
         fontSize=10,
         leading=14,
     ))
@@ -89,7 +256,7 @@ def build_pdf(
     styles.add(ParagraphStyle(
         name="H1",
         parent=styles["Heading1"],
-        fontName=(FONT_FAMILY or styles["Heading1"].fontName),
+        fontName=(_font_family() or styles["Heading1"].fontName),
         fontSize=16,
         leading=20,
         spaceAfter=10,
@@ -97,7 +264,7 @@ def build_pdf(
     styles.add(ParagraphStyle(
         name="H2",
         parent=styles["Heading2"],
-        fontName=(FONT_FAMILY or styles["Heading2"].fontName),
+        fontName=(_font_family() or styles["Heading2"].fontName),
         fontSize=12,
         leading=16,
         spaceAfter=6,
@@ -128,7 +295,7 @@ def build_pdf(
     ]
     tbl = Table(rows, colWidths=[220, 260])
     tbl.setStyle(TableStyle([
-        ("FONTNAME", (0,0), (-1,-1), FONT_NAME), 
+        ("FONTNAME", (0,0), (-1,-1), _font_name()), 
         ("BACKGROUND", (0, 0), (-1, 0), colors.whitesmoke),
         ("BOX", (0, 0), (-1, -1), 0.5, colors.grey),
         ("INNERGRID", (0, 0), (-1, -1), 0.25, colors.lightgrey),
@@ -140,6 +307,17 @@ def build_pdf(
     story.append(tbl)
     story.append(Spacer(1, 12))
 
+    # График баланса и нетто-потока
+    base_pts = baseline.get("forecast") or []
+    scen_pts = scenario.get("forecast_scenario") or []
+    if base_pts or scen_pts:
+        chart_pts = base_pts or scen_pts
+        dates, net, bal = _series(chart_pts)
+        _, _, scen_bal = _series(scen_pts if base_pts else [])
+        story.append(Paragraph("Баланс и нетто-поток", styles["H2"]))
+        story.append(_build_chart(dates, net, bal, scen_bal if len(scen_bal) else None))
+        story.append(Spacer(1, 12))
+
     # Рекомендации
     story.append(Paragraph("Рекомендации", styles["H2"]))
     advice_text = advice.get("advice_text") or "Совет не сформирован."
@@ -157,7 +335,7 @@ def build_pdf(
             ])
         tbl2 = Table(rows, colWidths=[200, 100, 180], repeatRows=1)
         tbl2.setStyle(TableStyle([
-            ("FONTNAME", (0,0), (-1,-1), FONT_NAME), 
+            ("FONTNAME", (0,0), (-1,-1), _font_name()), 
             ("BACKGROUND", (0, 0), (-1, 0), colors.whitesmoke),
             ("BOX", (0, 0), (-1, -1), 0.5, colors.grey),
             ("INNERGRID", (0, 0), (-1, -1), 0.25, colors.lightgrey),
@@ -167,6 +345,16 @@ def build_pdf(
         ]))
         story.append(tbl2)
 
+    # Дневной прогноз (постранично)
+    if base_pts or scen_pts:
+        story.append(PageBreak())
+        story.append(Paragraph("Дневной прогноз", styles["H2"]))
+        tables = _daily_tables(base_pts or scen_pts, scen_pts if base_pts else [])
+        for i, t in enumerate(tables):
+            if i:
+                story.append(PageBreak())
+            story.append(t)
+
     # Build PDF
     doc.build(story)
     return buf.getvalue()
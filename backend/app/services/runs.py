@@ -0,0 +1,402 @@
+# backend/app/services/runs.py
+from __future__ import annotations
+import hashlib
+import json
+import math
+import threading
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple
+from uuid import uuid4
+
+import numpy as np
+
+from ..core import config
+from ..core.logging import get_logger
+from ..utils import io, sqlstore
+from ..utils.filelock import atomic_write, file_lock
+from ..utils.singleflight import SingleFlight
+
+log = get_logger("runs")
+
+_EPOCH = np.datetime64("1970-01-01", "D")
+_META = ("run_id", "kind", "scenario", "params_hash", "data_version", "params", "metrics",
+         "horizon_days", "min_cash", "created_at")
+_BANDS = ("net_cash_lo", "net_cash_hi", "cash_balance_lo", "cash_balance_hi", "p_negative")
+
+
+def run_key(kind: str, data_version: str, params: Dict) -> str:
+    """Ключ дедупликации: одинаковые параметры на той же версии данных → тот же прогон."""
+    blob = json.dumps({"kind": kind, "data_version": data_version, "params": params},
+                      sort_keys=True, default=str)
+    return hashlib.sha1(blob.encode("utf-8")).hexdigest()
+
+
+def _finite(metrics: Optional[Dict]) -> Optional[Dict]:
+    """NaN/inf → None: и в JSON-ответе, и в jsonb они невалидны."""
+    if metrics is None:
+        return None
+    return {k: (None if isinstance(v, float) and not math.isfinite(v) else v) for k, v in metrics.items()}
+
+
+def _arrays(points: List[Dict]) -> Dict[str, np.ndarray]:
+    dates = np.array([str(p["date"])[:10] for p in points], dtype="datetime64[D]")
+    out = {
+        "days": (dates - _EPOCH).astype("<i4"),
+        "net_cash": np.asarray([p["net_cash"] for p in points], dtype="<f8"),
+        "cash_balance": np.asarray([p["cash_balance"] for p in points], dtype="<f8"),
+    }
+    if points and all(p.get(k) is not None for p in points for k in _BANDS):
+        out["bands"] = np.asarray([[p[k] for p in points] for k in _BANDS], dtype="<f8")
+    return out
+
+
+def _points(days: np.ndarray, net: np.ndarray, bal: np.ndarray,
+            bands: Optional[np.ndarray] = None) -> List[Dict]:
+    iso = np.datetime_as_string(_EPOCH + days.astype("timedelta64[D]")).tolist()
+    pts = [{"date": d, "net_cash": n, "cash_balance": b}
+           for d, n, b in zip(iso, net.tolist(), bal.tolist())]
+    if bands is not None and bands.shape == (len(_BANDS), len(pts)):
+        for k, row in zip(_BANDS, bands.tolist()):
+            for p, v in zip(pts, row):
+                p[k] = v
+    return pts
+
+
+class FileRunStore:
+    """
+    Файлы: <data_dir>/runs/<run_id>.npz — ряды прогона (int32 дни + float64, интервалы — bands 5×h),
+    runs/index.jsonl — по строке метаданных на прогон (append-only, дочитывается с последнего смещения).
+    Проверка «уже есть» + дозапись индекса — под flock runs/index.lock (пишут и API, и процессы пула).
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._index: Dict[str, Dict] = {}
+
+    @staticmethod
+    def _dir(root: Path | None) -> Path:
+        return (io.data_dir() if root is None else Path(root)) / "runs"
+
+    def _load_index(self, d: Path) -> Dict:
+        path = d / "index.jsonl"
+        size = path.stat().st_size if path.exists() else 0
+        idx = self._index.get(str(path))
+        if idx is None or size < idx["offset"]:
+            idx = {"offset": 0, "metas": [], "by_id": {}, "by_hash": {}}
+            self._index[str(path)] = idx
+        if size > idx["offset"]:
+            with path.open("rb") as f:
+                f.seek(idx["offset"])
+                chunk = f.read(size - idx["offset"])
+            end = chunk.rfind(b"\n") + 1          # недописанную строку оставляем на потом
+            for line in chunk[:end].splitlines():
+                if line.strip():
+                    meta = json.loads(line)
+                    idx["metas"].append(meta)
+                    idx["by_id"][meta["run_id"]] = meta
+                    idx["by_hash"][meta["params_hash"]] = meta
+            idx["offset"] += end
+        return idx
+
+    def find(self, key: str, root: Path | None = None) -> Optional[Dict]:
+        with self._lock:
+            return self._load_index(self._dir(root))["by_hash"].get(key)
+
+    def get(self, run_id: str, root: Path | None = None) -> Optional[Dict]:
+        d = self._dir(root)
+        with self._lock:
+            meta = self._load_index(d)["by_id"].get(run_id)
+        if meta is None:
+            return None
+        with np.load(d / f"{run_id}.npz") as z:
+            pts = _points(z["days"], z["net_cash"], z["cash_balance"], z["bands"] if "bands" in z else None)
+        return {**meta, "points": pts}
+
+    def save(self, meta: Dict, points: List[Dict], root: Path | None = None) -> Dict:
+        d = self._dir(root)
+        d.mkdir(parents=True, exist_ok=True)
+        with self._lock, file_lock(d / "index.lock"):
+            existing = self._load_index(d)["by_hash"].get(meta["params_hash"])
+            if existing is not None:
+                return existing
+            arrays = _arrays(points)
+            atomic_write(d / f"{meta['run_id']}.npz", lambda f: np.savez(f, **arrays))
+            with (d / "index.jsonl").open("a", encoding="utf-8") as f:
+                f.write(json.dumps(meta, ensure_ascii=False) + "\n")
+            self._load_index(d)
+        return meta
+
+    def list(self, root: Path | None = None, kind: Optional[str] = None, limit: int = 50) -> List[Dict]:
+        with self._lock:
+            metas = self._load_index(self._dir(root))["metas"]
+            out = [m for m in reversed(metas) if kind is None or m["kind"] == kind]
+        return out[:limit]
+
+
+class SqlRunStore:
+    """БД: таблица run_history (migrations/003, 004), одна строка на прогон, ряды — bytea/blob."""
+
+    def _meta(self, row) -> Dict:
+        meta = dict(zip(_META, row))
+        for k in ("params", "metrics"):
+            if isinstance(meta[k], str):
+                meta[k] = json.loads(meta[k])
+        meta["min_cash"] = None if meta["min_cash"] is None else float(meta["min_cash"])
+        return meta
+
+    def _select(self, where: str, params: list, tail: str = "", arrays: bool = False) -> List[tuple]:
+        store = sqlstore.get_store()
+        cols = list(_META) + (["days", "net_cash", "cash_balance", "bands"] if arrays else [])
+        with store.connection() as conn:
+            cur = conn.cursor()
+            cur.execute(f"select {', '.join(cols)} from run_history where {where} {tail}", params)
+            return cur.fetchall()
+
+    def find(self, key: str, root: Path | None = None) -> Optional[Dict]:
+        p = sqlstore.get_store().ph
+        rows = self._select(f"scope = {p} and params_hash = {p}", [io.storage_scope(root), key])
+        return self._meta(rows[0]) if rows else None
+
+    def get(self, run_id: str, root: Path | None = None) -> Optional[Dict]:
+        p = sqlstore.get_store().ph
+        rows = self._select(f"scope = {p} and run_id = {p}", [io.storage_scope(root), run_id], arrays=True)
+        if not rows:
+            return None
+        row = rows[0]
+        days, net, bal = (np.frombuffer(bytes(b), dtype=t) for b, t in
+                          zip(row[len(_META):], ("<i4", "<f8", "<f8")))
+        raw = row[len(_META) + 3]
+        bands = None if raw is None else np.frombuffer(bytes(raw), dtype="<f8").reshape(len(_BANDS), -1)
+        return {**self._meta(row[:len(_META)]), "points": _points(days, net, bal, bands)}
+
+    def save(self, meta: Dict, points: List[Dict], root: Path | None = None) -> Dict:
+        store = sqlstore.get_store()
+        p = store.ph
+        j = f"{p}::jsonb" if store.dialect == "postgresql" else p
+        arr = _arrays(points)
+        cols = ["scope"] + list(_META) + ["days", "net_cash", "cash_balance", "bands"]
+        marks = [p, p, p, p, p, p, j, j, p, p, p, p, p, p, p]
+        values = [io.storage_scope(root)] + [
+            json.dumps(meta[k], ensure_ascii=False) if k in ("params", "metrics") else meta[k] for k in _META
+        ] + [arr["days"].tobytes(), arr["net_cash"].tobytes(), arr["cash_balance"].tobytes(),
+             arr["bands"].tobytes() if "bands" in arr else None]
+        with store.connection() as conn:
+            cur = conn.cursor()
+            cur.execute(f"insert into run_history ({', '.join(cols)}) values ({', '.join(marks)}) "
+                        "on conflict (scope, params_hash) do nothing", values)
+        return self.find(meta["params_hash"], root) or meta
+
+    def list(self, root: Path | None = None, kind: Optional[str] = None, limit: int = 50) -> List[Dict]:
+        p = sqlstore.get_store().ph
+        where, params = f"scope = {p}", [io.storage_scope(root)]
+        if kind:
+            where += f" and kind = {p}"
+            params.append(kind)
+        rows = self._select(where, params + [int(limit)], f"order by created_at desc limit {p}")
+        return [self._meta(r) for r in rows]
+
+
+# семантика шоков сценария (scenarios.derive_scenario) — часть ключа: прогоны, посчитанные
+# по прежним правилам (FX только к притокам, без shift_purchases_days), не переиспользуются
+SHOCKS_VERSION = 2
+
+_FILE_STORE = FileRunStore()
+_SQL_STORE = SqlRunStore()
+# одинаковые прогоны, пришедшие одновременно (вкладки дашборда, пользователи), считаются один раз
+_FLIGHTS = SingleFlight("runs")
+
+
+def get_run_store():
+    return _SQL_STORE if config.STORAGE_BACKEND == "sql" else _FILE_STORE
+
+
+def flight_key(kind: str, params: Dict, root: Path | None = None) -> Tuple[str, str]:
+    """Ключ совмещения одинаковых запросов до расчёта: (набор данных, run_key на текущей версии)."""
+    return io.storage_scope(root), run_key(kind, io.data_version(root), params)
+
+
+def get_or_create(kind: str, params: Dict, compute: Callable[[], Dict],
+                  root: Path | None = None) -> Tuple[Dict, bool]:
+    """
+    Прогон с дедупликацией по (версия данных, параметры): найден — отдаём сохранённый без пересчёта,
+    иначе compute() → {"points", "metrics"[, "run_id", "min_cash"]} и сохраняем. Одновременные
+    одинаковые промахи ждут один расчёт (single-flight) и получают его запись.
+    Возвращает (запись с points, reused).
+    """
+    store = get_run_store()
+    version = io.data_version(root)
+    key = run_key(kind, version, params)
+    hit = store.find(key, root)
+    if hit is not None:
+        rec = store.get(hit["run_id"], root)
+        if rec is not None:
+            return rec, True
+
+    (rec, reused), shared = _FLIGHTS.do((io.storage_scope(root), key),
+                                        lambda: _create(store, kind, params, version, key, compute, root))
+    return (dict(rec), True) if shared else (rec, reused)
+
+
+def _create(store, kind: str, params: Dict, version: str, key: str, compute: Callable[[], Dict],
+            root: Path | None) -> Tuple[Dict, bool]:
+    res = compute()
+    points = res["points"]
+    meta = {
+        "run_id": res.get("run_id") or str(uuid4()),
+        "kind": kind,
+        "scenario": params.get("scenario"),
+        "params_hash": key,
+        "data_version": version,
+        "params": params,
+        "metrics": _finite(res.get("metrics")),
+        "horizon_days": len(points),
+        "min_cash": res.get("min_cash", min((p["cash_balance"] for p in points), default=None)),
+        "created_at": datetime.now(timezone.utc).isoformat(timespec="milliseconds"),
+    }
+    saved = store.save(meta, points, root)
+    if saved["run_id"] != meta["run_id"]:             # параллельный такой же прогон успел раньше
+        return store.get(saved["run_id"], root) or {**meta, "points": points}, True
+    if kind == "forecast":
+        try:   # алерты не должны ронять прогон
+            from .alerts import on_run
+            on_run(meta, points, root)
+        except Exception as e:
+            log.warning("alerts failed", extra={"run_id": meta["run_id"], "error": str(e)})
+    return {**meta, "points": points}, False
+
+
+def forecast_params(horizon_days: int, scenario: str = "baseline", root: Path | None = None,
+                    mode: str = "total") -> Dict:
+    """Параметры (они же ключ) прогона прогноза."""
+    from .selection import choose_model
+
+    # выбранная модель — часть ключа: смена champion без смены данных даёт новый прогон
+    model = choose_model(horizon_days, root) if mode == "total" else None
+    params = {"horizon_days": int(horizon_days), "scenario": scenario, "model": model}
+    if mode != "total":   # старые ключи total-прогонов не меняются
+        params["mode"] = mode
+    return params
+
+
+def scenario_params(params: Dict, root: Path | None = None) -> Dict:
+    """Ключ сценария с прогнозом: параметры + модель; от сохранённого прогона модель уже в нём."""
+    from .selection import choose_model
+
+    if params.get("baseline_run_id"):
+        return {**params, "shocks": SHOCKS_VERSION}
+    return {**params, "model": choose_model(params.get("horizon_days", config.DEFAULT_HORIZON_DAYS), root),
+            "shocks": SHOCKS_VERSION}
+
+
+def forecast_key(horizon_days: int, scenario: str = "baseline", mode: str = "total",
+                 root: Path | None = None) -> Tuple[str, str]:
+    """flight_key прогноза с той же моделью, что возьмёт forecast_run (читает версию и selection.json)."""
+    return flight_key("forecast", forecast_params(horizon_days, scenario, root, mode), root)
+
+
+def scenario_key(params: Dict, root: Path | None = None) -> Tuple[str, str]:
+    return flight_key("scenario", scenario_params(params, root), root)
+
+
+def forecast_run(horizon_days: int, scenario: str = "baseline", root: Path | None = None,
+                 mode: str = "total") -> Tuple[Dict, bool]:
+    from .forecast import get_forecast
+
+    params = forecast_params(horizon_days, scenario, root, mode)
+
+    def compute():
+        pts, metrics = get_forecast(horizon=horizon_days, scenario=scenario, root=root,
+                                    model_name=params["model"], mode=mode)
+        return {"points": pts, "metrics": metrics}
+
+    return get_or_create("forecast", params, compute, root)
+
+
+def scenario_run(params: Dict, root: Path | None = None) -> Tuple[Dict, bool]:
+    from .scenarios import run_scenario
+
+    params = dict(params)
+    base_id = params.pop("baseline_run_id", None)
+    if base_id:
+        return derived_scenario_run(base_id, params, root)
+
+    def compute():
+        res = run_scenario(**params, root=root)
+        return {"points": res["forecast_scenario"], "metrics": res["metrics"],
+                "run_id": res["run_id"], "min_cash": res["min_cash"]}
+
+    return get_or_create("scenario", scenario_params(params, root), compute, root)
+
+
+def load_run(run_id: str, kind: str, root: Path | None = None) -> Dict:
+    """Сохранённый прогон нужного вида с точками; нет такого — LookupError."""
+    rec = get_run_store().get(run_id, root)
+    if rec is None or rec.get("kind") != kind:
+        raise LookupError(f"{kind} run not found: {run_id}")
+    return rec
+
+
+def derived_scenario_run(base_id: str, params: Dict, root: Path | None = None) -> Tuple[Dict, bool]:
+    """
+    Сценарий от сохранённого baseline-прогона: шоки к его точкам, без загрузки витрины и прогноза.
+    horizon_days — не больше горизонта прогона (нет — весь прогон); сценарий stress/optimistic
+    масштабирует baseline так же, как get_forecast.
+    """
+    from .forecast import _apply_scenario
+    from .scenarios import derive_scenario
+
+    base = load_run(base_id, "forecast", root)
+    pts = base["points"]
+    h = int(params.get("horizon_days") or len(pts))
+    if h > len(pts):
+        raise ValueError(f"horizon_days {h} exceeds baseline run horizon {len(pts)}")
+    scenario = params.get("scenario") or "baseline"
+    base_scenario = (base.get("params") or {}).get("scenario") or base.get("scenario") or "baseline"
+    if scenario != base_scenario and base_scenario != "baseline":
+        raise ValueError(f"cannot derive '{scenario}' from a '{base_scenario}' run")
+
+    def compute():
+        src = pts[:h]
+        if scenario != base_scenario and src:
+            src = _apply_scenario(src, src[0]["cash_balance"] - src[0]["net_cash"], scenario)
+        res = derive_scenario(src, scenario=scenario, fx_shock=params.get("fx_shock", 0.0),
+                              delay_top_inflow_days=params.get("delay_top_inflow_days", 0),
+                              delay_top_outflow_days=params.get("delay_top_outflow_days", 0),
+                              shift_purchases_days=params.get("shift_purchases_days", 0))
+        return {"points": res["forecast_scenario"], "metrics": base.get("metrics"),
+                "run_id": res["run_id"], "min_cash": res["min_cash"]}
+
+    key = {**params, "horizon_days": h, "baseline_run_id": base_id, "shocks": SHOCKS_VERSION}
+    return get_or_create("scenario", key, compute, root)
+
+
+def as_forecast(rec: Dict) -> Dict:
+    """Запись прогона → тело как у ответа /forecast."""
+    return {"forecast": rec["points"], "metrics": rec.get("metrics") or {},
+            "scenario": rec.get("scenario") or "baseline", "run_id": rec["run_id"]}
+
+
+def as_scenario(rec: Dict) -> Dict:
+    """Запись прогона → тело как у ответа /scenario."""
+    return {"run_id": rec["run_id"], "scenario": rec.get("scenario") or "baseline",
+            "forecast_scenario": rec["points"], "min_cash": rec.get("min_cash"), "metrics": rec.get("metrics")}
+
+
+def resolve_pair(data: Dict, root: Path | None = None) -> Tuple[Dict, Dict]:
+    """
+    baseline/scenario для совета и отчёта: переданные целиком или по baseline_run_id/scenario_run_id
+    (baseline выводится из params сценария, если тот построен от прогона). Не хватает — ValueError.
+    """
+    baseline, scenario = data.get("baseline"), data.get("scenario")
+    base_id = data.get("baseline_run_id")
+    if not scenario and data.get("scenario_run_id"):
+        rec = load_run(data["scenario_run_id"], "scenario", root)
+        scenario = as_scenario(rec)
+        base_id = base_id or (rec.get("params") or {}).get("baseline_run_id")
+    if not baseline and base_id:
+        baseline = as_forecast(load_run(base_id, "forecast", root))
+    if not baseline or not scenario:
+        raise ValueError("need baseline and scenario (objects or baseline_run_id/scenario_run_id)")
+    return baseline, scenario
+
@@ -1,20 +1,25 @@
 # backend/app/services/scenarios.py
 from __future__ import annotations
-from typing import Dict
+from typing import Dict, List
+from pathlib import Path
 from uuid import uuid4
 
 from .forecast import get_forecast
 from .scenarios_utils import points_to_df, df_to_points, apply_scenarios_safe
 
-def run_scenario(
-    horizon_days: int = 35,
+def derive_scenario(
+    base_points: List[Dict],
     scenario: str = "baseline",
     fx_shock: float = 0.0,
     delay_top_inflow_days: int = 0,
     delay_top_outflow_days: int = 0,
-    shift_purchases_days: int = 0,  # опционально: можно сделать отдельный перенос для «закупок»
-):
-    base_points, _ = get_forecast(horizon=horizon_days, scenario=scenario)
+    shift_purchases_days: int = 0,
+) -> Dict:
+    """
+    Применяет шоки к уже посчитанному прогнозу (без повторного фита модели).
+    FX-шок масштабирует net_cash всех дней, shift_purchases_days — перенос крупнейшего outflow
+    после delay_top_outflow_days (семантика прежнего /api/scenario).
+    """
     base_df = points_to_df(base_points)
 
     # стартовый баланс = B0 из baseline ряда
@@ -29,6 +34,8 @@ def run_scenario(
         fx_shock=fx_shock,
         delay_top_inflow_days=delay_top_inflow_days,
         delay_top_outflow_days=delay_top_outflow_days,
+        shift_purchases_days=shift_purchases_days,
+        fx_scope="all",
     )
 
     pts = df_to_points(scen_df)
@@ -41,3 +48,22 @@ def run_scenario(
         "min_cash": float(min_cash),
         "metrics": None,
     }
+
+def run_scenario(
+    horizon_days: int = 35,
+    scenario: str = "baseline",
+    fx_shock: float = 0.0,
+    delay_top_inflow_days: int = 0,
+    delay_top_outflow_days: int = 0,
+    shift_purchases_days: int = 0,
+    root: Path | None = None,
+):
+    base_points, _ = get_forecast(horizon=horizon_days, scenario=scenario, root=root)
+    return derive_scenario(
+        base_points,
+        scenario=scenario,
+        fx_shock=fx_shock,
+        delay_top_inflow_days=delay_top_inflow_days,
+        delay_top_outflow_days=delay_top_outflow_days,
+        shift_purchases_days=shift_purchases_days,
+    )
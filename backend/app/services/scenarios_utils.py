@@ -33,12 +33,16 @@ def apply_scenarios_safe(
     fx_shock: float = 0.0,
     delay_top_inflow_days: int = 0,
     delay_top_outflow_days: int = 0,
+    shift_purchases_days: int = 0,
+    fx_scope: str = "positive",
 ) -> pd.DataFrame:
     """
     Устойчивое применение сценариев:
       - агрегирует по дате перед операциями,
-      - FX-шок применяем только к положительным net_cash,
+      - FX-шок: fx_scope="positive" — только к положительным net_cash (MVP-модель),
+        "all" — масштаб всех дней (как исторически в /api/scenario),
       - переносит max inflow / min outflow на указанное число дней,
+      - «сдвиг закупок» — ещё один перенос крупнейшего outflow (после delay_top_outflow_days),
       - корректно инициализирует cash_balance с учётом исходного баланса.
     """
     if daily is None or daily.empty:
@@ -51,14 +55,17 @@ def apply_scenarios_safe(
     # 0) Агрегируем по дню (если были дубли строк на дату)
     df = df.groupby("date", as_index=False, sort=True)["net_cash"].sum()
 
-    # 1) FX-шок — к положительным дням (MVP-модель)
+    # 1) FX-шок — к положительным дням (MVP-модель) или ко всем
+    if fx_scope not in ("positive", "all"):
+        raise ValueError(f"unknown fx_scope: {fx_scope!r}")
     if fx_shock:
-        pos = df["net_cash"] > 0
+        pos = df["net_cash"] > 0 if fx_scope == "positive" else slice(None)
         df.loc[pos, "net_cash"] = df.loc[pos, "net_cash"] * (1.0 + fx_shock)
 
     # 2) Переносы
     df = _delay_extreme_daily(df, is_inflow=True, days=delay_top_inflow_days)
     df = _delay_extreme_daily(df, is_inflow=False, days=delay_top_outflow_days)
+    df = _delay_extreme_daily(df, is_inflow=False, days=shift_purchases_days)
 
     # 3) Баланс: старт — либо явно передан, либо из исходных данных
     if base_balance0 is None:
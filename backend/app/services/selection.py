@@ -0,0 +1,156 @@
+# backend/app/services/selection.py
+from __future__ import annotations
+import json
+import threading
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from ..core import config
+from ..core.metrics import timed
+from ..utils import io
+from ..utils.filelock import atomic_write
+from . import backtest as bt
+from . import npmodels as npm
+
+DEFAULT_TARGET = "net_cash"
+
+# имена моделей backtest → артефакты реестра (services.registry)
+REGISTRY_NAMES = {"naive_last": "naive", "naive_mean": "naive_mean", "arima": "arima", "prophet": "prophet",
+                  **{m: m for m in npm.MODELS}}
+# при равном sMAPE предпочитаем более простую модель
+_PREFERENCE = ["naive_last", "naive_mean", "ses", "dow_profile", "dom_profile", "holt", "hw", "arima", "prophet"]
+
+
+def candidate_models() -> List[str]:
+    """Без pmdarima «arima» в backtest — это naive_last, сравнивать его незачем."""
+    return (["naive_last", "naive_mean", *npm.MODELS]
+            + (["arima"] if bt.HAS_PMD else []) + (["prophet"] if bt.HAS_PROPHET else []))
+
+
+def _path(target: str, root: Path | None) -> Path:
+    return (io.data_dir() if root is None else Path(root)) / "models" / target / "selection.json"
+
+
+def _rank(scores: Dict[str, float]) -> List[str]:
+    def key(m):
+        s = scores[m]
+        return (not np.isfinite(s), s if np.isfinite(s) else 0.0, _PREFERENCE.index(m))
+    return sorted(scores, key=key)
+
+
+@timed("model_selection")
+def select_models(root: Path | None = None, target: str = DEFAULT_TARGET,
+                  models: Optional[List[str]] = None) -> Optional[Dict]:
+    """
+    Champion/challenger по корзинам горизонта (MODEL_SELECTION_BUCKETS, напр. 1–7, 8–14, 15–35, 36–60):
+    один backtest на максимальный горизонт с общими для всех моделей точками отсечения,
+    sMAPE считается по шагам внутри корзины. Корзины длиннее доступной истории наследуют
+    выбор последней оцененной. Результат — models/<target>/selection.json.
+    None — истории меньше окна.
+    """
+    from .forecast import load_daily_cash_df
+
+    t0 = time.perf_counter()
+    version = io.data_version(root)
+    df = load_daily_cash_df(root)
+    y = df[target].to_numpy(dtype=float) if target in df.columns else np.empty(0)
+    window = int(config.MODEL_SELECTION_WINDOW)
+    buckets = sorted(set(config.MODEL_SELECTION_BUCKETS))
+    h = min(buckets[-1], len(y) - window)
+    if h < 1:
+        return None
+
+    idx = pd.DatetimeIndex(df["date"])
+    step = max(1, (len(y) - window - h + 1) // max(1, config.MODEL_SELECTION_MAX_ORIGINS))
+    origins = bt.backtest_origins(len(y), window, h, step, config.MODEL_SELECTION_MAX_ORIGINS)
+    truth = bt.truth_matrix(y, origins, h)
+    preds = {m: bt.forecast_matrix(m, y, idx, origins, h) for m in (models or candidate_models())}
+
+    out_buckets = []
+    lo = 0
+    for hi in buckets:
+        if lo >= h:                      # нет данных на такую глубину — берём выбор предыдущей корзины
+            prev = dict(out_buckets[-1])
+            prev.update({"min_h": lo + 1, "max_h": hi, "inherited": True})
+            out_buckets.append(prev)
+            lo = hi
+            continue
+        top = min(hi, h)
+        scores = {m: bt.smape(truth[:, lo:top], p[:, lo:top]) for m, p in preds.items()}
+        ranked = _rank(scores)
+        out_buckets.append({
+            "min_h": lo + 1, "max_h": hi,
+            "champion": ranked[0],
+            "challenger": ranked[1] if len(ranked) > 1 else None,
+            "scores": {m: (round(s, 4) if np.isfinite(s) else None) for m, s in scores.items()},
+            "inherited": False,
+        })
+        lo = hi
+
+    result = {
+        "target": target,
+        "data_version": version,
+        "computed_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "window": window, "origins": int(len(origins)), "horizon_evaluated": int(h),
+        "elapsed_ms": round((time.perf_counter() - t0) * 1000.0, 1),
+        "buckets": out_buckets,
+    }
+    path = _path(target, root)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    blob = json.dumps(result, ensure_ascii=False, indent=2).encode("utf-8")
+    atomic_write(path, lambda f: f.write(blob))   # отбор может идти в нескольких процессах пула
+    return result
+
+
+_CACHE: Dict[str, tuple] = {}
+_CACHE_LOCK = threading.Lock()
+
+
+def load_selection(root: Path | None = None, target: str = DEFAULT_TARGET) -> Optional[Dict]:
+    """Сохранённый выбор (кэш в памяти по mtime файла)."""
+    path = _path(target, root)
+    try:
+        mtime = path.stat().st_mtime_ns
+    except FileNotFoundError:
+        return None
+    with _CACHE_LOCK:
+        hit = _CACHE.get(str(path))
+        if hit and hit[0] == mtime:
+            return hit[1]
+    try:
+        sel = json.loads(path.read_text(encoding="utf-8"))
+    except Exception:
+        return None
+    with _CACHE_LOCK:
+        _CACHE[str(path)] = (mtime, sel)
+    return sel
+
+
+def selection_version(root: Path | None = None, target: str = DEFAULT_TARGET) -> Optional[str]:
+    """Метка сохранённого выбора для ETag: версия данных, на которой он посчитан, и время расчёта."""
+    if not config.MODEL_SELECTION:
+        return None
+    sel = load_selection(root, target)
+    return f"{sel.get('data_version')}@{sel.get('computed_at')}" if sel else None
+
+
+def choose_model(horizon: int, root: Path | None = None, target: str = DEFAULT_TARGET) -> Optional[str]:
+    """
+    Имя артефакта реестра для горизонта: champion корзины, покрывающей horizon.
+    Выбор может быть от прошлой версии данных — пересчёт идёт в фоне после sync.
+    None — режим выключен или выбора ещё нет (тогда модель по умолчанию).
+    """
+    if not config.MODEL_SELECTION:
+        return None
+    sel = load_selection(root, target)
+    if not sel or not sel.get("buckets"):
+        return None
+    for b in sel["buckets"]:
+        if int(horizon) <= b["max_h"]:
+            return REGISTRY_NAMES.get(b["champion"])
+    return REGISTRY_NAMES.get(sel["buckets"][-1]["champion"])
@@ -1,33 +1,156 @@
-from datetime import date, timedelta
+from datetime import date
+from typing import Dict, Sequence
 import numpy as np
 import pandas as pd
 
-def pull_bank_statements(start: date, end: date) -> pd.DataFrame:
+# базовые курсы к KZT для синтетики (random walk вокруг них)
+FX_BASE = {"USD": 500.0, "EUR": 540.0, "RUB": 5.5, "CNY": 70.0}
+# доля операций по валютам (по умолчанию); неизвестные валюты делят остаток поровну
+_CCY_WEIGHTS = {"KZT": 0.7, "USD": 0.2, "EUR": 0.1}
+
+
+def pull_bank_statements(start: date, end: date, seed: int = 123) -> pd.DataFrame:
     """
     Мок-адаптер банка: генерит 0–3 операций в день по KZT/USD.
     """
-    np.random.seed(123)
+    rng = np.random.default_rng(seed)
     dates = pd.date_range(start, end, freq="D").date
-    rows = []
-    for d in dates:
-        for _ in range(np.random.randint(0, 4)):
-            ccy = np.random.choice(["KZT", "USD"], p=[0.7, 0.3])
-            sign = np.random.choice([1, -1], p=[0.55, 0.45])
-            amt  = np.random.choice([200_000, 350_000, 500_000, 800_000, 1_200_000, 2_000_000])
-            rows.append({"date": d, "account": "MAIN", "currency": ccy, "amount": float(sign*amt)})
-    return pd.DataFrame(rows)
+    per_day = rng.integers(0, 4, len(dates))
+    n = int(per_day.sum())
+    sign = np.where(rng.random(n) < 0.55, 1.0, -1.0)
+    amt = rng.choice(np.array([200_000, 350_000, 500_000, 800_000, 1_200_000, 2_000_000], dtype=float), n)
+    return pd.DataFrame({
+        "date": np.repeat(dates, per_day),
+        "account": "MAIN",
+        "currency": np.where(rng.random(n) < 0.7, "KZT", "USD"),
+        "amount": sign * amt,
+    })
+
 
 def pull_payment_calendar(start: date, end: date) -> pd.DataFrame:
     """
     Мок-платёжный календарь: еженедельные inflow, раз в 2 недели payroll, иногда USD outflow.
     """
     dates = pd.date_range(start, end, freq="D").date
-    rows = []
-    for i, d in enumerate(dates):
-        if i % 7 == 0:
-            rows.append({"date": d, "type": "inflow",  "currency": "KZT", "amount": 5_000_000, "memo": "Client invoice"})
-        if i % 14 == 0:
-            rows.append({"date": d, "type": "outflow", "currency": "KZT", "amount": 6_500_000, "memo": "Payroll"})
-        if i % 21 == 5:
-            rows.append({"date": d, "type": "outflow", "currency": "USD", "amount": 20_000,   "memo": "Import"})
-    return pd.DataFrame(rows)
+    i = np.arange(len(dates))
+    parts = [
+        (i % 7 == 0, "inflow", "KZT", 5_000_000, "Client invoice"),
+        (i % 14 == 0, "outflow", "KZT", 6_500_000, "Payroll"),
+        (i % 21 == 5, "outflow", "USD", 20_000, "Import"),
+    ]
+    frames = [pd.DataFrame({"date": dates[m], "type": t, "currency": c, "amount": float(a), "memo": memo,
+                            "_pos": i[m], "_ord": k})
+              for k, (m, t, c, a, memo) in enumerate(parts)]
+    df = pd.concat(frames, ignore_index=True).sort_values(["_pos", "_ord"], kind="stable")
+    return df.drop(columns=["_pos", "_ord"]).reset_index(drop=True)
+
+
+def _business_day_before(d: pd.DatetimeIndex) -> pd.DatetimeIndex:
+    """Выходные → предыдущая пятница (зарплата/налоги не платятся в выходные)."""
+    shift = np.where(d.dayofweek == 5, 1, np.where(d.dayofweek == 6, 2, 0))
+    return d - pd.to_timedelta(shift, unit="D")
+
+
+def fx_random_walk(dates: pd.DatetimeIndex, currencies: Sequence[str], seed: int = 42,
+                   vol: float = 0.004) -> pd.DataFrame:
+    """Курсы XXX/KZT: геометрическое случайное блуждание вокруг FX_BASE, одна cumsum на пару."""
+    rng = np.random.default_rng(seed)
+    out = {"date": dates}
+    for c in currencies:
+        if c == "KZT":
+            continue
+        steps = rng.normal(0.0, vol, len(dates))
+        out[f"{c}/KZT"] = np.round(FX_BASE.get(c, 100.0) * np.exp(np.cumsum(steps)), 4)
+    return pd.DataFrame(out)
+
+
+def generate_ledger(start: date, end: date, accounts: int = 1,
+                    currencies: Sequence[str] = ("KZT", "USD", "EUR"), counterparties: int = 50,
+                    ops_per_day: float = 2.0, seed: int = 0) -> Dict[str, pd.DataFrame]:
+    """
+    Синтетический набор источников для нагрузочных тестов — целиком векторно (без циклов по строкам):
+      - bank_statements: date, account, currency, counterparty, amount. Число операций — Пуассон
+        с интенсивностью по дню недели (выходные ×0.2), концу месяца (×1.5), году (±20%, декабрь ×1.4);
+        контрагенты по Ципфу (клиенты — приход, поставщики — расход), суммы — логнормальные
+        с масштабом контрагента; валютные суммы — в единицах валюты.
+      - payment_calendar (суммы со знаком, как после etl.normalize): инвойсы по понедельникам,
+        зарплата 10-го и 25-го, аренда 1-го, налоги 25-го после квартала (выходные → пятница),
+        импорт в валюте раз в 3 недели.
+      - fx_rates: XXX/KZT по всем валютам кроме KZT.
+    Даты — datetime64 (не объекты date): миллионы строк собираются за секунды. seed → те же данные.
+    """
+    rng = np.random.default_rng(seed)
+    days = pd.date_range(start, end, freq="D")
+    T, A = len(days), int(accounts)
+    currencies = [c.upper() for c in currencies]
+    acc_names = np.array([f"ACC{a + 1:03d}" for a in range(A)])
+
+    # --- банк: интенсивность (T, A) → число операций → плоские массивы операций
+    dow, dom, doy = days.dayofweek.to_numpy(), days.day.to_numpy(), days.dayofyear.to_numpy()
+    lam = (np.where(dow >= 5, 0.2, 1.0)
+           * np.where(dom >= days.days_in_month.to_numpy() - 2, 1.5, 1.0)
+           * (1.0 + 0.2 * np.sin(2 * np.pi * doy / 365.25))
+           * np.where(days.month.to_numpy() == 12, 1.4, 1.0))
+    acc_scale = rng.lognormal(0.0, 0.5, A)                           # крупные и мелкие счета
+    counts = rng.poisson(ops_per_day * lam[:, None] * acc_scale[None, :] / acc_scale.mean())
+    flat = counts.ravel()                                            # порядок: день, затем счёт
+    n = int(flat.sum())
+    day_idx = np.repeat(np.repeat(np.arange(T), A), flat)
+    acc_idx = np.repeat(np.tile(np.arange(A), T), flat)
+
+    K = max(2, int(counterparties))
+    zipf = 1.0 / np.arange(1, K + 1)
+    pk = zipf / zipf.sum()
+    cp = rng.choice(K, n, p=pk)
+    is_customer = np.arange(K) % 2 == 0                              # чётные по рангу — клиенты, нечётные — поставщики
+    cp_scale = rng.lognormal(np.log(400_000), 0.8, K)
+    # ожидаемый расход чуть меньше прихода — остаток не уходит дрейфом в минус на длинных рядах
+    w_in, w_out = (pk * cp_scale)[is_customer].sum(), (pk * cp_scale)[~is_customer].sum()
+    cp_scale[~is_customer] *= 0.98 * w_in / w_out
+    w = np.array([_CCY_WEIGHTS.get(c, 0.0) for c in currencies])
+    w = np.where(w > 0, w, max(0.0, 1.0 - w.sum()) / max(1, int((w == 0).sum())))
+    ccy_idx = rng.choice(len(currencies), n, p=w / w.sum())
+    rate0 = np.array([1.0 if c == "KZT" else FX_BASE.get(c, 100.0) for c in currencies])
+    amount = np.round(cp_scale[cp] * acc_scale[acc_idx] * rng.lognormal(0.0, 0.35, n) / rate0[ccy_idx], 2)
+    bank = pd.DataFrame({   # строковые колонки — категории: коды уже есть, строки не материализуются
+        "date": days[day_idx],
+        "account": pd.Categorical.from_codes(acc_idx, acc_names),
+        "currency": pd.Categorical.from_codes(ccy_idx, currencies),
+        "counterparty": pd.Categorical.from_codes(cp, [f"CP{k:04d}" for k in range(K)]),
+        "amount": np.where(is_customer[cp], amount, -amount),
+    })
+
+    # --- календарь: даты событий × счета
+    month_starts = pd.date_range(days[0].replace(day=1), days[-1], freq="MS")
+    def on(dates: pd.DatetimeIndex) -> pd.DatetimeIndex:
+        return dates[(dates >= days[0]) & (dates <= days[-1])]
+    events = [
+        (on(days[dow == 0]), "inflow", "KZT", 4.0e6, "Client invoice"),
+        (on(_business_day_before(month_starts + pd.Timedelta(days=9))), "outflow", "KZT", 5.5e6, "Payroll"),
+        (on(_business_day_before(month_starts + pd.Timedelta(days=24))), "outflow", "KZT", 5.5e6, "Payroll"),
+        (on(month_starts), "outflow", "KZT", 2.0e6, "Rent"),
+        (on(_business_day_before(month_starts[month_starts.month.isin([1, 4, 7, 10])] + pd.Timedelta(days=24))),
+         "outflow", "KZT", 4.0e6, "Taxes"),
+    ]
+    foreign = [c for c in currencies if c != "KZT"]
+    if foreign:
+        events.append((on(days[5::21]), "outflow", foreign[0], 4.0e3, "Import"))
+    frames = []
+    for dates, typ, ccy, base, memo in events:
+        m = len(dates)
+        amt = np.round(base * np.outer(np.ones(m), acc_scale) * rng.lognormal(0.0, 0.1, (m, A)), 2).ravel()
+        frames.append(pd.DataFrame({
+            "date": np.repeat(dates.to_numpy(), A),
+            "type": typ,
+            "currency": ccy,
+            "amount": amt if typ == "inflow" else -amt,
+            "memo": memo,
+            "account": np.tile(acc_names, m),
+        }))
+    cal = pd.concat(frames, ignore_index=True).sort_values("date", kind="stable").reset_index(drop=True)
+
+    return {
+        "bank_statements": bank,
+        "payment_calendar": cal,
+        "fx_rates": fx_random_walk(days, currencies, seed + 1),
+    }
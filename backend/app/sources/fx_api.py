@@ -1,6 +1,5 @@
-from datetime import date, timedelta
+from datetime import date
 import os
-import httpx
 import pandas as pd
 import numpy as np
 
@@ -23,6 +22,7 @@ def _timeseries_exchangeratehost(start: date, end: date, pairs=None) -> pd.DataF
         "symbols":    symbols,
         "places":     4,
     }
+    import httpx  # лениво: нужен только при sync из внешнего API
     with httpx.Client(timeout=30) as client:
         r = client.get(EXCHANGERATE_HOST, params=params)
         r.raise_for_status()
@@ -55,16 +55,9 @@ def fetch_fx_rates(start: date, end: date, pairs=None) -> pd.DataFrame:
     try:
         return _timeseries_exchangeratehost(start, end, pairs=pairs)
     except Exception:
-        # синтетика как fallback
+        # синтетика как fallback (random walk вокруг базовых курсов, векторно)
+        from .bank_mock import fx_random_walk
         pairs = pairs or FX_PAIRS_DEFAULT
-        days = (end - start).days + 1
-        dates = [start + timedelta(days=i) for i in range(days)]
-        np.random.seed(42)
-        base = {"USD/KZT": 500.0, "EUR/KZT": 540.0}
-        data = {"date": dates}
-        for p in pairs:
-            series = [base.get(p, 500.0)]
-            for _ in range(1, days):
-                series.append(series[-1] + np.random.normal(0, 0.8))
-            data[p] = np.round(series, 2)
-        return pd.DataFrame(data)
+        df = fx_random_walk(pd.date_range(start, end, freq="D"), [p.split("/")[0] for p in pairs], seed=42)
+        df["date"] = df["date"].dt.date
+        return df
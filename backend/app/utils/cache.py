@@ -0,0 +1,111 @@
+# backend/app/utils/cache.py
+from __future__ import annotations
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Dict, Hashable, Optional, Tuple
+
+import pandas as pd
+
+
+@dataclass
+class _Entry:
+    tenant: str
+    stamp: Hashable      # версия источника (mtime/size файла); другая → промах
+    df: pd.DataFrame
+    nbytes: int
+
+
+class FrameCache:
+    """
+    LRU-кэш датафреймов для всех тенантов одного процесса.
+    - общий лимит памяти (max_bytes) — вытесняем самые давно использованные записи любого тенанта;
+    - лимит на тенанта (tenant_max_bytes) — «шумный» тенант вытесняет только свои записи.
+    Ключ включает тенанта, так что данные разных компаний не пересекаются.
+    """
+
+    def __init__(self, max_bytes: int, tenant_max_bytes: int | None = None):
+        self.max_bytes = int(max_bytes)
+        self.tenant_max_bytes = int(tenant_max_bytes or max_bytes)
+        self._lock = threading.Lock()
+        self._items: "OrderedDict[Tuple[str, Hashable], _Entry]" = OrderedDict()
+        self._used = 0
+        self._per_tenant: Dict[str, int] = {}
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @staticmethod
+    def _size(df: pd.DataFrame) -> int:
+        try:
+            return int(df.memory_usage(index=True, deep=True).sum())
+        except Exception:
+            return 0
+
+    def get(self, tenant: str, key: Hashable, stamp: Hashable) -> Optional[pd.DataFrame]:
+        with self._lock:
+            e = self._items.get((tenant, key))
+            if e is None or e.stamp != stamp:
+                self.misses += 1
+                return None
+            self._items.move_to_end((tenant, key))
+            self.hits += 1
+            return e.df
+
+    def put(self, tenant: str, key: Hashable, stamp: Hashable, df: pd.DataFrame) -> None:
+        nbytes = self._size(df)
+        if nbytes > self.tenant_max_bytes or nbytes > self.max_bytes:
+            return  # слишком большой — не кэшируем, чтобы не выбить всё остальное
+        with self._lock:
+            self._drop((tenant, key))
+            self._items[(tenant, key)] = _Entry(tenant, stamp, df, nbytes)
+            self._used += nbytes
+            self._per_tenant[tenant] = self._per_tenant.get(tenant, 0) + nbytes
+            self._evict(tenant)
+
+    def invalidate(self, tenant: str, key: Hashable) -> None:
+        with self._lock:
+            self._drop((tenant, key))
+
+    def clear(self, tenant: str | None = None) -> None:
+        with self._lock:
+            for k in [k for k in self._items if tenant is None or k[0] == tenant]:
+                self._drop(k)
+
+    def stats(self) -> Dict[str, object]:
+        with self._lock:
+            return {
+                "entries": len(self._items),
+                "used_bytes": self._used,
+                "max_bytes": self.max_bytes,
+                "tenant_max_bytes": self.tenant_max_bytes,
+                "per_tenant_bytes": dict(self._per_tenant),
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+            }
+
+    # --- внутреннее (под self._lock) ---
+
+    def _drop(self, k) -> None:
+        e = self._items.pop(k, None)
+        if e is None:
+            return
+        self._used -= e.nbytes
+        left = self._per_tenant.get(e.tenant, 0) - e.nbytes
+        if left > 0:
+            self._per_tenant[e.tenant] = left
+        else:
+            self._per_tenant.pop(e.tenant, None)
+
+    def _evict(self, tenant: str) -> None:
+        # сначала лимит тенанта — вытесняем только его старые записи
+        while self._per_tenant.get(tenant, 0) > self.tenant_max_bytes:
+            k = next(k for k in self._items if k[0] == tenant)
+            self._drop(k)
+            self.evictions += 1
+        # затем общий лимит — глобальный LRU по всем тенантам
+        while self._used > self.max_bytes and self._items:
+            k = next(iter(self._items))
+            self._drop(k)
+            self.evictions += 1
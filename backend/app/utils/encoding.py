@@ -0,0 +1,170 @@
+# backend/app/utils/encoding.py
+"""
+Компактные форматы ответов для длинных рядов (прогноз, сценарий, backtest).
+
+json     — как раньше: список объектов по дням (схемы pydantic);
+columnar — тот же JSON, но по колонкам {"date": [...], "net_cash": [...]}, сериализация orjson;
+arrow    — Arrow IPC stream (application/vnd.apache.arrow.stream);
+parquet  — один parquet-файл (application/vnd.apache.parquet).
+Формат — ?format=... или Accept; в бинарных метаданные (run_id, metrics, ...) лежат
+в метаданных схемы под ключом "la" (JSON), run_id дублируется заголовком X-Run-Id.
+"""
+from __future__ import annotations
+import io as _io
+import json
+from typing import Any, Dict, Iterable, List, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+from fastapi import HTTPException, Request
+from fastapi.responses import JSONResponse, Response
+
+from ..core import lazy
+
+JSON = "application/json"
+COLUMNAR = "application/vnd.la.columnar+json"
+ARROW = "application/vnd.apache.arrow.stream"
+PARQUET = "application/vnd.apache.parquet"
+
+MEDIA = {"json": JSON, "columnar": COLUMNAR, "arrow": ARROW, "parquet": PARQUET}
+_BY_MEDIA = {v: k for k, v in MEDIA.items()}
+_BY_MEDIA["application/x-parquet"] = "parquet"
+_BY_MEDIA["application/vnd.apache.arrow.file"] = "arrow"   # отдаём stream — читается тем же ipc.open_stream
+
+HAS_ORJSON = lazy.available("orjson")
+META_KEY = b"la"
+
+
+def negotiate(request: Optional[Request], fmt: Optional[str] = None) -> str:
+    """Имя формата: явный ?format= важнее Accept; неизвестный format → 400, неизвестный Accept → json."""
+    if fmt:
+        fmt = fmt.lower()
+        if fmt not in MEDIA:
+            raise HTTPException(400, detail=f"unknown format '{fmt}' (one of: {', '.join(MEDIA)})")
+        return fmt
+    accept = request.headers.get("accept", "") if request is not None else ""
+    best, best_q = "json", 0.0
+    for part in accept.split(","):
+        media, _, params = part.strip().partition(";")
+        name = _BY_MEDIA.get(media.strip().lower())
+        if name is None:
+            continue
+        q = 1.0
+        for p in params.split(";"):
+            k, _, v = p.strip().partition("=")
+            if k == "q":
+                try:
+                    q = float(v)
+                except ValueError:
+                    q = 0.0
+        if q > best_q:
+            best, best_q = name, q
+    return best
+
+
+def columns(rows: Sequence[Dict[str, Any]], keys: Optional[Iterable[str]] = None) -> Dict[str, List]:
+    """Список объектов → колонки; ключи — из keys или первой строки; дата — ISO-строка."""
+    if not rows:
+        return {k: [] for k in (keys or ())}
+    keys = list(keys or rows[0].keys())
+    out = {k: [r.get(k) for r in rows] for k in keys}
+    if "date" in out:
+        out["date"] = [str(d)[:10] for d in out["date"]]
+    return out
+
+
+def frame_columns(df: pd.DataFrame) -> Dict[str, List]:
+    """DataFrame → колонки для columnar: даты ISO, NaN → null (orjson и так пишет null)."""
+    out: Dict[str, List] = {}
+    for c in df.columns:
+        s = df[c]
+        if pd.api.types.is_datetime64_any_dtype(s):
+            out[str(c)] = s.dt.strftime("%Y-%m-%d").tolist()
+        elif pd.api.types.is_float_dtype(s):
+            out[str(c)] = [None if v != v else v for v in s.tolist()]
+        else:
+            out[str(c)] = s.tolist()
+    return out
+
+
+def dumps(obj: Any) -> bytes:
+    """orjson (numpy-массивы без копии в список, NaN → null) или stdlib json как запасной путь."""
+    if HAS_ORJSON:
+        import orjson
+        return orjson.dumps(obj, option=orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS)
+    return json.dumps(_nan_to_none(obj), ensure_ascii=False, default=_default,
+                      separators=(",", ":"), allow_nan=False).encode("utf-8")
+
+
+def _default(o):
+    if isinstance(o, np.ndarray):
+        return _nan_to_none(o.tolist())
+    if isinstance(o, np.generic):
+        return o.item()
+    if hasattr(o, "isoformat"):
+        return o.isoformat()
+    raise TypeError(f"not JSON serializable: {type(o).__name__}")
+
+
+def _nan_to_none(obj):
+    if isinstance(obj, float) and obj != obj:
+        return None
+    if isinstance(obj, dict):
+        return {k: _nan_to_none(v) for k, v in obj.items()}
+    if isinstance(obj, (list, tuple)):
+        return [_nan_to_none(v) for v in obj]
+    return obj
+
+
+class FastJSONResponse(JSONResponse):
+    """JSONResponse через dumps(): без jsonable_encoder и pydantic — готовый dict/колонки."""
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
+
+
+def table_bytes(df: pd.DataFrame, fmt: str, meta: Optional[Dict[str, Any]] = None) -> bytes:
+    """DataFrame → Arrow IPC stream / parquet; meta — JSON в метаданных схемы (ключ "la")."""
+    import pyarrow as pa
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    if meta:
+        table = table.replace_schema_metadata({**(table.schema.metadata or {}), META_KEY: dumps(meta)})
+    sink = _io.BytesIO()
+    if fmt == "arrow":
+        with pa.ipc.new_stream(sink, table.schema) as writer:
+            writer.write_table(table)
+    elif fmt == "parquet":
+        import pyarrow.parquet as pq
+        pq.write_table(table, sink)
+    else:
+        raise ValueError(f"not a binary format: {fmt}")
+    return sink.getvalue()
+
+
+def binary_response(body: bytes, fmt: str, headers: Optional[Dict[str, str]] = None) -> Response:
+    return Response(content=body, media_type=MEDIA[fmt], headers=headers)
+
+
+def points_frame(points: Sequence[Dict[str, Any]]) -> pd.DataFrame:
+    """Точки прогона → DataFrame для Arrow/parquet: date — date32, полосы — только если есть."""
+    cols = columns(points)
+    cols = {k: v for k, v in cols.items() if k == "date" or any(x is not None for x in v)}
+    df = pd.DataFrame(cols)
+    if "date" in df:
+        df["date"] = pd.to_datetime(df["date"]).dt.date
+    return df
+
+
+def series_response(fmt: str, points: Sequence[Dict[str, Any]], field: str,
+                    meta: Dict[str, Any]) -> Response:
+    """Ответ прогноза/сценария в формате fmt (не json): колонки под именем field + meta."""
+    headers = {"X-Run-Id": str(meta["run_id"])} if meta.get("run_id") else None
+    if fmt == "columnar":
+        return FastJSONResponse({**meta, field: columns(points)}, headers=headers,
+                                media_type=COLUMNAR)
+    return binary_response(table_bytes(points_frame(points), fmt, meta), fmt, headers)
+
+
+def read_meta(schema) -> Dict[str, Any]:
+    """Метаданные "la" из схемы pyarrow (для клиентов и тестов)."""
+    raw = (schema.metadata or {}).get(META_KEY)
+    return json.loads(raw) if raw else {}
@@ -0,0 +1,55 @@
+# backend/app/utils/filelock.py
+"""
+Файловые хранилища (история прогонов, алерты, реестр моделей, остатки backtest) пишут и процесс API,
+и процессы пула OFFLOAD_WORKERS — threading.Lock видит только свой процесс.
+file_lock — межпроцессная блокировка flock на служебном файле рядом с данными;
+atomic_write — запись во временный файл с уникальным (pid + uuid) именем и os.replace,
+так что два процесса не пишут в один .tmp и читатель никогда не видит недописанный файл.
+Без fcntl (Windows) file_lock ничего не блокирует — там OFFLOAD_WORKERS=0 (потоки одного процесса).
+"""
+from __future__ import annotations
+import os
+import uuid
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Callable, IO, Iterator
+
+try:
+    import fcntl
+except ImportError:  # не POSIX
+    fcntl = None
+
+
+@contextmanager
+def file_lock(path: Path) -> Iterator[None]:
+    """Эксклюзивная блокировка path (файл создаётся, не удаляется) на время блока."""
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with path.open("a+b") as f:
+        if fcntl is not None:
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+
+
+def temp_path(path: Path) -> Path:
+    """.<имя>.<pid>.<uuid>.tmp в том же каталоге (os.replace атомарен только в пределах ФС)."""
+    path = Path(path)
+    return path.with_name(f".{path.name}.{os.getpid()}.{uuid.uuid4().hex[:8]}.tmp")
+
+
+def atomic_write(path: Path, write: Callable[[IO[bytes]], None]) -> Path:
+    """write(f) пишет содержимое в бинарный файл; результат появляется под path целиком или не появляется."""
+    path = Path(path)
+    tmp = temp_path(path)
+    try:
+        with tmp.open("wb") as f:
+            write(f)
+        os.replace(tmp, path)
+    except BaseException:
+        tmp.unlink(missing_ok=True)
+        raise
+    return path
@@ -1,8 +1,128 @@
+import re
+from datetime import date
 from pathlib import Path
+from typing import List, Optional, Tuple
 import pandas as pd
 
+from ..core import config
+from ..core.tenant import get_tenant
+from ..core.metrics import timed
+from .cache import FrameCache
+from . import sqlstore
+
 DATA_DIR = Path(__file__).resolve().parents[2] / "data" / "processed"
 DATA_DIR.mkdir(parents=True, exist_ok=True)
+TENANTS_DIR = DATA_DIR.parent / "tenants"
+
+_ENTITY_RE = re.compile(r"^[A-Za-z0-9][A-Za-z0-9_.-]{0,63}$")
+
+# кэш прочитанных файлов для всех тенантов (LRU + лимиты памяти)
+FRAME_CACHE = FrameCache(
+    max_bytes=config.CACHE_MAX_MB * 1024 * 1024,
+    tenant_max_bytes=(config.CACHE_TENANT_MAX_MB or config.CACHE_MAX_MB) * 1024 * 1024,
+)
+
+def data_dir(tenant: str | None = None) -> Path:
+    """
+    Корень хранилища тенанта. Тенант по умолчанию — data/processed (как раньше),
+    остальные — data/tenants/<tenant>.
+    """
+    tenant = tenant or get_tenant()
+    if tenant == config.DEFAULT_TENANT:
+        return DATA_DIR
+    return TENANTS_DIR / tenant
+
+def entity_dir(entity: str | None) -> Path:
+    """
+    Корень данных юрлица внутри тенанта: <data_dir>/entities/<entity>.
+    None/"default" — основной набор тенанта.
+    """
+    if not entity or entity == "default":
+        return data_dir()
+    if not _ENTITY_RE.match(entity) or ".." in entity:
+        raise ValueError(f"invalid entity id: {entity!r}")
+    return data_dir() / "entities" / entity
+
+def _dir(root: Path | None) -> Path:
+    return data_dir() if root is None else Path(root)
+
+def _stamp(path: Path):
+    st = path.stat()
+    return (st.st_mtime_ns, st.st_size)
+
+def _cached(key: str, stamp, loader):
+    """Чтение через FRAME_CACHE: источник не менялся (stamp) → отдаём копию из памяти."""
+    tenant = get_tenant()
+    df = FRAME_CACHE.get(tenant, key, stamp)
+    if df is None:
+        df = loader()
+        if df is None:
+            return None
+        FRAME_CACHE.put(tenant, key, stamp, df)
+    return df.copy()
+
+def _cached_read(path: Path, reader):
+    """Файл: версия — (mtime, size)."""
+    return _cached(str(path), _stamp(path), lambda: reader(path))
+
+def _sql_dataset(name: str) -> Optional[str]:
+    """STORAGE_BACKEND=sql: имя датасета в БД (bank_statements, daily_cash, ...) или None → файлы."""
+    if config.STORAGE_BACKEND != "sql":
+        return None
+    stem = Path(name).stem
+    return stem if stem in sqlstore.DATASETS else None
+
+def storage_scope(root: Path | None) -> str:
+    """Ключ набора данных в БД: <tenant> или <tenant>/entities/<entity>."""
+    tenant = get_tenant()
+    if root is None:
+        return tenant
+    base = data_dir(tenant).resolve()
+    try:
+        rel = Path(root).resolve().relative_to(base)
+    except ValueError:
+        return Path(root).resolve().as_posix()
+    return tenant if rel == Path(".") else f"{tenant}/{rel.as_posix()}"
+
+def dataset_roots(name: str = "daily_cash") -> List[Tuple[str, Path | None]]:
+    """
+    Все наборы данных с датасетом name: (тенант, root) — основной набор тенанта (root=None)
+    и его юрлица entities/<id>; в STORAGE_BACKEND=sql — по scope из БД, иначе по каталогам.
+    """
+    found: dict = {}
+
+    def add(tenant: str, entity: str | None):
+        found.setdefault(f"{tenant}/entities/{entity}" if entity else tenant,
+                         (tenant, data_dir(tenant) / "entities" / entity if entity else None))
+
+    if _sql_dataset(f"{name}.parquet") is not None:
+        for scope in sqlstore.get_store().scopes(name):
+            tenant, _, rest = scope.partition("/")
+            entity = rest[len("entities/"):] if rest.startswith("entities/") else None
+            if (not rest or entity) and _ENTITY_RE.match(tenant) and (entity is None or _ENTITY_RE.match(entity)):
+                add(tenant, entity)
+        return [found[k] for k in sorted(found)]
+
+    tenants = [config.DEFAULT_TENANT]
+    if TENANTS_DIR.exists():
+        tenants += sorted(p.name for p in TENANTS_DIR.iterdir() if p.is_dir())
+    for tenant in tenants:
+        add(tenant, None)
+        entities = data_dir(tenant) / "entities"
+        if entities.is_dir():
+            for p in sorted(entities.iterdir()):
+                if p.is_dir() and _ENTITY_RE.match(p.name):
+                    add(tenant, p.name)
+    return [found[k] for k in sorted(found)]
+
+def _date_range(df: pd.DataFrame, start: Optional[date], end: Optional[date]) -> pd.DataFrame:
+    if (start is None and end is None) or "date" not in df.columns:
+        return df
+    d = pd.to_datetime(df["date"], errors="coerce")
+    mask = pd.Series(True, index=df.index)
+    if start is not None: mask &= d >= pd.Timestamp(start)
+    if end is not None: mask &= d <= pd.Timestamp(end)
+    return df[mask].reset_index(drop=True)
 
 def _try_parquet_write(path: Path, df: pd.DataFrame) -> bool:
     try:
@@ -17,8 +137,16 @@ def _try_parquet_read(path: Path):
     except Exception:
         return None
 
-def save_df(name: str, df: pd.DataFrame):
-    path = DATA_DIR / name
+def save_df(name: str, df: pd.DataFrame, root: Path | None = None):
+    ds = _sql_dataset(name)
+    if ds is not None:
+        sqlstore.get_store().save(storage_scope(root), ds, df)  # версия в БД меняется → кэш промахнётся сам
+        return
+    base = _dir(root)
+    base.mkdir(parents=True, exist_ok=True)
+    path = base / name
+    for p in (path, path.with_suffix(".parquet"), path.with_suffix(".csv")):
+        FRAME_CACHE.invalidate(get_tenant(), str(p))
     if name.endswith(".parquet"):
         if not _try_parquet_write(path, df):
             (path.with_suffix(".csv")).write_text("")  # создать файл, если нужно
@@ -29,25 +157,61 @@ def save_df(name: str, df: pd.DataFrame):
         if not _try_parquet_write(path.with_suffix(".parquet"), df):
             df.to_csv(path.with_suffix(".csv"), index=False)
 
-def load_df(name: str) -> pd.DataFrame:
-    path = DATA_DIR / name
+@timed("load_df")
+def load_df(name: str, root: Path | None = None,
+            start: Optional[date] = None, end: Optional[date] = None) -> pd.DataFrame:
+    """
+    Читает датасет набора root. start/end — диапазон дат (включительно):
+    в БД фильтруется индексом (scope, dt), для файлов — после чтения.
+    """
+    ds = _sql_dataset(name)
+    if ds is not None:
+        store, scope = sqlstore.get_store(), storage_scope(root)
+        version = store.version(scope, ds)
+        if version is None:
+            raise FileNotFoundError(f"{scope}:{ds}")
+        return _cached(f"sql:{scope}:{ds}:{start}:{end}", version,
+                       lambda: store.load(scope, ds, start, end))
+    return _date_range(_load_file(name, root), start, end)
+
+def _load_file(name: str, root: Path | None) -> pd.DataFrame:
+    path = _dir(root) / name
     if name.endswith(".parquet"):
         if path.exists():
-            df = _try_parquet_read(path); 
+            df = _cached_read(path, _try_parquet_read)
             if df is not None: return df
         csv_path = path.with_suffix(".csv")
-        if csv_path.exists(): return pd.read_csv(csv_path)
+        if csv_path.exists(): return _cached_read(csv_path, pd.read_csv)
         raise FileNotFoundError(str(path))
     elif name.endswith(".csv"):
         if not path.exists(): raise FileNotFoundError(str(path))
-        return pd.read_csv(path)
+        return _cached_read(path, pd.read_csv)
     else:
         pq, csv = path.with_suffix(".parquet"), path.with_suffix(".csv")
-        df = _try_parquet_read(pq) if pq.exists() else None
+        df = _cached_read(pq, _try_parquet_read) if pq.exists() else None
         if df is not None: return df
-        if csv.exists(): return pd.read_csv(csv)
+        if csv.exists(): return _cached_read(csv, pd.read_csv)
         raise FileNotFoundError(str(pq))
 
-def path_exists(name: str) -> bool:
-    p = DATA_DIR / name
+def path_exists(name: str, root: Path | None = None) -> bool:
+    ds = _sql_dataset(name)
+    if ds is not None:
+        return sqlstore.get_store().version(storage_scope(root), ds) is not None
+    p = _dir(root) / name
     return p.exists() or (name.endswith(".parquet") and p.with_suffix(".csv").exists())
+
+def data_version(root: Path | None = None, name: str = "daily_cash") -> str:
+    """
+    Версия витрины набора root — меняется при каждой перезаписи.
+    files: mtime/size файла, sql: dataset_version; нет данных → "none".
+    """
+    ds = _sql_dataset(f"{name}.parquet")
+    if ds is not None:
+        v = sqlstore.get_store().version(storage_scope(root), ds)
+        return "none" if v is None else f"sql:{v}"
+    base = _dir(root)
+    for p in (base / f"{name}.parquet", base / f"{name}.csv"):
+        if p.exists():
+            mtime_ns, size = _stamp(p)
+            return f"file:{p.suffix[1:]}:{mtime_ns}:{size}"
+    return "none"
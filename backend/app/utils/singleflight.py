@@ -0,0 +1,47 @@
+# backend/app/utils/singleflight.py
+from __future__ import annotations
+import threading
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, Hashable, Tuple
+
+from ..core.metrics import SINGLEFLIGHT
+
+
+class SingleFlight:
+    """
+    Один расчёт на ключ среди потоков процесса: первый вызов do(key, fn) считает fn(), остальные,
+    пришедшие до его окончания, ждут и получают тот же результат (или то же исключение).
+    Результат не кэшируется — после завершения следующий вызов считает заново
+    (повторное использование — забота истории прогонов).
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self._lock = threading.Lock()
+        self._calls: Dict[Hashable, Future] = {}
+
+    def do(self, key: Hashable, fn: Callable[[], Any]) -> Tuple[Any, bool]:
+        """(результат, shared): shared=True — ждали чужой расчёт."""
+        with self._lock:
+            fut = self._calls.get(key)
+            leader = fut is None
+            if leader:
+                fut = self._calls[key] = Future()
+        SINGLEFLIGHT.inc(flight=self.name, role="leader" if leader else "follower")
+        if not leader:
+            return fut.result(), True
+        try:
+            res = fn()
+        except BaseException as e:
+            fut.set_exception(e)
+            raise
+        else:
+            fut.set_result(res)
+            return res, False
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
+
+    def inflight(self) -> int:
+        with self._lock:
+            return len(self._calls)
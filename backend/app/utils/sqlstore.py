@@ -0,0 +1,344 @@
+# backend/app/utils/sqlstore.py
+from __future__ import annotations
+import queue
+import re
+import sqlite3
+import threading
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from datetime import date
+from pathlib import Path
+from typing import Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+import pandas as pd
+
+from ..core import config
+
+BACKEND_DIR = Path(__file__).resolve().parents[2]
+MIGRATIONS_DIR = BACKEND_DIR / "migrations"
+
+
+@dataclass(frozen=True)
+class Dataset:
+    """Отображение логического датасета (имя файла без расширения) на таблицу БД."""
+    table: str
+    columns: Tuple[Tuple[str, str], ...]               # (колонка df, колонка БД); первая — дата
+    defaults: Dict[str, object] = field(default_factory=dict)  # для NOT NULL колонок без значения
+    wide_fx: bool = False                               # fx_rates: в файлах «широкий» вид, в БД — (dt, pair, rate)
+
+    @property
+    def db_columns(self) -> List[str]:
+        return [db for _, db in self.columns]
+
+
+DATASETS: Dict[str, Dataset] = {
+    "bank_statements": Dataset(
+        "raw_bank_statements",
+        (("date", "dt"), ("account", "account"), ("currency", "ccy"), ("amount", "amount")),
+        defaults={"account": ""},
+    ),
+    "payment_calendar": Dataset(
+        "raw_payment_calendar",
+        (("date", "dt"), ("type", "type"), ("currency", "ccy"), ("amount", "amount"), ("memo", "memo")),
+    ),
+    "fx_rates": Dataset("raw_fx_rates", (("date", "dt"), ("pair", "pair"), ("rate", "rate")), wide_fx=True),
+    "daily_cash": Dataset(
+        "fact_cash_daily",
+        (("date", "dt"), ("net_cash", "net_cash"), ("cash_balance", "cash_balance")),
+    ),
+}
+
+# Postgres → SQLite: только то, что встречается в migrations/*.sql
+_SQLITE_SUBS = [
+    (re.compile(r"\bbigserial primary key\b", re.I), "integer primary key autoincrement"),
+    (re.compile(r"'(\{\}|\[\])'::jsonb", re.I), r"'\1'"),
+    (re.compile(r"\bjsonb\b", re.I), "text"),
+    (re.compile(r"\btimestamptz default now\(\)", re.I), "text default current_timestamp"),
+    (re.compile(r"\buuid\b", re.I), "text"),
+    (re.compile(r"\bbytea\b", re.I), "blob"),
+]
+
+
+def to_sqlite(sql: str) -> str:
+    for rx, repl in _SQLITE_SUBS:
+        sql = rx.sub(repl, sql)
+    return sql
+
+
+def _records(frame: pd.DataFrame) -> List[tuple]:
+    """Строки для executemany/COPY: нативные python-типы, NaN → NULL."""
+    cols = [frame[c].astype(object).where(frame[c].notna(), None).tolist() for c in frame.columns]
+    return list(zip(*cols))
+
+
+class _Pool:
+    """Простой пул соединений: до size штук, лишние запросы ждут свободное соединение."""
+
+    def __init__(self, connect: Callable[[], object], size: int, timeout_s: float):
+        self._connect = connect
+        self._size = max(1, int(size))
+        self._timeout = timeout_s
+        self._idle: "queue.LifoQueue" = queue.LifoQueue()
+        self._created = 0
+        self._lock = threading.Lock()
+
+    def _acquire(self):
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            pass
+        with self._lock:
+            grow = self._created < self._size
+            if grow:
+                self._created += 1
+        if not grow:
+            return self._idle.get(timeout=self._timeout)
+        try:
+            return self._connect()
+        except Exception:
+            with self._lock:
+                self._created -= 1
+            raise
+
+    @contextmanager
+    def connection(self):
+        conn = self._acquire()
+        try:
+            yield conn
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            self._idle.put(conn)
+
+    def close(self):
+        while True:
+            try:
+                conn = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            try:
+                conn.close()
+            except Exception:
+                pass
+            with self._lock:
+                self._created -= 1
+
+
+class SqlStore:
+    """
+    Хранилище датасетов в БД: SQLite (stdlib, локально/в тестах) или Postgres (psycopg 3).
+    - схема — migrations/*.sql, применяются по порядку и учитываются в schema_migrations;
+    - запись датасета = delete по scope + bulk insert (executemany / COPY) в одной транзакции;
+    - чтение — по индексу (scope, dt), с опциональным диапазоном дат;
+    - dataset_version растёт на каждую запись — по нему валидируется кэш кадров.
+    """
+
+    def __init__(self, url: str, pool_size: int = 4, timeout_s: float = 30.0):
+        self.url = url
+        if url.startswith("sqlite:"):
+            self.dialect = "sqlite"
+            path = url.split("sqlite:///", 1)[-1] if "sqlite:///" in url else ":memory:"
+            if path != ":memory:" and not Path(path).is_absolute():
+                path = str(BACKEND_DIR / path)
+            if path != ":memory:":
+                Path(path).parent.mkdir(parents=True, exist_ok=True)
+            else:
+                pool_size = 1  # у каждого соединения была бы своя in-memory БД
+            self._path = path
+            connect = self._connect_sqlite
+        elif url.startswith(("postgresql://", "postgres://")):
+            self.dialect = "postgresql"
+            connect = self._connect_pg
+        else:
+            raise ValueError(f"unsupported DATABASE_URL for sql storage: {url!r}")
+        self.ph = "?" if self.dialect == "sqlite" else "%s"
+        self._pool = _Pool(connect, pool_size, timeout_s)
+        self._migrated = False
+        self._migrate_lock = threading.Lock()
+
+    # --- соединения ---
+
+    def _connect_sqlite(self):
+        conn = sqlite3.connect(self._path, timeout=30, check_same_thread=False)
+        conn.execute("pragma journal_mode=wal")
+        conn.execute("pragma synchronous=normal")
+        return conn
+
+    def _connect_pg(self):
+        try:
+            import psycopg
+        except ImportError as e:  # опциональная зависимость
+            raise RuntimeError("Postgres storage requires 'psycopg' (pip install 'psycopg[binary]')") from e
+        return psycopg.connect(self.url)
+
+    @contextmanager
+    def connection(self) -> Iterator[object]:
+        self.migrate()
+        with self._pool.connection() as conn:
+            yield conn
+
+    def close(self):
+        self._pool.close()
+
+    # --- миграции ---
+
+    def migrate(self) -> List[str]:
+        """Применяет ещё не применённые migrations/*.sql; возвращает их версии."""
+        if self._migrated:
+            return []
+        with self._migrate_lock:
+            if self._migrated:
+                return []
+            applied: List[str] = []
+            with self._pool.connection() as conn:
+                cur = conn.cursor()
+                cur.execute("create table if not exists schema_migrations("
+                            "version text primary key, applied_at timestamp default current_timestamp)")
+                cur.execute("select version from schema_migrations")
+                done = {r[0] for r in cur.fetchall()}
+                conn.commit()
+                for path in sorted(MIGRATIONS_DIR.glob("*.sql")):
+                    version = path.stem
+                    if version in done:
+                        continue
+                    sql = path.read_text(encoding="utf-8")
+                    mark = f"insert into schema_migrations(version) values ('{version}');"
+                    if self.dialect == "sqlite":
+                        # executescript сам не транзакционен — оборачиваем вручную
+                        conn.executescript(f"begin;\n{to_sqlite(sql)}\n{mark}\ncommit;")
+                    else:
+                        cur.execute(sql)
+                        cur.execute(mark)
+                        conn.commit()
+                    applied.append(version)
+            self._migrated = True
+            return applied
+
+    # --- датасеты ---
+
+    def _dt(self, value) -> object:
+        d = pd.Timestamp(value).date()
+        return d.isoformat() if self.dialect == "sqlite" else d
+
+    def _to_db(self, ds: Dataset, df: pd.DataFrame) -> pd.DataFrame:
+        src = df.copy()
+        src.columns = [str(c) for c in src.columns]
+        if ds.wide_fx:
+            pairs = [c for c in src.columns if c.lower() != "date"]
+            src = src.rename(columns={c: "date" for c in src.columns if c.lower() == "date"})
+            src = (src.melt(id_vars="date", value_vars=pairs, var_name="pair", value_name="rate")
+                      .dropna(subset=["rate"]))
+        else:
+            src = src.rename(columns={c: c.lower() for c in src.columns})
+        out = pd.DataFrame(index=src.index)
+        for col, db in ds.columns:
+            out[db] = src[col] if col in src.columns else ds.defaults.get(db)
+        dt = pd.to_datetime(out["dt"], errors="coerce")
+        out = out[dt.notna()]
+        dt = dt[dt.notna()]
+        out["dt"] = dt.dt.strftime("%Y-%m-%d") if self.dialect == "sqlite" else dt.dt.date
+        if "type" in out.columns:
+            out["type"] = out["type"].astype(str).str.lower()
+        for db, value in ds.defaults.items():
+            out[db] = out[db].fillna(value)
+        return out
+
+    def _from_db(self, ds: Dataset, rows: Sequence[tuple]) -> pd.DataFrame:
+        frame = pd.DataFrame.from_records(list(rows), columns=ds.db_columns)
+        frame["dt"] = pd.to_datetime(frame["dt"]).dt.date
+        for db in ("amount", "rate", "net_cash", "cash_balance"):
+            if db in frame.columns:
+                frame[db] = pd.to_numeric(frame[db], errors="coerce").astype(float)
+        frame = frame.rename(columns={db: col for col, db in ds.columns})
+        if ds.wide_fx:
+            frame = (frame.pivot_table(index="date", columns="pair", values="rate", aggfunc="last")
+                          .reset_index())
+            frame.columns.name = None
+        return frame
+
+    def _bulk_insert(self, conn, table: str, columns: Sequence[str], rows: List[tuple]):
+        if not rows:
+            return
+        cols = ", ".join(columns)
+        if self.dialect == "postgresql":
+            with conn.cursor() as cur, cur.copy(f"copy {table} ({cols}) from stdin") as cp:
+                for r in rows:
+                    cp.write_row(r)
+        else:
+            marks = ", ".join([self.ph] * len(columns))
+            conn.executemany(f"insert into {table} ({cols}) values ({marks})", rows)
+
+    def save(self, scope: str, name: str, df: pd.DataFrame) -> int:
+        """Заменяет датасет name в scope; возвращает новую версию."""
+        ds = DATASETS[name]
+        frame = self._to_db(ds, df)
+        frame.insert(0, "scope", scope)
+        rows = _records(frame)
+        p = self.ph
+        min_dt = frame["dt"].min() if len(frame) else None
+        max_dt = frame["dt"].max() if len(frame) else None
+        with self.connection() as conn:
+            cur = conn.cursor()
+            cur.execute(f"delete from {ds.table} where scope = {p}", (scope,))
+            self._bulk_insert(conn, ds.table, list(frame.columns), rows)
+            cur.execute(
+                "insert into dataset_version(scope, name, version, row_count, min_dt, max_dt) "
+                f"values ({p}, {p}, 1, {p}, {p}, {p}) "
+                "on conflict (scope, name) do update set version = dataset_version.version + 1, "
+                "row_count = excluded.row_count, min_dt = excluded.min_dt, max_dt = excluded.max_dt, "
+                "updated_at = current_timestamp",
+                (scope, name, len(rows), min_dt, max_dt),
+            )
+            cur.execute(f"select version from dataset_version where scope = {p} and name = {p}", (scope, name))
+            return int(cur.fetchone()[0])
+
+    def load(self, scope: str, name: str,
+             start: Optional[date] = None, end: Optional[date] = None) -> pd.DataFrame:
+        """Читает датасет; start/end (включительно) фильтруются в БД по индексу (scope, dt)."""
+        ds = DATASETS[name]
+        p = self.ph
+        where, params = [f"scope = {p}"], [scope]
+        if start is not None:
+            where.append(f"dt >= {p}")
+            params.append(self._dt(start))
+        if end is not None:
+            where.append(f"dt <= {p}")
+            params.append(self._dt(end))
+        sql = f"select {', '.join(ds.db_columns)} from {ds.table} where {' and '.join(where)} order by dt"
+        with self.connection() as conn:
+            cur = conn.cursor()
+            cur.execute(sql, params)
+            rows = cur.fetchall()
+        return self._from_db(ds, rows)
+
+    def version(self, scope: str, name: str) -> Optional[int]:
+        p = self.ph
+        with self.connection() as conn:
+            cur = conn.cursor()
+            cur.execute(f"select version from dataset_version where scope = {p} and name = {p}", (scope, name))
+            row = cur.fetchone()
+        return int(row[0]) if row else None
+
+    def scopes(self, name: str) -> List[str]:
+        """Все scope, где сохранён датасет name (для обходов вроде ночного прогрева)."""
+        p = self.ph
+        with self.connection() as conn:
+            cur = conn.cursor()
+            cur.execute(f"select scope from dataset_version where name = {p} order by scope", (name,))
+            return [r[0] for r in cur.fetchall()]
+
+
+_STORE: Optional[SqlStore] = None
+_STORE_LOCK = threading.Lock()
+
+
+def get_store() -> SqlStore:
+    """Общий SqlStore процесса (DATABASE_URL, пул DB_POOL_SIZE); миграции — при первом обращении."""
+    global _STORE
+    if _STORE is None:
+        with _STORE_LOCK:
+            if _STORE is None:
+                _STORE = SqlStore(config.DATABASE_URL, config.DB_POOL_SIZE, config.DB_POOL_TIMEOUT_S)
+    return _STORE
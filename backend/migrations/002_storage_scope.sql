@@ -0,0 +1,36 @@
+-- Хранилище данных в БД (STORAGE_BACKEND=sql): разделение по scope (тенант/юрлицо),
+-- индексы под выборки по диапазону дат и версии датасетов для инвалидации кэшей.
+
+alter table raw_bank_statements add column scope text not null default 'default';
+alter table raw_payment_calendar add column scope text not null default 'default';
+alter table raw_fx_rates add column scope text not null default 'default';
+
+create index if not exists idx_bank_scope_dt on raw_bank_statements(scope, dt);
+create index if not exists idx_paycal_scope_dt on raw_payment_calendar(scope, dt);
+create index if not exists idx_fx_scope_dt on raw_fx_rates(scope, dt);
+
+-- витрина: первичный ключ (scope, dt) вместо dt
+create table if not exists fact_cash_daily_v2(
+  scope text not null default 'default',
+  dt date not null,
+  net_cash numeric not null,
+  cash_balance numeric not null,
+  meta jsonb default '{}'::jsonb,
+  computed_at timestamptz default now(),
+  primary key (scope, dt)
+);
+insert into fact_cash_daily_v2(dt, net_cash, cash_balance, meta, computed_at)
+  select dt, net_cash, cash_balance, meta, computed_at from fact_cash_daily;
+drop table fact_cash_daily;
+alter table fact_cash_daily_v2 rename to fact_cash_daily;
+
+create table if not exists dataset_version(
+  scope text not null,
+  name text not null,         -- 'bank_statements', 'daily_cash', ...
+  version bigint not null,
+  row_count bigint not null default 0,
+  min_dt date,
+  max_dt date,
+  updated_at timestamptz default now(),
+  primary key (scope, name)
+);
@@ -0,0 +1,21 @@
+-- История прогонов прогноза/сценариев: одна строка на прогон, ряды — бинарные массивы
+-- (days: int32 LE — дни от 1970-01-01; net_cash/cash_balance: float64 LE).
+create table if not exists run_history(
+  run_id text primary key,
+  scope text not null,
+  kind text not null,             -- 'forecast' | 'scenario'
+  scenario text,
+  params_hash text not null,      -- sha1(kind, data_version, params)
+  data_version text not null,
+  params jsonb default '{}'::jsonb,
+  metrics jsonb,
+  horizon_days int not null,
+  min_cash numeric,
+  days bytea not null,
+  net_cash bytea not null,
+  cash_balance bytea not null,
+  created_at text not null        -- ISO UTC
+);
+
+create unique index if not exists idx_run_history_hash on run_history(scope, params_hash);
+create index if not exists idx_run_history_created on run_history(scope, created_at);
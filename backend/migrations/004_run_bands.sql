@@ -0,0 +1,3 @@
+-- Интервалы прогноза и P(баланс < 0): float64 LE, 5×horizon по строкам
+-- (net_cash_lo, net_cash_hi, cash_balance_lo, cash_balance_hi, p_negative); null — прогон без интервалов.
+alter table run_history add column bands bytea;
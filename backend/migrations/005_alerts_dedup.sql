@@ -0,0 +1,13 @@
+-- Алерты по прогонам: разделение по scope и дедупликация повторяющихся срабатываний
+-- (fingerprint = sha1(kind, scenario, дата разрыва)); статус open → resolved, когда разрыв ушёл из прогноза.
+alter table alerts add column scope text not null default 'default';
+alter table alerts add column scenario text;
+alter table alerts add column fingerprint text;
+alter table alerts add column status text not null default 'open';
+alter table alerts add column last_run_id text;
+alter table alerts add column occurrences int not null default 1;
+alter table alerts add column first_seen text;
+alter table alerts add column last_seen text;
+
+create unique index if not exists idx_alerts_fingerprint on alerts(scope, fingerprint);
+create index if not exists idx_alerts_status on alerts(scope, status, last_seen);
@@ -0,0 +1,69 @@
+# backend/tests/conftest.py
+"""
+Общие фикстуры: изолированное хранилище (data/processed и data/tenants во временном каталоге,
+свежие файловые сторы прогонов/алертов и реестр моделей, пустой кэш кадров), то же на files и sql,
+TestClient поверх него и фабрика дневной витрины.
+Модули app импортируются внутри фикстур — как и в тестах, через importorskip.
+"""
+import numpy as np
+import pandas as pd
+import pytest
+
+
+def _daily(days: int = 60, shift: float = 0.0, balance0: float = 0.0, noise: float | None = None,
+           seed: int = 0) -> pd.DataFrame:
+    """Витрина daily_cash с 2024-01-01: синус ±1000 (+shift) или шум N(shift, noise)."""
+    dates = pd.date_range("2024-01-01", periods=days, freq="D").date
+    if noise is None:
+        net = np.sin(np.arange(days)) * 1000 + shift
+    else:
+        net = shift + np.random.default_rng(seed).normal(0, noise, days)
+    return pd.DataFrame({"date": dates, "net_cash": net, "cash_balance": balance0 + np.cumsum(net)})
+
+
+@pytest.fixture
+def make_daily():
+    return _daily
+
+
+@pytest.fixture
+def isolated(tmp_path, monkeypatch):
+    """Файловое хранилище во tmp_path: processed/ — тенант по умолчанию, tenants/ — остальные."""
+    io_mod = pytest.importorskip("app.utils.io")
+    from app.core import config
+    from app.services import alerts, intervals, registry, runs
+
+    monkeypatch.setattr(io_mod, "DATA_DIR", tmp_path / "processed")
+    monkeypatch.setattr(io_mod, "TENANTS_DIR", tmp_path / "tenants")
+    monkeypatch.setattr(config, "STORAGE_BACKEND", "files")
+    monkeypatch.setattr(runs, "_FILE_STORE", runs.FileRunStore())
+    monkeypatch.setattr(alerts, "_FILE_STORE", alerts.FileAlertStore())
+    monkeypatch.setattr(registry, "REGISTRY", registry.ModelRegistry())
+    intervals._MEM.clear()
+    io_mod.FRAME_CACHE.clear()
+    return tmp_path
+
+
+@pytest.fixture(params=["files", "sql"])
+def backend(request, isolated, monkeypatch):
+    """isolated на обоих бэкендах хранения; sql — SQLite в том же tmp_path."""
+    from app.core import config
+    from app.utils import sqlstore
+
+    monkeypatch.setattr(config, "STORAGE_BACKEND", request.param)
+    if request.param == "sql":
+        store = sqlstore.SqlStore(f"sqlite:///{isolated / 's.db'}")
+        monkeypatch.setattr(sqlstore, "_STORE", store)
+        request.addfinalizer(store.close)
+    return request.param
+
+
+@pytest.fixture
+def client(isolated):
+    """TestClient API поверх isolated и 60 дней витрины (баланс от 50 000)."""
+    pytest.importorskip("fastapi")
+    from fastapi.testclient import TestClient
+    from app.main import app
+    from app.utils import io
+    io.save_df("daily_cash.parquet", _daily(balance0=5e4))
+    return TestClient(app)
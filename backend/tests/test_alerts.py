@@ -0,0 +1,94 @@
+# backend/tests/test_alerts.py
+import pytest
+import numpy as np
+import pandas as pd
+
+io_mod = pytest.importorskip("app.utils.io")
+from app.core import config
+from app.services import alerts, runs
+
+
+def _points(balances, start="2025-01-01"):
+    dates = pd.date_range(start, periods=len(balances), freq="D")
+    return [{"date": d.date().isoformat(), "net_cash": 0.0, "cash_balance": float(b)}
+            for d, b in zip(dates, balances)]
+
+
+@pytest.fixture
+def backend(backend, monkeypatch):
+    monkeypatch.setattr(config, "MODEL_SELECTION", False)
+    return backend
+
+
+def test_rules_fire_on_first_breach_in_window(monkeypatch):
+    pts = _points([500, 100, -50, -80, 20] + [-10] * 20)
+    monkeypatch.setattr(config, "ALERT_RULES", "3:0,7:200,30:-1000")
+    found = {a["kind"]: a for a in alerts.evaluate(pts)}
+    assert set(found) == {"cash_gap_3d", "low_cash_7d"}
+    assert found["cash_gap_3d"]["dt"] == "2025-01-03" and found["cash_gap_3d"]["payload"]["count"] == 1
+    assert found["low_cash_7d"]["payload"]["days_ahead"] == 2
+    assert found["low_cash_7d"]["payload"]["min_balance"] == -80
+    assert [p["cash_balance"] for p in alerts.detect_cash_gap_14d(pts)][:2] == [-50, -80]
+    # legacy-хелпер и AlertRule(14) видят одно и то же окно: день 15 (offset 14) уже вне его
+    edge = _points([10] * 14 + [-1])
+    assert alerts.detect_cash_gap_14d(edge) == [] and alerts.evaluate(edge, [alerts.AlertRule(14)]) == []
+    assert len(alerts.detect_cash_gap_14d(pts)) == alerts.evaluate(pts, [alerts.AlertRule(14)])[0]["payload"]["count"]
+
+
+def test_recurring_alerts_are_deduplicated_and_resolved(backend):
+    store = alerts.get_alert_store()
+    gap = _points([100, -10, -20, 50])
+    assert alerts.on_run({"run_id": "r1", "scenario": "baseline"}, gap)["new"] == 1
+    assert alerts.on_run({"run_id": "r2", "scenario": "baseline"}, gap) == {"new": 0, "repeated": 1, "resolved": 0}
+    assert alerts.on_run({"run_id": "s1", "scenario": "stress"}, gap)["new"] == 1
+
+    items = [a for a in store.list(status="open") if a["scenario"] == "baseline"]
+    assert len(items) == 1
+    a = items[0]
+    assert (a["kind"], a["dt"], a["occurrences"], a["run_id"], a["last_run_id"]) == \
+           ("cash_gap_14d", "2025-01-02", 2, "r1", "r2")
+
+    res = alerts.on_run({"run_id": "r3", "scenario": "baseline"}, _points([100, 90, 80, 70]))
+    assert res["resolved"] == 1
+    assert [x["scenario"] for x in store.list(status="open")] == ["stress"]
+
+
+def test_new_forecast_run_raises_alert(backend):
+    dates = pd.date_range("2024-01-01", periods=40, freq="D").date
+    net = np.full(40, -100.0)
+    io_mod.save_df("daily_cash.parquet", pd.DataFrame({"date": dates, "net_cash": net,
+                                                       "cash_balance": 4500 + np.cumsum(net)}))
+    run, _ = runs.forecast_run(14, "baseline")
+    items = alerts.get_alert_store().list()
+    assert len(items) == 1 and items[0]["run_id"] == run["run_id"]
+    assert items[0]["dt"] == "2024-02-15"                 # 500 − 100·k < 0 на шестой день
+    runs.forecast_run(14, "baseline")                     # тот же прогон из истории — без повтора
+    assert alerts.get_alert_store().list()[0]["occurrences"] == 1
+
+
+def test_gap_detection_precision_recall():
+    dates = pd.date_range("2024-01-01", periods=120, freq="D")
+    net = np.full(120, -100.0)
+    daily = pd.DataFrame({"date": dates, "net_cash": net, "cash_balance": 9000 + np.cumsum(net)})
+    res = alerts.gap_detection(daily, "naive_mean")      # прогноз совпадает с фактом
+    assert res["tp"] + res["fp"] + res["fn"] + res["tn"] == res["origins"] > 0
+    assert res["precision"] == res["recall"] == 1.0 and res["meets_target"] is True
+    assert res["median_days_early"] == 0
+
+    noisy = daily.assign(net_cash=np.random.default_rng(0).normal(-100, 800, 120))
+    noisy["cash_balance"] = 9000 + noisy["net_cash"].cumsum()
+    res = alerts.gap_detection(noisy, "naive_last", alerts.AlertRule(7, 500.0))
+    assert res["kind"] == "low_cash_7d"
+    assert res["precision"] is None or 0.0 <= res["precision"] <= 1.0
+
+
+def test_alerts_api(backend):
+    pytest.importorskip("fastapi")
+    from fastapi.testclient import TestClient
+    from app.main import app
+    alerts.on_run({"run_id": "r1", "scenario": "baseline"}, _points([-1, -2]))
+    client = TestClient(app)
+    body = client.get("/api/alerts", params={"status": "open"}).json()
+    assert body["count"] == 1 and body["items"][0]["kind"] == "cash_gap_14d"
+    assert client.get("/api/alerts/precision").status_code == 404           # витрины нет
+    assert client.get("/api/alerts", params={"status": "bogus"}).status_code == 422
@@ -0,0 +1,81 @@
+# backend/tests/test_audit.py
+import gzip
+from datetime import datetime, timedelta
+
+from app.core import audit, config
+
+
+def _rec(ts: datetime, action="forecast", tenant="default", body=None):
+    return {"ts": ts.isoformat(), "tenant": tenant, "user": "u", "role": "CFO",
+            "action": action, "request": body or {"h": 7}, "response": {}}
+
+
+def test_rotation_compression_and_range_scan(tmp_path, monkeypatch):
+    monkeypatch.setattr(config, "AUDIT_MAX_BYTES", 2_000)
+    monkeypatch.setattr(config, "AUDIT_FLUSH_INTERVAL_S", 0.05)
+    w = audit.AuditWriter(tmp_path)
+    t0 = datetime(2025, 9, 1, 10, 0, 0)
+    for i in range(100):
+        w.submit(_rec(t0 + timedelta(minutes=i)))
+    w.flush()
+
+    rotated = sorted(tmp_path.glob("audit-*.log.gz"))
+    assert rotated, "ожидали ротацию по размеру"
+    with gzip.open(rotated[0], "rt", encoding="utf-8") as f:
+        assert f.readline().startswith('{"ts": "2025-09-01T10:00:00"')
+
+    start, end = (t0 + timedelta(minutes=40)).isoformat(), (t0 + timedelta(minutes=49)).isoformat()
+    got = list(w.iter_records(start, end))
+    assert [r["ts"] for r in got] == [(t0 + timedelta(minutes=i)).isoformat() for i in range(40, 50)]
+    # файлы вне диапазона отброшены по имени
+    assert len(w._files_for_range(start, end)) < len(rotated) + 1
+    w.close()
+
+
+def test_daily_rotation(tmp_path, monkeypatch):
+    monkeypatch.setattr(config, "AUDIT_FLUSH_INTERVAL_S", 0.05)
+    w = audit.AuditWriter(tmp_path)
+    w.submit(_rec(datetime(2025, 9, 1, 23, 59)))
+    w.submit(_rec(datetime(2025, 9, 2, 0, 1)))
+    w.flush()
+    assert [p.name for p in tmp_path.glob("audit-*.log.gz")] == ["audit-20250901T235900-20250901T235900.log.gz"]
+    w.close()
+
+
+def test_large_payload_is_hashed(tmp_path, monkeypatch):
+    monkeypatch.setattr(config, "AUDIT_MAX_PAYLOAD_BYTES", 100)
+    monkeypatch.setattr(config, "AUDIT_FLUSH_INTERVAL_S", 0.05)
+    w = audit.AuditWriter(tmp_path)
+    w.submit(_rec(datetime(2025, 9, 1), body={"points": list(range(1000))}))
+    w.flush()
+    rec = next(w.iter_records())
+    assert rec["request"]["_truncated"] is True
+    assert len(rec["request"]["sha256"]) == 64
+    w.close()
+
+
+def test_query_is_tenant_scoped(tmp_path, monkeypatch):
+    monkeypatch.setattr(config, "AUDIT_FLUSH_INTERVAL_S", 0.05)
+    w = audit.AuditWriter(tmp_path)
+    monkeypatch.setattr(audit, "AUDIT", w)
+    now = datetime.utcnow()
+    w.submit(_rec(now, tenant="acme"))
+    w.submit(_rec(now, tenant="default", action="advice"))
+    from app.core.tenant import use_tenant
+    with use_tenant("acme"):
+        assert [r["tenant"] for r in audit.query_audit()] == ["acme"]
+    assert [r["action"] for r in audit.query_audit(action="advice")] == ["advice"]
+    w.close()
+
+
+def test_range_scan_tolerates_slightly_out_of_order_writes(tmp_path, monkeypatch):
+    monkeypatch.setattr(config, "AUDIT_FLUSH_INTERVAL_S", 0.05)
+    w = audit.AuditWriter(tmp_path)
+    t0 = datetime(2025, 9, 1, 10, 0, 0)
+    # ts взят до submit(): соседний запрос встал в очередь раньше
+    for sec in (0, 2, 1, 3):
+        w.submit(_rec(t0 + timedelta(seconds=sec)))
+    w.flush()
+    got = [r["ts"] for r in w.iter_records(t0.isoformat(), (t0 + timedelta(seconds=1)).isoformat())]
+    assert sorted(got) == [t0.isoformat(), (t0 + timedelta(seconds=1)).isoformat()]
+    w.close()
@@ -0,0 +1,54 @@
+# backend/tests/test_backtest.py
+import pytest
+import numpy as np
+import pandas as pd
+
+pytest.importorskip("app.utils.io")
+from app.services import backtest as bt
+
+
+def _daily(days=120):
+    dates = pd.date_range("2024-01-01", periods=days, freq="D")
+    net = np.where(np.arange(days) % 20 < 10, -300.0, 300.0)       # баланс пилой уходит в минус
+    return pd.DataFrame({"date": dates, "net_cash": net, "cash_balance": 1000 + np.cumsum(net)})
+
+
+def test_gap_scores_match_per_origin_loop():
+    df = _daily()
+    y, b = df["net_cash"].to_numpy(), df["cash_balance"].to_numpy()
+    origins = bt.backtest_origins(len(y), 30, 7)
+    pred = bt.forecast_matrix("naive_last", y, pd.DatetimeIndex(df["date"]), origins, 7)
+    res = bt.gap_scores(pred, b, origins)
+
+    tp = fp = fn = 0
+    for i, t in enumerate(origins):                                   # как старый scripts/backtest.py
+        warn = (b[t - 1] + np.cumsum(pred[i])).min() < 0
+        event = b[t:t + 7].min() < 0
+        tp, fp, fn = tp + (warn and event), fp + (warn and not event), fn + (event and not warn)
+    assert (res["tp"], res["fp"], res["fn"]) == (tp, fp, fn)
+    assert res["precision"] == pytest.approx(tp / (tp + fp)) and res["recall"] == pytest.approx(tp / (tp + fn))
+
+
+def test_rolling_backtest_reports_accuracy_gap_and_speed():
+    res = bt.rolling_backtest(bt.BacktestParams(horizon=7, window=30, use_models=["naive_last", "naive_mean", "ses"],
+                                                max_origins=50, detail=False), df=_daily())
+    assert res["origins"] == 50 and res["per_model"] == {}
+    s = res["summary"].set_index("model")
+    assert set(s.index) == {"naive_last", "naive_mean", "ses"}
+    assert (s["points"] == 50 * 7).all() and (s["ms"] >= 0).all() and (s["MAE"] > 0).all()
+    assert s["gap_precision"].between(0, 1).all() and s["gap_recall"].between(0, 1).all()
+
+
+def test_backtest_api_summary_is_json_safe(isolated):
+    pytest.importorskip("fastapi")
+    from fastapi.testclient import TestClient
+    from app.main import app
+    from app.utils import io as io_mod
+    df = _daily()
+    df["cash_balance"] += 1e9                                           # разрывов нет → precision = null
+    io_mod.save_df("daily_cash.parquet", df)
+    r = TestClient(app).post("/api/backtest", json={"horizon": 7, "models": ["naive_mean"], "detail": False},
+                             headers={"X-Role": "Analyst"})
+    assert r.status_code == 200
+    row = r.json()["summary"][0]
+    assert row["gap_precision"] is None and row["origins_per_s"] > 0 and r.json()["per_model"] == {}
@@ -0,0 +1,45 @@
+# backend/tests/test_batch.py
+import io
+import json
+import zipfile
+import pytest
+import numpy as np
+import pandas as pd
+
+pytest.importorskip("reportlab")
+io_mod = pytest.importorskip("app.utils.io")
+batch = pytest.importorskip("app.services.batch")
+
+
+def _daily(n=40, seed=0):
+    rng = np.random.default_rng(seed)
+    net = rng.normal(0, 1e5, n)
+    return pd.DataFrame({
+        "date": pd.date_range("2025-01-01", periods=n, freq="D").date,
+        "net_cash": net,
+        "cash_balance": np.cumsum(net) + 1e6,
+    })
+
+
+def test_batch_reports_zip_and_shared_fit(isolated):
+    # два юрлица с одинаковой витриной → один фит на двоих
+    for e in ("kz01", "kz02"):
+        io_mod.save_df("daily_cash.parquet", _daily(), io_mod.entity_dir(e))
+    io_mod.save_df("daily_cash.parquet", _daily(seed=1), io_mod.entity_dir("kz03"))
+
+    params = dict(horizon_days=7, scenario="stress", fx_shock=0.1,
+                  delay_top_inflow_days=1, delay_top_outflow_days=0)
+    archive, summary = batch.run_batch_reports(["kz01", "kz02", "kz03", "missing"], params, workers=3)
+
+    assert summary["ok"] == 3 and summary["failed"] == 1
+    assert summary["shared_fits"] == 1
+    names = set(zipfile.ZipFile(io.BytesIO(archive)).namelist())
+    assert names == {"kz01.pdf", "kz02.pdf", "kz03.pdf", "summary.json"}
+    stored = json.loads(zipfile.ZipFile(io.BytesIO(archive)).read("summary.json"))
+    assert {"forecast_ms", "pdf_ms"} <= set(stored["entities"][0])
+
+
+def test_batch_rejects_bad_entity_id():
+    with pytest.raises(ValueError):
+        batch.run_batch_reports(["../etc"], dict(horizon_days=7, scenario="baseline", fx_shock=0.0,
+                                                 delay_top_inflow_days=0, delay_top_outflow_days=0))
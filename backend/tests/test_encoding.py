@@ -0,0 +1,60 @@
+# backend/tests/test_encoding.py
+import pytest
+
+pytest.importorskip("app.utils.io")
+pa = pytest.importorskip("pyarrow")
+pytest.importorskip("fastapi")
+from app.utils import encoding
+
+
+def test_negotiate_prefers_query_then_accept_q():
+    class R:
+        def __init__(self, accept):
+            self.headers = {"accept": accept}
+    assert encoding.negotiate(R("*/*")) == "json"
+    assert encoding.negotiate(R(f"{encoding.ARROW};q=0.5, {encoding.PARQUET}")) == "parquet"
+    assert encoding.negotiate(R(encoding.ARROW), "columnar") == "columnar"
+    with pytest.raises(Exception):
+        encoding.negotiate(R(""), "xml")
+
+
+def test_forecast_formats_carry_the_same_series(client):
+    body = {"horizon_days": 14}
+    rows = client.post("/api/forecast", json=body).json()
+    points = rows["forecast"]
+
+    col = client.post("/api/forecast", json=body, params={"format": "columnar"})
+    assert col.status_code == 200 and col.headers["content-type"].startswith(encoding.COLUMNAR)
+    data = col.json()
+    assert data["run_id"] == rows["run_id"] and data["metrics"] == rows["metrics"]
+    assert data["forecast"]["date"] == [p["date"] for p in points]
+    assert data["forecast"]["net_cash"] == pytest.approx([p["net_cash"] for p in points])
+
+    arrow = client.post("/api/forecast", json=body, headers={"Accept": encoding.ARROW})
+    assert arrow.headers["content-type"] == encoding.ARROW and arrow.headers["x-run-id"] == rows["run_id"]
+    table = pa.ipc.open_stream(arrow.content).read_all()
+    assert table.num_rows == 14 and str(table.schema.field("date").type) == "date32[day]"
+    assert table.column("cash_balance").to_pylist() == pytest.approx([p["cash_balance"] for p in points])
+    assert encoding.read_meta(table.schema)["run_id"] == rows["run_id"]
+
+    pq = pytest.importorskip("pyarrow.parquet")
+    import io
+    par = client.post("/api/forecast", json=body, params={"format": "parquet"})
+    df = pq.read_table(io.BytesIO(par.content)).to_pandas()
+    assert len(df) == 14 and list(df.columns)[:3] == ["date", "net_cash", "cash_balance"]
+
+    assert client.post("/api/forecast", json=body, params={"format": "xml"}).status_code == 400
+
+
+def test_backtest_binary_is_long_table_with_summary_in_meta(client):
+    body = {"horizon": 3, "window": 30, "step": 5, "models": ["naive_last", "naive_mean"]}
+    rows = client.post("/api/backtest", json=body).json()
+    r = client.post("/api/backtest", json=body, params={"format": "arrow"})
+    table = pa.ipc.open_stream(r.content).read_all()
+    assert set(table.column("model").to_pylist()) == {"naive_last", "naive_mean"}
+    assert table.num_rows == sum(len(v) for v in rows["per_model"].values())
+    meta = encoding.read_meta(table.schema)
+    assert meta["origins"] == rows["origins"] and meta["summary"]["model"] == [s["model"] for s in rows["summary"]]
+
+    col = client.post("/api/backtest", json=body, params={"format": "columnar"}).json()
+    assert col["per_model"]["naive_last"]["date"] == [p["date"] for p in rows["per_model"]["naive_last"]]
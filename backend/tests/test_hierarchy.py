@@ -0,0 +1,86 @@
+# backend/tests/test_hierarchy.py
+from datetime import date, timedelta
+
+import pytest
+import numpy as np
+import pandas as pd
+
+io_mod = pytest.importorskip("app.utils.io")
+from app.core import config
+from app.services import hierarchy, registry, forecast
+from app.services import backtest as bt
+from app.services.etl import build_daily_cashframe
+
+
+@pytest.fixture
+def sources(isolated, monkeypatch):
+    monkeypatch.setattr(bt, "HAS_PMD", False)
+    monkeypatch.setattr(config, "FX_INTEREST_RATES", "KZT:0.12,USD:0.05")
+
+    days = 60
+    dates = [date(2024, 1, 1) + timedelta(days=i) for i in range(days)]
+    bank = pd.DataFrame({"date": dates * 2, "account": "MAIN",
+                         "currency": ["KZT"] * days + ["USD"] * days,
+                         "amount": [1000.0] * days + [-2.0] * days})
+    pay = pd.DataFrame({"date": [dates[-1] + timedelta(days=3), dates[-1] + timedelta(days=5), dates[10]],
+                        "type": ["inflow", "outflow", "inflow"], "currency": "KZT",
+                        "amount": [7000.0, 3000.0, 500.0], "memo": "plan"})
+    fx = pd.DataFrame({"date": dates, "USD/KZT": 500.0, "EUR/KZT": 540.0})
+    io_mod.save_df("bank_statements.parquet", bank)
+    io_mod.save_df("payment_calendar.parquet", pay)
+    io_mod.save_df("fx_rates.parquet", fx)
+    io_mod.save_df("daily_cash.parquet", build_daily_cashframe())
+    return isolated
+
+
+def test_forward_rates_interest_parity():
+    rates = {"KZT": 0.12, "USD": 0.05}
+    fwd = hierarchy.forward_rates(500.0, "USD", 365, rates)
+    assert fwd[-1] == pytest.approx(500.0 * 1.12 / 1.05)
+    assert np.all(np.diff(fwd) > 0)                                     # KZT дешевеет при r_KZT > r_USD
+    assert np.all(hierarchy.forward_rates(1.0, "KZT", 10, rates) == 1.0)
+
+
+def test_hierarchical_reconciles_and_uses_known_calendar(sources):
+    points, metrics, contrib = hierarchy.forecast_hierarchical(7)
+    assert metrics["components"] == len(contrib) == 3                  # bank_in_KZT, bank_out_USD, calendar_KZT
+    net = np.array([p["net_cash"] for p in points])
+    assert np.allclose(np.sum(list(contrib.values()), axis=0), net)     # bottom-up: итог = сумма листьев
+
+    cal = contrib["calendar_KZT"]
+    assert cal[2] == pytest.approx(7000.0) and cal[4] == pytest.approx(-3000.0)
+    assert cal[0] == 0.0                                                 # внутри покрытия календаря — известный ноль
+    assert cal[6] == pytest.approx(500.0 / 60)                           # за покрытием — модель по истории
+    usd = contrib["bank_out_USD"]
+    assert usd[0] == pytest.approx(-2.0 * 500.0 * (1 + 0.12 / 365) / (1 + 0.05 / 365))
+
+    daily = io_mod.load_df("daily_cash.parquet")
+    last = daily.loc[pd.to_datetime(daily["date"]) <= "2024-02-29", "cash_balance"].iloc[-1]
+    assert points[0]["date"] == "2024-03-01"
+    assert points[-1]["cash_balance"] == pytest.approx(last + net.sum())
+
+
+def test_get_forecast_hierarchical_mode_and_fallback(sources, tmp_path):
+    pts, metrics = forecast.get_forecast(horizon=7, mode="hierarchical")
+    assert len(pts) == 7 and metrics["components"] == 3
+    # листья лежат в реестре под своими target — повторный прогноз без фитов
+    assert registry.REGISTRY.list("bank_in_KZT")[0]["name"] == "naive_mean"
+
+    (io_mod.DATA_DIR / "payment_calendar.parquet").unlink()
+    io_mod.FRAME_CACHE.clear()
+    pts, metrics = forecast.get_forecast(horizon=7, mode="hierarchical")
+    assert len(pts) == 7 and "components" not in metrics                # нет исходников → total
+
+
+def test_unsigned_calendar_has_the_same_sign_in_total_and_hierarchical(sources):
+    # источник отдал outflow положительным — витрина (total) и иерархия читают его одинаково
+    pay = pd.DataFrame({"date": [date(2024, 1, 21), date(2024, 1, 31)], "type": ["outflow", "OUTFLOW"],
+                        "currency": "KZT", "amount": [3000.0, -300.0], "memo": "raw"})
+    io_mod.save_df("payment_calendar.parquet", pay)
+    io_mod.save_df("daily_cash.parquet", build_daily_cashframe())
+    daily = io_mod.load_df("daily_cash.parquet").set_index("date")["net_cash"]
+    assert daily[date(2024, 1, 21)] == pytest.approx(1000.0 - 2.0 * 500.0 - 3000.0)
+    assert daily[date(2024, 1, 31)] == pytest.approx(1000.0 - 2.0 * 500.0 - 300.0)
+
+    _, _, contrib = hierarchy.forecast_hierarchical(7)
+    assert np.all(contrib["calendar_KZT"] == pytest.approx(-3300.0 / 60))
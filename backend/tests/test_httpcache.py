@@ -0,0 +1,73 @@
+# backend/tests/test_httpcache.py
+import pytest
+
+io_mod = pytest.importorskip("app.utils.io")
+pytest.importorskip("fastapi")
+from app.core.httpcache import _matches
+
+
+def test_weak_etag_comparison():
+    assert _matches('W/"abc"', '"abc"') and _matches('"x", W/"abc"', 'W/"abc"') and _matches("*", 'W/"z"')
+    assert not _matches('"abd"', 'W/"abc"')
+
+
+def test_forecast_get_revalidates_until_data_changes(client, make_daily):
+    q = {"horizon_days": 30, "scenario": "baseline"}
+    first = client.get("/api/forecast", params=q)
+    assert first.status_code == 200 and len(first.json()["forecast"]) == 30
+    etag = first.headers["etag"]
+    assert etag.startswith('W/"') and "no-cache" in first.headers["cache-control"]
+    assert first.json()["run_id"] == client.post("/api/forecast", json=q).json()["run_id"]
+
+    again = client.get("/api/forecast", params=q, headers={"If-None-Match": etag})
+    assert again.status_code == 304 and again.content == b"" and again.headers["etag"] == etag
+    # другой формат — другое представление, другой ETag
+    col = client.get("/api/forecast", params={**q, "format": "columnar"}, headers={"If-None-Match": etag})
+    assert col.status_code == 200 and col.headers["etag"] != etag
+
+    io_mod.save_df("daily_cash.parquet", make_daily(shift=10.0, balance0=5e4))  # новая версия данных
+    fresh = client.get("/api/forecast", params=q, headers={"If-None-Match": etag})
+    assert fresh.status_code == 200 and fresh.headers["etag"] != etag
+
+
+def test_backtest_get_and_runs_are_conditional(client):
+    q = {"horizon": 3, "window": 30, "step": 5, "models": ["naive_last", "naive_mean"]}
+    r = client.get("/api/backtest", params=q)
+    assert r.status_code == 200 and set(r.json()["per_model"]) == {"naive_last", "naive_mean"}
+    assert client.get("/api/backtest", params=q, headers={"If-None-Match": r.headers["etag"]}).status_code == 304
+
+    run_id = client.post("/api/forecast", json={"horizon_days": 7}).json()["run_id"]
+    got = client.get(f"/api/runs/{run_id}")
+    assert got.status_code == 200 and len(got.json()["points"]) == 7
+    assert client.get(f"/api/runs/{run_id}", headers={"If-None-Match": got.headers["etag"]}).status_code == 304
+    listing = client.get("/api/runs")
+    assert client.get("/api/runs", headers={"If-None-Match": listing.headers["etag"]}).status_code == 304
+
+
+def test_large_json_is_gzipped(client):
+    r = client.get("/api/forecast", params={"horizon_days": 60}, headers={"Accept-Encoding": "gzip"})
+    assert r.headers.get("content-encoding") == "gzip" and "Accept-Encoding" in r.headers["vary"]
+    assert len(r.json()["forecast"]) == 60                             # httpx распаковывает сам
+    small = client.get("/api/health", headers={"Accept-Encoding": "gzip"})
+    assert "content-encoding" not in small.headers
+
+
+def test_forecast_etag_follows_champion_and_selection(client, monkeypatch):
+    from app.services import selection
+    q = {"horizon_days": 14}
+    monkeypatch.setattr(selection, "choose_model", lambda h, root=None: "naive_mean")
+    first = client.get("/api/forecast", params=q)
+    etag = first.headers["etag"]
+    assert client.get("/api/forecast", params=q, headers={"If-None-Match": etag}).status_code == 304
+
+    # фоновый select_models сменил champion, данные те же — старый ETag больше не совпадает
+    monkeypatch.setattr(selection, "choose_model", lambda h, root=None: "naive")
+    fresh = client.get("/api/forecast", params=q, headers={"If-None-Match": etag})
+    assert fresh.status_code == 200 and fresh.headers["etag"] != etag
+    assert fresh.json()["run_id"] != first.json()["run_id"]
+
+    # пересчитанный выбор (та же модель) — тоже новый ETag
+    monkeypatch.setattr("app.routers.forecast.selection_version", lambda: "v1@2024-03-01T00:00:00")
+    again = client.get("/api/forecast", params=q, headers={"If-None-Match": fresh.headers["etag"]})
+    assert again.status_code == 200 and again.headers["etag"] != fresh.headers["etag"]
+    assert again.json()["run_id"] == fresh.json()["run_id"]             # прогон тот же — из истории
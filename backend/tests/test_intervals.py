@@ -0,0 +1,72 @@
+# backend/tests/test_intervals.py
+import pytest
+import numpy as np
+
+io_mod = pytest.importorskip("app.utils.io")
+from app.core import config
+from app.services import intervals, registry
+from app.services.forecast import get_forecast
+
+
+@pytest.fixture
+def data(isolated, make_daily, monkeypatch):
+    monkeypatch.setattr(config, "MODEL_SELECTION", False)
+    io_mod.save_df("daily_cash.parquet", make_daily(150, balance0=5000.0, noise=1000.0, seed=1))
+    return io_mod.DATA_DIR
+
+
+def test_bands_contain_forecast_and_p_negative_is_probability(data):
+    pts, metrics = get_forecast(horizon=20, root=data, model_name="naive_mean")
+    assert metrics["interval_origins"] >= config.INTERVAL_MIN_ORIGINS
+    for p in pts:
+        assert p["net_cash_lo"] <= p["net_cash"] <= p["net_cash_hi"]
+        assert p["cash_balance_lo"] <= p["cash_balance"] <= p["cash_balance_hi"]
+        assert 0.0 <= p["p_negative"] <= 1.0
+    width = [p["cash_balance_hi"] - p["cash_balance_lo"] for p in pts]
+    assert width[-1] > width[0]                           # неопределённость баланса копится
+
+
+def test_p_negative_grows_as_balance_approaches_zero():
+    E = np.random.default_rng(0).normal(0, 100, (50, 5))
+    net = np.zeros(5)
+    p = [intervals.bands(net, np.full(5, b), E, 0.8)["p_negative"][-1] for b in (1000.0, 200.0, 0.0, -1000.0)]
+    assert p == sorted(p) and p[0] < 0.05 and p[-1] > 0.95
+
+    few = intervals.bands(net, np.full(5, 0.0), E[:2], 0.8, sd_fallback=100.0)   # нормальное приближение
+    assert np.allclose(few["p_negative"], 0.5) and np.all(np.diff(few["cash_balance_hi"]) > 0)
+
+
+def test_residuals_are_cached_per_data_version(data, monkeypatch):
+    get_forecast(horizon=10, root=data, model_name="naive_mean")
+    version = io_mod.data_version(data)
+    path = registry.REGISTRY.version_dir("net_cash", version, data) / "naive_mean.resid.npy"
+    assert path.exists()
+
+    intervals._MEM.clear()
+    monkeypatch.setattr(intervals.bt, "forecast_matrix", lambda *a, **k: pytest.fail("recomputed"))
+    pts, _ = get_forecast(horizon=10, root=data, model_name="naive_mean")
+    assert pts[0]["p_negative"] is not None
+
+
+def test_forecast_api_and_runs_keep_bands(data):
+    pytest.importorskip("fastapi")
+    from fastapi.testclient import TestClient
+    from app.main import app
+    client = TestClient(app)
+    r = client.post("/api/forecast", json={"horizon_days": 7})
+    assert r.status_code == 200
+    body = r.json()
+    assert body["metrics"]["interval_level"] == pytest.approx(config.FORECAST_INTERVAL_LEVEL)
+    first = body["forecast"][0]
+    assert first["cash_balance_lo"] <= first["cash_balance"] <= first["cash_balance_hi"]
+
+    rec = client.get(f"/api/runs/{body['run_id']}").json()
+    assert rec["points"][0]["p_negative"] == pytest.approx(first["p_negative"])
+
+
+def test_norm_cdf_is_vectorized_and_accurate():
+    from statistics import NormalDist
+    x = np.linspace(-6, 6, 240).reshape(3, -1)
+    ref = np.array([NormalDist().cdf(float(v)) for v in x.ravel()]).reshape(x.shape)
+    got = intervals._norm_cdf(x)
+    assert got.shape == x.shape and np.abs(got - ref).max() < 2e-7
@@ -0,0 +1,49 @@
+# backend/tests/test_metrics.py
+import pytest
+
+from app.core import metrics
+
+
+def test_histogram_buckets_are_cumulative_in_text_format():
+    h = metrics.Histogram("t_latency_seconds", "test", buckets=(0.1, 1.0))
+    for v in (0.05, 0.5, 0.7, 3.0):
+        h.observe(v, route="/api/x")
+    text = "\n".join(h.render())
+    assert 't_latency_seconds_bucket{route="/api/x",le="0.1"} 1' in text
+    assert 't_latency_seconds_bucket{route="/api/x",le="1.0"} 3' in text
+    assert 't_latency_seconds_bucket{route="/api/x",le="+Inf"} 4' in text
+    assert 't_latency_seconds_count{route="/api/x"} 4' in text
+
+
+def test_span_records_latency_and_errors():
+    with metrics.span("unit_stage"):
+        pass
+    with pytest.raises(RuntimeError):
+        with metrics.span("unit_stage"):
+            raise RuntimeError("boom")
+    snap = metrics.SPAN_LATENCY.snapshot()[(("span", "unit_stage"),)]
+    assert snap["count"] == 2
+    assert metrics.SPAN_ERRORS.snapshot()[(("span", "unit_stage"),)] == 1
+
+
+def test_route_template_hides_ids():
+    class Route:
+        path = "/api/runs/{run_id}"
+    # значение параметра совпадает с литеральным сегментом — шаблон берётся из роута, не из пути
+    scope = {"route": Route(), "path": "/api/runs/runs", "path_params": {"run_id": "runs"}}
+    assert metrics._route_template(scope) == "/api/runs/{run_id}"
+    assert metrics._route_template({"path": "/nope"}) == "<unmatched>"
+
+
+def test_metrics_endpoint_exports_routes_and_spans():
+    pytest.importorskip("fastapi")
+    from fastapi.testclient import TestClient
+    from app.main import app
+    c = TestClient(app)
+    c.post("/api/forecast", json={"horizon_days": 3})
+    text = c.get("/api/metrics").text
+    assert 'route="/api/forecast"' in text
+    c.get("/api/runs/runs")                                      # 404 прогона, но роут найден
+    assert 'route="/api/runs/{run_id}"' in c.get("/api/metrics").text
+    assert 'span="forecast_cash"' in text
+    assert c.get("/api/metrics", params={"format": "json"}).json()["requests"]
@@ -0,0 +1,58 @@
+# backend/tests/test_mock_data.py
+from datetime import date
+import pytest
+import numpy as np
+import pandas as pd
+
+io_mod = pytest.importorskip("app.utils.io")
+from app.services import etl
+from app.sources import bank_mock
+from app.sources.fx_api import fetch_fx_rates
+
+
+def test_generate_ledger_is_reproducible_and_well_formed():
+    kw = dict(accounts=4, currencies=("KZT", "USD", "EUR"), counterparties=30, seed=7)
+    a = bank_mock.generate_ledger(date(2023, 1, 1), date(2024, 12, 31), **kw)
+    b = bank_mock.generate_ledger(date(2023, 1, 1), date(2024, 12, 31), **kw)
+    for name in a:
+        pd.testing.assert_frame_equal(a[name], b[name])
+    assert not a["bank_statements"].equals(
+        bank_mock.generate_ledger(date(2023, 1, 1), date(2024, 12, 31), **{**kw, "seed": 8})["bank_statements"])
+
+    bank, cal, fx = a["bank_statements"], a["payment_calendar"], a["fx_rates"]
+    assert list(bank.columns) == ["date", "account", "currency", "counterparty", "amount"]
+    assert bank["account"].nunique() == 4 and set(bank["currency"]) == {"KZT", "USD", "EUR"}
+    assert bank["date"].is_monotonic_increasing and (bank["amount"] != 0).all()
+    # у контрагента одно направление потока; по выходным операций заметно меньше
+    assert (bank.groupby("counterparty", observed=True)["amount"].agg(lambda s: np.sign(s).nunique()) == 1).all()
+    per_dow = bank.groupby(bank["date"].dt.dayofweek).size()
+    assert per_dow[[5, 6]].max() < per_dow[[0, 1, 2, 3, 4]].min()
+
+    assert ((cal["type"] == "inflow") == (cal["amount"] > 0)).all()
+    payroll = pd.DatetimeIndex(cal.loc[cal["memo"] == "Payroll", "date"])
+    assert (payroll.dayofweek < 5).all() and set(payroll.day) <= {8, 9, 10, 23, 24, 25}
+    assert list(fx.columns) == ["date", "USD/KZT", "EUR/KZT"] and len(fx) == 731 and (fx.iloc[:, 1:] > 0).all().all()
+
+
+def test_generated_ledger_builds_daily_cash(isolated):
+    src = bank_mock.generate_ledger(date(2024, 1, 1), date(2024, 6, 30), accounts=3, seed=1)
+    for name, df in src.items():
+        io_mod.save_df(f"{name}.parquet", df)
+    daily = etl.build_daily_cashframe()
+    assert len(daily) == 182 and daily["net_cash"].notna().all()
+    assert daily["cash_balance"].iloc[-1] == pytest.approx(daily["net_cash"].sum())
+
+
+def test_legacy_mocks_keep_schema(monkeypatch):
+    bank = bank_mock.pull_bank_statements(date(2024, 1, 1), date(2024, 3, 31))
+    assert list(bank.columns) == ["date", "account", "currency", "amount"]
+    assert set(bank["account"]) == {"MAIN"} and set(bank["currency"]) <= {"KZT", "USD"}
+    assert isinstance(bank["date"].iloc[0], date)
+    cal = bank_mock.pull_payment_calendar(date(2024, 1, 1), date(2024, 3, 31))
+    assert cal.iloc[0]["memo"] == "Client invoice" and cal.iloc[1]["memo"] == "Payroll"
+    assert (cal["amount"] > 0).all()                          # знак — из type, как в CSV
+
+    from app.sources import fx_api
+    monkeypatch.setattr(fx_api, "_timeseries_exchangeratehost", lambda *a, **k: 1 / 0)   # без сети → синтетика
+    fx = fetch_fx_rates(date(2024, 1, 1), date(2024, 1, 31), pairs=["USD/KZT", "EUR/KZT"])
+    assert list(fx.columns) == ["date", "USD/KZT", "EUR/KZT"] and len(fx) == 31
@@ -0,0 +1,91 @@
+# backend/tests/test_multiseries.py
+import pytest
+import numpy as np
+import pandas as pd
+
+io_mod = pytest.importorskip("app.utils.io")
+from app.services import multiseries as ms
+from app.services import npmodels as npm
+from app.services import backtest as bt
+
+
+def _ses_loop(y, alpha):
+    level, sse = y[0], 0.0
+    for v in y[1:]:
+        e = v - level
+        sse += e * e
+        level += alpha * e
+    return level, sse
+
+
+def test_smooth_matches_scalar_ses_and_handles_ragged_rows():
+    rng = np.random.default_rng(0)
+    a, b = rng.normal(100, 10, 50), rng.normal(-5, 2, 20)
+    Y = ms.right_align([a, b])
+    assert Y.shape == (2, 50) and np.isnan(Y[1, :30]).all()
+    st = npm.smooth(Y, np.array([0.3]), np.array([0.0]))
+    for i, y in enumerate((a, b)):
+        level, sse = _ses_loop(y, 0.3)
+        assert st["level"][i, 0] == pytest.approx(level)
+        assert st["sse"][i, 0] == pytest.approx(sse)
+        assert st["n"][i] == len(y) - 1
+
+
+def test_forecast_many_picks_holt_for_trend_and_reports_throughput():
+    t = np.arange(120, dtype=float)
+    rng = np.random.default_rng(1)
+    Y = np.vstack([1000 + 50 * t + rng.normal(0, 5, 120),       # тренд
+                   rng.normal(500, 50, 120),                       # шум вокруг уровня
+                   np.r_[np.full(119, np.nan), 7.0]])              # одна точка
+    res = ms.forecast_many(Y, 10, arima_fallback=False)
+    assert res["models"] == ["holt", "ses", "naive"]
+    assert res["forecasts"].shape == (3, 10)
+    assert res["forecasts"][0, 0] == pytest.approx(1000 + 50 * 120, rel=0.01)
+    assert np.all(res["forecasts"][2] == 7.0)
+    assert res["series"] == 3 and res["series_per_s"] > 0
+
+
+def test_arima_only_for_autocorrelated_residuals(monkeypatch):
+    class FakeModel:
+        order = (2, 0, 0)
+        def __init__(self, y): self.y = y
+        def predict_in_sample(self): return self.y
+        def predict(self, n_periods): return np.full(n_periods, -1.0)
+
+    class FakePm:
+        calls = 0
+        @classmethod
+        def auto_arima(cls, y, **kw):
+            cls.calls += 1
+            return FakeModel(y)
+
+    monkeypatch.setattr(bt, "HAS_PMD", True)
+    monkeypatch.setattr(bt, "pm", FakePm, raising=False)
+    rng = np.random.default_rng(2)
+    saw = np.tile([1000.0, -1000.0], 60)                                # ES не ловит чередование
+    res = ms.forecast_many(np.vstack([saw, rng.normal(0, 1, 120)]), 5, workers=1)
+    assert res["models"][0] == "arima" and res["params"][0] == {"order": [2, 0, 0]}
+    assert res["models"][1] != "arima" and FakePm.calls == res["arima"] == 1
+
+
+def test_batch_endpoint(isolated):
+    pytest.importorskip("fastapi")
+    from fastapi.testclient import TestClient
+    from app.main import app
+    for e, n in (("kz01", 40), ("kz02", 60)):
+        net = np.full(n, 100.0)
+        io_mod.save_df("daily_cash.parquet", pd.DataFrame({
+            "date": pd.date_range("2025-01-01", periods=n, freq="D").date,
+            "net_cash": net, "cash_balance": np.cumsum(net)}), io_mod.entity_dir(e))
+
+    client = TestClient(app)
+    r = client.post("/api/forecast/batch", headers={"X-Role": "Analyst"},
+                    json={"entities": ["kz01", "kz02", "nope"], "horizon_days": 3})
+    assert r.status_code == 200
+    body = r.json()
+    assert [i["entity"] for i in body["items"]] == ["kz01", "kz02"]
+    assert body["failed"][0]["entity"] == "nope" and body["summary"]["series"] == 2
+    kz01 = body["items"][0]["forecast"]
+    assert kz01[0]["date"] == "2025-02-10" and kz01[-1]["cash_balance"] == pytest.approx(4300.0)
+    assert client.post("/api/forecast/batch", headers={"X-Role": "Analyst"},
+                       json={"entities": ["../x"]}).status_code == 400
@@ -0,0 +1,64 @@
+# backend/tests/test_npmodels.py
+import pytest
+import numpy as np
+import pandas as pd
+
+pytest.importorskip("app.utils.io")
+from app.services import npmodels as npm
+from app.services import backtest as bt
+from app.services import registry
+
+
+def _weekly(days=140, seed=0):
+    """Инвойсы по понедельникам, зарплата раз в две недели — как в bank_mock.pull_payment_calendar."""
+    idx = pd.date_range("2024-01-01", periods=days, freq="D")
+    rng = np.random.default_rng(seed)
+    y = rng.normal(0, 1e4, days)
+    y[idx.dayofweek == 0] += 5e6
+    y[idx.dayofweek == 4] -= 3e6
+    return y, idx
+
+
+@pytest.mark.parametrize("model", npm.MODELS)
+def test_single_pass_origins_match_per_window_fits(model):
+    y, idx = _weekly(90)
+    origins = bt.backtest_origins(len(y), 5, 7, 4)            # включая окна короче MIN_OBS
+    fast = bt.forecast_matrix(model, y, idx, origins, 7)
+    func = bt.MODEL_FUNCS[model]
+    slow = np.array([func(pd.Series(y[:t]), idx[:t], 7) if model in bt.INDEX_MODELS
+                     else func(pd.Series(y[:t]), 7) for t in origins])
+    assert np.allclose(fast, slow)
+
+
+def test_seasonal_models_beat_naive_on_weekly_cycle():
+    y, idx = _weekly()
+    res = bt.rolling_backtest(bt.BacktestParams(horizon=14, window=56, step=7,
+                                                use_models=["naive_last", "naive_mean", "hw", "dow_profile"]),
+                              df=pd.DataFrame({"date": idx, "net_cash": y}))
+    score = res["summary"].set_index("model")["sMAPE"]
+    assert score["dow_profile"] < score["naive_mean"] and score["hw"] < score["naive_last"]
+
+
+def test_holt_trend_and_profile_predictions():
+    t = np.arange(60, dtype=float)
+    params, _ = npm.fit("holt", 100 + 10 * t)
+    assert npm.predict("holt", params, 1)[0] == pytest.approx(700, rel=0.02)
+
+    y, idx = _weekly(days=56)
+    params, _ = npm.fit("dow_profile", y, idx)
+    nxt = npm.predict("dow_profile", params, 7, idx[-1])     # idx[-1] — воскресенье → дальше пн..вс
+    assert nxt[0] == pytest.approx(5e6, rel=0.01) and nxt[4] == pytest.approx(-3e6, rel=0.01)
+
+    days = pd.date_range("2024-01-01", periods=120, freq="D")
+    y = np.where(days.day == 25, -1e6, 0.0)
+    params, smape = npm.fit("dom_profile", y, days)
+    fut = npm.predict("dom_profile", params, 31, days[-1])
+    assert fut[np.flatnonzero(pd.date_range(days[-1] + pd.Timedelta(days=1), periods=31).day == 25)[0]] == -1e6
+
+
+def test_registry_artifact_predicts_from_params():
+    y, idx = _weekly()
+    daily = pd.DataFrame({"date": idx, "net_cash": y})
+    art = registry.fit_model("hw", daily, "v1")
+    assert art.params["season"] and art.insample_smape is not None
+    assert np.allclose(art.predict(10), npm.forecast("hw", y, idx, 10))
@@ -0,0 +1,110 @@
+# backend/tests/test_offload.py
+import asyncio
+import time
+import pytest
+
+offload = pytest.importorskip("app.core.offload")
+from app.core.tenant import get_tenant, use_tenant
+
+
+class _Gone:
+    """Заглушка starlette.Request: клиент уже отключился."""
+    async def is_disconnected(self):
+        return True
+
+
+def test_process_pool_runs_task_in_request_tenant():
+    pool = offload.Offloader(workers=1, max_inflight=4)
+    try:
+        async def go():
+            with use_tenant("acme"):
+                return await pool.run("t", get_tenant), await pool.run("t", pow, 2, 10)
+        assert asyncio.run(go()) == ("acme", 1024)
+        assert pool.stats()["inflight"] == 0 and pool.stats()["mode"] == "process"
+    finally:
+        pool.shutdown()
+
+
+def test_worker_metrics_reach_api_process(tmp_path):
+    from app.core.metrics import SPAN_ERRORS, SPAN_LATENCY
+    from app.services.etl import build_daily_cashframe
+    key = (("span", "build_daily_cashframe"),)
+    before = SPAN_ERRORS.snapshot().get(key, 0.0), SPAN_LATENCY.snapshot().get(key, {}).get("count", 0.0)
+    pool = offload.Offloader(workers=1, max_inflight=4)
+    try:
+        with pytest.raises(FileNotFoundError):          # исключение задачи доходит как есть…
+            asyncio.run(pool.run("t", build_daily_cashframe, tmp_path / "empty"))
+    finally:
+        pool.shutdown()
+    # …а её span, записанный в процессе пула, виден в метриках API
+    assert SPAN_ERRORS.snapshot()[key] == before[0] + 1
+    assert SPAN_LATENCY.snapshot()[key]["count"] == before[1] + 1
+
+
+def test_admission_rejects_when_saturated():
+    pool = offload.Offloader(workers=0, max_inflight=1)
+
+    async def go():
+        first = asyncio.ensure_future(pool.run("t", time.sleep, 0.3))
+        await asyncio.sleep(0.05)
+        with pytest.raises(offload.Saturated):
+            await pool.run("t", time.sleep, 0)
+        await first
+        await pool.run("t", time.sleep, 0)          # слот освободился
+    asyncio.run(go())
+
+
+def test_disconnect_cancels_queued_and_abandons_running():
+    pool = offload.Offloader(workers=1, max_inflight=8)
+    try:
+        async def go():
+            busy = [asyncio.ensure_future(pool.run("t", time.sleep, 0.5)) for _ in range(2)]
+            await asyncio.sleep(0.1)
+            with pytest.raises(offload.ClientGone):      # третья ждёт в очереди → снимается
+                await pool.run("t", time.sleep, 5, request=_Gone())
+            assert pool.stats()["inflight"] == 2
+            await asyncio.gather(*busy)
+        asyncio.run(go())
+    finally:
+        pool.shutdown()
+
+    threads = offload.Offloader(workers=0, max_inflight=2)
+
+    async def go():
+        with pytest.raises(offload.ClientGone):          # уже выполняется → досчитается, слот занят
+            await threads.run("t", time.sleep, 0.3, request=_Gone())
+        assert threads.stats()["inflight"] == 1
+        await asyncio.sleep(0.4)
+        assert threads.stats()["inflight"] == 0
+    asyncio.run(go())
+
+
+def test_heavy_endpoint_returns_429_when_busy(monkeypatch):
+    pytest.importorskip("fastapi")
+    from fastapi.testclient import TestClient
+    from app.main import app
+    monkeypatch.setattr(offload, "OFFLOAD", offload.Offloader(workers=0, max_inflight=0))
+    client = TestClient(app)
+    r = client.post("/api/forecast", json={"horizon_days": 7})
+    assert r.status_code == 429 and r.headers["Retry-After"] == "2"
+    for path, body in (("/api/forecast/batch", {"entities": ["kz01"]}), ("/api/report/batch", {"entities": ["kz01"]})):
+        assert client.post(path, json=body, headers={"X-Role": "Analyst"}).status_code == 429
+
+
+def test_identical_tasks_share_one_execution():
+    pool = offload.Offloader(workers=0, max_inflight=1)        # второй слот не понадобится
+    calls = []
+
+    def work(x):
+        calls.append(x)
+        time.sleep(0.2)
+        return x * 2
+
+    async def go():
+        res = await asyncio.gather(*(pool.run("t", work, 21, key="k") for _ in range(5)),
+                                   pool.run("t", work, 1, key="other"), return_exceptions=True)
+        assert res[:5] == [42] * 5 and isinstance(res[5], offload.Saturated)
+        assert pool.stats()["coalescing"] == 0
+        assert await pool.run("t", work, 21, key="k") == 42   # после завершения — новый расчёт
+    asyncio.run(go())
+    assert calls == [21, 21]
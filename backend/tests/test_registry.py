@@ -0,0 +1,106 @@
+# backend/tests/test_registry.py
+import time
+
+import pytest
+import numpy as np
+
+io_mod = pytest.importorskip("app.utils.io")
+from app.core import config
+from app.services import registry, forecast
+from app.services import backtest as bt
+from app.services import npmodels as npm
+
+
+class FakeArima:
+    """Подмена pmdarima: сериализуется pickle, как настоящая модель."""
+    order = (1, 0, 1)
+
+    def __init__(self, y):
+        self.mean = float(np.mean(y))
+        self.n = len(y)
+
+    def aic(self):
+        return 123.4
+
+    def predict(self, n_periods):
+        return np.full(n_periods, self.mean)
+
+    def predict_in_sample(self):
+        return np.full(self.n, self.mean)
+
+
+class FakePm:
+    fits = 0
+
+    @classmethod
+    def auto_arima(cls, y, **kw):
+        cls.fits += 1
+        return FakeArima(y)
+
+
+@pytest.fixture
+def isolated(isolated, monkeypatch):
+    monkeypatch.setattr(bt, "HAS_PMD", True)
+    monkeypatch.setattr(bt, "pm", FakePm, raising=False)
+    FakePm.fits = 0
+    return isolated
+
+
+def test_forecast_reuses_artifact_until_data_version_changes(isolated, make_daily):
+    io_mod.save_df("daily_cash.parquet", make_daily(40, 500.0))
+    pts, _ = forecast.get_forecast(horizon=5)
+    assert FakePm.fits == 1
+    assert pts[0]["net_cash"] == pytest.approx(make_daily(40, 500.0)["net_cash"].mean())
+    forecast.get_forecast(horizon=30)                                  # другой горизонт — тот же фит
+    assert FakePm.fits == 1
+
+    # новый процесс: артефакт читается с диска, без фита
+    registry.REGISTRY = registry.ModelRegistry()
+    forecast.get_forecast(horizon=5)
+    assert FakePm.fits == 1
+
+    time.sleep(0.01)
+    io_mod.save_df("daily_cash.parquet", make_daily(40, 600.0))          # новая версия витрины
+    pts, _ = forecast.get_forecast(horizon=5)
+    assert FakePm.fits == 2
+    assert pts[0]["net_cash"] == pytest.approx(make_daily(40, 600.0)["net_cash"].mean())
+
+
+def test_warm_up_metadata_and_prune(isolated, monkeypatch, make_daily):
+    monkeypatch.setattr(config, "MODEL_KEEP_VERSIONS", 1)
+    io_mod.save_df("daily_cash.parquet", make_daily(40, 500.0))
+    metas = {m["name"]: m for m in registry.warm_up()}
+    assert set(metas) == {"naive", "naive_mean", "arima", *npm.MODELS}
+    assert metas["arima"]["params"]["order"] == [1, 0, 1]
+    assert metas["arima"]["n_obs"] == 40 and metas["arima"]["insample_smape"] is not None
+
+    time.sleep(0.01)
+    io_mod.save_df("daily_cash.parquet", make_daily(40, 501.0))
+    registry.warm_up()
+    listed = registry.REGISTRY.list()
+    assert {m["data_version"] for m in listed} == {io_mod.data_version()}   # старая версия удалена
+
+
+def test_warm_up_all_covers_tenants_and_entities(isolated, monkeypatch, make_daily):
+    from app.core.tenant import use_tenant
+    monkeypatch.setattr(registry, "available_models", lambda: ["naive"])
+    io_mod.save_df("daily_cash.parquet", make_daily(40, 500.0))
+    io_mod.save_df("daily_cash.parquet", make_daily(40, 501.0), io_mod.entity_dir("kz01"))
+    with use_tenant("acme"):
+        io_mod.save_df("daily_cash.parquet", make_daily(40, 502.0), io_mod.entity_dir("uz02"))
+    done = registry.warm_up_all()
+    assert done == {"acme": 0, "acme/entities/uz02": 1, "default": 1, "default/entities/kz01": 1}
+    assert registry.REGISTRY.load("naive", io_mod.data_version(io_mod.entity_dir("kz01")),
+                                  root=io_mod.entity_dir("kz01")) is not None
+
+
+def test_models_endpoint(isolated, make_daily):
+    pytest.importorskip("fastapi")
+    from fastapi.testclient import TestClient
+    from app.main import app
+    io_mod.save_df("daily_cash.parquet", make_daily(40, 500.0))
+    client = TestClient(app)
+    r = client.post("/api/models/warmup", headers={"X-Role": "CFO"})
+    assert r.status_code == 200 and r.json()["count"] == 3 + len(npm.MODELS)
+    body = client.get("/api/models").json()
+    assert body["count"] == 3 + len(npm.MODELS) and all(i["current"] for i in body["items"])
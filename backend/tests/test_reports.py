@@ -0,0 +1,45 @@
+# backend/tests/test_reports.py
+import pytest
+import numpy as np
+from datetime import date, timedelta
+
+reports = pytest.importorskip("app.services.reports", reason="reportlab not installed")
+
+
+def _points(n, shift=0.0):
+    rng = np.random.default_rng(0)
+    net = rng.normal(0, 1e6, n)
+    bal = np.cumsum(net) + 5e6 + shift
+    d0 = date(2025, 1, 1)
+    return [{"date": (d0 + timedelta(days=i)).isoformat(), "net_cash": float(a), "cash_balance": float(b)}
+            for i, (a, b) in enumerate(zip(net, bal))]
+
+
+def test_downsample_minmax_keeps_extremes():
+    y = np.sin(np.linspace(0, 20, 5000))
+    y[1234] = -50.0  # одиночный провал не должен потеряться
+    xs, ys = reports._downsample_minmax(y, 100)
+    assert len(ys) <= 200
+    assert ys.min() == pytest.approx(-50.0)
+    assert ys.max() == pytest.approx(y.max())
+
+
+def test_downsample_sum_preserves_total():
+    y = np.arange(365, dtype=float)
+    _, sums, agg = reports._downsample_sum(y, 100)
+    assert sums.sum() == pytest.approx(y.sum())
+    assert agg >= 2
+
+
+def test_build_pdf_with_long_horizon():
+    base = _points(365)
+    scen = _points(365, shift=-1e6)
+    pdf = reports.build_pdf({"forecast": base}, {"forecast_scenario": scen, "min_cash": -1.0}, {}, 365)
+    assert pdf[:4] == b"%PDF"
+    # дневная таблица режется на страницы
+    assert len(reports._daily_tables(base, scen)) == -(-365 // reports.TABLE_ROWS_PER_PAGE)
+
+
+def test_build_pdf_without_forecast():
+    pdf = reports.build_pdf(None, None, None)
+    assert pdf[:4] == b"%PDF"
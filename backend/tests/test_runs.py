@@ -0,0 +1,158 @@
+# backend/tests/test_runs.py
+import pytest
+
+io_mod = pytest.importorskip("app.utils.io")
+from app.services import runs
+
+
+def test_identical_runs_are_deduplicated_until_data_changes(backend, make_daily):
+    io_mod.save_df("daily_cash.parquet", make_daily(40))
+    first, reused = runs.forecast_run(10, "baseline")
+    assert not reused and len(first["points"]) == 10
+    again, reused = runs.forecast_run(10, "baseline")
+    assert reused and again["run_id"] == first["run_id"]
+    assert again["points"] == first["points"]
+
+    other, reused = runs.forecast_run(10, "stress")                 # другие параметры
+    assert not reused and other["run_id"] != first["run_id"]
+
+    io_mod.save_df("daily_cash.parquet", make_daily(40, shift=50.0))      # новая версия данных
+    fresh, reused = runs.forecast_run(10, "baseline")
+    assert not reused and fresh["run_id"] != first["run_id"]
+
+    store = runs.get_run_store()
+    listed = store.list(kind="forecast")
+    assert [r["run_id"] for r in listed][0] == fresh["run_id"] and len(listed) == 3
+    assert "points" not in listed[0]
+    got = store.get(first["run_id"])
+    assert got["params"] == {"horizon_days": 10, "scenario": "baseline", "model": None}
+    assert got["points"][0]["date"] == "2024-02-10"
+
+
+def test_runs_api_roundtrip(backend, make_daily):
+    pytest.importorskip("fastapi")
+    from fastapi.testclient import TestClient
+    from app.main import app
+    io_mod.save_df("daily_cash.parquet", make_daily(40))
+    client = TestClient(app)
+    r = client.post("/api/scenario", json={"horizon_days": 7, "fx_shock": 0.1})
+    assert r.status_code == 200
+    run_id = r.json()["run_id"]
+    assert client.post("/api/scenario", json={"horizon_days": 7, "fx_shock": 0.1}).json()["run_id"] == run_id
+
+    items = client.get("/api/runs", params={"kind": "scenario"}).json()["items"]
+    assert [i["run_id"] for i in items] == [run_id]
+    rec = client.get(f"/api/runs/{run_id}").json()
+    assert rec["kind"] == "scenario" and len(rec["points"]) == 7
+    assert client.get("/api/runs/nope").status_code == 404
+
+
+def test_concurrent_identical_runs_compute_once(backend, make_daily):
+    import threading
+    import time
+    from concurrent.futures import ThreadPoolExecutor
+    io_mod.save_df("daily_cash.parquet", make_daily(40))
+    calls, gate = [], threading.Event()
+
+    def compute():
+        calls.append(1)
+        gate.wait(2)
+        return {"points": [{"date": "2024-02-10", "net_cash": 1.0, "cash_balance": 2.0}], "metrics": {}}
+
+    with ThreadPoolExecutor(4) as ex:
+        futs = [ex.submit(runs.get_or_create, "forecast", {"h": 1}, compute) for _ in range(4)]
+        time.sleep(0.2)                       # все четыре промахнулись по истории и ждут лидера
+        gate.set()
+        res = [f.result() for f in futs]
+    assert len(calls) == 1
+    assert len({r["run_id"] for r, _ in res}) == 1 and sorted(reused for _, reused in res) == [False, True, True, True]
+
+
+def test_flight_key_matches_run_key_and_follows_champion(backend, monkeypatch, make_daily):
+    from app.services import selection
+    io_mod.save_df("daily_cash.parquet", make_daily(40))
+    monkeypatch.setattr(selection, "choose_model", lambda h, root=None: "naive_mean")
+    rec, _ = runs.forecast_run(10, "baseline")
+    scope, key = runs.forecast_key(10, "baseline")
+    assert scope == "default" and key == rec["params_hash"] and rec["params"]["model"] == "naive_mean"
+
+    monkeypatch.setattr(selection, "choose_model", lambda h, root=None: "naive")   # новый champion
+    assert runs.forecast_key(10, "baseline")[1] != key
+    assert runs.scenario_key({"horizon_days": 10}) != runs.scenario_key({"horizon_days": 10, "fx_shock": 0.1})
+
+
+def test_scenario_api_applies_every_shock(backend, make_daily):
+    pytest.importorskip("fastapi")
+    from fastapi.testclient import TestClient
+    from app.main import app
+    io_mod.save_df("daily_cash.parquet", make_daily(40, shift=-1500.0))  # в прогнозе есть оттоки для переноса
+    client = TestClient(app)
+    base_id = client.post("/api/forecast", json={"horizon_days": 14}).json()["run_id"]
+
+    def run(**shocks):
+        body = {"horizon_days": 14, **shocks}
+        direct = client.post("/api/scenario", json=body).json()
+        derived = client.post("/api/scenario", json={**body, "baseline_run_id": base_id}).json()
+        return direct["forecast_scenario"], derived["forecast_scenario"]
+
+    plain = run()
+    for shocks in ({"shift_purchases_days": 5}, {"fx_shock": 0.2}):
+        changed = run(**shocks)
+        assert changed[0] != plain[0] and changed[1] != plain[1], shocks
+
+
+def test_file_store_dedup_holds_across_processes(tmp_path):
+    # у каждого процесса (API, воркеры пула) свой FileRunStore и свой threading.Lock — держит flock
+    import threading
+    from concurrent.futures import ThreadPoolExecutor
+    points = [{"date": "2024-02-10", "net_cash": 1.0, "cash_balance": 2.0}]
+    barrier = threading.Barrier(6)
+
+    def save(i):
+        meta = {"run_id": f"r{i}", "kind": "forecast", "params_hash": "same", "params": {}, "metrics": {}}
+        store = runs.FileRunStore()
+        barrier.wait()
+        return store.save(meta, points, tmp_path)["run_id"]
+
+    with ThreadPoolExecutor(6) as ex:
+        ids = list(ex.map(save, range(6)))
+    assert len(set(ids)) == 1
+    assert len((tmp_path / "runs" / "index.jsonl").read_text().splitlines()) == 1
+    assert not list((tmp_path / "runs").glob("*.tmp"))
+
+
+def test_scenario_advice_and_report_from_run_ids(backend, monkeypatch, make_daily):
+    pytest.importorskip("fastapi")
+    from fastapi.testclient import TestClient
+    from app.main import app
+    from app.services import forecast, scenarios
+    io_mod.save_df("daily_cash.parquet", make_daily(40))
+    client = TestClient(app)
+    base = client.post("/api/forecast", json={"horizon_days": 14}).json()
+
+    def no_refit(*a, **k):
+        raise AssertionError("baseline must come from the stored run")
+    monkeypatch.setattr(forecast, "get_forecast", no_refit)
+    monkeypatch.setattr(scenarios, "get_forecast", no_refit)
+
+    r = client.post("/api/scenario", json={"baseline_run_id": base["run_id"], "fx_shock": 0.0})
+    assert r.status_code == 200
+    scen = r.json()
+    assert [p["cash_balance"] for p in scen["forecast_scenario"]] == \
+           pytest.approx([p["cash_balance"] for p in base["forecast"]])
+    stress = client.post("/api/scenario", json={"baseline_run_id": base["run_id"], "scenario": "stress",
+                                               "horizon_days": 7}).json()
+    assert len(stress["forecast_scenario"]) == 7
+    assert stress["forecast_scenario"][0]["net_cash"] == pytest.approx(base["forecast"][0]["net_cash"] * 0.95)
+    assert client.post("/api/scenario", json={"baseline_run_id": base["run_id"],
+                                              "horizon_days": 30}).status_code == 400
+    assert client.post("/api/scenario", json={"baseline_run_id": "nope"}).status_code == 404
+
+    adv = client.post("/api/advice", json={"scenario_run_id": scen["run_id"]}, headers={"X-Role": "CFO"})
+    assert adv.status_code == 200 and adv.json()["run_id"] == scen["run_id"] and adv.json()["advice_text"]
+    assert client.post("/api/advice", json={"baseline_run_id": base["run_id"]},
+                       headers={"X-Role": "CFO"}).status_code == 422
+
+    pytest.importorskip("reportlab")
+    pdf = client.post("/api/report/pdf", json={"scenario_run_id": scen["run_id"], "advice": adv.json()})
+    assert pdf.status_code == 200 and pdf.content[:4] == b"%PDF"
@@ -24,3 +24,19 @@ def test_run_scenario_contract():
     assert "scenario" in res and res["scenario"] in ("baseline", "stress", "optimistic")
     assert "forecast_scenario" in res and isinstance(res["forecast_scenario"], list)
     assert "min_cash" in res
+
+
+def test_derive_scenario_fx_scales_all_days_and_shift_purchases_moves_outflow():
+    pts = [{"date": f"2025-09-0{i + 1}", "net_cash": v, "cash_balance": b}
+           for i, (v, b) in enumerate([(100.0, 1100.0), (-400.0, 700.0), (50.0, 750.0), (-100.0, 650.0)])]
+    fx = svc.derive_scenario(pts, fx_shock=0.2)["forecast_scenario"]
+    assert [p["net_cash"] for p in fx] == pytest.approx([120.0, -480.0, 60.0, -120.0])   # и оттоки тоже
+    assert fx[-1]["cash_balance"] == pytest.approx(1000.0 + 0.2 * (100 - 400 + 50 - 100) + (100 - 400 + 50 - 100))
+
+    base = svc.derive_scenario(pts)
+    shifted = svc.derive_scenario(pts, shift_purchases_days=2)
+    assert shifted["forecast_scenario"] != base["forecast_scenario"]
+    by_date = {str(p["date"]): p["net_cash"] for p in shifted["forecast_scenario"]}
+    assert by_date["2025-09-02"] == 0.0 and by_date["2025-09-04"] == pytest.approx(-500.0)
+    bal = {str(p["date"]): p["cash_balance"] for p in shifted["forecast_scenario"]}
+    assert bal["2025-09-03"] == pytest.approx(1150.0)                    # крупный платёж ушёл позже
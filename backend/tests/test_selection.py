@@ -0,0 +1,61 @@
+# backend/tests/test_selection.py
+import pytest
+import numpy as np
+import pandas as pd
+
+io_mod = pytest.importorskip("app.utils.io")
+from app.core import config
+from app.services import backtest as bt
+from app.services import forecast, selection
+
+
+@pytest.fixture
+def isolated(isolated, monkeypatch):
+    monkeypatch.setattr(bt, "HAS_PMD", False)
+    monkeypatch.setattr(bt, "HAS_PROPHET", False)
+    monkeypatch.setattr(config, "MODEL_SELECTION", True)
+    monkeypatch.setattr(config, "MODEL_SELECTION_BUCKETS", [7, 14, 35, 60])
+    return isolated
+
+
+def _stationary(make_daily, days=240):
+    return make_daily(days, shift=1000.0, noise=50.0)   # шум вокруг среднего → naive_mean лучше
+
+
+def test_vectorized_naive_matrices_match_per_origin_fits():
+    y = np.random.default_rng(1).normal(size=50)
+    idx = pd.date_range("2024-01-01", periods=50, freq="D")
+    origins = bt.backtest_origins(50, 10, 5, 3)
+    for m in ("naive_last", "naive_mean"):
+        fast = bt.forecast_matrix(m, y, idx, origins, 5)
+        slow = np.array([bt.MODEL_FUNCS[m](pd.Series(y[:t]), 5) for t in origins])
+        assert np.allclose(fast, slow)
+    assert np.array_equal(bt.truth_matrix(y, origins, 5)[2], y[origins[2]:origins[2] + 5])
+
+
+def test_selection_buckets_and_forecast_uses_champion(isolated, make_daily):
+    io_mod.save_df("daily_cash.parquet", _stationary(make_daily))
+    sel = selection.select_models()
+    assert [b["max_h"] for b in sel["buckets"]] == [7, 14, 35, 60]
+    assert sel["horizon_evaluated"] == 60 and sel["origins"] >= 1
+    assert all(b["champion"] == "naive_mean" for b in sel["buckets"])
+    assert sel["buckets"][0]["challenger"] == "ses"              # SES с малым alpha ≈ среднее
+
+    assert selection.choose_model(10) == "naive_mean"
+    pts, _ = forecast.get_forecast(horizon=5)
+    assert pts[0]["net_cash"] == pytest.approx(_stationary(make_daily)["net_cash"].mean())
+
+
+def test_short_history_inherits_last_evaluated_bucket(isolated, make_daily):
+    io_mod.save_df("daily_cash.parquet", _stationary(make_daily, days=45))   # окно 30 → оценим только 15 шагов
+    sel = selection.select_models()
+    assert sel["horizon_evaluated"] == 15
+    assert [b["inherited"] for b in sel["buckets"]] == [False, False, False, True]
+    assert sel["buckets"][3]["champion"] == sel["buckets"][2]["champion"]
+
+
+def test_selection_disabled_falls_back_to_default(isolated, monkeypatch, make_daily):
+    io_mod.save_df("daily_cash.parquet", _stationary(make_daily))
+    selection.select_models()
+    monkeypatch.setattr(config, "MODEL_SELECTION", False)
+    assert selection.choose_model(10) is None
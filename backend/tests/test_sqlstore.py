@@ -0,0 +1,87 @@
+# backend/tests/test_sqlstore.py
+from datetime import date, timedelta
+
+import pytest
+import numpy as np
+import pandas as pd
+
+io_mod = pytest.importorskip("app.utils.io")
+from app.core import config
+from app.core.tenant import use_tenant
+from app.utils import sqlstore
+from app.services.etl import build_daily_cashframe
+
+
+@pytest.fixture
+def sql_backend(isolated, monkeypatch):
+    store = sqlstore.SqlStore(f"sqlite:///{isolated / 'store.db'}", pool_size=2)
+    monkeypatch.setattr(config, "STORAGE_BACKEND", "sql")
+    monkeypatch.setattr(sqlstore, "_STORE", store)
+    yield store
+    store.close()
+
+
+def _sources(days=30):
+    dates = [date(2024, 1, 1) + timedelta(days=i) for i in range(days)]
+    bank = pd.DataFrame({"date": dates, "account": "MAIN",
+                         "currency": ["KZT", "USD"] * (days // 2), "amount": np.arange(days, dtype=float) * 1000})
+    pay = pd.DataFrame({"date": dates[::7], "type": "inflow", "currency": "KZT",
+                        "amount": 5000.0, "memo": "invoice"})
+    fx = pd.DataFrame({"date": dates, "USD/KZT": 500.0, "EUR/KZT": 540.0})
+    return bank, pay, fx
+
+
+def test_migrations_apply_once(tmp_path):
+    store = sqlstore.SqlStore(f"sqlite:///{tmp_path / 'm.db'}")
+    assert store.migrate()[:2] == ["001_init", "002_storage_scope"]
+    again = sqlstore.SqlStore(store.url)
+    assert again.migrate() == []
+
+
+def test_sql_roundtrip_range_and_etl(sql_backend):
+    bank, pay, fx = _sources()
+    io_mod.save_df("bank_statements.parquet", bank)
+    io_mod.save_df("payment_calendar.parquet", pay)
+    io_mod.save_df("fx_rates.parquet", fx)
+    assert not (io_mod.DATA_DIR / "bank_statements.parquet").exists()   # всё в БД
+
+    got = io_mod.load_df("bank_statements.parquet")
+    assert list(got.columns) == ["date", "account", "currency", "amount"]
+    assert got["amount"].sum() == bank["amount"].sum()
+    fx_back = io_mod.load_df("fx_rates.parquet")
+    assert sorted(c for c in fx_back.columns if c != "date") == ["EUR/KZT", "USD/KZT"]
+
+    part = io_mod.load_df("bank_statements.parquet", start=date(2024, 1, 10), end=date(2024, 1, 12))
+    assert [d.day for d in part["date"]] == [10, 11, 12]
+
+    daily = build_daily_cashframe()
+    io_mod.save_df("daily_cash.parquet", daily)
+    back = io_mod.load_df("daily_cash.parquet")
+    assert np.allclose(back["cash_balance"], daily["cash_balance"])
+
+
+def test_sql_versions_invalidate_cache_and_scope_tenants(sql_backend):
+    bank, _, _ = _sources()
+    io_mod.save_df("bank_statements.parquet", bank)
+    assert sql_backend.version("default", "bank_statements") == 1
+    assert len(io_mod.load_df("bank_statements.parquet")) == 30
+    io_mod.save_df("bank_statements.parquet", bank.head(5))           # замена датасета, версия 2
+    assert sql_backend.version("default", "bank_statements") == 2
+    assert len(io_mod.load_df("bank_statements.parquet")) == 5
+
+    with use_tenant("acme"):
+        assert not io_mod.path_exists("bank_statements.parquet")
+        io_mod.save_df("bank_statements.parquet", bank, io_mod.entity_dir("kz01"))
+        assert len(io_mod.load_df("bank_statements.parquet", io_mod.entity_dir("kz01"))) == 30
+    assert sql_backend.version("acme/entities/kz01", "bank_statements") == 1
+
+
+def test_dataset_roots_enumerate_sql_scopes(sql_backend):
+    daily = pd.DataFrame({"date": [date(2024, 1, 1)], "net_cash": [1.0], "cash_balance": [1.0]})
+    io_mod.save_df("daily_cash.parquet", daily)
+    with use_tenant("acme"):
+        io_mod.save_df("daily_cash.parquet", daily, io_mod.entity_dir("kz01"))
+    roots = io_mod.dataset_roots()
+    assert roots == [("acme", io_mod.TENANTS_DIR / "acme" / "entities" / "kz01"), ("default", None)]
+    with use_tenant("acme"):
+        assert io_mod.storage_scope(roots[0][1]) == "acme/entities/kz01"
@@ -0,0 +1,33 @@
+# backend/tests/test_startup.py
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+pytest.importorskip("fastapi")
+from app.core import lazy
+from app.services import backtest as bt
+
+BACKEND = Path(__file__).resolve().parents[1]
+
+
+def test_heavy_libraries_not_imported_with_app():
+    code = ("import sys, app.main; "
+            "print(sorted(m for m in ('reportlab', 'httpx', 'apscheduler', 'pmdarima', 'prophet') if m in sys.modules))")
+    out = subprocess.run([sys.executable, "-c", code], cwd=BACKEND, capture_output=True, text=True, check=True)
+    assert out.stdout.strip() == "[]"
+
+
+def test_availability_probe_and_lazy_attributes(monkeypatch):
+    assert lazy.available("numpy") and not lazy.available("definitely_not_a_module_xyz")
+    assert bt.HAS_PMD == lazy.available("pmdarima")
+    with pytest.raises(AttributeError):
+        bt.not_a_model_lib
+    if not bt.HAS_PMD:
+        assert not hasattr(bt, "pm")
+
+
+def test_warm_imports_records_timings():
+    lazy.warm_imports(["json", "definitely_not_a_module_xyz"], background=False)
+    assert "json" in lazy.IMPORT_MS and "definitely_not_a_module_xyz" not in lazy.IMPORT_MS
@@ -0,0 +1,56 @@
+# backend/tests/test_tenancy.py
+import pytest
+import numpy as np
+import pandas as pd
+
+io_mod = pytest.importorskip("app.utils.io")
+from app.core.tenant import use_tenant
+from app.utils.cache import FrameCache
+
+
+def _df(rows):
+    return pd.DataFrame({"x": np.arange(rows, dtype="float64")})
+
+
+def test_frame_cache_global_lru_across_tenants():
+    one = FrameCache._size(_df(1000))
+    cache = FrameCache(max_bytes=int(one * 2.5))
+    cache.put("a", "k1", 1, _df(1000))
+    cache.put("b", "k1", 1, _df(1000))
+    assert cache.get("a", "k1", 1) is not None      # a/k1 теперь свежее, чем b/k1
+    cache.put("c", "k1", 1, _df(1000))              # переполнение → вытесняется b/k1
+    assert cache.get("b", "k1", 1) is None
+    assert cache.get("a", "k1", 1) is not None
+    assert cache.stats()["evictions"] == 1
+
+
+def test_frame_cache_tenant_cap_and_stamp():
+    one = FrameCache._size(_df(1000))
+    cache = FrameCache(max_bytes=one * 10, tenant_max_bytes=int(one * 1.5))
+    cache.put("noisy", "k1", 1, _df(1000))
+    cache.put("quiet", "k1", 1, _df(1000))
+    cache.put("noisy", "k2", 1, _df(1000))          # лимит тенанта → уходит только noisy/k1
+    assert cache.get("noisy", "k1", 1) is None
+    assert cache.get("quiet", "k1", 1) is not None
+    assert cache.get("noisy", "k2", 2) is None       # файл изменился (другой stamp) → промах
+
+
+def test_tenants_do_not_share_files(isolated):
+    with use_tenant("acme"):
+        io_mod.save_df("daily_cash.parquet", _df(3))
+    with use_tenant("globex"):
+        io_mod.save_df("daily_cash.parquet", _df(5))
+        assert len(io_mod.load_df("daily_cash.parquet")) == 5
+    with use_tenant("acme"):
+        assert len(io_mod.load_df("daily_cash.parquet")) == 3
+        assert io_mod.data_dir() == isolated / "tenants" / "acme"
+    with pytest.raises(FileNotFoundError):
+        io_mod.load_df("daily_cash.parquet")           # тенант по умолчанию ничего не видит
+
+
+def test_invalid_tenant_header_rejected():
+    pytest.importorskip("fastapi")
+    from fastapi.testclient import TestClient
+    from app.main import app
+    r = TestClient(app).post("/api/forecast", json={"horizon_days": 3}, headers={"X-Tenant": "../x"})
+    assert r.status_code == 400
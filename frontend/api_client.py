@@ -0,0 +1,121 @@
+# frontend/api_client.py
+"""
+HTTP-клиент дашборда, общий для app.py и pages/.
+Streamlit перезапускает скрипт на каждое движение виджета, поэтому здесь всё, что не должно
+повторяться: одна keep-alive сессия на процесс (gzip включён в requests по умолчанию),
+короткий кэш /health, статус LLM — только по запросу, и условные GET: бэкенд отдаёт ETag
+по (версия данных, параметры), повтор с If-None-Match → 304 без пересчёта и без тела.
+"""
+import threading
+from collections import OrderedDict
+
+import requests
+import streamlit as st
+
+ETAG_ENTRIES = 64          # сколько последних ответов держим для If-None-Match (на процесс Streamlit)
+
+
+@st.cache_resource
+def _session() -> requests.Session:
+    s = requests.Session()
+    s.headers.update({"Accept-Encoding": "gzip, deflate"})
+    return s
+
+
+class _EtagStore:
+    """(url, параметры, роль) → (ETag, JSON); LRU — старые ответы вытесняются."""
+
+    def __init__(self, maxsize: int):
+        self.maxsize = maxsize
+        self._lock = threading.Lock()
+        self._items: "OrderedDict[tuple, tuple]" = OrderedDict()
+
+    def get(self, key):
+        with self._lock:
+            hit = self._items.get(key)
+            if hit is not None:
+                self._items.move_to_end(key)
+            return hit
+
+    def put(self, key, etag: str, data):
+        with self._lock:
+            self._items[key] = (etag, data)
+            self._items.move_to_end(key)
+            while len(self._items) > self.maxsize:
+                self._items.popitem(last=False)
+
+
+@st.cache_resource
+def _etags() -> _EtagStore:
+    return _EtagStore(ETAG_ENTRIES)
+
+
+def _url(api_base: str, path: str) -> str:
+    return api_base.rstrip("/") + "/" + path.lstrip("/")
+
+
+def _error(e: requests.RequestException) -> str:
+    resp = getattr(e, "response", None)
+    if resp is None:
+        return str(e)
+    try:
+        detail = resp.json().get("detail")
+    except Exception:
+        detail = resp.text
+    return f"{resp.status_code} {resp.reason} — {detail}"
+
+
+def cached_get(api_base: str, path: str, params: dict | None = None, role: str | None = None,
+               timeout: int = 60):
+    """GET с ревалидацией по ETag: (data, err, from_cache). from_cache=True — сервер ответил 304."""
+    url = _url(api_base, path)
+    items = tuple(sorted((k, tuple(v) if isinstance(v, list) else v) for k, v in (params or {}).items()))
+    key = (url, items, role)
+    headers = {"X-Role": role} if role else {}
+    prev = _etags().get(key)
+    if prev is not None:
+        headers["If-None-Match"] = prev[0]
+    try:
+        r = _session().get(url, params=params, headers=headers, timeout=timeout)
+        if r.status_code == 304 and prev is not None:
+            return prev[1], None, True
+        r.raise_for_status()
+        data = r.json()
+    except requests.RequestException as e:
+        return None, _error(e), False
+    if r.headers.get("ETag"):
+        _etags().put(key, r.headers["ETag"], data)
+    return data, None, False
+
+
+def post_json(api_base: str, path: str, json_data=None, role: str | None = None, timeout: int = 60):
+    """POST через общую сессию: (data, err)."""
+    headers = {"X-Role": role} if role else {}
+    try:
+        r = _session().post(_url(api_base, path), json=json_data or {}, headers=headers, timeout=timeout)
+        r.raise_for_status()
+        return (r.json() if r.content else {}), None
+    except requests.RequestException as e:
+        return None, _error(e)
+
+
+@st.cache_data(ttl=15, show_spinner=False)
+def health(api_base: str) -> tuple:
+    """(ok, ошибка) — дешёвый /health с коротким таймаутом, не чаще раза в 15 с на адрес."""
+    try:
+        r = _session().get(_url(api_base, "/health"), timeout=2)
+        r.raise_for_status()
+        return r.json().get("status") == "ok", None
+    except Exception as e:
+        return False, str(e)
+
+
+@st.cache_data(ttl=600, show_spinner="Проверяем LLM…")
+def llm_status(api_base: str) -> dict:
+    """/llm/test — это полная генерация: вызывается только по кнопке, результат живёт 10 минут."""
+    try:
+        r = _session().get(_url(api_base, "/llm/test"), timeout=60)
+        r.raise_for_status()
+        return r.json()
+    except Exception as e:
+        return {"ok": False, "error": str(e)}
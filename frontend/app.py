@@ -4,10 +4,12 @@ import io
 import requests
 import pandas as pd
 import numpy as np
+import altair as alt
 import streamlit as st
-import matplotlib.pyplot as plt
 from dotenv import load_dotenv
 
+from api_client import cached_get, health, llm_status
+
 load_dotenv()
 
 # ---- Config ----
@@ -22,36 +24,6 @@ horizon = st.sidebar.slider("Горизонт прогноза (дней)", 7, 6
 
 
 
-import requests
-
-def safe_get_json(url: str):
-    try:
-        r = requests.get(url, timeout=5)
-        r.raise_for_status()
-        return r.json(), None
-    except Exception as e:
-        return None, str(e)
-
-st.markdown("### Статус подключения")
-col_h, col_l = st.columns(2)
-with col_h:
-    data, err = safe_get_json(f"{api_base}/health")
-    if err or not data or data.get("status") != "ok":
-        st.error(f"API: нет связи ({err or data})")
-    else:
-        st.success("API: OK")
-with col_l:
-    data, err = safe_get_json(f"{api_base}/llm/test")
-    if err or not data:
-        st.warning(f"LLM: нет связи ({err})")
-    else:
-        prov = data.get("provider") or "—"
-        sample = data.get("sample") or ""
-        if prov and not sample.startswith("error"):
-            st.success(f"LLM: {prov} — готово")
-        else:
-            st.warning(f"LLM: есть конфиг, но ответ пустой/ошибка ({sample[:60]})")
-
 st.sidebar.markdown("---")
 st.sidebar.write("**Файлы входных данных** (CSV):")
 uploaded_bank = st.sidebar.file_uploader("bank_statements.csv", type=["csv"])
@@ -106,12 +78,6 @@ def api_post(path: str, files=None, json_data=None, role: str | None = None,
                 return None, str(e)
         return None, str(e)
 
-def api_get(path: str, timeout: int = 10):
-    url = f"{api_base}{path}"
-    r = requests.get(url, timeout=timeout)
-    r.raise_for_status()
-    return r.json()
-
 def status_badge(ok: bool, text_ok: str, text_fail: str) -> str:
     return f"✅ {text_ok}" if ok else f"❌ {text_fail}"
 
@@ -136,22 +102,61 @@ def api_post_binary(path: str, json_data=None, role: str | None = None, headers:
         return None, f"Network error @ {url}: {e}"
 
 
-def plot_forecast(forecast_points: list, title: str):
-    if not forecast_points:
-        st.info("Нет данных для графика.")
-        return
-    df = pd.DataFrame(forecast_points)
+@st.cache_data(max_entries=16, show_spinner=False)
+def points_frame(run_id: str, _points: list) -> pd.DataFrame:
+    # прогон неизменяем — DataFrame строим один раз на run_id (_points не хэшируется)
+    df = pd.DataFrame(_points)
     df["date"] = pd.to_datetime(df["date"])
-    fig, ax = plt.subplots(figsize=(10, 4))
-    ax.plot(df["date"], df["cash_balance"], label="Cash balance")
-    ax.bar(df["date"], df["net_cash"], alpha=0.3, label="Net cash (bar)")
-    ax.set_title(title)
-    ax.set_xlabel("Дата")
-    ax.set_ylabel("Сумма, KZT")
-    ax.legend()
-    st.pyplot(fig)
     return df
 
+
+def forecast_chart(df: pd.DataFrame, title: str, bands: bool = True) -> alt.Chart:
+    base = alt.Chart(df).encode(x=alt.X("date:T", title="Дата"))
+    layers = []
+    if bands and "cash_balance_lo" in df and df["cash_balance_lo"].notna().all():
+        layers.append(base.mark_area(opacity=0.15).encode(y="cash_balance_lo:Q", y2="cash_balance_hi:Q"))
+    layers.append(base.mark_bar(opacity=0.3).encode(y=alt.Y("net_cash:Q", title="Сумма, KZT")))
+    layers.append(base.mark_line().encode(
+        y="cash_balance:Q",
+        tooltip=[alt.Tooltip("date:T", title="Дата"), alt.Tooltip("cash_balance:Q", format=",.0f"),
+                 alt.Tooltip("net_cash:Q", format=",.0f")],
+    ))
+    return alt.layer(*layers).properties(title=title, height=320).interactive()
+
+
+def metrics_view(m: dict) -> dict:
+    """Метрики для показа: sMAPE в %, уровень интервалов в %, счётчики целыми; None/NaN пропускаем."""
+    out = {}
+    for k, v in (m or {}).items():
+        if v is None or (isinstance(v, float) and not np.isfinite(v)):
+            continue
+        if k == "smape":
+            out["sMAPE"] = f"{float(v):.3f}%"
+        elif k == "interval_level":
+            out["Уровень интервалов"] = f"{float(v) * 100:.0f}%"
+        elif k == "interval_origins":
+            out["Окон backtest для интервалов"] = int(v)
+        elif k == "components":
+            out["Компонент иерархии"] = int(v)
+        else:
+            out[k] = round(float(v), 3) if isinstance(v, (int, float)) else v
+    return out
+
+
+@st.fragment
+def forecast_panel(resp_key: str, points_key: str, title: str):
+    """График из session_state; переключатель интервалов перерисовывает только этот фрагмент."""
+    resp = st.session_state.get(resp_key)
+    if not resp:
+        return
+    points = resp.get(points_key) or []
+    if not points:
+        st.info("Нет данных для графика.")
+        return
+    bands = st.toggle("Интервалы", value=True, key=f"{resp_key}_bands")
+    df = points_frame(resp.get("run_id") or "", points)
+    st.altair_chart(forecast_chart(df, title, bands), use_container_width=True)
+
 # ---- Upload ----
 if upload_btn:
     if not (uploaded_bank and uploaded_pay and uploaded_fx):
@@ -178,22 +183,19 @@ st.title("💧 Liquidity Assistant — Дашборд")
 
 with st.sidebar:
     st.markdown("### Статус сервисов")
-    api_ok, llm_ok, llm_info = False, False, {}
-    try:
-        api_ok = api_get("/health").get("status") == "ok"
-    except Exception:
-        api_ok = False
-    try:
-        llm_info = api_get("/llm/test")
-        llm_ok = bool(llm_info.get("ok", False))
-    except Exception:
-        llm_ok = False
-
-    st.write(status_badge(api_ok, "API доступно", "API недоступно"))
-    if llm_ok:
-        st.write(f"✅ LLM: {llm_info.get('provider','?')} / {llm_info.get('model','?')}")
+    # /health — кэш на 15 с; /llm/test — полная генерация, поэтому только по кнопке (кэш 10 мин)
+    api_ok, api_err = health(api_base)
+    st.write(status_badge(api_ok, "API доступно", f"API недоступно ({api_err})" if api_err else "API недоступно"))
+    if st.button("Проверить LLM") or st.session_state.get("llm_checked"):
+        st.session_state["llm_checked"] = True
+        llm_info = llm_status(api_base)
+        sample = str(llm_info.get("sample") or "")
+        if llm_info.get("provider") and sample and not sample.startswith("error"):
+            st.write(f"✅ LLM: {llm_info.get('provider', '?')} / {llm_info.get('model', '?')}")
+        else:
+            st.write(f"❌ LLM недоступен (будет fallback): {(llm_info.get('error') or sample)[:80]}")
     else:
-        st.write("❌ LLM недоступен (будет fallback)")
+        st.caption("LLM: не проверялся")
 
 # ---- Forecast Section ----
 # st.header("1) Базовый прогноз ликвидности")
@@ -228,21 +230,25 @@ with colF1:
     scenario_name = st.selectbox("Сценарий прогноза", ["baseline", "stress", "optimistic"], index=0)
 
     if st.button("Сделать прогноз", type="primary"):
-        payload = {"horizon_days": horizon, "scenario": scenario_name}  # ⬅️ добавили scenario
-        resp, err = api_post("/forecast", json_data=payload)
+        # GET + ETag: тот же горизонт/сценарий на той же версии данных → 304, без пересчёта и тела
+        params = {"horizon_days": horizon, "scenario": scenario_name}
+        resp, err, cached = cached_get(api_base, "/forecast", params)
         if err:
             st.error(f"Ошибка прогноза: {err}")
         else:
             st.session_state["forecast"] = resp.get("forecast")
             st.session_state["baseline_resp"] = resp
-            st.success(f"Готово — прогноз посчитан ({scenario_name}).")
-            plot_forecast(st.session_state["forecast"], f"Прогноз Cash balance ({scenario_name})")
+            st.success(f"Готово — прогноз посчитан ({scenario_name})."
+                       + (" Данные не менялись — взят из кэша." if cached else ""))
 
 with colF2:
     if st.session_state["baseline_resp"]:
         m = st.session_state["baseline_resp"].get("metrics", {})
         st.subheader("Метрики качества")
-        st.write({k: str(round(v, 3)) + "%" for k, v in m.items()})
+        st.write(metrics_view(m))
+
+forecast_panel("baseline_resp", "forecast",
+               f"Прогноз Cash balance ({(st.session_state['baseline_resp'] or {}).get('scenario', '')})")
 
 # ---- Scenario Section ----
 st.header("2) Сценарии 'what-if'")
@@ -270,6 +276,11 @@ if run_scenario:
         "delay_top_inflow_days": int(d_in),
         "delay_top_outflow_days": int(d_out),
     }
+    base_resp = st.session_state.get("baseline_resp") or {}
+    if base_resp.get("run_id") and len(base_resp.get("forecast") or []) >= horizon:
+        # шоки к уже посчитанному прогнозу на сервере — без повторного прогноза
+        payload["baseline_run_id"] = base_resp["run_id"]
+        payload["scenario"] = base_resp.get("scenario") or "baseline"
     resp, err = api_post("/scenario", json_data=payload)
     if err:
         st.error(f"Ошибка сценария: {err}")
@@ -277,7 +288,8 @@ if run_scenario:
         st.session_state["scenario"] = resp.get("forecast_scenario")
         st.session_state["scenario_resp"] = resp
         st.success("Сценарий рассчитан.")
-        plot_forecast(st.session_state["scenario"], "Сценарий: Cash balance при шоках")
+
+forecast_panel("scenario_resp", "forecast_scenario", "Сценарий: Cash balance при шоках")
 
 # ---- Advice Section ----
 st.header("3) Совет по действиям (Advisor)")
@@ -287,9 +299,10 @@ with colA1:
         if not (st.session_state["baseline_resp"] and st.session_state["scenario_resp"]):
             st.warning("Сначала посчитайте базовый прогноз и сценарий.")
         else:
+            # только id прогонов — точки сервер берёт из истории
             payload = {
-                "baseline": st.session_state["baseline_resp"],
-                "scenario": st.session_state["scenario_resp"]
+                "baseline_run_id": st.session_state["baseline_resp"].get("run_id"),
+                "scenario_run_id": st.session_state["scenario_resp"].get("run_id"),
             }
             resp, err = api_post("/advice", json_data=payload, role="CFO")
             if err:
@@ -374,12 +387,16 @@ else:
 
 st.subheader("Экспорт в PDF")
 if st.button("Сформировать PDF-бриф", type="secondary"):
+    base_resp = st.session_state.get("baseline_resp") or {}
+    scen_resp = st.session_state.get("scenario_resp") or {}
     payload = {
-        "baseline": st.session_state.get("baseline_resp") or {},
-        "scenario": st.session_state.get("scenario_resp") or {},
         "advice":   st.session_state.get("advice") or st.session_state.get("advice_resp") or {},
         "horizon_days": st.session_state.get("horizon", None),
     }
+    if base_resp.get("run_id") and scen_resp.get("run_id"):
+        payload.update(baseline_run_id=base_resp["run_id"], scenario_run_id=scen_resp["run_id"])
+    else:
+        payload.update(baseline=base_resp, scenario=scen_resp)
     pdf_bytes, err = api_post_binary("/report/pdf", json_data=payload, role="CFO")
     if err:
         st.error(f"Ошибка PDF: {err}")
@@ -3,31 +3,15 @@ import io
 import json
 import numpy as np
 import pandas as pd
-import requests
 import streamlit as st
 
+from api_client import cached_get
+
 st.set_page_config(page_title="Backtest & Models", page_icon="📈", layout="wide")
 
 # --- API base ---------------------------------------------------------------
 api_base = (st.session_state.get("API_URL") or "http://127.0.0.1:8000/api").rstrip("/")
 
-def api_post(path: str, json_data=None, role: str = "Analyst", timeout: int = 60):
-    url = api_base + ("/" + path.lstrip("/"))
-    try:
-        r = requests.post(url, json=json_data or {}, headers={
-            "Content-Type": "application/json",
-            "X-Role": role
-        }, timeout=timeout)
-        if r.status_code >= 400:
-            try:
-                detail = r.json().get("detail")
-            except Exception:
-                detail = r.text
-            return None, f"{r.status_code} {r.reason} — {detail}"
-        return r.json(), None
-    except requests.RequestException as e:
-        return None, str(e)
-
 # --- UI ---------------------------------------------------------------------
 st.title("📈 Backtest & сравнение моделей")
 
@@ -53,6 +37,7 @@ def fmt_pct(x):
         return "—"
 
 def df_safe(records):
+    # records — список строк или колонки {"date": [...], ...} (format=columnar) — DataFrame понимает оба
     try:
         df = pd.DataFrame(records or [])
         # нормализуем date, если есть
@@ -64,19 +49,22 @@ def df_safe(records):
 
 if run_btn:
     with st.spinner("Считаем…"):
-        payload = {
+        # GET по колонкам: меньше JSON, а повтор тех же параметров на тех же данных → 304 без пересчёта
+        params = {
             "horizon": int(horizon),
             "window": int(window),
             "step": int(step),
             "target_col": target_col,
             "models": models,
+            "format": "columnar",
         }
-        data, err = api_post("/backtest", json_data=payload, role=role)
+        data, err, cached = cached_get(api_base, "/backtest", params, role=role, timeout=300)
     if err:
         st.error(f"Ошибка: {err}")
     else:
         st.session_state["backtest_result"] = data
-        st.success("Готово ✅")
+        st.session_state["backtest_frames"] = {}
+        st.success("Готово ✅" + (" (данные не менялись — из кэша)" if cached else ""))
 
 data = st.session_state["backtest_result"]
 
@@ -105,22 +93,38 @@ else:
 # --- Per-model chart --------------------------------------------------------
 st.subheader("📊 Факт vs прогноз")
 per_model = data.get("per_model") or {}
-opts = [m for m in per_model.keys() if per_model[m]]
-if not opts:
-    st.info("Нет результатов per-model.")
-else:
+
+
+def model_frame(model: str) -> pd.DataFrame:
+    # тысячи строк на модель — разбираем один раз на результат (сбрасывается новым запуском)
+    frames = st.session_state.setdefault("backtest_frames", {})
+    if model not in frames:
+        dfm = df_safe(per_model.get(model))
+        frames[model] = dfm.sort_values("date") if not dfm.empty else dfm
+    return frames[model]
+
+
+@st.fragment
+def per_model_panel():
+    """Выбор модели перерисовывает только график, а не всю страницу."""
+    opts = [m for m in per_model.keys() if per_model[m]]
+    if not opts:
+        st.info("Нет результатов per-model.")
+        return
     model_sel = st.selectbox("Модель", opts, index=0)
-    dfm = df_safe(per_model.get(model_sel))
+    dfm = model_frame(model_sel)
     if dfm.empty:
         st.info("Недостаточно точек для графика.")
-    else:
-        dfm = dfm.sort_values("date")
-        # группируем по дате, если перекрываются окна
-        g = dfm.groupby("date", as_index=False).agg({"y_true": "mean", "y_pred": "mean"})
-        g = g.set_index("date")
-        st.line_chart(g[["y_true", "y_pred"]])
-        with st.expander("Показать сырые точки (пересечения окон)"):
-            st.dataframe(dfm, use_container_width=True)
+        return
+    # группируем по дате, если перекрываются окна
+    g = dfm.groupby("date", as_index=False).agg({"y_true": "mean", "y_pred": "mean"})
+    g = g.set_index("date")
+    st.line_chart(g[["y_true", "y_pred"]])
+    with st.expander("Показать сырые точки (пересечения окон)"):
+        st.dataframe(dfm, use_container_width=True)
+
+
+per_model_panel()
 
 # --- Downloads --------------------------------------------------------------
 st.subheader("⬇️ Экспорт результатов")
@@ -0,0 +1,30 @@
+"""
+Общая шапка JSON-отчётов бенчмарков (bench_pipeline, backtest, loadtest): когда, на какой ревизии
+и с какими версиями снят отчёт — чтобы отчёты разных коммитов можно было сравнивать.
+"""
+import platform
+import subprocess
+from datetime import datetime, timezone
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+
+
+def git_rev() -> str | None:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True,
+                              text=True, timeout=5).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+def report_header() -> dict:
+    import numpy as np
+    import pandas as pd
+    return {
+        "created_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "git": git_rev(),
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "pandas": pd.__version__,
+    }
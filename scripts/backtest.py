@@ -1,130 +1,138 @@
 #!/usr/bin/env python
+"""
+Офлайн rolling backtest на том же движке, что POST /api/backtest (services.backtest.rolling_backtest):
+точность (MAPE/sMAPE/MAE), раннее предупреждение о разрыве (precision/recall, запас в днях),
+время и окон/с по каждой модели. Витрина daily_cash или синтетика заданного размера — для
+отслеживания регрессий производительности (--json пишет отчёт, сравнимый между коммитами).
+Примеры:
+  python scripts/backtest.py --horizon 7 --window 30 --models naive_last,arima
+  python scripts/backtest.py --synthetic --days 100000 --accounts 20 --models naive_mean,ses,holt --json bt.json
+"""
 import argparse
+import json
+import sys
+import time
 from pathlib import Path
-import pandas as pd
+
 import numpy as np
-import matplotlib.pyplot as plt
-from datetime import timedelta
+import pandas as pd
 
 ROOT = Path(__file__).resolve().parents[1]
-DATA = ROOT / "data" / "processed"
-OUT  = ROOT / "data" / "reports"
-OUT.mkdir(parents=True, exist_ok=True)
+sys.path.insert(0, str(ROOT / "backend"))
 
-def smape(y_true, y_pred):
-    y_true, y_pred = np.array(y_true), np.array(y_pred)
-    denom = (np.abs(y_true) + np.abs(y_pred))
-    denom[denom == 0] = 1e-9
-    return (100.0 / len(y_true)) * np.sum(np.abs(y_pred - y_true) / denom)
+from app.services.backtest import HAS_PMD, HAS_PROPHET, MODEL_FUNCS, BacktestParams, rolling_backtest  # noqa: E402
+from app.services.forecast import load_daily_cash_df  # noqa: E402
+from app.utils.io import entity_dir  # noqa: E402
+from _report import report_header  # noqa: E402
 
-def mae(y_true, y_pred):
-    y_true, y_pred = np.array(y_true), np.array(y_pred)
-    return float(np.mean(np.abs(y_pred - y_true)))
+OUT = ROOT / "data" / "reports"
+_AGG = ("MAPE", "sMAPE", "MAE", "gap_precision", "gap_recall", "gap_days_early")
 
-def rolling_forecast_naive(series, horizon, window=7):
+
+def synthetic_daily(days: int, accounts: int = 1, seed: int = 0) -> list[pd.DataFrame]:
     """
-    Наивный прогноз: среднее скользящее по последним window для net_cash,
-    cash_balance как cumsum(net_cash).
+    Ряды daily_cash для accounts счетов сразу матрицей (accounts, days): недельный цикл поступлений,
+    зарплата 10-го и 25-го, шум. Остаток возвращается к целевому (казначейство выметает/пополняет
+    долю отклонения), поэтому и на 100k днях разрывы случаются, а не уходят дрейфом в бесконечность.
     """
-    preds = []
-    hist = list(series)  # список значений net_cash
-    for _ in range(horizon):
-        w = hist[-window:] if len(hist) >= window else hist
-        pred = float(np.mean(w)) if len(w) else 0.0
-        preds.append(pred)
-        hist.append(pred)
-    return preds
-
-def main(horizon=14, window=7, start_offset=30):
-    # daily_cash: date, net_cash, cash_balance
-    df = None
-    for name in ("daily_cash.parquet", "daily_cash.csv"):
-        p = DATA / name
-        if p.exists():
-            df = pd.read_parquet(p) if name.endswith(".parquet") else pd.read_csv(p)
-            break
-    if df is None or df.empty:
-        raise SystemExit("daily_cash.* not found or empty")
-
-    df["date"] = pd.to_datetime(df["date"])
-    df = df.sort_values("date").reset_index(drop=True)
-
-    metrics = []
-    # скользящее окно: начиная с start_offset (чтобы было на что учиться)
-    for i in range(start_offset, len(df) - horizon):
-        hist = df.iloc[:i]
-        future = df.iloc[i:i+horizon]
-
-        # прогнозируем net_cash
-        preds_net = rolling_forecast_naive(hist["net_cash"].values, horizon=horizon, window=window)
-        # считаем баланс: берем последний факт баланса + cumsum(preds_net)
-        last_balance = float(hist["cash_balance"].values[-1]) if len(hist) else 0.0
-        preds_bal = np.cumsum(preds_net) + last_balance
-
-        # метрики по net_cash
-        m_smape = smape(future["net_cash"].values, preds_net)
-        m_mae   = mae  (future["net_cash"].values, preds_net)
-
-        # сигнал о кассовом разрыве в прогнозе
-        forecast_min_bal = float(np.min(preds_bal))
-        warn_predicted = forecast_min_bal < 0
-
-        # случится ли отрицательный баланс фактически в горизонте?
-        true_bal = hist["cash_balance"].values[-1] + np.cumsum(future["net_cash"].values)
-        true_min_bal = float(np.min(true_bal))
-        event_true = true_min_bal < 0
-
-        # насколько заранее модель "подняла флаг"?
-        days_to_event = None
-        if event_true:
-            # день наступления разрыва в факте
-            day_event_idx = int(np.where(true_bal < 0)[0][0])
-            # была ли точка в preds_bal, где ушло <0 до day_event_idx?
-            alert_idx = next((k for k, v in enumerate(preds_bal) if v < 0), None)
-            if alert_idx is not None:
-                days_to_event = max(0, day_event_idx - alert_idx)
-
-        metrics.append({
-            "asof": df["date"].iloc[i-1].date().isoformat(),
-            "horizon": horizon,
-            "smape": round(m_smape, 3),
-            "mae": round(m_mae, 3),
-            "forecast_min_balance": round(forecast_min_bal, 2),
-            "warn_predicted": bool(warn_predicted),
-            "true_min_balance": round(true_min_bal, 2),
-            "event_true": bool(event_true),
-            "days_to_event_early": (int(days_to_event) if days_to_event is not None else None),
-        })
-
-    met_df = pd.DataFrame(metrics)
-    met_path = OUT / "backtest_metrics.csv"
-    met_df.to_csv(met_path, index=False)
-
-    # короткий итог
-    agg = {
-        "runs": len(met_df),
-        "smape_mean": round(float(met_df["smape"].mean()), 3),
-        "mae_mean": round(float(met_df["mae"].mean()), 3),
-        "early_warnings": int(met_df["warn_predicted"].sum()),
-        "events_true": int(met_df["event_true"].sum()),
-        "median_days_to_event_early": float(met_df["days_to_event_early"].dropna().median()) if met_df["days_to_event_early"].notna().any() else None
-    }
-    print("Backtest summary:", agg)
-
-    # картинка: распределение sMAPE
-    plt.figure(figsize=(6,4))
-    plt.hist(met_df["smape"].values, bins=20)
-    plt.title("sMAPE distribution (net_cash forecast)")
-    plt.xlabel("sMAPE, %")
-    plt.ylabel("count")
-    img_path = OUT / "backtest_smape_hist.png"
-    plt.savefig(img_path, bbox_inches="tight", dpi=150)
-    print("Saved:", met_path, img_path)
-
-if __name__ == "__main__":
-    ap = argparse.ArgumentParser()
+    rng = np.random.default_rng(seed)
+    dates = pd.date_range("1970-01-01", periods=int(days), freq="D")   # 100k дней помещаются в datetime64[ns]
+    dow, dom = dates.dayofweek.to_numpy(), dates.day.to_numpy()
+    scale = rng.uniform(5e5, 5e6, (accounts, 1))
+    pattern = np.where(dow == 0, 3.0, np.where(dow >= 5, -0.2, 0.4)) + np.isin(dom, (10, 25)) * -4.0
+    shocks = scale * (pattern - pattern.mean() + rng.normal(0, 1.0, (accounts, days)))
+    target, keep = scale[:, 0] * 2.0, 0.9                # отклонение от цели живёт ~10 дней
+    bal = np.empty((accounts, days))
+    dev = np.zeros(accounts)
+    for t in range(days):                                # цикл по дням, счета — векторно
+        dev = keep * dev + shocks[:, t]
+        bal[:, t] = target + dev
+    net = np.diff(bal, axis=1, prepend=target[:, None])
+    return [pd.DataFrame({"date": dates, "net_cash": net[i], "cash_balance": bal[i]}) for i in range(accounts)]
+
+
+def run(frames: list[pd.DataFrame], params: BacktestParams) -> tuple[pd.DataFrame, int]:
+    """Backtest по каждому ряду; сводка по моделям: средние метрики, суммарное время, окон/с."""
+    rows, origins = [], 0
+    for df in frames:
+        res = rolling_backtest(params, df=df)
+        origins += res["origins"]
+        rows.append(res["summary"])
+    allm = pd.concat(rows, ignore_index=True)
+    agg = allm.groupby("model").agg(
+        **{c: (c, "mean") for c in _AGG if c in allm.columns},
+        points=("points", "sum"),
+        ms=("ms", "sum"),
+    ).reset_index()
+    agg["origins_per_s"] = (origins / (agg["ms"] / 1000.0)).where(agg["ms"] > 0).round(1)
+    return agg.sort_values("sMAPE"), origins
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
     ap.add_argument("--horizon", type=int, default=14)
-    ap.add_argument("--window",  type=int, default=7)
-    ap.add_argument("--offset",  type=int, default=30, help="минимальная длина истории до первого прогноза")
+    ap.add_argument("--window", type=int, default=30, help="минимальная длина истории до первого прогноза")
+    ap.add_argument("--step", type=int, default=1)
+    ap.add_argument("--max-origins", type=int, default=None, help="только последние N окон")
+    ap.add_argument("--models", default=None, help=f"через запятую; по умолчанию все: {','.join(MODEL_FUNCS)}")
+    ap.add_argument("--gap-threshold", type=float, default=0.0, help="порог баланса для раннего предупреждения")
+    ap.add_argument("--entity", default=None, help="юрлицо (каталог entities/<id>); по умолчанию основной набор")
+    ap.add_argument("--synthetic", action="store_true", help="синтетика вместо витрины")
+    ap.add_argument("--days", type=int, default=1000)
+    ap.add_argument("--accounts", type=int, default=1)
+    ap.add_argument("--seed", type=int, default=0)
+    ap.add_argument("--json", default=None, help="куда сохранить отчёт")
+    ap.add_argument("--out", default=str(OUT), help="каталог для backtest_summary.csv")
     args = ap.parse_args()
-    main(horizon=args.horizon, window=args.window, start_offset=args.offset)
+
+    models = [m.strip() for m in args.models.split(",") if m.strip()] if args.models else None
+    if models is None:   # без pmdarima/prophet они молча откатываются к naive_last — в сводке не нужны
+        models = [m for m in MODEL_FUNCS if (m != "arima" or HAS_PMD) and (m != "prophet" or HAS_PROPHET)]
+    unknown = [m for m in models if m not in MODEL_FUNCS]
+    if unknown:
+        raise SystemExit(f"unknown models: {', '.join(unknown)} (available: {', '.join(MODEL_FUNCS)})")
+    params = BacktestParams(horizon=args.horizon, window=args.window, step=args.step, use_models=models,
+                            max_origins=args.max_origins, gap_threshold=args.gap_threshold, detail=False)
+
+    t0 = time.perf_counter()
+    if args.synthetic:
+        frames = synthetic_daily(args.days, args.accounts, args.seed)
+        source = "synthetic"
+    else:
+        root = entity_dir(args.entity) if args.entity else None
+        daily = load_daily_cash_df(root)
+        if daily.empty:
+            raise SystemExit("daily_cash not found or empty (upload data or use --synthetic)")
+        frames, source = [daily], f"daily_cash:{args.entity or 'default'}"
+    gen_ms = (time.perf_counter() - t0) * 1000.0
+
+    t0 = time.perf_counter()
+    summary, origins = run(frames, params)
+    total_ms = (time.perf_counter() - t0) * 1000.0
+
+    days = len(frames[0])
+    print(f"{source}: {len(frames)} series × {days} days, {origins} origins, horizon {args.horizon} "
+          f"(data {gen_ms:.0f} ms, backtest {total_ms:.0f} ms)")
+    with pd.option_context("display.width", 160, "display.max_columns", 20, "display.float_format", "{:.3f}".format):
+        print(summary.to_string(index=False))
+
+    out = Path(args.out)
+    out.mkdir(parents=True, exist_ok=True)
+    summary.to_csv(out / "backtest_summary.csv", index=False)
+
+    if args.json:
+        report = {
+            **report_header(),
+            "dataset": {"source": source, "series": len(frames), "days": days, "seed": args.seed},
+            "params": {k: v for k, v in vars(params).items() if k != "detail"},
+            "origins": origins,
+            "data_ms": round(gen_ms, 1),
+            "total_ms": round(total_ms, 1),
+            "models": json.loads(summary.to_json(orient="records")),   # NaN → null
+        }
+        Path(args.json).write_text(json.dumps(report, ensure_ascii=False, indent=2), encoding="utf-8")
+        print(f"saved {args.json}")
+
+
+if __name__ == "__main__":
+    main()
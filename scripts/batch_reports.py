@@ -0,0 +1,48 @@
+#!/usr/bin/env python
+"""
+Батч-генерация PDF-брифов по нескольким юрлицам без поднятого API.
+Пример: python scripts/batch_reports.py kz01 kz02 --horizon 14 --scenario stress --out briefs.zip
+"""
+import argparse
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT / "backend"))
+
+from app.services.batch import run_batch_reports  # noqa: E402
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("entities", nargs="*", help="id юрлиц (пусто — основной набор)")
+    ap.add_argument("--horizon", type=int, default=14)
+    ap.add_argument("--scenario", default="baseline", choices=["baseline", "stress", "optimistic"])
+    ap.add_argument("--fx-shock", type=float, default=0.0)
+    ap.add_argument("--delay-in", type=int, default=0)
+    ap.add_argument("--delay-out", type=int, default=0)
+    ap.add_argument("--workers", type=int, default=None)
+    ap.add_argument("--out", default="liquidity_briefs.zip")
+    args = ap.parse_args()
+
+    params = {
+        "horizon_days": args.horizon,
+        "scenario": args.scenario,
+        "fx_shock": args.fx_shock,
+        "delay_top_inflow_days": args.delay_in,
+        "delay_top_outflow_days": args.delay_out,
+    }
+    archive, summary = run_batch_reports(args.entities, params, workers=args.workers)
+    Path(args.out).write_bytes(archive)
+
+    for r in summary["entities"]:
+        if r["ok"]:
+            stages = ", ".join(f"{k[:-3]}={v}ms" for k, v in r.items() if k.endswith("_ms"))
+            print(f"  {r['entity']:<16} ok    {stages}")
+        else:
+            print(f"  {r['entity']:<16} FAIL  {r['error']}")
+    print(f"Batch: ok={summary['ok']} failed={summary['failed']} workers={summary['workers']} "
+          f"shared_fits={summary['shared_fits']} wall={summary['wall_ms']}ms -> {args.out}")
+    return 0 if not summary["failed"] else 1
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,187 @@
+#!/usr/bin/env python
+"""
+Бенчмарк конвейера без поднятого API: синтетические выписки/календарь растущего размера
+(моки sources.bank_mock) → ETL → прогноз (холодный и из реестра) → сценарий → совет (LLM-заглушка)
+→ PDF → backtest. Время — медиана по --repeat прогонам, память — пик tracemalloc отдельным прогоном.
+Каждый размер считается в своём временном каталоге данных. Отчёт --json сравним между коммитами
+(--compare старый.json печатает отношение времени по этапам).
+Пример: python scripts/bench_pipeline.py --sizes 90,365,1825 --repeat 3 --json pipeline.json
+"""
+import argparse
+import gc
+import json
+import os
+import resource
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import date, timedelta
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+BACKEND = ROOT / "backend"
+sys.path.insert(0, str(BACKEND))
+os.environ.setdefault("MODEL_WARMUP_ON_SYNC", "false")
+
+import numpy as np  # noqa: E402
+import pandas as pd  # noqa: E402
+
+from app.core import config  # noqa: E402
+from app.services import advisor, backtest as bt, etl, llm, registry  # noqa: E402
+from app.services.forecast import get_forecast  # noqa: E402
+from _report import report_header  # noqa: E402
+from app.services.scenarios import run_scenario  # noqa: E402
+from app.sources.bank_mock import pull_bank_statements, pull_payment_calendar  # noqa: E402
+from app.utils import io  # noqa: E402
+
+STAGES = ("seed", "etl", "forecast_cold", "forecast", "scenario", "advice", "pdf", "backtest")
+STUB_BRIEF = "1) Итог: ликвидность под контролем.\n2) Риски: см. минимум баланса.\n3) Рекомендации: см. действия."
+
+
+def stub_llm(latency_ms: float):
+    """Заглушка llm.chat: фиксированная задержка вместо сети, ответ постоянный."""
+    def chat(system_prompt: str, user_prompt: str) -> str:
+        if latency_ms > 0:
+            time.sleep(latency_ms / 1000.0)
+        return STUB_BRIEF
+    return chat
+
+
+def seed(days: int) -> dict:
+    """Источники за days дней: банк и календарь — моки bank_mock, курсы — random walk (без сети)."""
+    end = date(2025, 1, 1)
+    start = end - timedelta(days=days - 1)
+    bank = pull_bank_statements(start, end)
+    cal = etl.normalize_calendar(pull_payment_calendar(start, end))
+    dates = pd.date_range(start, end, freq="D").date
+    rng = np.random.default_rng(42)
+    fx = pd.DataFrame({"date": dates,
+                       "USD/KZT": np.round(500 + np.cumsum(rng.normal(0, 0.8, len(dates))), 2),
+                       "EUR/KZT": np.round(540 + np.cumsum(rng.normal(0, 0.9, len(dates))), 2)})
+    io.save_df("bank_statements.parquet", bank)
+    io.save_df("payment_calendar.parquet", cal)
+    io.save_df("fx_rates.parquet", fx)
+    return {"bank_statements": len(bank), "payment_calendar": len(cal), "fx_rates": len(fx)}
+
+
+def pipeline(horizon: int, backtest_models: list[str], trace: bool = False) -> tuple[dict, dict]:
+    """
+    Этапы по очереди с нуля (пустой реестр моделей, холодный кэш кадров): ({этап: мс}, {этап: пик МБ}).
+    trace=True — пик памяти этапа по tracemalloc (должен быть запущен).
+    """
+    registry.REGISTRY = registry.ModelRegistry()
+    io.FRAME_CACHE.clear()
+    ms, peaks, ctx = {}, {}, {}
+
+    def stage(name, fn):
+        if trace:
+            tracemalloc.reset_peak()
+        t0 = time.perf_counter()
+        out = fn()
+        ms[name] = (time.perf_counter() - t0) * 1000.0
+        if trace:
+            peaks[name] = tracemalloc.get_traced_memory()[1] / 2**20
+        return out
+
+    def do_etl():
+        daily = etl.build_daily_cashframe()
+        io.save_df("daily_cash.parquet", daily)
+        return daily
+
+    from app.services.reports import build_pdf   # импорт ReportLab — не часть этапа pdf
+    daily = stage("etl", do_etl)
+    stage("forecast_cold", lambda: get_forecast(horizon=horizon))      # с фитом модели
+    pts, metrics = stage("forecast", lambda: get_forecast(horizon=horizon))
+    ctx["baseline"] = {"forecast": pts, "metrics": metrics, "scenario": "baseline"}
+    ctx["scenario"] = stage("scenario", lambda: run_scenario(horizon_days=horizon, scenario="stress", fx_shock=0.1))
+    ctx["advice"] = stage("advice", lambda: advisor.build_advice({"baseline": ctx["baseline"],
+                                                                  "scenario": ctx["scenario"]}))
+    advice = ctx["advice"].model_dump() if hasattr(ctx["advice"], "model_dump") else ctx["advice"]
+    stage("pdf", lambda: build_pdf(ctx["baseline"], ctx["scenario"], advice, horizon))
+    stage("backtest", lambda: bt.rolling_backtest(
+        bt.BacktestParams(horizon=horizon, window=30, use_models=backtest_models, max_origins=200, detail=False),
+        df=daily))
+    return ms, peaks
+
+
+def measure(days: int, args) -> dict:
+    with tempfile.TemporaryDirectory(prefix="bench-") as tmp:
+        io.DATA_DIR, io.TENANTS_DIR = Path(tmp) / "processed", Path(tmp) / "tenants"
+        io.DATA_DIR.mkdir(parents=True)
+
+        t0 = time.perf_counter()
+        rows = seed(days)
+        seed_ms = (time.perf_counter() - t0) * 1000.0
+        runs = [pipeline(args.horizon, args.backtest_models)[0] for _ in range(args.repeat)]
+
+        # память — отдельным прогоном: tracemalloc сам замедляет код в разы
+        gc.collect()
+        tracemalloc.start()
+        try:
+            seed(days)
+            seed_mb = tracemalloc.get_traced_memory()[1] / 2**20
+            _, peaks = pipeline(args.horizon, args.backtest_models, trace=True)
+        finally:
+            tracemalloc.stop()
+
+    stages = {"seed": {"ms": round(seed_ms, 1), "peak_mb": round(seed_mb, 2)}}
+    for name in STAGES[1:]:
+        vals = [r[name] for r in runs]
+        stages[name] = {"ms": round(statistics.median(vals), 1), "ms_min": round(min(vals), 1),
+                        "peak_mb": round(peaks[name], 2)}
+    return {"days": days, "rows": rows, "stages": stages}
+
+
+def compare(report: dict, old_path: str):
+    old = {r["days"]: r["stages"] for r in json.loads(Path(old_path).read_text(encoding="utf-8"))["sizes"]}
+    print(f"vs {old_path} (new/old, ms):")
+    for r in report["sizes"]:
+        prev = old.get(r["days"])
+        if not prev:
+            continue
+        cells = [f"{s}={r['stages'][s]['ms'] / prev[s]['ms']:.2f}x" for s in STAGES
+                 if s in prev and prev[s]["ms"] > 0]
+        print(f"  {r['days']:>6} days: " + "  ".join(cells))
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--sizes", default="90,365,1825", help="дней истории, через запятую")
+    ap.add_argument("--horizon", type=int, default=14)
+    ap.add_argument("--repeat", type=int, default=3)
+    ap.add_argument("--llm-latency-ms", type=float, default=0.0, help="задержка заглушки LLM")
+    ap.add_argument("--backtest-models", default="naive_last,naive_mean,ses,hw")
+    ap.add_argument("--json", default=None, help="куда сохранить отчёт")
+    ap.add_argument("--compare", default=None, help="прошлый отчёт для сравнения")
+    args = ap.parse_args()
+    args.backtest_models = [m for m in args.backtest_models.split(",") if m]
+
+    config.LLM_PROVIDER = "stub"
+    llm.chat = stub_llm(args.llm_latency_ms)   # advisor зовёт llm.chat через модуль
+
+    sizes = []
+    for days in (int(s) for s in args.sizes.split(",") if s.strip()):
+        res = measure(days, args)
+        sizes.append(res)
+        cells = "  ".join(f"{s}={v['ms']:.0f}ms/{v['peak_mb']:.1f}MB" for s, v in res["stages"].items())
+        print(f"{days:>6} days ({res['rows']['bank_statements']} bank rows): {cells}")
+
+    report = {
+        **report_header(),
+        "pmdarima": bt.HAS_PMD,
+        "params": {"horizon": args.horizon, "repeat": args.repeat, "llm_latency_ms": args.llm_latency_ms,
+                   "backtest_models": args.backtest_models},
+        "rss_max_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024.0, 1),
+        "sizes": sizes,
+    }
+    if args.compare:
+        compare(report, args.compare)
+    if args.json:
+        Path(args.json).write_text(json.dumps(report, ensure_ascii=False, indent=2), encoding="utf-8")
+        print(f"saved {args.json}")
+
+
+if __name__ == "__main__":
+    main()
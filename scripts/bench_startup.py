@@ -0,0 +1,92 @@
+#!/usr/bin/env python
+"""
+Замер старта API: `python -X importtime -c "import app.main"` в чистом процессе, стоимость импорта
+по модулям (cumulative) и отдельно — тяжёлых библиотек, которые приложение грузит лениво.
+Пример: python scripts/bench_startup.py --runs 5 --top 15 --json startup.json
+"""
+import argparse
+import json
+import os
+import re
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+BACKEND = ROOT / "backend"
+
+# импортируются при первом использовании / фоновым прогревом (core.lazy, main._warm_start)
+LAZY = ["reportlab.platypus", "app.services.reports", "httpx", "apscheduler.schedulers.background",
+        "pmdarima", "prophet"]
+
+_LINE = re.compile(r"^import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)")
+
+
+def importtime(stmt: str) -> tuple[float, dict]:
+    """Один чистый процесс: (wall мс, {модуль: (cumulative мкс, глубина)})."""
+    env = {**os.environ, "PYTHONPATH": str(BACKEND), "STARTUP_WARMUP": "false"}
+    t0 = time.perf_counter()
+    proc = subprocess.run([sys.executable, "-X", "importtime", "-c", stmt], cwd=BACKEND, env=env,
+                          capture_output=True, text=True)
+    wall = (time.perf_counter() - t0) * 1000.0
+    if proc.returncode != 0:
+        raise RuntimeError(proc.stderr.strip().splitlines()[-1] if proc.stderr.strip() else "import failed")
+    mods = {}
+    for line in proc.stderr.splitlines():
+        m = _LINE.match(line)
+        if m:
+            mods[m.group(4)] = (int(m.group(2)), len(m.group(3)) // 2)
+    return wall, mods
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--runs", type=int, default=3)
+    ap.add_argument("--top", type=int, default=15)
+    ap.add_argument("--json", default=None, help="куда сохранить отчёт")
+    args = ap.parse_args()
+
+    walls, per_mod = [], {}
+    for _ in range(args.runs):
+        wall, mods = importtime("import app.main")
+        walls.append(wall)
+        for name, (cum, depth) in mods.items():
+            per_mod.setdefault(name, []).append((cum, depth))
+
+    # верхний уровень дерева импорта app.main (глубина 1) — что реально стоит старт
+    rows = sorted(((n, statistics.median(c for c, _ in v) / 1000.0) for n, v in per_mod.items()
+                   if v[0][1] == 1), key=lambda r: -r[1])
+    total = statistics.median(c for c, _ in per_mod["app.main"]) / 1000.0
+    print(f"import app.main: {total:.0f} ms (median of {args.runs}), process wall {statistics.median(walls):.0f} ms")
+    for name, ms in rows[:args.top]:
+        print(f"  {name:<40} {ms:8.1f} ms  {ms / total * 100:5.1f}%")
+
+    lazy_rows = {}
+    print("lazy (not imported at startup):")
+    for name in LAZY:
+        loaded = name in per_mod
+        try:
+            _, mods = importtime(f"import {name}")
+            ms = mods[name][0] / 1000.0
+            lazy_rows[name] = {"ms": round(ms, 1), "imported_at_startup": loaded}
+            print(f"  {name:<40} {ms:8.1f} ms  {'LOADED AT STARTUP' if loaded else 'deferred'}")
+        except RuntimeError as e:
+            lazy_rows[name] = {"ms": None, "error": str(e)}
+            print(f"  {name:<40}      n/a  ({e})")
+
+    if args.json:
+        report = {
+            "runs": args.runs,
+            "app_main_ms": round(total, 1),
+            "process_wall_ms": round(statistics.median(walls), 1),
+            "modules": [{"module": n, "ms": round(ms, 1)} for n, ms in rows],
+            "lazy": lazy_rows,
+        }
+        Path(args.json).write_text(json.dumps(report, ensure_ascii=False, indent=2), encoding="utf-8")
+        print(f"saved {args.json}")
+
+
+if __name__ == "__main__":
+    main()
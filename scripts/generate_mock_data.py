@@ -0,0 +1,88 @@
+#!/usr/bin/env python
+"""
+Синтетика для нагрузочных тестов: годы истории по многим счетам, валютам и контрагентам
+(sources.bank_mock.generate_ledger — векторно, миллионы строк за секунды, seed → те же данные).
+Пишет прямо в хранилище сервиса через io.save_df: тенант (--tenant), юрлица (--entities N →
+entities/E01..EN, у каждого свой seed), бэкенд files|sql (--storage, по умолчанию STORAGE_BACKEND).
+--build сразу собирает витрину daily_cash тем же ETL, что /api/etl/build.
+Примеры:
+  python scripts/generate_mock_data.py --years 10 --accounts 100 --build
+  python scripts/generate_mock_data.py --days 730 --entities 20 --tenant load --storage sql
+"""
+import argparse
+import os
+import sys
+import time
+from datetime import date, timedelta
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT / "backend"))
+os.environ.setdefault("MODEL_WARMUP_ON_SYNC", "false")
+
+from app.core import config  # noqa: E402
+from app.core.tenant import use_tenant  # noqa: E402
+from app.services import etl  # noqa: E402
+from app.sources.bank_mock import generate_ledger  # noqa: E402
+from app.utils import io  # noqa: E402
+
+
+def write_entity(root, args, start: date, end: date, seed: int) -> dict:
+    """Генерит и сохраняет один набор данных; {датасет: строк} и тайминги этапов (мс)."""
+    t0 = time.perf_counter()
+    src = generate_ledger(start, end, accounts=args.accounts, currencies=args.currencies,
+                          counterparties=args.counterparties, ops_per_day=args.ops_per_day, seed=seed)
+    t1 = time.perf_counter()
+    for name, df in src.items():
+        io.save_df(f"{name}.parquet", df, root)
+    t2 = time.perf_counter()
+    rows = {name: len(df) for name, df in src.items()}
+    timings = {"generate_ms": (t1 - t0) * 1000.0, "save_ms": (t2 - t1) * 1000.0}
+    if args.build:
+        daily = etl.build_daily_cashframe(root)
+        io.save_df("daily_cash.parquet", daily, root)
+        rows["daily_cash"] = len(daily)
+        timings["etl_ms"] = (time.perf_counter() - t2) * 1000.0
+    return {"rows": rows, **timings}
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--days", type=int, default=None, help="дней истории (по умолчанию --years)")
+    ap.add_argument("--years", type=float, default=1.0)
+    ap.add_argument("--end", default=None, help="последний день YYYY-MM-DD (по умолчанию сегодня)")
+    ap.add_argument("--accounts", type=int, default=5)
+    ap.add_argument("--currencies", default="KZT,USD,EUR")
+    ap.add_argument("--counterparties", type=int, default=200)
+    ap.add_argument("--ops-per-day", type=float, default=2.0, help="операций на счёт в будний день")
+    ap.add_argument("--seed", type=int, default=0)
+    ap.add_argument("--entities", type=int, default=0, help="0 — основной набор тенанта, N — entities/E01..EN")
+    ap.add_argument("--tenant", default=None)
+    ap.add_argument("--storage", choices=("files", "sql"), default=None)
+    ap.add_argument("--build", action="store_true", help="собрать daily_cash после генерации")
+    args = ap.parse_args()
+    args.currencies = [c.strip().upper() for c in args.currencies.split(",") if c.strip()]
+    if args.storage:
+        config.STORAGE_BACKEND = args.storage
+
+    end = date.fromisoformat(args.end) if args.end else date.today()
+    days = args.days or max(1, round(args.years * 365))
+    start = end - timedelta(days=days - 1)
+    targets = [None] if args.entities <= 0 else [f"E{i + 1:02d}" for i in range(args.entities)]
+
+    t0 = time.perf_counter()
+    total = 0
+    with use_tenant(args.tenant):
+        for k, entity in enumerate(targets):
+            res = write_entity(io.entity_dir(entity), args, start, end, args.seed + k)
+            total += res["rows"]["bank_statements"]
+            cells = "  ".join(f"{n}={v}" for n, v in res["rows"].items())
+            times = "  ".join(f"{n[:-3]}={v:.0f}ms" for n, v in res.items() if n.endswith("_ms"))
+            print(f"{entity or 'default'}: {cells}  ({times})")
+    secs = time.perf_counter() - t0
+    print(f"{config.STORAGE_BACKEND}/{args.tenant or config.DEFAULT_TENANT}: {len(targets)} set(s), "
+          f"{start}..{end}, {total} bank rows in {secs:.1f} s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+#!/usr/bin/env python
+"""
+Заглушка LLM для офлайн-нагрузки: отвечает на POST /api/chat (Ollama) и /v1/chat/completions,
+/chat/completions (OpenAI-совместимые) постоянным брифом с задержкой --latency-ms (± --jitter-ms).
+Только stdlib, поток на запрос — задержка не блокирует соседние запросы, как у настоящего сервера.
+Пример:
+  python scripts/llm_stub.py --port 11500 --latency-ms 800
+  LLM_PROVIDER=ollama OLLAMA_BASE_URL=http://127.0.0.1:11500 uvicorn app.main:app
+"""
+import argparse
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+BRIEF = ("1) Итог: ликвидность под контролем, минимум остатка выше нуля.\n"
+         "2) Риски: концентрация поступлений, валютные платежи.\n"
+         "3) Рекомендации: держать буфер, перенести закупки при просадке.")
+
+
+def make_handler(latency_ms: float, jitter_ms: float, stats: dict):
+    lock = threading.Lock()
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, *args):   # без строки в stderr на каждый запрос
+            pass
+
+        def _send(self, code: int, body: dict):
+            raw = json.dumps(body, ensure_ascii=False).encode("utf-8")
+            self.send_response(code)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(raw)))
+            self.end_headers()
+            self.wfile.write(raw)
+
+        def do_GET(self):
+            if self.path.rstrip("/") in ("", "/health", "/api/tags"):
+                self._send(200, {"ok": True, **stats})
+            else:
+                self._send(404, {"error": "not found"})
+
+        def do_POST(self):
+            n = int(self.headers.get("Content-Length") or 0)
+            req = json.loads(self.rfile.read(n) or b"{}")
+            delay = max(0.0, latency_ms + random.uniform(-jitter_ms, jitter_ms)) / 1000.0
+            time.sleep(delay)
+            with lock:
+                stats["requests"] += 1
+            model = req.get("model", "stub")
+            if self.path == "/api/chat":
+                self._send(200, {"model": model, "message": {"role": "assistant", "content": BRIEF}, "done": True})
+            elif self.path.endswith("/chat/completions"):
+                self._send(200, {"model": model, "object": "chat.completion",
+                                 "choices": [{"index": 0, "finish_reason": "stop",
+                                              "message": {"role": "assistant", "content": BRIEF}}]})
+            else:
+                self._send(404, {"error": "not found"})
+
+    return Handler
+
+
+def serve(host: str = "127.0.0.1", port: int = 0, latency_ms: float = 0.0,
+          jitter_ms: float = 0.0) -> ThreadingHTTPServer:
+    """Поднимает заглушку в фоновом потоке; порт 0 — свободный (server.server_address[1])."""
+    server = ThreadingHTTPServer((host, port), make_handler(latency_ms, jitter_ms, {"requests": 0}))
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="llm-stub", daemon=True).start()
+    return server
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--host", default="127.0.0.1")
+    ap.add_argument("--port", type=int, default=11500)
+    ap.add_argument("--latency-ms", type=float, default=500.0)
+    ap.add_argument("--jitter-ms", type=float, default=0.0)
+    args = ap.parse_args()
+    server = serve(args.host, args.port, args.latency_ms, args.jitter_ms)
+    print(f"LLM stub on http://{args.host}:{server.server_address[1]} (latency {args.latency_ms:.0f} ms)")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,261 @@
+#!/usr/bin/env python
+"""
+Нагрузочный тест API: N асинхронных клиентов httpx по замкнутому циклу (запрос → ответ → следующий)
+со смесью эндпоинтов (--mix forecast=5,scenario=3,advice=1), ступени конкурентности (--concurrency 1,4,16)
+по --duration секунд. Отчёт по каждому эндпоинту: запросы, ошибки, rps, p50/p95/p99/max (мс); --json
+сохраняет его для сравнения между коммитами.
+Без --base-url поднимает всё сам: синтетику в отдельном тенанте (--tenant, generate_ledger + ETL),
+заглушку LLM (scripts/llm_stub.py, --llm-latency-ms) и uvicorn (--workers) с LLM_PROVIDER=ollama на неё —
+/api/advice участвует офлайн.
+--vary — случайные горизонт/шок в каждом запросе (промахи по истории прогонов, т.е. реальный расчёт);
+без него одинаковые параметры отдаются из истории прогонов.
+Примеры:
+  python scripts/loadtest.py --concurrency 1,4,16 --duration 20 --json load.json
+  python scripts/loadtest.py --base-url http://127.0.0.1:8000 --mix forecast=1 --vary --concurrency 8
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import time
+from datetime import date, timedelta
+from pathlib import Path
+
+import numpy as np
+
+from _report import report_header
+
+ROOT = Path(__file__).resolve().parents[1]
+BACKEND = ROOT / "backend"
+
+DEFAULT_MIX = "forecast=5,scenario=3,advice=1,health=1"
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def seed_tenant(tenant: str, days: int, accounts: int, seed: int) -> dict:
+    """Синтетика и витрина daily_cash в тенанте tenant (тот же бэкенд хранения, что у сервера)."""
+    sys.path.insert(0, str(BACKEND))
+    from app.core.tenant import use_tenant
+    from app.services import etl
+    from app.sources.bank_mock import generate_ledger
+    from app.utils import io
+
+    end = date.today()
+    src = generate_ledger(end - timedelta(days=days - 1), end, accounts=accounts, seed=seed)
+    with use_tenant(tenant):
+        for name, df in src.items():
+            io.save_df(f"{name}.parquet", df)
+        daily = etl.build_daily_cashframe()
+        io.save_df("daily_cash.parquet", daily)
+    return {name: len(df) for name, df in src.items()} | {"daily_cash": len(daily)}
+
+
+class Stack:
+    """Сервер и заглушка LLM подпроцессами; закрываются вместе с харнессом."""
+
+    def __init__(self, args):
+        self.procs = []
+        self.args = args
+
+    def start(self) -> str:
+        a = self.args
+        env = {**os.environ, "MODEL_WARMUP_ON_SYNC": "false", "METRICS_LOG_REQUESTS": "false"}
+        if a.llm_latency_ms is not None:
+            llm_port = _free_port()
+            self.procs.append(subprocess.Popen(
+                [sys.executable, str(ROOT / "scripts" / "llm_stub.py"), "--port", str(llm_port),
+                 "--latency-ms", str(a.llm_latency_ms)], stdout=subprocess.DEVNULL))
+            env.update(LLM_PROVIDER="ollama", OLLAMA_BASE_URL=f"http://127.0.0.1:{llm_port}")
+        port = _free_port()
+        self.procs.append(subprocess.Popen(
+            [sys.executable, "-m", "uvicorn", "app.main:app", "--host", "127.0.0.1", "--port", str(port),
+             "--workers", str(a.workers), "--log-level", "warning", "--no-access-log"],
+            cwd=BACKEND, env=env))
+        return f"http://127.0.0.1:{port}"
+
+    def stop(self):
+        for p in reversed(self.procs):
+            p.terminate()
+        for p in self.procs:
+            try:
+                p.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                p.kill()
+
+
+async def wait_ready(client, timeout: float = 60.0):
+    t_end = time.monotonic() + timeout
+    while True:
+        try:
+            if (await client.get("/api/health")).status_code == 200:
+                return
+        except Exception:
+            if time.monotonic() > t_end:
+                raise
+        await asyncio.sleep(0.2)
+
+
+def build_requests(ctx: dict, vary: bool) -> dict:
+    """Эндпоинт → функция (rng) → (метод, путь, тело, заголовки)."""
+    cfo = {"X-Role": "CFO"}
+
+    def horizon(rng):
+        return rng.randint(7, 60) if vary else 35
+
+    return {
+        "forecast": lambda rng: ("POST", "/api/forecast", {"horizon_days": horizon(rng)}, {}),
+        "forecast_hier": lambda rng: ("POST", "/api/forecast",
+                                      {"horizon_days": horizon(rng), "mode": "hierarchical"}, {}),
+        "scenario": lambda rng: ("POST", "/api/scenario",
+                                 {"horizon_days": horizon(rng), "scenario": "stress",
+                                  "fx_shock": round(rng.uniform(-0.2, 0.2), 3) if vary else 0.1}, {}),
+        "scenario_from_run": lambda rng: ("POST", "/api/scenario",
+                                          {"baseline_run_id": ctx["baseline_run_id"],
+                                           "fx_shock": round(rng.uniform(-0.2, 0.2), 3) if vary else 0.1}, {}),
+        "advice": lambda rng: ("POST", "/api/advice", ctx["advice"], cfo),
+        "report": lambda rng: ("POST", "/api/report/pdf", ctx["report"], {}),
+        "backtest": lambda rng: ("POST", "/api/backtest",
+                                 {"horizon": 7, "models": ["naive_mean", "ses"], "max_origins": 60,
+                                  "detail": False}, {}),
+        "runs": lambda rng: ("GET", "/api/runs", None, {}),
+        "health": lambda rng: ("GET", "/api/health", None, {}),
+    }
+
+
+async def prepare(client) -> dict:
+    """Тела для advice/report — id настоящих прогонов forecast/scenario (заодно прогрев модели)."""
+    base = (await client.post("/api/forecast", json={"horizon_days": 35})).raise_for_status().json()
+    scen = (await client.post("/api/scenario", json={"horizon_days": 35, "scenario": "stress",
+                                                      "fx_shock": 0.1})).raise_for_status().json()
+    advice_req = {"baseline_run_id": base["run_id"], "scenario_run_id": scen["run_id"]}
+    adv = (await client.post("/api/advice", json=advice_req, headers={"X-Role": "CFO"})).raise_for_status().json()
+    return {"baseline_run_id": base["run_id"], "advice": advice_req,
+            "report": {**advice_req, "advice": adv, "horizon_days": 35}}
+
+
+async def stage(client, reqs: dict, mix: dict, concurrency: int, duration: float, seed: int) -> dict:
+    """Замкнутый цикл: concurrency клиентов шлют запросы duration секунд; латентности по эндпоинтам."""
+    names, weights = list(mix), list(mix.values())
+    samples = {n: [] for n in names}
+    errors = {n: 0 for n in names}
+    t_end = time.perf_counter() + duration
+
+    async def worker(k: int):
+        rng = random.Random(seed * 1000 + k)
+        while time.perf_counter() < t_end:
+            name = rng.choices(names, weights)[0]
+            method, path, body, headers = reqs[name](rng)
+            t0 = time.perf_counter()
+            try:
+                r = await client.request(method, path, json=body, headers=headers)
+                ok = r.status_code < 400
+            except Exception:
+                ok = False
+            dt = (time.perf_counter() - t0) * 1000.0
+            if ok:
+                samples[name].append(dt)
+            else:
+                errors[name] += 1
+
+    t0 = time.perf_counter()
+    await asyncio.gather(*(worker(k) for k in range(concurrency)))
+    wall = time.perf_counter() - t0
+
+    out = {}
+    for n in names:
+        lat = np.asarray(samples[n])
+        row = {"requests": len(lat) + errors[n], "errors": errors[n], "rps": round(len(lat) / wall, 2)}
+        if len(lat):
+            p50, p95, p99 = np.percentile(lat, [50, 95, 99])
+            row |= {"p50_ms": round(p50, 1), "p95_ms": round(p95, 1), "p99_ms": round(p99, 1),
+                    "max_ms": round(lat.max(), 1)}
+        out[n] = row
+    total = sum(len(v) for v in samples.values())
+    return {"concurrency": concurrency, "wall_s": round(wall, 2), "rps": round(total / wall, 2),
+            "errors": sum(errors.values()), "endpoints": out}
+
+
+def print_stage(res: dict):
+    print(f"concurrency {res['concurrency']}: {res['rps']} rps, {res['errors']} errors ({res['wall_s']} s)")
+    for n, r in res["endpoints"].items():
+        lat = (f"p50 {r['p50_ms']:>8.1f}  p95 {r['p95_ms']:>8.1f}  p99 {r['p99_ms']:>8.1f}  max {r['max_ms']:>8.1f} ms"
+               if "p50_ms" in r else "no successful requests")
+        print(f"  {n:<17} n={r['requests']:<6} err={r['errors']:<4} {r['rps']:>8.2f} rps  {lat}")
+
+
+async def run(args, base_url: str) -> list[dict]:
+    import httpx
+    limits = httpx.Limits(max_connections=max(args.concurrency) + 4, max_keepalive_connections=max(args.concurrency))
+    headers = {"X-Tenant": args.tenant} if args.tenant else {}
+    async with httpx.AsyncClient(base_url=base_url, headers=headers, limits=limits,
+                                 timeout=args.timeout) as client:
+        await wait_ready(client)
+        reqs = build_requests(await prepare(client), args.vary)
+        unknown = [n for n in args.mix if n not in reqs]
+        if unknown:
+            raise SystemExit(f"unknown endpoints in --mix: {', '.join(unknown)} (available: {', '.join(reqs)})")
+        results = []
+        for c in args.concurrency:
+            res = await stage(client, reqs, args.mix, c, args.duration, args.seed)
+            print_stage(res)
+            results.append(res)
+        return results
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--base-url", default=None, help="уже запущенный сервер; без него — поднимем свой")
+    ap.add_argument("--workers", type=int, default=1, help="воркеры uvicorn (только без --base-url)")
+    ap.add_argument("--mix", default=DEFAULT_MIX, help="эндпоинт=вес через запятую")
+    ap.add_argument("--concurrency", default="1,4,16", help="ступени числа клиентов")
+    ap.add_argument("--duration", type=float, default=15.0, help="секунд на ступень")
+    ap.add_argument("--vary", action="store_true", help="случайные параметры (промахи по истории прогонов)")
+    ap.add_argument("--tenant", default="loadtest", help="тенант с данными нагрузки ('' — основной)")
+    ap.add_argument("--seed-days", type=int, default=730, help="дней синтетики; 0 — данные уже есть")
+    ap.add_argument("--accounts", type=int, default=10)
+    ap.add_argument("--llm-latency-ms", type=float, default=500.0,
+                    help="задержка заглушки LLM (только без --base-url)")
+    ap.add_argument("--timeout", type=float, default=120.0)
+    ap.add_argument("--seed", type=int, default=0)
+    ap.add_argument("--json", default=None, help="куда сохранить отчёт")
+    args = ap.parse_args()
+    args.concurrency = [int(c) for c in args.concurrency.split(",") if c.strip()]
+    args.mix = {k.strip(): float(v) for k, v in (p.split("=") for p in args.mix.split(",") if p.strip())}
+
+    dataset = seed_tenant(args.tenant or "default", args.seed_days, args.accounts, args.seed) \
+        if args.seed_days > 0 else None
+    stack = None
+    base_url = args.base_url
+    if not base_url:
+        stack = Stack(args)
+        base_url = stack.start()
+    try:
+        results = asyncio.run(run(args, base_url))
+    finally:
+        if stack:
+            stack.stop()
+
+    if args.json:
+        report = {
+            **report_header(),
+            "cpus": os.cpu_count(),
+            "server": base_url if args.base_url else {"workers": args.workers, "llm_latency_ms": args.llm_latency_ms},
+            "dataset": dataset,
+            "params": {"mix": args.mix, "duration_s": args.duration, "vary": args.vary, "tenant": args.tenant},
+            "stages": results,
+        }
+        Path(args.json).write_text(json.dumps(report, ensure_ascii=False, indent=2), encoding="utf-8")
+        print(f"saved {args.json}")
+
+
+if __name__ == "__main__":
+    main()